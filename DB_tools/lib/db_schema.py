@@ -156,6 +156,7 @@ SYSTEM_SETTINGS_DEFAULTS = {
     'permission_min': ('1', '用户权限最小值'),
     'permission_max': ('10', '用户权限最大值'),
     'distill_rate': ('0.1', '蒸馏任务价格系数（相对于查询任务）'),
+    'cache_hit_rate': ('1.0', '相关性缓存命中时的价格系数'),
     'debug_console_enabled': ('false', '是否启用调试日志控制台'),
     # 修复35新增: 公告栏和维护模式配置
     'announcement_enabled': ('false', '是否启用公告栏'),
@@ -25,6 +25,56 @@ model_name = ''
 api_base_url = ''
 api_timeout = 180
 API_KEYS = []
+# LLM客户端连接池（HTTP keep-alive）
+llm_max_connections = 200
+llm_max_keepalive = 200
+llm_keepalive_expiry = 30
+# 跨查询相关性结果缓存
+relevance_cache_enabled = True
+relevance_cache_ttl = 30 * 24 * 3600
+# Worker执行引擎: thread（每个permission一个线程）或 async（事件循环 + 协程）
+worker_engine = 'thread'
+async_engine_loops = 4
+async_engine_io_threads = 32
+# 结果批量提交（commit_batch_size=1 时逐篇提交）
+commit_batch_size = 1
+commit_batch_ms = 500
+# 大Block按DOI区间切分为多个工作单元（0 表示不切分）
+block_slice_size = 500
+# 每个查询预取并解码的Block数（0 表示关闭预取）
+block_prefetch_depth = 2
+# 调度器从MySQL恢复遗漏查询的扫描间隔（秒），平时由调度事件唤醒
+scheduler_recovery_interval = 60
+# 全局公平共享闸门: 固定并发预算（0 表示按Key池RPM × 预估延迟自动推算）
+fair_share_concurrency = 0
+fair_share_latency = 5
+# 分布式限流（USE_REDIS_RATELIMITER）等待额度的最长秒数，超时后按本地余量选择Key
+rate_limit_max_wait = 30
+# 准入控制: 预估的回复Token数（加在提示词预估之上），限额利用目标比例
+estimated_completion_tokens = 60
+rate_limit_target = 0.95
+# 自适应并发（AIMD）: 开关、每个查询的初始并发上限、p95延迟容忍倍数
+adaptive_concurrency = True
+adaptive_initial_concurrency = 4
+adaptive_latency_tolerance = 1.5
+# AI调用容错: 每篇文献的重试次数、退避基数（秒）、失败文献重新入队次数、是否开启对冲请求
+ai_max_retries = 3
+ai_retry_base_delay = 1.0
+ai_max_requeue = 2
+ai_hedge_enabled = False
+# 熔断: 首次熔断时长（秒）、触发熔断的错误率
+circuit_open_seconds = 10
+circuit_error_rate = 0.5
+# 优先级调度: batch 请求的最长宽限时间（秒），决定老化速度（见 fair_share.py）
+priority_aging_seconds = 10
+# Block租约时长（秒）：Worker异常退出后超过此时长未续约的Block重新入队（见 block_lease.py）
+block_lease_seconds = 120
+# Worker进程收到 SIGTERM 后等待Worker退出的最长时间（秒），超时后直接交还租约（见 scheduler.shutdown_scheduler）
+shutdown_timeout = 30
+# 新写入文献Block的存储格式: hash（逐篇记录）或 snapshot（整Block列式快照，见 paper_snapshot.py）
+paper_block_format = 'hash'
+# 进程内已解码文献Block缓存的内存预算（MB），0表示关闭（见 lib/redis/block_cache.py）
+block_cache_mb = 256
 local_develop_mode = False  # 新增：本地开发者模式开关 20251028
 DB_HOST = ''
 DB_PORT = 3306
@@ -71,6 +121,19 @@ def load_config():
     global YEAR_RANGE_START, YEAR_RANGE_END, INCLUDE_ALL_YEARS
     global ResearchQuestion, Requirements, system_prompt
     global model_name, api_base_url, api_timeout, API_KEYS
+    global llm_max_connections, llm_max_keepalive, llm_keepalive_expiry
+    global relevance_cache_enabled, relevance_cache_ttl
+    global worker_engine, async_engine_loops, async_engine_io_threads
+    global commit_batch_size, commit_batch_ms
+    global block_slice_size, block_prefetch_depth
+    global scheduler_recovery_interval
+    global fair_share_concurrency, fair_share_latency
+    global rate_limit_max_wait
+    global estimated_completion_tokens, rate_limit_target
+    global adaptive_concurrency, adaptive_initial_concurrency, adaptive_latency_tolerance
+    global ai_max_retries, ai_retry_base_delay, ai_max_requeue, ai_hedge_enabled
+    global circuit_open_seconds, circuit_error_rate, priority_aging_seconds
+    global block_lease_seconds, shutdown_timeout, paper_block_format, block_cache_mb
     global DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME
     global unit_test_mode, local_develop_mode
     global TOKENS_PER_REQ
@@ -112,6 +175,109 @@ def load_config():
         api_base_url = config.get('api_base_url', 'https://ark.cn-beijing.volces.com/api/v3')
         api_timeout = config.get('api_timeout', 180)  # 默认180秒
         API_KEYS = config.get('API_KEYS', [])
+        # LLM客户端连接池
+        try:
+            llm_max_connections = int(config.get('llm_max_connections', 200) or 200)
+            llm_max_keepalive = int(config.get('llm_max_keepalive', llm_max_connections) or llm_max_connections)
+            llm_keepalive_expiry = float(config.get('llm_keepalive_expiry', 30) or 30)
+        except Exception:
+            llm_max_connections, llm_max_keepalive, llm_keepalive_expiry = 200, 200, 30
+        # 相关性结果缓存
+        relevance_cache_enabled = _to_bool(config.get('relevance_cache_enabled', True))
+        try:
+            relevance_cache_ttl = int(config.get('relevance_cache_ttl', 30 * 24 * 3600) or 30 * 24 * 3600)
+        except Exception:
+            relevance_cache_ttl = 30 * 24 * 3600
+        # Worker执行引擎
+        worker_engine = str(config.get('worker_engine', 'thread') or 'thread').strip().lower()
+        try:
+            async_engine_loops = int(config.get('async_engine_loops', 4) or 4)
+            async_engine_io_threads = int(config.get('async_engine_io_threads', 32) or 32)
+        except Exception:
+            async_engine_loops, async_engine_io_threads = 4, 32
+        # 结果批量提交
+        try:
+            commit_batch_size = max(1, int(config.get('commit_batch_size', 1) or 1))
+            commit_batch_ms = int(config.get('commit_batch_ms', 500) or 0)
+        except Exception:
+            commit_batch_size, commit_batch_ms = 1, 500
+        # Block切分
+        try:
+            block_slice_size = max(0, int(config.get('block_slice_size', 500) or 0))
+        except Exception:
+            block_slice_size = 500
+        # Block预取
+        try:
+            block_prefetch_depth = max(0, int(config.get('block_prefetch_depth', 2) or 0))
+        except Exception:
+            block_prefetch_depth = 2
+        # 调度器恢复扫描
+        try:
+            scheduler_recovery_interval = max(5, int(config.get('scheduler_recovery_interval', 60) or 60))
+        except Exception:
+            scheduler_recovery_interval = 60
+        # 全局公平共享闸门
+        try:
+            fair_share_concurrency = max(0, int(config.get('fair_share_concurrency', 0) or 0))
+            fair_share_latency = float(config.get('fair_share_latency', 5) or 5)
+        except Exception:
+            fair_share_concurrency, fair_share_latency = 0, 5
+        # 分布式限流
+        try:
+            rate_limit_max_wait = float(config.get('rate_limit_max_wait', 30) or 0)
+        except Exception:
+            rate_limit_max_wait = 30
+        # 准入控制
+        try:
+            estimated_completion_tokens = max(0, int(config.get('estimated_completion_tokens', 60) or 0))
+            rate_limit_target = min(1.0, max(0.1, float(config.get('rate_limit_target', 0.95) or 0.95)))
+        except Exception:
+            estimated_completion_tokens, rate_limit_target = 60, 0.95
+        # 自适应并发
+        adaptive_concurrency = _to_bool(config.get('adaptive_concurrency', True))
+        try:
+            adaptive_initial_concurrency = max(1, int(config.get('adaptive_initial_concurrency', 4) or 4))
+            adaptive_latency_tolerance = max(1.0, float(config.get('adaptive_latency_tolerance', 1.5) or 1.5))
+        except Exception:
+            adaptive_initial_concurrency, adaptive_latency_tolerance = 4, 1.5
+        # AI调用容错
+        try:
+            ai_max_retries = max(0, int(config.get('ai_max_retries', 3) or 0))
+            ai_retry_base_delay = max(0.1, float(config.get('ai_retry_base_delay', 1.0) or 1.0))
+            ai_max_requeue = max(0, int(config.get('ai_max_requeue', 2) or 0))
+        except Exception:
+            ai_max_retries, ai_retry_base_delay, ai_max_requeue = 3, 1.0, 2
+        ai_hedge_enabled = _to_bool(config.get('ai_hedge_enabled', False))
+        # 熔断
+        try:
+            circuit_open_seconds = max(1, int(config.get('circuit_open_seconds', 10) or 10))
+            circuit_error_rate = min(1.0, max(0.05, float(config.get('circuit_error_rate', 0.5) or 0.5)))
+        except Exception:
+            circuit_open_seconds, circuit_error_rate = 10, 0.5
+        # 优先级调度
+        try:
+            priority_aging_seconds = max(0.1, float(config.get('priority_aging_seconds', 10) or 10))
+        except Exception:
+            priority_aging_seconds = 10
+        # Block租约
+        try:
+            block_lease_seconds = max(10, int(config.get('block_lease_seconds', 120) or 120))
+        except Exception:
+            block_lease_seconds = 120
+        # 退出时等待Worker的时长
+        try:
+            shutdown_timeout = max(0.0, float(config.get('shutdown_timeout', 30) or 0))
+        except Exception:
+            shutdown_timeout = 30
+        # 文献Block存储格式
+        paper_block_format = str(config.get('paper_block_format', 'hash') or 'hash').lower()
+        if paper_block_format not in ('hash', 'snapshot'):
+            paper_block_format = 'hash'
+        # 已解码Block缓存预算
+        try:
+            block_cache_mb = max(0, int(config.get('block_cache_mb', 256)))
+        except Exception:
+            block_cache_mb = 256
         # 新增：本地开发者模式
         local_develop_mode = _to_bool(config.get('local_develop_mode', False))
         
@@ -209,6 +375,38 @@ def save_config():
         'model_name': model_name,
         'api_base_url': api_base_url,
         'api_timeout': api_timeout,
+        'llm_max_connections': llm_max_connections,
+        'llm_max_keepalive': llm_max_keepalive,
+        'llm_keepalive_expiry': llm_keepalive_expiry,
+        'relevance_cache_enabled': relevance_cache_enabled,
+        'relevance_cache_ttl': relevance_cache_ttl,
+        'worker_engine': worker_engine,
+        'async_engine_loops': async_engine_loops,
+        'async_engine_io_threads': async_engine_io_threads,
+        'commit_batch_size': commit_batch_size,
+        'commit_batch_ms': commit_batch_ms,
+        'block_slice_size': block_slice_size,
+        'block_prefetch_depth': block_prefetch_depth,
+        'scheduler_recovery_interval': scheduler_recovery_interval,
+        'fair_share_concurrency': fair_share_concurrency,
+        'fair_share_latency': fair_share_latency,
+        'rate_limit_max_wait': rate_limit_max_wait,
+        'estimated_completion_tokens': estimated_completion_tokens,
+        'rate_limit_target': rate_limit_target,
+        'adaptive_concurrency': adaptive_concurrency,
+        'adaptive_initial_concurrency': adaptive_initial_concurrency,
+        'adaptive_latency_tolerance': adaptive_latency_tolerance,
+        'ai_max_retries': ai_max_retries,
+        'ai_retry_base_delay': ai_retry_base_delay,
+        'ai_max_requeue': ai_max_requeue,
+        'ai_hedge_enabled': ai_hedge_enabled,
+        'circuit_open_seconds': circuit_open_seconds,
+        'circuit_error_rate': circuit_error_rate,
+        'priority_aging_seconds': priority_aging_seconds,
+        'block_lease_seconds': block_lease_seconds,
+        'shutdown_timeout': shutdown_timeout,
+        'paper_block_format': paper_block_format,
+        'block_cache_mb': block_cache_mb,
         'unit_test_mode': unit_test_mode,
         'local_develop_mode': local_develop_mode,
         # enable_debug_website_console 已迁移到数据库管理
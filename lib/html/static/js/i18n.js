@@ -463,6 +463,11 @@
         health_error: '连接失败',
         health_queue: '积压 {count} 条',
         queue_backlog: '积压',
+        circuit_breaker: '熔断器',
+        worker_processes: 'Worker进程',
+        process_count: '{count} 个进程',
+        circuit_error_rate: '错误率',
+        circuit_retry_in: '{seconds} 秒后探测',
         status_ok: 'OK',
         status_error: 'ERROR',
         status_connected: '已连接',
@@ -476,6 +481,7 @@
         task_status: '状态',
         task_pending: '待处理Blocks',
         pending_blocks: '待处理Blocks',
+        ai_concurrency: 'AI并发/上限 · 排队',
         task_completed: '已完成',
         completed: '已完成',
         task_action: '操作',
@@ -528,6 +534,8 @@
         control_permission_max: '最大值',
         control_distill_rate: '蒸馏任务价格系数',
         control_distill_desc: '蒸馏任务相对于普通查询任务的价格比例。默认0.1表示蒸馏任务费用为查询任务的10%。',
+        control_cache_hit_rate: '缓存命中价格系数',
+        control_cache_hit_desc: '文献命中相关性缓存（无需调用AI）时的价格比例。默认1表示与正常调用同价，0表示免费。',
         control_rate_label: '系数 (0~1)',
         control_rate_preview: '= 查询价格的 {percent}%',
         control_debug_console: '调试日志控制台',
@@ -564,6 +572,11 @@
         // 批量操作（修复32新增）
         batch_selected_count: '已选择 {count} 项',
         batch_terminate: '批量终止',
+        batch_escalate: '提升为管理员优先级',
+        task_priority: '优先级',
+        priority_admin: '管理员',
+        priority_interactive: '交互',
+        priority_batch: '批量',
         batch_adjust_balance: '批量调整余额',
         batch_adjust_permission: '批量调整权限',
         batch_confirm: '确定对 {count} 项执行此操作？',
@@ -1340,6 +1353,11 @@
         health_error: 'Connection Failed',
         health_queue: '{count} items pending',
         queue_backlog: 'Pending',
+        circuit_breaker: 'Circuit',
+        worker_processes: 'Worker Processes',
+        process_count: '{count} processes',
+        circuit_error_rate: 'Error rate',
+        circuit_retry_in: 'probe in {seconds}s',
         status_ok: 'OK',
         status_error: 'ERROR',
         status_connected: 'Connected',
@@ -1353,6 +1371,7 @@
         task_status: 'Status',
         task_pending: 'Pending Blocks',
         pending_blocks: 'Pending Blocks',
+        ai_concurrency: 'AI In-flight/Limit · Queued',
         task_completed: 'Completed',
         completed: 'Completed',
         task_action: 'Action',
@@ -1405,6 +1424,8 @@
         control_permission_max: 'Max',
         control_distill_rate: 'Distillation Price Rate',
         control_distill_desc: 'Price ratio of distillation tasks relative to regular query tasks. Default 0.1 means distillation cost is 10% of query cost.',
+        control_cache_hit_rate: 'Cache Hit Price Rate',
+        control_cache_hit_desc: 'Price ratio for papers answered from the relevance cache (no AI call). Default 1 means the same price as a regular call; 0 means free.',
         control_rate_label: 'Rate (0~1)',
         control_rate_preview: '= {percent}% of query price',
         control_debug_console: 'Debug Log Console',
@@ -1441,6 +1462,11 @@
         // Batch operations (Fix 32)
         batch_selected_count: 'Selected {count} items',
         batch_terminate: 'Batch Terminate',
+        batch_escalate: 'Escalate to Admin Priority',
+        task_priority: 'Priority',
+        priority_admin: 'Admin',
+        priority_interactive: 'Interactive',
+        priority_batch: 'Batch',
         batch_adjust_balance: 'Batch Adjust Balance',
         batch_adjust_permission: 'Batch Adjust Permission',
         batch_confirm: 'Execute on {count} items?',
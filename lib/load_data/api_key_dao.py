@@ -0,0 +1,44 @@
+"""
+API Key数据访问对象 (新架构)
+管理 api_list 表的读取
+
+api_list 表结构:
+- api_index (INT, PK) - Key编号
+- api_key (VARCHAR 512, UNIQUE) - API Key
+- api_name (VARCHAR 255) - 名称（来源文件名）
+- rpm_limit (INT) - 每分钟请求数上限
+- tpm_limit (BIGINT) - 每分钟Token数上限
+- is_active (TINYINT) - 是否启用
+"""
+
+from typing import List, Dict, Any
+from .db_base import _get_connection
+
+# 与 DB_tools/lib/db_schema.py 中 api_list 的列默认值保持一致
+DEFAULT_RPM_LIMIT = 3000
+DEFAULT_TPM_LIMIT = 500000
+
+
+def get_active_api_keys() -> List[Dict[str, Any]]:
+    """
+    获取所有启用的API Key及其限额
+
+    Returns:
+        [{api_index, api_key, api_name, rpm_limit, tpm_limit}, ...]
+    """
+    conn = _get_connection()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            "SELECT api_index, api_key, api_name, rpm_limit, tpm_limit "
+            "FROM api_list WHERE is_active = 1 ORDER BY api_index"
+        )
+        rows = cursor.fetchall() or []
+        cursor.close()
+
+        for row in rows:
+            row['rpm_limit'] = int(row.get('rpm_limit') or DEFAULT_RPM_LIMIT)
+            row['tpm_limit'] = int(row.get('tpm_limit') or DEFAULT_TPM_LIMIT)
+        return rows
+    finally:
+        conn.close()
@@ -209,6 +209,7 @@ def ensure_defaults() -> bool:
         'permission_min': ('1', '用户权限最小值'),
         'permission_max': ('10', '用户权限最大值'),
         'distill_rate': ('0.1', '蒸馏任务价格系数（相对于查询任务）'),
+        'cache_hit_rate': ('1.0', '相关性缓存命中时的价格系数'),
         'debug_console_enabled': ('false', '是否启用调试日志控制台'),
         # 修复35新增: 公告栏和维护模式配置
         'announcement_enabled': ('false', '是否启用公告栏'),
@@ -297,6 +298,18 @@ def set_distill_rate(rate: float) -> bool:
     return set_setting('distill_rate', str(rate), '蒸馏任务价格系数（相对于查询任务）')
 
 
+def get_cache_hit_rate() -> float:
+    """获取缓存命中价格系数"""
+    return get_float_setting('cache_hit_rate', 1.0)
+
+
+def set_cache_hit_rate(rate: float) -> bool:
+    """设置缓存命中价格系数"""
+    if rate < 0 or rate > 1:
+        return False
+    return set_setting('cache_hit_rate', str(rate), '相关性缓存命中时的价格系数')
+
+
 def get_bool_setting(key: str, default: bool = False) -> bool:
     """获取布尔类型配置"""
     value = get_setting(key)
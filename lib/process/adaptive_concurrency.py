@@ -0,0 +1,142 @@
+"""
+自适应并发控制模块 (新架构)
+按API的实际表现（延迟、429/5xx）自动调整并发上限，取代手工调节 permission 与固定并发预算
+
+算法 (AIMD，类似TCP拥塞控制):
+- 以"窗口"为评估周期：每完成 max(MIN_WINDOW, 当前上限) 次调用评估一次（约一个往返）
+- 拥塞信号: 429 / 5xx / 超时，或窗口 p95 延迟超过基线 p95 × 容忍倍数
+  -> 上限乘以 BACKOFF（乘性减），退出慢启动
+- 无拥塞且窗口内在途数达到上限（上限确实是瓶颈）
+  -> 慢启动阶段上限翻倍，之后每个窗口 +1（加性增）
+- 基线 p95 为无拥塞窗口 p95 的指数滑动平均，适应服务端延迟的缓慢漂移
+- 拥塞错误立即生效，但两次乘性减之间至少间隔一个窗口，避免一次突发把上限压到底
+
+使用:
+- 每个查询（FairShareGate 的流）一个控制器，上限不超过该查询的Worker数（permission）
+- 全局一个控制器，上限不超过并发预算上限（见 fair_share.py）
+"""
+
+from typing import Dict, List, Optional
+
+# 每个评估窗口的最少样本数
+MIN_WINDOW = 10
+# 乘性减系数
+BACKOFF = 0.7
+# 基线 p95 的平滑因子
+BASELINE_ALPHA = 0.1
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(len(ordered) * pct))
+    return ordered[index]
+
+
+class AIMDLimit:
+    """
+    单个并发上限控制器
+
+    非线程安全，由调用方（FairShareGate）在锁内调用
+    """
+
+    def __init__(self, initial: int, max_limit: int, min_limit: int = 1,
+                 tolerance: float = 1.5):
+        """
+        Args:
+            initial: 初始上限（慢启动起点）
+            max_limit: 上限的上限
+            min_limit: 上限的下限
+            tolerance: p95 延迟超过基线的容忍倍数
+        """
+        self.min_limit = max(1, int(min_limit))
+        self.max_limit = max(self.min_limit, int(max_limit))
+        self.limit = float(min(self.max_limit, max(self.min_limit, initial)))
+        self.tolerance = max(1.0, float(tolerance))
+        self.slow_start = True
+        self.baseline: Optional[float] = None
+        self._latencies: List[float] = []
+        self._samples = 0
+        self._peak_in_flight = 0
+        self._since_backoff = 1 << 30  # 首次拥塞立即退避
+        self._congested = False
+
+    def get_limit(self) -> int:
+        return int(self.limit)
+
+    def set_max(self, max_limit: int) -> None:
+        """调整上限的上限（如查询permission变化、全局预算刷新）"""
+        self.max_limit = max(self.min_limit, int(max_limit))
+        self.limit = min(self.limit, float(self.max_limit))
+
+    def observe(self, latency: Optional[float], congested: bool, in_flight: int) -> None:
+        """
+        记录一次调用结果
+
+        Args:
+            latency: API调用耗时（秒），调用未发出时为None
+            congested: 是否为拥塞信号
+            in_flight: 记录时（含本次）的在途调用数
+        """
+        self._samples += 1
+        self._since_backoff += 1
+        self._peak_in_flight = max(self._peak_in_flight, in_flight)
+        if latency is not None and not congested:
+            self._latencies.append(latency)
+
+        if congested:
+            self._congested = True
+            # 拥塞立即退避，但一个窗口内最多一次
+            if self._since_backoff >= self._window():
+                self._backoff()
+                self._reset_window()
+            return
+
+        if self._samples >= self._window():
+            self._evaluate()
+            self._reset_window()
+
+    def _window(self) -> int:
+        return max(MIN_WINDOW, int(self.limit))
+
+    def _evaluate(self) -> None:
+        if self._congested:
+            # 窗口内有拥塞但刚退避过，本窗口不再增长
+            return
+        if not self._latencies:
+            return
+
+        p95 = _percentile(self._latencies, 0.95)
+        if self.baseline is not None and p95 > self.baseline * self.tolerance:
+            self._backoff()
+            return
+
+        self.baseline = p95 if self.baseline is None else (
+            self.baseline + BASELINE_ALPHA * (p95 - self.baseline)
+        )
+
+        # 在途数没有触及上限时，上限不是瓶颈，不必增长
+        if self._peak_in_flight < self.get_limit():
+            return
+        if self.slow_start:
+            self.limit = min(float(self.max_limit), self.limit * 2)
+        else:
+            self.limit = min(float(self.max_limit), self.limit + 1)
+
+    def _backoff(self) -> None:
+        self.slow_start = False
+        self.limit = max(float(self.min_limit), self.limit * BACKOFF)
+        self._since_backoff = 0
+
+    def _reset_window(self) -> None:
+        self._latencies = []
+        self._samples = 0
+        self._peak_in_flight = 0
+        self._congested = False
+
+    def get_stats(self) -> Dict:
+        return {
+            'limit': self.get_limit(),
+            'max_limit': self.max_limit,
+            'slow_start': self.slow_start,
+            'baseline_p95': round(self.baseline, 3) if self.baseline is not None else None,
+        }
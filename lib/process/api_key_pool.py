@@ -0,0 +1,414 @@
+"""
+API Key池模块 (新架构)
+加载 api_list 中所有启用的Key，按Key统计实时TPM/RPM，并将请求路由到余量最大的Key
+
+设计:
+- 每个Key维护独立的TPM/RPM滑动窗口和在途请求数
+- acquire() 选出余量最大的Key；余量 = min(TPM剩余比例, RPM剩余比例)
+- 在途请求按每次请求的预估Token计入（见 token_estimator.py，默认 TOKENS_PER_REQ），
+  避免并发线程同时挤向同一个Key
+- release() 上报本次请求的实际Token消耗
+- 汇总容量 (Σtpm_limit, Σrpm_limit) 供调度器判断是否接受新任务，
+  系统总吞吐随加载的Key数量线性增长
+- Key列表每 refresh_interval 秒从MySQL刷新一次，刷新时保留已有Key的统计
+
+分布式限流 (USE_REDIS_RATELIMITER):
+- 本地滑动窗口只统计本进程，多个后端进程会各自认为拥有全部额度
+- 启用后 acquire() 先在Redis令牌桶（全局 + 单Key，见 lib/redis/rate_limiter.py）
+  按预估Token预扣额度，额度不足时等待回填；release() 按实际Token结算差额
+- Redis不可用或等待超过 rate_limit_max_wait 秒时回退为本地选择，不阻塞调用
+"""
+
+import asyncio
+import time
+import threading
+from typing import Dict, List, Optional, Tuple
+from ..config import config_loader as config
+from ..load_data.api_key_dao import (
+    get_active_api_keys, DEFAULT_RPM_LIMIT, DEFAULT_TPM_LIMIT
+)
+from ..redis.rate_limiter import RateLimiter
+from .circuit_breaker import get_breaker, KEY_FAILURE_ERRORS
+from .sliding_window import TPMSlidingWindow, RPMSlidingWindow
+
+
+class ApiKeyState:
+    """单个API Key的限额与实时用量"""
+
+    def __init__(self, key_id: str, api_key: str, api_name: str = '',
+                 rpm_limit: int = DEFAULT_RPM_LIMIT,
+                 tpm_limit: int = DEFAULT_TPM_LIMIT):
+        self.key_id = key_id
+        self.api_key = api_key
+        self.api_name = api_name or ''
+        self.rpm_limit = max(1, int(rpm_limit or DEFAULT_RPM_LIMIT))
+        self.tpm_limit = max(1, int(tpm_limit or DEFAULT_TPM_LIMIT))
+        # 每次选Key都会读取各Key的窗口，读多写少，使用单条计数
+        self.tpm_window = TPMSlidingWindow(60, stripes=1)
+        self.rpm_window = RPMSlidingWindow(60, stripes=1)
+        self.in_flight = 0
+        self.reserved = 0  # 在途请求预扣的Token总数
+        # Key级熔断器：连续出错的Key暂停使用，流量切到其他Key
+        self.breaker = get_breaker(f"key:{key_id}")
+
+    def headroom(self, tokens: int) -> float:
+        """
+        计算加入本次请求后的剩余余量比例（可为负数，表示已超额）
+
+        在途请求按各自的预估Token计入
+        """
+        projected_tpm = self.tpm_window.get_tpm() + self.reserved + tokens
+        projected_rpm = self.rpm_window.get_rpm() + self.in_flight + 1
+        tpm_room = 1.0 - projected_tpm / self.tpm_limit
+        rpm_room = 1.0 - projected_rpm / self.rpm_limit
+        return min(tpm_room, rpm_room)
+
+    def masked_key(self) -> str:
+        """脱敏后的Key（用于日志和监控展示）"""
+        if len(self.api_key) <= 8:
+            return '****'
+        return f"{self.api_key[:4]}****{self.api_key[-4:]}"
+
+
+class ApiKeyPool:
+    """
+    API Key池
+
+    职责: 维护所有可用Key的实时用量，为每次AI调用选择余量最大的Key
+    """
+
+    def __init__(self, refresh_interval: float = 60.0):
+        """
+        Args:
+            refresh_interval: Key列表刷新间隔（秒），默认60秒
+        """
+        self.refresh_interval = refresh_interval
+        self._keys: Dict[str, ApiKeyState] = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._loaded_at = 0.0
+
+    def _load_key_rows(self) -> List[Dict]:
+        """读取Key配置：优先 config.API_KEYS，否则读取 api_list 表"""
+        api_keys = getattr(config, 'API_KEYS', []) or []
+        if api_keys:
+            return [
+                {'key_id': f"cfg{i}", 'api_key': key, 'api_name': 'config'}
+                for i, key in enumerate(api_keys) if key
+            ]
+
+        return [
+            {
+                'key_id': str(row['api_index']),
+                'api_key': row['api_key'],
+                'api_name': row.get('api_name') or '',
+                'rpm_limit': row.get('rpm_limit'),
+                'tpm_limit': row.get('tpm_limit'),
+            }
+            for row in get_active_api_keys() if row.get('api_key')
+        ]
+
+    def refresh(self) -> int:
+        """
+        重新加载Key列表（保留已有Key的滑动窗口统计）
+
+        Returns:
+            当前可用Key数量
+        """
+        try:
+            rows = self._load_key_rows()
+        except Exception as e:
+            print(f"[ApiKeyPool] 加载API Key失败: {e}")
+            # 加载失败时继续使用旧列表，稍后重试
+            with self._lock:
+                self._loaded_at = time.time()
+                return len(self._keys)
+
+        with self._lock:
+            new_keys: Dict[str, ApiKeyState] = {}
+            for row in rows:
+                key_id = row['key_id']
+                state = self._keys.get(key_id)
+                if state is None or state.api_key != row['api_key']:
+                    state = ApiKeyState(key_id, row['api_key'], row.get('api_name', ''))
+                state.api_name = row.get('api_name') or state.api_name
+                state.rpm_limit = max(1, int(row.get('rpm_limit') or DEFAULT_RPM_LIMIT))
+                state.tpm_limit = max(1, int(row.get('tpm_limit') or DEFAULT_TPM_LIMIT))
+                new_keys[key_id] = state
+
+            if len(new_keys) != len(self._keys):
+                print(f"[ApiKeyPool] 加载 {len(new_keys)} 个API Key")
+            self._keys = new_keys
+            self._loaded_at = time.time()
+            return len(self._keys)
+
+    def _ensure_loaded(self) -> None:
+        """
+        Key列表过期时刷新
+
+        首次加载时其他线程等待加载完成；之后的定期刷新只由一个线程执行，
+        其余线程继续使用旧列表
+        """
+        if time.time() - self._loaded_at < self.refresh_interval:
+            return
+
+        blocking = self._loaded_at == 0.0
+        if not self._refresh_lock.acquire(blocking=blocking):
+            return
+        try:
+            if time.time() - self._loaded_at >= self.refresh_interval:
+                self.refresh()
+        finally:
+            self._refresh_lock.release()
+
+    @staticmethod
+    def _default_reserve() -> int:
+        return int(getattr(config, 'TOKENS_PER_REQ', 400) or 400)
+
+    @staticmethod
+    def _shared_enabled() -> bool:
+        return bool(getattr(config, 'USE_REDIS_RATELIMITER', False))
+
+    @staticmethod
+    def get_target_ratio() -> float:
+        """限额利用目标比例（留出余量吸收预估误差）"""
+        return min(1.0, max(0.1, float(getattr(config, 'rate_limit_target', 0.95) or 0.95)))
+
+    def _healthy_keys(self) -> List[ApiKeyState]:
+        """未熔断的Key（调用方持有锁）"""
+        return [k for k in self._keys.values() if k.breaker.is_available()]
+
+    def _acquire_local(self, tokens_per_req: int) -> Optional[ApiKeyState]:
+        """按本进程统计选择余量最大的健康Key并登记一次在途请求"""
+        with self._lock:
+            candidates = sorted(
+                self._healthy_keys(),
+                key=lambda k: (k.headroom(tokens_per_req), -k.in_flight),
+                reverse=True
+            )
+            for key in candidates:
+                # 半开状态的Key同一时间只放行一个探测请求
+                if key.breaker.try_acquire():
+                    key.in_flight += 1
+                    key.reserved += tokens_per_req
+                    return key
+            return None
+
+    def _try_acquire_shared(self, tokens: int) -> Optional[Tuple[Optional[ApiKeyState], float]]:
+        """
+        在Redis令牌桶中按本地余量顺序尝试预扣额度（只考虑未熔断的Key）
+
+        选中的Key处于半开状态且探测名额已被其他请求占用时，退还预扣的额度并换下一个Key
+
+        Returns:
+            (Key, 0)；额度不足时为 (None, 建议等待秒数)；没有健康Key时为 (None, None)；
+            Redis不可用时返回None
+        """
+        rejected = set()
+        while True:
+            with self._lock:
+                healthy = [k for k in self._healthy_keys() if k.key_id not in rejected]
+                if not healthy:
+                    return None, None
+                candidates = sorted(
+                    healthy,
+                    key=lambda k: (k.headroom(tokens), -k.in_flight),
+                    reverse=True
+                )
+                target = self.get_target_ratio()
+                limits = [
+                    (k.key_id, int(k.tpm_limit * target), int(k.rpm_limit * target))
+                    for k in candidates
+                ]
+                global_limits = (sum(l[1] for l in limits), sum(l[2] for l in limits))
+
+            result = RateLimiter.try_acquire(limits, global_limits, tokens)
+            if result is None:
+                return None
+            index, wait = result
+            if index < 0:
+                return None, max(0.01, wait)
+
+            key = candidates[index]
+            with self._lock:
+                # 半开状态的Key同一时间只放行一个探测请求
+                if key.breaker.try_acquire():
+                    key.in_flight += 1
+                    key.reserved += tokens
+                    return key, 0.0
+            RateLimiter.refund(key.key_id, tokens)
+            rejected.add(key.key_id)
+
+    def acquire(self, tokens: int = None) -> Optional[ApiKeyState]:
+        """
+        选择余量最大的Key并登记一次在途请求
+
+        启用分布式限流时等待Redis令牌桶放行；所有Key都已超额且等待超时时
+        仍返回余量最大的Key（由调度器控制整体节奏）
+
+        Args:
+            tokens: 本次请求的预估Token数（默认 TOKENS_PER_REQ）
+
+        Returns:
+            ApiKeyState，或None（没有可用Key）
+        """
+        self._ensure_loaded()
+        tokens = tokens or self._default_reserve()
+
+        if self._shared_enabled():
+            deadline = time.time() + float(getattr(config, 'rate_limit_max_wait', 30) or 0)
+            while True:
+                result = self._try_acquire_shared(tokens)
+                if result is None:
+                    break
+                key, wait = result
+                if key is not None:
+                    return key
+                if wait is None:
+                    # 所有Key均已熔断，快速失败
+                    return None
+                if time.time() + wait > deadline:
+                    print(f"[ApiKeyPool] 等待限流额度超时，按本地余量选择Key")
+                    break
+                time.sleep(min(wait, 1.0))
+
+        return self._acquire_local(tokens)
+
+    async def acquire_async(self, tokens: int = None) -> Optional[ApiKeyState]:
+        """acquire() 的异步版本：Redis访问放到线程池，等待回填时让出事件循环"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._ensure_loaded)
+        tokens = tokens or self._default_reserve()
+
+        if self._shared_enabled():
+            deadline = time.time() + float(getattr(config, 'rate_limit_max_wait', 30) or 0)
+            while True:
+                result = await loop.run_in_executor(None, self._try_acquire_shared, tokens)
+                if result is None:
+                    break
+                key, wait = result
+                if key is not None:
+                    return key
+                if wait is None:
+                    # 所有Key均已熔断，快速失败
+                    return None
+                if time.time() + wait > deadline:
+                    print(f"[ApiKeyPool] 等待限流额度超时，按本地余量选择Key")
+                    break
+                await asyncio.sleep(min(wait, 1.0))
+
+        return self._acquire_local(tokens)
+
+    def _release_local(self, key: ApiKeyState, tokens: int, reserved: int,
+                       error: Optional[str]) -> None:
+        if error is None:
+            # 调用未完成（如对冲请求被取消），归还可能占用的探测名额
+            key.breaker.cancel()
+        else:
+            key.breaker.record(error not in KEY_FAILURE_ERRORS)
+        with self._lock:
+            key.in_flight = max(0, key.in_flight - 1)
+            key.reserved = max(0, key.reserved - reserved)
+        # 未发出的请求不计入RPM
+        if error is not None:
+            key.rpm_window.add_request()
+        if tokens > 0:
+            key.tpm_window.add_tokens(tokens)
+
+    def release(self, key: ApiKeyState, tokens: int, reserved: int = None,
+                error: Optional[str] = '') -> None:
+        """
+        结束一次请求，上报实际Token消耗与调用结果
+
+        Args:
+            key: acquire() 返回的Key
+            tokens: response.usage.total_tokens（失败时为0，退还预扣的Token额度）
+            reserved: acquire() 时的预估Token数（默认 TOKENS_PER_REQ）
+            error: 错误分类（见 resilient_call.py），成功为''，调用未完成为None；
+                   Key本身的故障计入该Key的熔断器
+        """
+        reserved = reserved or self._default_reserve()
+        self._release_local(key, tokens, reserved, error)
+        if self._shared_enabled():
+            RateLimiter.reconcile(key.key_id, tokens - reserved)
+
+    async def release_async(self, key: ApiKeyState, tokens: int, reserved: int = None,
+                            error: Optional[str] = '') -> None:
+        """release() 的异步版本（结算放到线程池执行）"""
+        reserved = reserved or self._default_reserve()
+        self._release_local(key, tokens, reserved, error)
+        if self._shared_enabled():
+            delta = tokens - reserved
+            await asyncio.get_running_loop().run_in_executor(
+                None, RateLimiter.reconcile, key.key_id, delta
+            )
+
+    def get_capacity(self) -> Tuple[int, int]:
+        """
+        获取所有Key的汇总容量
+
+        Returns:
+            (max_tpm, max_rpm)；没有Key时返回单Key默认值
+        """
+        self._ensure_loaded()
+        with self._lock:
+            if not self._keys:
+                return (DEFAULT_TPM_LIMIT, DEFAULT_RPM_LIMIT)
+            max_tpm = sum(k.tpm_limit for k in self._keys.values())
+            max_rpm = sum(k.rpm_limit for k in self._keys.values())
+            return (max_tpm, max_rpm)
+
+    def get_reserved(self) -> Tuple[int, int]:
+        """
+        获取所有在途请求的预扣量（调度器准入控制使用）
+
+        Returns:
+            (预扣Token总数, 在途请求数)
+        """
+        with self._lock:
+            return (
+                sum(k.reserved for k in self._keys.values()),
+                sum(k.in_flight for k in self._keys.values()),
+            )
+
+    def get_key_count(self) -> int:
+        """获取可用Key数量"""
+        with self._lock:
+            return len(self._keys)
+
+    def get_stats(self) -> List[Dict]:
+        """获取每个Key的实时用量（Key已脱敏）"""
+        with self._lock:
+            keys = list(self._keys.values())
+        return [
+            {
+                'key_id': k.key_id,
+                'api_key': k.masked_key(),
+                'api_name': k.api_name,
+                'tpm': k.tpm_window.get_tpm(),
+                'rpm': k.rpm_window.get_rpm(),
+                'tpm_limit': k.tpm_limit,
+                'rpm_limit': k.rpm_limit,
+                'in_flight': k.in_flight,
+                'reserved': k.reserved,
+                'circuit': k.breaker.get_state(),
+            }
+            for k in keys
+        ]
+
+
+# 全局Key池实例
+_key_pool: Optional[ApiKeyPool] = None
+_key_pool_lock = threading.Lock()
+
+
+def get_key_pool() -> ApiKeyPool:
+    """获取全局API Key池"""
+    global _key_pool
+
+    if _key_pool is None:
+        with _key_pool_lock:
+            if _key_pool is None:
+                _key_pool = ApiKeyPool()
+
+    return _key_pool
@@ -0,0 +1,250 @@
+"""
+异步执行引擎模块 (新架构)
+用少量事件循环线程 + asyncio 协程执行文献相关性判断，替代"每个permission一个OS线程"
+
+设计:
+- 启动 async_engine_loops 个事件循环线程，查询按轮询分配到某个事件循环
+- 每个查询启动 permission 个协程槽位（AsyncWorker），单查询并发仍受 permission 限制
+- 槽位复用 BlockWorker 的全部业务步骤（终止信号、领取Block、单篇扣费与写结果、归档），
+  只把AI调用换成 AsyncOpenAI 的 await
+- Redis/MySQL 为同步调用，统一放到共享的IO线程池（async_engine_io_threads）执行，
+  事件循环只负责等待HTTP响应，因此在途请求数与线程数解耦
+- 启用Block预取时，槽位从查询共享的预取队列取下一个Block，队列为空时协程让出等待
+
+启用方式: config.json 中 "worker_engine": "async"（默认 "thread"）
+"""
+
+import asyncio
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import partial
+from typing import Any, Callable, List, Optional
+
+from ..config import config_loader as config
+from ..redis.paper_commit import COMMIT_TERMINATED
+from .block_prefetch import PREFETCH_PENDING
+
+
+class AsyncWorker:
+    """
+    异步Worker槽位
+
+    对外接口与 BlockWorker 一致（uid / qid / start / stop / is_alive），
+    调度器无需区分执行引擎
+    """
+
+    def __init__(self, engine: 'AsyncEngine', loop: asyncio.AbstractEventLoop,
+                 worker: Any, ai_processor: Callable):
+        """
+        Args:
+            engine: 所属异步引擎
+            loop: 运行该槽位的事件循环
+            worker: 提供业务步骤的 BlockWorker（蒸馏任务为 DistillWorker 内部的 BlockWorker）
+            ai_processor: 异步AI处理函数 (doi, title, abstract) -> {relevant, reason, _tokens}
+        """
+        self.uid = worker.uid
+        self.qid = worker.qid
+        self._engine = engine
+        self._loop = loop
+        self._worker = worker
+        self._ai_processor = ai_processor
+        self._future = None
+
+    def start(self) -> None:
+        """将槽位协程提交到事件循环"""
+        if self._future is not None:
+            return
+        self._worker._running = True
+        self._worker._register(self)
+        self._future = asyncio.run_coroutine_threadsafe(self._run_loop(), self._loop)
+        print(f"[Worker-{self._worker.worker_id}] 启动(async) uid={self.uid} qid={self.qid}")
+
+    def stop(self) -> None:
+        """停止槽位（处理完当前文献后退出）"""
+        self._worker.stop()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """等待槽位协程退出"""
+        if self._future is not None:
+            wait([self._future], timeout)
+
+    def is_alive(self) -> bool:
+        """槽位协程是否仍在运行"""
+        return self._future is not None and not self._future.done()
+
+    async def _io(self, func: Callable, *args) -> Any:
+        """在IO线程池中执行同步的Redis/MySQL操作"""
+        return await self._loop.run_in_executor(
+            self._engine.io_pool, partial(func, *args)
+        )
+
+    async def _run_loop(self) -> None:
+        """槽位主循环（与 BlockWorker._run_loop 相同的规则R4.c）"""
+        worker = self._worker
+        try:
+            while worker._running:
+                # 预取队列为空时在事件循环中等待，不占用IO线程
+                block_key = await self._io(worker._next_block, 0)
+                if block_key is PREFETCH_PENDING:
+                    await asyncio.sleep(0.05)
+                    continue
+                if not block_key:
+                    break
+
+                await self._process_block(block_key)
+
+                # 已停止时Block可能未处理完，不计完成数，退出时交还
+                if not worker._running:
+                    break
+
+                if not await self._io(worker._finish_block):
+                    break
+
+        except Exception as e:
+            print(f"[Worker-{worker.worker_id}] 异常: {e}")
+        finally:
+            # 清理涉及Redis操作，同样放到IO线程池，不阻塞同一事件循环上的其他查询
+            try:
+                await self._io(worker._cleanup)
+            except RuntimeError:
+                # 引擎停止后IO线程池已关闭，无法再提交：直接在当前线程清理
+                worker._cleanup()
+
+    async def _process_block(self, block_key: str) -> None:
+        """处理单个Block（与 BlockWorker._process_block 相同的规则R5）"""
+        worker = self._worker
+        papers, price = await self._io(worker._load_block, block_key)
+
+        for doi, record in papers.items():
+            # AI调用前检查终止信号（刷新本地标志时访问Redis，放到IO线程池）
+            if worker._terminate_check_due():
+                await self._io(worker._refresh_terminated)
+            if not worker._running or worker._terminated:
+                break
+
+            try:
+                record, paper_price = worker._unpack_paper(record, price)
+                ai_result = await self._ai_processor(doi, record.title, record.abstract)
+                status = await self._io(
+                    worker._finish_paper, doi, ai_result, block_key, paper_price
+                )
+            except Exception as e:
+                print(f"[Worker-{worker.worker_id}] 处理文献失败 {doi}: {e}")
+                continue
+
+            # 提交脚本同样检查终止信号
+            if status == COMMIT_TERMINATED:
+                worker._terminated = True
+                break
+
+        await self._io(worker._flush_commits)
+
+
+class AsyncEngine:
+    """
+    异步执行引擎
+
+    职责: 管理事件循环线程和IO线程池，为查询生成异步Worker槽位
+    """
+
+    def __init__(self, loop_count: int = 4, io_threads: int = 32):
+        """
+        Args:
+            loop_count: 事件循环线程数
+            io_threads: 执行同步Redis/MySQL操作的线程数（所有事件循环共享）
+        """
+        self.loop_count = max(1, int(loop_count))
+        self.io_threads = max(1, int(io_threads))
+        self.io_pool = ThreadPoolExecutor(
+            max_workers=self.io_threads,
+            thread_name_prefix="AsyncEngine-IO"
+        )
+        self._loops: List[asyncio.AbstractEventLoop] = []
+        self._threads: List[threading.Thread] = []
+        self._next_loop = itertools.count()
+
+        for i in range(self.loop_count):
+            loop = asyncio.new_event_loop()
+            # 协程内的 run_in_executor(None, ...) 同样使用共享IO线程池
+            loop.set_default_executor(self.io_pool)
+            thread = threading.Thread(
+                target=self._run_event_loop, args=(loop,),
+                name=f"AsyncEngine-Loop-{i}", daemon=True
+            )
+            thread.start()
+            self._loops.append(loop)
+            self._threads.append(thread)
+
+        print(f"[AsyncEngine] 启动 {self.loop_count} 个事件循环, "
+              f"IO线程池 {self.io_threads} 线程")
+
+    @staticmethod
+    def _run_event_loop(loop: asyncio.AbstractEventLoop) -> None:
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    def spawn(self, uid: int, qid: str, count: int,
+              is_distillation: bool = False) -> List[AsyncWorker]:
+        """
+        为查询生成 count 个异步Worker槽位（同一查询的槽位在同一事件循环中运行）
+
+        Args:
+            uid: 用户ID
+            qid: 查询ID
+            count: 槽位数量（即单查询最大并发，通常等于用户permission）
+            is_distillation: 是否为蒸馏任务（使用蒸馏费率）
+
+        Returns:
+            AsyncWorker 列表
+        """
+        from .worker import BlockWorker
+        from .distill import DistillWorker
+        from .search_paper import create_async_ai_processor
+
+        ai_processor = create_async_ai_processor(uid, qid)
+        loop = self._loops[next(self._next_loop) % self.loop_count]
+
+        workers = []
+        for _ in range(count):
+            if is_distillation:
+                inner = DistillWorker.build_block_worker(uid, qid)
+            else:
+                inner = BlockWorker(uid, qid)
+            worker = AsyncWorker(self, loop, inner, ai_processor)
+            worker.start()
+            workers.append(worker)
+
+        print(f"[AsyncEngine] 为 uid={uid} qid={qid} 启动了 {count} 个异步Worker")
+        return workers
+
+    def stop(self) -> None:
+        """停止所有事件循环和IO线程池"""
+        for loop in self._loops:
+            loop.call_soon_threadsafe(loop.stop)
+        self.io_pool.shutdown(wait=False)
+
+
+# 全局引擎实例
+_engine: Optional[AsyncEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_async_engine() -> AsyncEngine:
+    """获取全局异步执行引擎（首次调用时启动）"""
+    global _engine
+
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = AsyncEngine(
+                    loop_count=getattr(config, 'async_engine_loops', 4),
+                    io_threads=getattr(config, 'async_engine_io_threads', 32),
+                )
+
+    return _engine
+
+
+def is_async_engine_enabled() -> bool:
+    """是否使用异步执行引擎"""
+    return str(getattr(config, 'worker_engine', 'thread') or 'thread').lower() == 'async'
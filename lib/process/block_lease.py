@@ -0,0 +1,172 @@
+"""
+Block租约模块 (新架构)
+Worker领取Block时在Redis中登记租约（TaskQueue.pop_block），处理完成后结束租约；
+Worker线程或整个Worker进程异常退出时，已领取的Block不再随LPOP丢失，
+租约过期后由任意进程的调度器回收并重新入队
+
+设计:
+- 本进程领取的Block记录在进程内表中，调度器每 block_lease_seconds/3 秒统一续约
+- 回收时跳过结果哈希中已有结果的文献：全部未处理则原Block重新入队，
+  部分已处理则剩余文献作为同一工作单元的重试Block入队（不改变 total_blocks，不增加重试次数）
+- 已终止的任务只删除租约，不重新入队
+- 重新入队后发布调度事件：原Worker进程已退出时由其他进程接管该查询
+- 租约完成时已被回收（进程卡顿超过租约时长）则不计完成数，由重新入队的工作单元计数
+- Worker进程正常退出（SIGTERM）时不等租约过期，按回收的规则立即交还（hand_back_block）
+"""
+
+import threading
+from typing import Dict, Optional, Set, Tuple
+
+from ..config import config_loader as config
+from ..redis.task_queue import TaskQueue
+from ..redis.paper_blocks import PaperBlocks
+from ..redis.result_cache import ResultCache
+from ..redis.scheduler_events import SchedulerEvents
+from ..redis.connection import get_redis_client
+
+# 本进程持有的租约 (uid, qid) -> {block_key}
+_held: Dict[Tuple[int, str], Set[str]] = {}
+_held_lock = threading.Lock()
+
+
+def get_lease_seconds() -> float:
+    """租约时长（秒）"""
+    return max(10.0, float(getattr(config, 'block_lease_seconds', 120) or 120))
+
+
+def lease_block(uid: int, qid: str) -> Optional[str]:
+    """领取一个Block并登记租约"""
+    block_key = TaskQueue.pop_block(uid, qid, get_lease_seconds())
+    if block_key:
+        with _held_lock:
+            _held.setdefault((uid, qid), set()).add(block_key)
+    return block_key
+
+
+def _untrack(uid: int, qid: str, block_key: str) -> None:
+    with _held_lock:
+        keys = _held.get((uid, qid))
+        if keys is not None:
+            keys.discard(block_key)
+            if not keys:
+                del _held[(uid, qid)]
+
+
+def complete_block(uid: int, qid: str, block_key: str) -> Optional[int]:
+    """
+    结束租约并累加完成数
+
+    Returns:
+        更新后的完成数；租约已被回收时返回None
+    """
+    _untrack(uid, qid, block_key)
+    return TaskQueue.complete_block(uid, qid, block_key)
+
+
+def return_block(uid: int, qid: str, block_key: str) -> None:
+    """未处理的Block推回任务队列（已终止的任务只删除租约）"""
+    _untrack(uid, qid, block_key)
+    if TaskQueue.is_terminated(uid, qid):
+        TaskQueue.drop_lease(uid, qid, block_key)
+    else:
+        TaskQueue.push_back_block(uid, qid, block_key)
+
+
+def abandon_block(uid: int, qid: str, block_key: str) -> None:
+    """
+    停止续约（Worker异常退出或收到终止信号时）
+
+    租约保留在Redis中，到期后由回收线程处理
+    """
+    _untrack(uid, qid, block_key)
+
+
+def hand_back_block(uid: int, qid: str, block_key: str) -> None:
+    """
+    交还处理到一半的Block（Worker进程正常退出时）
+
+    已有结果的文献不再重做，剩余文献作为替代工作单元推回任务队列；已终止的任务只删除租约
+    """
+    _untrack(uid, qid, block_key)
+    if TaskQueue.is_terminated(uid, qid):
+        TaskQueue.drop_lease(uid, qid, block_key)
+    else:
+        TaskQueue.push_back_block(uid, qid, block_key, _replacement_unit(uid, qid, block_key))
+
+
+def hand_back_all() -> int:
+    """交还本进程仍持有的全部租约（进程退出时调用），返回交还的Block数"""
+    with _held_lock:
+        held = [(uid, qid, list(keys)) for (uid, qid), keys in _held.items()]
+
+    returned = 0
+    for uid, qid, keys in held:
+        for block_key in keys:
+            hand_back_block(uid, qid, block_key)
+            returned += 1
+    return returned
+
+
+def renew_all() -> int:
+    """续约本进程持有的全部租约，返回续约的Block数"""
+    with _held_lock:
+        held = [(uid, qid, list(keys)) for (uid, qid), keys in _held.items()]
+
+    lease_seconds = get_lease_seconds()
+    renewed = 0
+    for uid, qid, keys in held:
+        if TaskQueue.renew_leases(uid, qid, keys, lease_seconds):
+            renewed += len(keys)
+    return renewed
+
+
+def _replacement_unit(uid: int, qid: str, block_key: str) -> str:
+    """
+    过期Block的替代工作单元
+
+    部分文献已有结果时只重做剩余文献（列表为空时Worker直接计完成）；
+    读取失败时按原Block重新入队
+    """
+    client = get_redis_client()
+    if not client:
+        return block_key
+    try:
+        dois = list(PaperBlocks.get_block_records(block_key).keys())
+        if not dois:
+            return block_key
+        values = client.hmget(ResultCache._key_result(uid, qid), dois)
+        remaining = [doi for doi, value in zip(dois, values) if value is None]
+    except Exception:
+        return block_key
+    if len(remaining) == len(dois):
+        return block_key
+    return PaperBlocks.make_retry_key(block_key, remaining, PaperBlocks.retry_attempt(block_key))
+
+
+def reap_expired(limit: int = 100) -> int:
+    """
+    回收所有查询中已过期的租约（调度器定期调用，多进程并发调用安全）
+
+    Returns:
+        重新入队的工作单元数
+    """
+    reap_seconds = get_lease_seconds()
+    requeued = 0
+    for uid, qid in TaskQueue.get_leased_queries():
+        expired = TaskQueue.claim_expired_leases(uid, qid, reap_seconds, limit)
+        if not expired:
+            continue
+
+        if TaskQueue.is_terminated(uid, qid):
+            for block_key in expired:
+                TaskQueue.requeue_reaped(uid, qid, block_key, None)
+            continue
+
+        for block_key in expired:
+            replacement = _replacement_unit(uid, qid, block_key)
+            if TaskQueue.requeue_reaped(uid, qid, block_key, replacement):
+                requeued += 1
+
+        print(f"[BlockLease] 查询 {qid} 回收 {len(expired)} 个过期租约")
+        SchedulerEvents.publish_query(uid, qid)
+    return requeued
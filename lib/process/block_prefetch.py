@@ -0,0 +1,177 @@
+"""
+Block预取模块 (新架构)
+每个查询一个预取线程：提前领取并解码后续Block，放入有界内存队列，
+Worker处理完当前Block后直接从队列取下一个，不再在Block边界同步等待 HGETALL + 解压
+
+设计:
+- 同一查询的所有Worker（线程或异步槽位）共享一个预取器，按引用计数管理
+- 队列容量 block_prefetch_depth（0 表示关闭预取，Worker直接 pop_block）
+- 预取线程遇到终止信号或任务队列为空时结束
+- 最后一个Worker退出时关闭预取器，已领取但未处理的Block推回任务队列（终止时丢弃）
+- 预取队列中的Block同样持有租约（见 block_lease.py），进程崩溃后到期重新入队
+"""
+
+import queue
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from ..config import config_loader as config
+from ..redis.task_queue import TaskQueue
+from .block_lease import lease_block, return_block
+
+# take() 在等待超时时返回此值（预取仍在进行）
+PREFETCH_PENDING = object()
+
+
+class BlockPrefetcher:
+    """单个查询的Block预取器"""
+
+    def __init__(self, uid: int, qid: str, depth: int,
+                 loader: Callable[[str], Tuple[Dict, float]]):
+        """
+        Args:
+            uid: 用户ID
+            qid: 查询ID
+            depth: 预取队列容量（已解码Block数）
+            loader: Block读取函数 block_key -> (papers, price)
+        """
+        self.uid = uid
+        self.qid = qid
+        self._loader = loader
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, depth))
+        self._exhausted = threading.Event()
+        self._closed = threading.Event()
+        self._refs = 0
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"Prefetch-{uid}-{qid}",
+            daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        """预取线程主循环"""
+        try:
+            while not self._closed.is_set():
+                if TaskQueue.is_terminated(self.uid, self.qid):
+                    break
+
+                block_key = lease_block(self.uid, self.qid)
+                if not block_key:
+                    break
+
+                try:
+                    papers, price = self._loader(block_key)
+                except Exception as e:
+                    print(f"[Prefetch] 读取Block失败 {block_key}: {e}")
+                    papers, price = {}, 1
+
+                if not self._put((block_key, papers, price)):
+                    # 预取器已关闭，Block尚未交给Worker
+                    self._push_back(block_key)
+                    break
+        except Exception as e:
+            print(f"[Prefetch] 异常 qid={self.qid}: {e}")
+        finally:
+            self._exhausted.set()
+            # 关闭后才放入队列的Block由预取线程自己推回
+            if self._closed.is_set():
+                self._drain()
+
+    def _put(self, item: tuple) -> bool:
+        """放入队列（队列满时等待），预取器关闭时返回False"""
+        while not self._closed.is_set():
+            try:
+                self._queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _push_back(self, block_key: str) -> None:
+        """未处理的Block推回任务队列（已终止的任务直接丢弃）"""
+        return_block(self.uid, self.qid, block_key)
+
+    def take(self, timeout: float = 0.5):
+        """
+        取下一个已解码的Block
+
+        Args:
+            timeout: 最长等待秒数，<=0 时不等待
+
+        Returns:
+            (block_key, papers, price)；预取结束且队列已空时返回None；
+            等待超时返回 PREFETCH_PENDING
+        """
+        try:
+            if timeout > 0:
+                return self._queue.get(timeout=timeout)
+            return self._queue.get_nowait()
+        except queue.Empty:
+            if self._exhausted.is_set() and self._queue.empty():
+                return None
+            return PREFETCH_PENDING
+
+    def is_finished(self) -> bool:
+        """预取器是否已关闭或已无更多Block"""
+        return self._closed.is_set() or (self._exhausted.is_set() and self._queue.empty())
+
+    def close(self) -> None:
+        """关闭预取器，推回队列中尚未被领取的Block"""
+        self._closed.set()
+        self._drain()
+
+    def _drain(self) -> None:
+        while True:
+            try:
+                block_key = self._queue.get_nowait()[0]
+            except queue.Empty:
+                break
+            self._push_back(block_key)
+
+
+# 全局预取器注册表: (uid, qid) -> BlockPrefetcher
+_prefetchers: Dict[Tuple[int, str], BlockPrefetcher] = {}
+_prefetchers_lock = threading.Lock()
+
+
+def get_prefetch_depth() -> int:
+    """预取队列容量（0 表示关闭预取）"""
+    return max(0, int(getattr(config, 'block_prefetch_depth', 0) or 0))
+
+
+def acquire_prefetcher(uid: int, qid: str,
+                       loader: Callable[[str], Tuple[Dict, float]]) -> Optional[BlockPrefetcher]:
+    """
+    获取查询的预取器（不存在或已结束时新建），引用计数+1
+
+    Returns:
+        BlockPrefetcher；预取关闭时返回None
+    """
+    depth = get_prefetch_depth()
+    if depth <= 0:
+        return None
+
+    with _prefetchers_lock:
+        prefetcher = _prefetchers.get((uid, qid))
+        if prefetcher is None or prefetcher.is_finished():
+            prefetcher = BlockPrefetcher(uid, qid, depth, loader)
+            _prefetchers[(uid, qid)] = prefetcher
+        prefetcher._refs += 1
+        return prefetcher
+
+
+def release_prefetcher(prefetcher: Optional[BlockPrefetcher]) -> None:
+    """引用计数-1，归零时关闭预取器"""
+    if prefetcher is None:
+        return
+
+    with _prefetchers_lock:
+        prefetcher._refs -= 1
+        if prefetcher._refs > 0:
+            return
+        key = (prefetcher.uid, prefetcher.qid)
+        if _prefetchers.get(key) is prefetcher:
+            del _prefetchers[key]
+
+    prefetcher.close()
@@ -0,0 +1,200 @@
+"""
+熔断器模块 (新架构)
+API端点或单个Key故障时快速失败并把流量切到健康的Key，而不是让所有Worker等到超时
+
+状态机:
+- CLOSED: 正常放行；统计最近 WINDOW_SIZE 次调用结果
+  错误率 >= circuit_error_rate 且样本数 >= MIN_REQUESTS 时 -> OPEN
+- OPEN: 拒绝调用；经过开启时长后 -> HALF_OPEN
+  开启时长从 circuit_open_seconds 起，连续探测失败时翻倍（上限 MAX_OPEN_SECONDS）
+- HALF_OPEN: 同一时间只放行一个探测请求
+  探测成功 -> CLOSED（清空统计）；探测失败 -> OPEN
+  探测请求长时间没有结果（如调用方异常退出）时允许新的探测
+
+熔断对象:
+- endpoint:{api_base_url} - API端点（所有Key共用），打开时所有调用快速失败
+- 每个API Key一个熔断器（见 api_key_pool.py），打开时选Key跳过该Key
+
+只有端点/Key本身的问题计为失败：端点为5xx、超时、连接失败，Key另外计入401/403；
+429由限流与自适应并发处理，请求本身的错误（400等）不计入
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from ..config import config_loader as config
+from .resilient_call import ERR_SERVER, ERR_TIMEOUT, ERR_NETWORK, ERR_AUTH
+
+STATE_CLOSED = 'CLOSED'
+STATE_OPEN = 'OPEN'
+STATE_HALF_OPEN = 'HALF_OPEN'
+
+# 计为熔断失败的错误类型
+ENDPOINT_FAILURE_ERRORS = (ERR_SERVER, ERR_TIMEOUT, ERR_NETWORK)
+KEY_FAILURE_ERRORS = ENDPOINT_FAILURE_ERRORS + (ERR_AUTH,)
+
+# 统计窗口（最近N次调用）与最少样本数
+WINDOW_SIZE = 20
+MIN_REQUESTS = 5
+# 开启时长上限（秒）
+MAX_OPEN_SECONDS = 300.0
+
+
+class CircuitBreaker:
+    """单个端点或Key的熔断器"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._state = STATE_CLOSED
+        self._outcomes: Deque[bool] = deque(maxlen=WINDOW_SIZE)  # True 表示失败
+        self._failures = 0
+        self._opened_at = 0.0
+        self._open_seconds = 0.0
+        self._probe_at = 0.0  # 当前探测请求的放行时间（0 表示没有探测在途）
+        self._trips = 0
+
+    @staticmethod
+    def _base_open_seconds() -> float:
+        return max(1.0, float(getattr(config, 'circuit_open_seconds', 10) or 10))
+
+    @staticmethod
+    def _error_rate_threshold() -> float:
+        return min(1.0, max(0.05, float(getattr(config, 'circuit_error_rate', 0.5) or 0.5)))
+
+    def _refresh(self, now: float) -> None:
+        """OPEN 超过开启时长后转为 HALF_OPEN（调用方持有锁）"""
+        if self._state == STATE_OPEN and now - self._opened_at >= self._open_seconds:
+            self._state = STATE_HALF_OPEN
+            self._probe_at = 0.0
+
+    def is_available(self) -> bool:
+        """是否可以放行（不占用探测名额，用于选Key时过滤）"""
+        now = time.time()
+        with self._lock:
+            self._refresh(now)
+            if self._state == STATE_CLOSED:
+                return True
+            if self._state == STATE_HALF_OPEN:
+                return not self._probe_at or now - self._probe_at >= self._open_seconds
+            return False
+
+    def try_acquire(self) -> bool:
+        """
+        申请放行一次调用；HALF_OPEN 时占用唯一的探测名额
+
+        放行后调用方必须通过 record() 反馈结果
+        """
+        now = time.time()
+        with self._lock:
+            self._refresh(now)
+            if self._state == STATE_CLOSED:
+                return True
+            if self._state == STATE_HALF_OPEN:
+                if self._probe_at and now - self._probe_at < self._open_seconds:
+                    return False
+                self._probe_at = now
+                return True
+            return False
+
+    def cancel(self) -> None:
+        """try_acquire() 放行后调用并未发出时归还探测名额"""
+        with self._lock:
+            if self._state == STATE_HALF_OPEN:
+                self._probe_at = 0.0
+
+    def retry_in(self) -> float:
+        """距离允许探测的剩余秒数（未打开时为0）"""
+        with self._lock:
+            if self._state != STATE_OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self._open_seconds - time.time())
+
+    def record(self, success: bool) -> None:
+        """反馈一次调用结果"""
+        now = time.time()
+        with self._lock:
+            if self._state == STATE_HALF_OPEN:
+                if success:
+                    self._close()
+                else:
+                    self._open(now, self._open_seconds * 2)
+                return
+            if self._state == STATE_OPEN:
+                # 打开前已放行的调用陆续返回，不影响状态
+                return
+
+            if len(self._outcomes) == self._outcomes.maxlen and self._outcomes[0]:
+                self._failures -= 1
+            self._outcomes.append(not success)
+            if not success:
+                self._failures += 1
+            if (len(self._outcomes) >= MIN_REQUESTS and
+                    self._failures / len(self._outcomes) >= self._error_rate_threshold()):
+                self._open(now, self._base_open_seconds())
+
+    def _open(self, now: float, seconds: float) -> None:
+        self._state = STATE_OPEN
+        self._opened_at = now
+        self._open_seconds = min(MAX_OPEN_SECONDS, max(self._base_open_seconds(), seconds))
+        self._probe_at = 0.0
+        self._trips += 1
+        print(f"[CircuitBreaker] {self.name} 熔断 {self._open_seconds:.0f} 秒")
+
+    def _close(self) -> None:
+        self._state = STATE_CLOSED
+        self._outcomes.clear()
+        self._failures = 0
+        self._probe_at = 0.0
+        print(f"[CircuitBreaker] {self.name} 探测成功，恢复")
+
+    def get_state(self) -> str:
+        with self._lock:
+            self._refresh(time.time())
+            return self._state
+
+    def get_stats(self) -> Dict:
+        now = time.time()
+        with self._lock:
+            self._refresh(now)
+            retry_in = 0.0
+            if self._state == STATE_OPEN:
+                retry_in = max(0.0, self._opened_at + self._open_seconds - now)
+            return {
+                'name': self.name,
+                'state': self._state,
+                'error_rate': round(self._failures / len(self._outcomes), 3) if self._outcomes else 0.0,
+                'trips': self._trips,
+                'retry_in': round(retry_in, 1),
+            }
+
+
+# 全局熔断器注册表: name -> CircuitBreaker
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """获取（不存在时创建）指定名称的熔断器"""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(name)
+                _breakers[name] = breaker
+    return breaker
+
+
+def get_endpoint_breaker(api_base: Optional[str]) -> CircuitBreaker:
+    """API端点的熔断器"""
+    return get_breaker(f"endpoint:{api_base or 'default'}")
+
+
+def get_breaker_stats(prefix: str = '') -> List[Dict]:
+    """所有（或指定前缀的）熔断器状态（管理员仪表板）"""
+    with _breakers_lock:
+        breakers = [b for name, b in _breakers.items() if name.startswith(prefix)]
+    return [b.get_stats() for b in breakers]
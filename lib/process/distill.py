@@ -15,12 +15,8 @@
 - 蒸馏Block存储格式改为JSON，包含bib和price，Worker直接读取无需查询
 """
 
-import json
 from typing import List
-from ..redis.result_cache import ResultCache
 from ..redis.task_queue import TaskQueue
-from ..redis.user_cache import UserCache
-from ..redis.billing import BillingQueue
 from ..redis.system_config import SystemConfig
 
 
@@ -46,66 +42,38 @@ class DistillWorker:
         # 修复31: 缓存蒸馏费率，避免每次处理都调用
         self._distill_rate = SystemConfig.get_distill_rate()
         self._inner_worker = BlockWorker(uid, qid, ai_processor)
-        # 覆盖费率
-        self._inner_worker._process_paper = self._process_paper_with_distill_rate
+        # 覆盖单篇解析：Block值为JSON，价格使用蒸馏费率
+        self._inner_worker._unpack_paper = self._unpack_distill_paper
     
-    def _process_paper_with_distill_rate(self, doi: str, bib_str: str,
-                                         block_key: str, price: int) -> None:
+    @classmethod
+    def build_block_worker(cls, uid: int, qid: str, ai_processor=None):
         """
-        使用蒸馏费率处理文献
+        创建按蒸馏费率扣费的 BlockWorker（异步引擎的槽位直接驱动其业务步骤，不需要外层线程）
         
-        修复31: bib_str 现在可能是JSON格式（包含bib和price）
-        格式: {"bib": "实际bib内容", "price": 2}
+        Returns:
+            BlockWorker 实例
         """
-        # 修复31: 解析JSON获取实际bib和价格
-        actual_bib = bib_str
-        actual_price = price  # 默认使用传入价格
-        
-        try:
-            data = json.loads(bib_str)
-            if isinstance(data, dict):
-                actual_bib = data.get('bib', bib_str)
-                actual_price = data.get('price', price)
-        except (json.JSONDecodeError, TypeError):
-            # 不是JSON格式，使用原始值
-            pass
-        
-        # 使用缓存的蒸馏费率计算扣费
-        distill_price = actual_price * self._distill_rate
-        
-        # 解析Bib
-        title, abstract = self._inner_worker._parse_bib(actual_bib)
+        return cls(uid, qid, ai_processor)._inner_worker
+    
+    def _unpack_distill_paper(self, record, price: float) -> tuple:
+        """
+        计算蒸馏价格
         
-        # 调用AI处理
-        ai_result = self._inner_worker.ai_processor(doi, title, abstract)
-        tokens_used = ai_result.pop('_tokens', 0)
+        蒸馏Block的JSON格式 {"bib": "...", "price": N} 由 PaperBlocks.get_block_records
+        解析为预解析记录，price 保存在 record.price；扣费、缓存价格系数和结果写入复用
+        BlockWorker 的逻辑
         
-        # 上报Token消耗
-        from .tpm_accumulator import report_tokens
-        if tokens_used > 0:
-            report_tokens(tokens_used)
+        Args:
+            record: 预解析记录
+            price: Worker按Block Key取得的期刊价格（蒸馏Block无法解析期刊，仅作回退）
         
-        # 原子扣费（蒸馏费率）
-        balance = UserCache.get_balance(self.uid)
-        if balance is not None and balance >= distill_price:
-            new_balance = UserCache.deduct_balance(self.uid, distill_price)
-            
-            if new_balance is not None:
-                # 写入结果
-                ResultCache.set_result(
-                    self.uid, self.qid, doi,
-                    ai_result, block_key
-                )
-                
-                # 写入计费流水（标记为蒸馏）
-                BillingQueue.push_billing_record(
-                    self.uid, self.qid, doi, distill_price
-                )
-                
-                # 更新进度
-                TaskQueue.incr_finished_count(self.uid, self.qid)
-                
-                self._inner_worker._processed_count += 1
+        Returns:
+            (record, 蒸馏价格)
+        """
+        if record.price is not None:
+            price = record.price
+        # 使用缓存的蒸馏费率计算扣费
+        return record, price * self._distill_rate
     
     @property
     def _running(self):
@@ -117,6 +85,10 @@ class DistillWorker:
         """代理 _inner_worker 的 _thread 属性（修复29）"""
         return self._inner_worker._thread
     
+    def is_alive(self) -> bool:
+        """代理 _inner_worker 的运行状态"""
+        return self._inner_worker.is_alive()
+    
     def start(self):
         """启动Worker"""
         self._inner_worker.start()
@@ -124,6 +96,10 @@ class DistillWorker:
     def stop(self):
         """停止Worker"""
         self._inner_worker.stop()
+    
+    def join(self, timeout=None):
+        """等待Worker线程退出"""
+        self._inner_worker.join(timeout)
 
 
 def spawn_distill_workers(uid: int, qid: str, count: int, 
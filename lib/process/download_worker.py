@@ -402,7 +402,7 @@ def stop_download_workers() -> None:
 
 
 def get_download_worker_count() -> int:
-    """获取当前活跃的下载Worker数量"""
-    pool = get_download_pool()
+    """获取当前活跃的下载Worker数量（不创建Worker池，以免覆盖之后启动时指定的 pool_size）"""
+    pool = _pool
     return pool.get_active_count() if pool else 0
 
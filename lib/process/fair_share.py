@@ -0,0 +1,451 @@
+"""
+全局公平共享闸门模块 (新架构)
+所有查询的AI调用共享一个全局并发预算，按 (uid, qid) 的优先级与剩余工作量排队
+
+背景:
+- 每个查询启动 permission 个Worker，没有全局上限；大量用户同时查询时，
+  所有Worker争抢同一份API TPM/RPM，大查询可以挤占小查询
+- 闸门限制全局在途AI调用数，超出预算的调用按放行时限依次放行
+
+优先级与放行顺序 (按放行时限排队):
+- 每个查询为一个流，登记优先级与剩余工作量（待处理Block数，调度器定期刷新）
+  - admin: 管理员提升的查询
+  - interactive: 蒸馏任务等交互式小任务
+  - batch: 普通查询（可能有数百万篇文献）
+- 请求到达时计算放行时限 deadline = 到达时间 + 宽限时间，放行时选择 deadline 最早的请求
+- 宽限时间 = priority_aging_seconds × 优先级区间内按剩余工作量插值（PRIORITY_SLACK）：
+  高优先级区间整体更短，同一优先级内剩余工作量越少越短（剩余工作最少者优先）
+- 低优先级请求等待超过两者宽限时间之差后排到新到达的高优先级请求之前（老化），
+  大查询在持续的小任务流下也不会饿死
+- 每个流同时排队的请求数不超过其Worker数，同优先级、同规模的流按Worker数（权重）分享槽位
+
+并发预算:
+- fair_share_concurrency > 0 时使用固定值
+- 否则按 Key 池 RPM 容量自动推算（Little定律）: RPM / 60 × fair_share_latency
+
+自适应并发 (adaptive_concurrency，见 adaptive_concurrency.py):
+- 全局预算由AIMD控制器在 [1, 上限] 内调节：固定预算时上限即该值，
+  自动推算时上限为推算值的2倍（推算值只是估计，允许向上探测真实吞吐）
+- 每个流另有AIMD上限（不超过其权重，即Worker数），流达到上限时其等待请求暂不参与放行，
+  不影响其他流按放行时限获得槽位
+- 调用方在每次AI调用结束后通过 observe() 反馈延迟与是否拥塞
+"""
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from ..config import config_loader as config
+from .adaptive_concurrency import AIMDLimit
+from .api_key_pool import get_key_pool
+
+# 并发预算重新计算间隔（秒）
+CAPACITY_REFRESH_INTERVAL = 10.0
+
+# 优先级
+PRIORITY_ADMIN = 'admin'
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_BATCH = 'batch'
+PRIORITIES = (PRIORITY_ADMIN, PRIORITY_INTERACTIVE, PRIORITY_BATCH)
+
+# 各优先级的宽限时间区间（priority_aging_seconds 的倍数）: (剩余工作为0时, 剩余工作无穷大时)
+PRIORITY_SLACK = {
+    PRIORITY_ADMIN: (0.0, 0.05),
+    PRIORITY_INTERACTIVE: (0.05, 0.2),
+    PRIORITY_BATCH: (0.2, 1.0),
+}
+# 剩余Block数达到该值时宽限时间取区间中点
+REMAINING_HALF_BLOCKS = 50
+# 平均等待时间的平滑因子
+WAIT_ALPHA = 0.05
+
+
+def priority_rank(priority: str) -> int:
+    """优先级排序值（越小越优先，未知优先级按batch处理）"""
+    try:
+        return PRIORITIES.index(priority)
+    except ValueError:
+        return PRIORITIES.index(PRIORITY_BATCH)
+
+
+class _Flow:
+    """单个查询的排队状态"""
+
+    __slots__ = ('uid', 'qid', 'weight', 'priority', 'remaining', 'in_flight', 'queued',
+                 'granted', 'limiter', 'blocked', 'closing')
+
+    def __init__(self, uid: int, qid: str, weight: float,
+                 limiter: Optional[AIMDLimit] = None):
+        self.uid = uid
+        self.qid = qid
+        self.weight = weight
+        self.priority = PRIORITY_BATCH
+        self.remaining = 0  # 剩余工作量（待处理Block数）
+        self.in_flight = 0
+        self.queued = 0
+        self.granted = 0
+        self.limiter = limiter
+        self.blocked: List[tuple] = []  # 流达到上限时暂存的堆条目
+        self.closing = False  # 查询已结束，在途与等待请求归零后移除
+
+    def has_room(self) -> bool:
+        return self.limiter is None or self.in_flight < self.limiter.get_limit()
+
+
+class _Waiter:
+    """等待放行的请求（线程使用Event，协程使用Future）"""
+
+    __slots__ = ('flow', 'arrived', 'granted', 'cancelled', '_event', '_loop', '_future')
+
+    def __init__(self, flow: _Flow, arrived: float, loop=None):
+        self.flow = flow
+        self.arrived = arrived
+        self.granted = False
+        self.cancelled = False
+        self._loop = loop
+        self._event = None if loop else threading.Event()
+        self._future = loop.create_future() if loop else None
+
+    def wake(self) -> None:
+        if self._loop is None:
+            self._event.set()
+        else:
+            self._loop.call_soon_threadsafe(self._set_result)
+
+    def _set_result(self) -> None:
+        if not self._future.done():
+            self._future.set_result(True)
+
+
+class FairShareGate:
+    """
+    全局公平共享闸门
+
+    线程Worker使用 slot()，异步槽位使用 slot_async()
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flows: Dict[Tuple[int, str], _Flow] = {}
+        self._heap: List[tuple] = []  # (deadline, seq, waiter)
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._capacity = 0
+        self._ceiling = 0
+        self._capacity_at = 0.0
+        self._global_limiter: Optional[AIMDLimit] = None
+        self._avg_wait: Dict[str, float] = {p: 0.0 for p in PRIORITIES}
+
+    # ==================== 预算 ====================
+
+    @staticmethod
+    def _adaptive_enabled() -> bool:
+        return bool(getattr(config, 'adaptive_concurrency', False))
+
+    @staticmethod
+    def _new_limiter(max_limit: int, initial: int = None) -> AIMDLimit:
+        if initial is None:
+            initial = int(getattr(config, 'adaptive_initial_concurrency', 4) or 4)
+        tolerance = float(getattr(config, 'adaptive_latency_tolerance', 1.5) or 1.5)
+        return AIMDLimit(initial, max_limit, tolerance=tolerance)
+
+    def _compute_capacity(self) -> tuple:
+        """
+        Returns:
+            (推算的并发预算, 自适应上限)
+        """
+        fixed = int(getattr(config, 'fair_share_concurrency', 0) or 0)
+        if fixed > 0:
+            return fixed, fixed
+        latency = float(getattr(config, 'fair_share_latency', 5) or 5)
+        _, max_rpm = get_key_pool().get_capacity()
+        ceiling = max(1, int(max_rpm / 60.0 * latency))
+        return ceiling, ceiling * 2
+
+    def _refresh_capacity(self) -> None:
+        """定期重新计算并发预算（Key池可能访问MySQL，不在锁内执行）"""
+        now = time.time()
+        if self._capacity and now - self._capacity_at < CAPACITY_REFRESH_INTERVAL:
+            return
+        self._capacity_at = now
+        try:
+            ceiling, max_limit = self._compute_capacity()
+        except Exception as e:
+            print(f"[FairShare] 计算并发预算失败: {e}")
+            ceiling = max_limit = self._ceiling or 1
+        with self._lock:
+            self._ceiling = ceiling
+            if not self._adaptive_enabled():
+                self._global_limiter = None
+            elif self._global_limiter is None:
+                # 全局从推算值起步，按实际表现上下调节
+                self._global_limiter = self._new_limiter(max_limit, initial=ceiling)
+            else:
+                self._global_limiter.set_max(max_limit)
+            self._update_capacity()
+            self._dispatch()
+
+    def _update_capacity(self) -> None:
+        """当前并发预算（调用方持有锁）"""
+        if self._global_limiter is not None:
+            self._capacity = self._global_limiter.get_limit()
+        else:
+            self._capacity = self._ceiling
+
+    # ==================== 流管理 ====================
+
+    def _flow(self, uid: int, qid: str) -> _Flow:
+        flow = self._flows.get((uid, qid))
+        if flow is None:
+            limiter = self._new_limiter(1) if self._adaptive_enabled() else None
+            flow = _Flow(uid, qid, 1.0, limiter)
+            self._flows[(uid, qid)] = flow
+        return flow
+
+    def set_weight(self, uid: int, qid: str, weight: float) -> None:
+        """登记查询权重（调度器启动查询时调用，权重为用户permission）"""
+        with self._lock:
+            flow = self._flow(uid, qid)
+            flow.closing = False
+            flow.weight = max(1.0, float(weight or 1))
+            if flow.limiter is None:
+                return
+            # 查询的并发上限不超过其Worker数；尚无反馈时按新上限重新慢启动
+            if flow.limiter.baseline is None:
+                flow.limiter = self._new_limiter(int(flow.weight))
+            else:
+                flow.limiter.set_max(int(flow.weight))
+
+    def set_priority(self, uid: int, qid: str, priority: str,
+                     remaining: Optional[int] = None) -> None:
+        """
+        登记查询优先级与剩余工作量（调度器启动查询时及之后定期调用）
+
+        Args:
+            priority: PRIORITY_ADMIN / PRIORITY_INTERACTIVE / PRIORITY_BATCH
+            remaining: 待处理Block数，None表示不更新
+        """
+        with self._lock:
+            flow = self._flow(uid, qid)
+            flow.priority = priority if priority in PRIORITIES else PRIORITY_BATCH
+            if remaining is not None:
+                flow.remaining = max(0, int(remaining))
+
+    def remove_flow(self, uid: int, qid: str) -> None:
+        """
+        查询结束后移除流
+
+        仍有在途或等待请求时只标记，最后一个请求归还或取消后再移除，
+        之后的 release / observe 仍能找到该流，全局在途数不会漂移
+        """
+        with self._lock:
+            flow = self._flows.get((uid, qid))
+            if flow is not None:
+                flow.closing = True
+                self._discard_if_idle(flow)
+
+    def _discard_if_idle(self, flow: _Flow) -> None:
+        """已结束的流没有在途与等待请求时移除（调用方持有锁）"""
+        if flow.closing and flow.in_flight <= 0 and flow.queued <= 0:
+            if self._flows.get((flow.uid, flow.qid)) is flow:
+                del self._flows[(flow.uid, flow.qid)]
+
+    # ==================== 放行 ====================
+
+    @staticmethod
+    def _slack(flow: _Flow) -> float:
+        """流的宽限时间：优先级区间内按剩余工作量插值"""
+        aging = float(getattr(config, 'priority_aging_seconds', 10) or 10)
+        low, high = PRIORITY_SLACK[flow.priority]
+        fraction = flow.remaining / (flow.remaining + REMAINING_HALF_BLOCKS)
+        return aging * (low + (high - low) * fraction)
+
+    def _enqueue(self, uid: int, qid: str, loop=None) -> _Waiter:
+        """计算放行时限；有空闲预算且无人排队时直接放行（调用方持有锁）"""
+        flow = self._flow(uid, qid)
+        now = time.time()
+        waiter = _Waiter(flow, now, loop)
+        if not self._heap and self._in_flight < self._capacity and flow.has_room():
+            self._grant(waiter)
+        else:
+            flow.queued += 1
+            deadline = now + self._slack(flow)
+            heapq.heappush(self._heap, (deadline, next(self._seq), waiter))
+        return waiter
+
+    def _grant(self, waiter: _Waiter) -> None:
+        waiter.granted = True
+        waiter.flow.in_flight += 1
+        waiter.flow.granted += 1
+        self._in_flight += 1
+        priority = waiter.flow.priority
+        wait = time.time() - waiter.arrived
+        self._avg_wait[priority] += WAIT_ALPHA * (wait - self._avg_wait[priority])
+
+    def _dispatch(self) -> None:
+        """按放行时限从早到晚放行等待请求（调用方持有锁）"""
+        while self._heap and self._in_flight < self._capacity:
+            entry = heapq.heappop(self._heap)
+            waiter = entry[2]
+            if waiter.cancelled:
+                continue
+            if not waiter.flow.has_room():
+                # 流已达自适应上限，待该流有调用结束后重新参与排队
+                waiter.flow.blocked.append(entry)
+                continue
+            waiter.flow.queued -= 1
+            self._grant(waiter)
+            waiter.wake()
+
+    def _cancel(self, waiter: _Waiter) -> None:
+        """取消等待中的请求；已放行则归还槽位"""
+        with self._lock:
+            if waiter.granted:
+                self._release_locked(waiter.flow)
+            elif not waiter.cancelled:
+                waiter.cancelled = True
+                waiter.flow.queued -= 1
+                self._discard_if_idle(waiter.flow)
+
+    def _release_locked(self, flow: _Flow) -> None:
+        flow.in_flight -= 1
+        self._in_flight -= 1
+        self._unblock(flow)
+        self._dispatch()
+        self._discard_if_idle(flow)
+
+    def _unblock(self, flow: _Flow) -> None:
+        """流的暂存请求重新放回堆中（保留原放行时限）"""
+        if flow.blocked and flow.has_room():
+            for entry in flow.blocked:
+                heapq.heappush(self._heap, entry)
+            flow.blocked = []
+
+    def acquire(self, uid: int, qid: str) -> None:
+        """阻塞直到获得槽位（线程Worker）"""
+        self._refresh_capacity()
+        with self._lock:
+            waiter = self._enqueue(uid, qid)
+        if not waiter.granted:
+            waiter._event.wait()
+
+    async def acquire_async(self, uid: int, qid: str) -> None:
+        """等待直到获得槽位（异步槽位，不阻塞事件循环）"""
+        loop = asyncio.get_running_loop()
+        self._refresh_capacity()
+        with self._lock:
+            waiter = self._enqueue(uid, qid, loop)
+        if waiter.granted:
+            return
+        try:
+            await waiter._future
+        except asyncio.CancelledError:
+            self._cancel(waiter)
+            raise
+
+    def release(self, uid: int, qid: str) -> None:
+        """归还槽位"""
+        with self._lock:
+            flow = self._flows.get((uid, qid))
+            if flow is None:
+                return
+            self._release_locked(flow)
+
+    @contextmanager
+    def slot(self, uid: int, qid: str):
+        """占用一个全局槽位执行AI调用"""
+        self.acquire(uid, qid)
+        try:
+            yield
+        finally:
+            self.release(uid, qid)
+
+    @asynccontextmanager
+    async def slot_async(self, uid: int, qid: str):
+        """占用一个全局槽位执行AI调用（异步）"""
+        await self.acquire_async(uid, qid)
+        try:
+            yield
+        finally:
+            self.release(uid, qid)
+
+    # ==================== 自适应反馈 ====================
+
+    def observe(self, uid: int, qid: str, latency: Optional[float], congested: bool) -> None:
+        """
+        反馈一次AI调用的结果（在 slot 内、归还槽位之前调用）
+
+        Args:
+            latency: API调用耗时（秒），调用未发出时为None
+            congested: 是否为拥塞信号（429/5xx/超时）
+        """
+        if latency is None and not congested:
+            return
+        with self._lock:
+            flow = self._flows.get((uid, qid))
+            if flow is not None and flow.limiter is not None:
+                flow.limiter.observe(latency, congested, flow.in_flight)
+                self._unblock(flow)
+            if self._global_limiter is not None:
+                self._global_limiter.observe(latency, congested, self._in_flight)
+                self._update_capacity()
+            self._dispatch()
+
+    # ==================== 统计 ====================
+
+    @staticmethod
+    def _flow_stats(flow: _Flow) -> Dict:
+        return {
+            'weight': flow.weight,
+            'priority': flow.priority,
+            'in_flight': flow.in_flight,
+            'queued': flow.queued,
+            'limit': flow.limiter.get_limit() if flow.limiter else int(flow.weight),
+        }
+
+    def get_flow_stats(self, uid: int, qid: str) -> Dict:
+        """单个查询的在途/排队数"""
+        with self._lock:
+            flow = self._flows.get((uid, qid))
+            if flow is None:
+                return {'weight': 0, 'priority': '', 'in_flight': 0, 'queued': 0, 'limit': 0}
+            return self._flow_stats(flow)
+
+    def get_all_flow_stats(self) -> Dict[str, Dict]:
+        """所有查询的在途/排队数: "uid:qid" -> 统计（进程快照上报）"""
+        with self._lock:
+            return {f"{uid}:{qid}": self._flow_stats(flow) for (uid, qid), flow in self._flows.items()}
+
+    def get_stats(self) -> Dict:
+        """闸门整体统计（管理员仪表板）"""
+        with self._lock:
+            return {
+                'capacity': self._capacity,
+                'ceiling': self._ceiling,
+                'adaptive': self._global_limiter.get_stats() if self._global_limiter else None,
+                'in_flight': self._in_flight,
+                'queued': sum(f.queued for f in self._flows.values()),
+                'flows': len(self._flows),
+                'avg_wait': {p: round(w, 3) for p, w in self._avg_wait.items()},
+            }
+
+
+# 全局闸门实例
+_gate: Optional[FairShareGate] = None
+_gate_lock = threading.Lock()
+
+
+def get_fair_share_gate() -> FairShareGate:
+    """获取全局公平共享闸门"""
+    global _gate
+
+    if _gate is None:
+        with _gate_lock:
+            if _gate is None:
+                _gate = FairShareGate()
+
+    return _gate
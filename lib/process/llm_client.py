@@ -0,0 +1,163 @@
+"""
+LLM客户端池模块 (新架构)
+进程级复用 OpenAI 兼容客户端，保持 HTTP 长连接
+
+设计:
+- 每个 (api_key, base_url) 只创建一次客户端，所有Worker线程共享
+- 客户端底层使用带连接池的 httpx.Client，复用TCP/TLS会话（keep-alive）
+- 连接池大小、keep-alive时长由 config.json 控制:
+  - llm_max_connections: 单个客户端的最大连接数
+  - llm_max_keepalive: 最大空闲长连接数
+  - llm_keepalive_expiry: 空闲连接保活时长（秒）
+- 异步引擎使用 AsyncOpenAI；异步客户端绑定事件循环，按 (事件循环, api_key, base_url) 缓存，
+  关闭时在各自的事件循环中执行
+"""
+
+import threading
+from typing import Dict, Tuple, Optional, Any
+from ..config import config_loader as config
+
+# (api_key, base_url) -> openai.OpenAI
+_clients: Dict[Tuple[str, str], Any] = {}
+_clients_lock = threading.Lock()
+
+# (id(loop), api_key, base_url) -> (openai.AsyncOpenAI, loop)
+_async_clients: Dict[Tuple[int, str, str], Tuple[Any, Any]] = {}
+
+
+def _pool_settings() -> Tuple[Any, Any]:
+    """读取连接池配置，返回 (httpx.Limits, httpx.Timeout)"""
+    import httpx
+
+    max_connections = int(getattr(config, 'llm_max_connections', 200) or 200)
+    max_keepalive = int(getattr(config, 'llm_max_keepalive', max_connections) or max_connections)
+    keepalive_expiry = float(getattr(config, 'llm_keepalive_expiry', 30) or 30)
+    timeout = float(getattr(config, 'api_timeout', 60) or 60)
+
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive,
+        keepalive_expiry=keepalive_expiry,
+    )
+    return limits, httpx.Timeout(timeout, connect=min(timeout, 10.0))
+
+
+def _build_http_client():
+    """创建带连接池的 httpx 客户端"""
+    import httpx
+
+    limits, timeout = _pool_settings()
+    return httpx.Client(limits=limits, timeout=timeout)
+
+
+def get_llm_client(api_key: str, base_url: Optional[str] = None):
+    """
+    获取共享的LLM客户端（线程安全）
+
+    Args:
+        api_key: API Key
+        base_url: API地址，默认使用 config.api_base_url
+
+    Returns:
+        openai.OpenAI 实例
+    """
+    import openai
+
+    base_url = base_url or getattr(config, 'api_base_url', None) or ''
+    cache_key = (api_key, base_url)
+
+    client = _clients.get(cache_key)
+    if client is not None:
+        return client
+
+    # 双重检查锁定
+    with _clients_lock:
+        client = _clients.get(cache_key)
+        if client is None:
+            client = openai.OpenAI(
+                api_key=api_key,
+                base_url=base_url or None,
+                http_client=_build_http_client(),
+            )
+            _clients[cache_key] = client
+            print(f"[LLMClient] 创建客户端 base_url={base_url or 'default'} "
+                  f"(共 {len(_clients)} 个)")
+    return client
+
+
+def get_async_llm_client(api_key: str, base_url: Optional[str] = None):
+    """
+    获取当前事件循环共享的异步LLM客户端
+
+    必须在事件循环内调用；同一事件循环只在其自身线程中运行，因此无需加锁
+
+    Returns:
+        openai.AsyncOpenAI 实例
+    """
+    import asyncio
+    import httpx
+    import openai
+
+    base_url = base_url or getattr(config, 'api_base_url', None) or ''
+    loop = asyncio.get_running_loop()
+    cache_key = (id(loop), api_key, base_url)
+
+    entry = _async_clients.get(cache_key)
+    if entry is None:
+        limits, timeout = _pool_settings()
+        client = openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url or None,
+            http_client=httpx.AsyncClient(limits=limits, timeout=timeout),
+        )
+        entry = (client, loop)
+        _async_clients[cache_key] = entry
+        print(f"[LLMClient] 创建异步客户端 base_url={base_url or 'default'} "
+              f"(共 {len(_async_clients)} 个)")
+    return entry[0]
+
+
+def close_llm_clients(timeout: float = 5.0) -> None:
+    """
+    关闭所有客户端及其连接池
+
+    异步客户端的连接池绑定创建它的事件循环，close() 提交到该事件循环执行；
+    事件循环已停止（未关闭）时在当前线程运行，已关闭时直接丢弃
+
+    Args:
+        timeout: 等待每个异步客户端关闭的秒数
+    """
+    with _clients_lock:
+        for client in _clients.values():
+            try:
+                client.close()
+            except Exception:
+                pass
+        _clients.clear()
+
+    _close_async_clients(timeout)
+
+
+def _close_async_clients(timeout: float) -> None:
+    """在各自的事件循环中关闭异步客户端，然后清空缓存"""
+    import asyncio
+
+    try:
+        current = asyncio.get_running_loop()
+    except RuntimeError:
+        current = None
+
+    for client, loop in list(_async_clients.values()):
+        try:
+            if loop.is_closed():
+                continue
+            if loop is current:
+                # 在该事件循环内调用时不能阻塞等待，关闭任务排入循环
+                loop.create_task(client.close())
+            elif loop.is_running():
+                asyncio.run_coroutine_threadsafe(client.close(), loop).result(timeout)
+            else:
+                loop.run_until_complete(client.close())
+        except Exception as e:
+            print(f"[LLMClient] 关闭异步客户端失败: {e}")
+    _async_clients.clear()
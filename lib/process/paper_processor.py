@@ -33,6 +33,7 @@ from ..load_data.journal_dao import (
     get_journal_prices, get_year_number
 )
 from ..redis.task_queue import TaskQueue
+from ..redis.scheduler_events import SchedulerEvents
 from ..redis.paper_blocks import PaperBlocks
 from ..redis.system_cache import SystemCache
 from ..redis.system_config import SystemConfig
@@ -429,6 +430,15 @@ def produce_tasks(selected_folders: List[str], time_range: Dict,
         mark_query_completed(query_id)
         return
     
+    # 大Block切分为固定大小的DOI区间，避免单个Worker卡在大Block上（进度按切片统计）
+    slice_size = getattr(config, 'block_slice_size', 0)
+    if slice_size > 0:
+        block_count = len(block_keys)
+        block_keys = PaperBlocks.split_into_slices(block_keys, slice_size)
+        if len(block_keys) != block_count:
+            utils.print_and_log(f"[producer] Split {block_count} blocks into "
+                                f"{len(block_keys)} work units (slice={slice_size})")
+    
     # 初始化任务状态
     TaskQueue.init_status(uid, query_id, len(block_keys))
     
@@ -438,6 +448,9 @@ def produce_tasks(selected_folders: List[str], time_range: Dict,
     # 更新查询状态
     update_query_status(query_id, 'RUNNING')
     
+    # 唤醒调度器立即启动Worker（无需等待MySQL轮询）
+    SchedulerEvents.publish_query(uid, query_id)
+    
     utils.print_and_log(f"[producer] Enqueued {len(block_keys)} blocks for query {query_id}")
 
 
@@ -472,6 +485,9 @@ def distillation_producer(relevant_dois: List[str], query_id: str,
     DISTILL_BLOCK_SIZE = 100
     block_keys = []
     
+    # 一次批量查询全部DOI的Bib（DOI索引一次查询，meta:Block按Block分组一次Pipeline读取）
+    papers = PaperBlocks.batch_get_papers_by_doi(relevant_dois)
+    
     for i in range(0, len(relevant_dois), DISTILL_BLOCK_SIZE):
         batch_dois = relevant_dois[i:i + DISTILL_BLOCK_SIZE]
         block_index = len(block_keys)
@@ -480,8 +496,7 @@ def distillation_producer(relevant_dois: List[str], query_id: str,
         # 收集这批DOI的Bib数据和价格
         block_data = {}
         for doi in batch_dois:
-            # 从meta:Block获取Bib数据
-            result = PaperBlocks.get_paper_by_doi(doi)
+            result = papers.get(doi)
             if result:
                 _, bib = result
                 if bib:
@@ -513,6 +528,9 @@ def distillation_producer(relevant_dois: List[str], query_id: str,
     # 更新查询状态
     update_query_status(query_id, 'RUNNING')
     
+    # 唤醒调度器（事件携带蒸馏标记，调度器无需再查询MySQL）
+    SchedulerEvents.publish_query(uid, query_id, is_distillation=True)
+    
     utils.print_and_log(f"[distill] Enqueued {len(block_keys)} blocks for distillation")
 
 
@@ -0,0 +1,155 @@
+"""
+进程角色模块 (新架构)
+HTTP服务与CPU密集的评估工作（解压、JSON、正则解析Bib、生成CSV）拆分到不同进程，
+避免与请求处理争抢同一个GIL；两类进程通过Redis中的任务Key协作，可独立扩缩容
+
+角色 (main.py --role，或环境变量 APW_ROLE):
+- all:    单进程运行全部组件（默认，兼容原部署方式）
+- web:    HTTP服务与BillingSyncer；不运行调度器，查询由Worker进程领取
+- worker: 调度器、执行引擎（BlockWorker/异步引擎）与下载Worker，不监听端口；
+          可启动多个（--processes N 或多个容器副本）
+
+多进程协作:
+- 调度事件通过Redis消费组分发，每个事件只被一个进程领取
+- 启动查询前在Redis中登记归属进程（TaskQueue.claim_owner）并定期续期，
+  避免恢复扫描在多个进程中重复启动同一查询；进程崩溃后归属过期，由其他进程的恢复扫描接管
+- 运行调度器的进程每 HEARTBEAT_INTERVAL 秒上报运行快照（ProcessRegistry），
+  管理员仪表板据此汇总整个集群的数据
+"""
+
+import os
+import signal
+import socket
+import threading
+import time
+from typing import Dict, Optional
+
+from ..redis.process_registry import ProcessRegistry
+from ..redis.block_cache import get_block_cache
+
+ROLE_ALL = 'all'
+ROLE_WEB = 'web'
+ROLE_WORKER = 'worker'
+ROLES = (ROLE_ALL, ROLE_WEB, ROLE_WORKER)
+
+# 快照上报间隔（秒）
+HEARTBEAT_INTERVAL = 5.0
+
+_role = ROLE_ALL
+_started_at = time.time()
+_heartbeat_thread: Optional[threading.Thread] = None
+_heartbeat_stop = threading.Event()
+_heartbeat_lock = threading.Lock()
+
+
+def set_role(role: str) -> None:
+    """设置当前进程角色（main.py 启动时调用）"""
+    global _role
+    if role not in ROLES:
+        raise ValueError(f"未知的进程角色: {role}")
+    _role = role
+
+
+def get_role() -> str:
+    return _role
+
+
+def runs_scheduler() -> bool:
+    """当前进程是否运行调度器与执行引擎"""
+    return _role != ROLE_WEB
+
+
+def get_process_id() -> str:
+    """当前进程ID（主机名-pid，每次调用时计算，fork出的子进程不会沿用父进程的值）"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def build_snapshot() -> Dict:
+    """当前进程的运行快照"""
+    from .scheduler import get_system_stats
+    from .fair_share import get_fair_share_gate
+    from .download_worker import get_download_worker_count
+
+    stats = get_system_stats()
+    gate = get_fair_share_gate()
+    return {
+        'process_id': get_process_id(),
+        'role': _role,
+        'host': socket.gethostname(),
+        'pid': os.getpid(),
+        'started_at': _started_at,
+        'updated_at': time.time(),
+        'tpm': stats['tpm'],
+        'rpm': stats['rpm'],
+        'active_workers': stats['active_workers'],
+        'active_queries': stats['active_queries'],
+        'download_workers': get_download_worker_count(),
+        'fair_share': gate.get_stats(),
+        'flows': gate.get_all_flow_stats(),
+        'block_cache': get_block_cache().get_stats(),
+    }
+
+
+def _heartbeat_loop() -> None:
+    while not _heartbeat_stop.is_set():
+        try:
+            ProcessRegistry.heartbeat(get_process_id(), build_snapshot())
+        except Exception as e:
+            print(f"[ProcessRole] 上报快照失败: {e}")
+        _heartbeat_stop.wait(HEARTBEAT_INTERVAL)
+
+
+def start_heartbeat() -> None:
+    """启动快照上报线程（调度器启动时调用）"""
+    global _heartbeat_thread
+
+    with _heartbeat_lock:
+        if _heartbeat_thread is not None and _heartbeat_thread.is_alive():
+            return
+        _heartbeat_stop.clear()
+        _heartbeat_thread = threading.Thread(
+            target=_heartbeat_loop,
+            name="ProcessHeartbeat",
+            daemon=True
+        )
+        _heartbeat_thread.start()
+
+
+def stop_heartbeat() -> None:
+    """停止上报并注销当前进程"""
+    _heartbeat_stop.set()
+    ProcessRegistry.unregister(get_process_id())
+
+
+def run_worker(download_pool_size: int = 10) -> None:
+    """
+    Worker进程主体：启动调度器与下载Worker，阻塞直到收到 SIGTERM/SIGINT
+
+    退出时停止执行引擎的Worker、提交其缓冲区、交还Block租约并释放查询归属
+    （见 scheduler.shutdown_scheduler），关闭LLM客户端的连接池后注销进程快照
+
+    Args:
+        download_pool_size: 下载Worker线程数
+    """
+    from .scheduler import start_scheduler, shutdown_scheduler
+    from .download_worker import start_download_workers, stop_download_workers
+    from .llm_client import close_llm_clients
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    start_scheduler()
+    start_download_workers(pool_size=download_pool_size)
+    print(f"[ProcessRole] Worker进程 {get_process_id()} 已启动")
+
+    try:
+        while not stop.wait(1.0):
+            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shutdown_scheduler()
+        stop_download_workers()
+        close_llm_clients()
+        stop_heartbeat()
+        print(f"[ProcessRole] Worker进程 {get_process_id()} 已退出")
@@ -0,0 +1,231 @@
+"""
+AI调用容错模块 (新架构)
+对单篇文献的AI调用做错误分类、指数退避重试与对冲请求
+
+错误分类 (classify_error):
+- rate_limit: 429
+- server:     5xx
+- timeout:    请求超时 / 408
+- network:    连接失败
+- no_key:     Key池暂无可用Key（含所有Key均已熔断）
+- circuit_open: API端点已熔断（见 circuit_breaker.py），按剩余熔断时间退避
+- auth:       401/403（Key失效，重试时会换Key）
+- bad_request: 其他4xx（请求本身有问题，重试无意义）
+- bad_response: 响应正文为空（已消耗Token，重试通常可得到正常响应）
+- unknown:    其他异常（如响应解析失败）
+
+重试:
+- 可重试错误按 "全抖动" 指数退避: uniform(0, min(RETRY_MAX_DELAY, base × 2^n))，
+  服务端给出 Retry-After 时不短于该值
+- 每篇文献最多重试 ai_max_retries 次；仍失败时结果标记 _failed，由Worker推入重试Block，
+  不扣费、不写入结果（见 worker.py）
+
+对冲 (ai_hedge_enabled):
+- 调用超过近期 p95 延迟仍未返回时，再发出一个相同请求，取先返回的结果
+- 对冲请求数不超过总调用数的 HEDGE_BUDGET，避免在服务端整体变慢时加倍负载
+"""
+
+import random
+import threading
+from typing import Dict, List, Optional
+
+from ..config import config_loader as config
+
+ERR_RATE_LIMIT = 'rate_limit'
+ERR_SERVER = 'server'
+ERR_TIMEOUT = 'timeout'
+ERR_NETWORK = 'network'
+ERR_NO_KEY = 'no_key'
+ERR_CIRCUIT_OPEN = 'circuit_open'
+ERR_AUTH = 'auth'
+ERR_BAD_REQUEST = 'bad_request'
+ERR_BAD_RESPONSE = 'bad_response'
+ERR_UNKNOWN = 'unknown'
+
+# 可重试的错误类型
+RETRYABLE_ERRORS = (ERR_RATE_LIMIT, ERR_SERVER, ERR_TIMEOUT, ERR_NETWORK, ERR_NO_KEY, ERR_AUTH,
+                    ERR_CIRCUIT_OPEN, ERR_BAD_RESPONSE)
+
+# 视为拥塞信号的错误类型（自适应并发控制据此退避）
+CONGESTION_ERRORS = (ERR_RATE_LIMIT, ERR_SERVER, ERR_TIMEOUT)
+
+# 退避上限（秒）
+RETRY_MAX_DELAY = 30.0
+
+# 对冲请求占总调用数的比例上限
+HEDGE_BUDGET = 0.05
+
+# p95 统计的样本数与重新计算间隔
+LATENCY_SAMPLES = 256
+LATENCY_RECOMPUTE_EVERY = 32
+
+
+class NoApiKeyError(RuntimeError):
+    """Key池暂无可用Key"""
+
+
+class EmptyResponseError(RuntimeError):
+    """API返回成功但响应正文为空"""
+
+
+class CircuitOpenError(RuntimeError):
+    """API端点熔断中，调用被快速拒绝"""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    status = getattr(exc, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(exc, 'response', None), 'status_code', None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_error(exc: BaseException) -> str:
+    """
+    对AI调用异常分类
+
+    兼容 openai/httpx 异常：优先按 status_code，其次按异常类型名
+    """
+    if isinstance(exc, NoApiKeyError):
+        return ERR_NO_KEY
+    if isinstance(exc, CircuitOpenError):
+        return ERR_CIRCUIT_OPEN
+    if isinstance(exc, EmptyResponseError):
+        return ERR_BAD_RESPONSE
+
+    status = _status_code(exc)
+    if status is not None:
+        if status == 429:
+            return ERR_RATE_LIMIT
+        if status == 408:
+            return ERR_TIMEOUT
+        if status >= 500:
+            return ERR_SERVER
+        if status in (401, 403):
+            return ERR_AUTH
+        if 400 <= status < 500:
+            return ERR_BAD_REQUEST
+
+    name = type(exc).__name__
+    if 'Timeout' in name:
+        return ERR_TIMEOUT
+    if 'RateLimit' in name:
+        return ERR_RATE_LIMIT
+    if 'Connection' in name or 'Connect' in name or isinstance(exc, ConnectionError):
+        return ERR_NETWORK
+    return ERR_UNKNOWN
+
+
+def retry_after(exc: BaseException) -> float:
+    """读取响应头 Retry-After（秒），熔断异常取剩余熔断时间，没有时返回0"""
+    if isinstance(exc, CircuitOpenError):
+        return exc.retry_after
+    headers = getattr(getattr(exc, 'response', None), 'headers', None)
+    if not headers:
+        return 0.0
+    try:
+        return max(0.0, float(headers.get('retry-after') or 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def backoff_delay(attempt: int, min_delay: float = 0.0) -> float:
+    """
+    第 attempt 次重试前的等待秒数（全抖动指数退避）
+
+    Args:
+        attempt: 重试序号（从0开始）
+        min_delay: 最短等待（如 Retry-After）
+    """
+    base = float(getattr(config, 'ai_retry_base_delay', 1.0) or 1.0)
+    cap = min(RETRY_MAX_DELAY, base * (2 ** attempt))
+    return max(min_delay, random.uniform(0, cap))
+
+
+def get_max_retries() -> int:
+    """每篇文献的重试次数"""
+    return max(0, int(getattr(config, 'ai_max_retries', 3) or 0))
+
+
+class LatencyTracker:
+    """
+    近期AI调用延迟统计与对冲预算
+
+    p95 每 LATENCY_RECOMPUTE_EVERY 个样本重新计算一次
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples: List[float] = []
+        self._next = 0
+        self._since_compute = 0
+        self._p95: Optional[float] = None
+        self._calls = 0
+        self._hedges = 0
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            if len(self._samples) < LATENCY_SAMPLES:
+                self._samples.append(latency)
+            else:
+                self._samples[self._next] = latency
+                self._next = (self._next + 1) % LATENCY_SAMPLES
+            self._since_compute += 1
+            if self._since_compute >= LATENCY_RECOMPUTE_EVERY:
+                self._since_compute = 0
+                ordered = sorted(self._samples)
+                self._p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def hedge_delay(self) -> Optional[float]:
+        """
+        本次调用的对冲等待时间
+
+        Returns:
+            秒数；未开启对冲、样本不足或超出对冲预算时返回None
+        """
+        if not getattr(config, 'ai_hedge_enabled', False):
+            return None
+        with self._lock:
+            self._calls += 1
+            if self._p95 is None:
+                return None
+            return self._p95
+
+    def try_hedge(self) -> bool:
+        """占用一次对冲预算"""
+        with self._lock:
+            if self._hedges + 1 > max(1.0, self._calls * HEDGE_BUDGET):
+                return False
+            self._hedges += 1
+            return True
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'p95': round(self._p95, 3) if self._p95 is not None else None,
+                'calls': self._calls,
+                'hedges': self._hedges,
+            }
+
+
+# 全局延迟统计实例
+_tracker: Optional[LatencyTracker] = None
+_tracker_lock = threading.Lock()
+
+
+def get_latency_tracker() -> LatencyTracker:
+    """获取全局延迟统计"""
+    global _tracker
+
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                _tracker = LatencyTracker()
+
+    return _tracker
@@ -6,24 +6,53 @@
 - 系统资源计算器: 实时TPM/RPM统计
 - Worker线程生产器: 根据查询任务和用户权限生产Worker
 - 任务完成检查: 定期检查并标记完成的任务
+
+事件驱动:
+- 查询入队时发布 sched:events 事件，调度器阻塞读取并立即启动Worker
+- MySQL的 query_log 仅在启动时和每 scheduler_recovery_interval 秒扫描一次，
+  用于恢复进程崩溃或事件丢失的查询
+
+优先级:
+- 蒸馏任务为 interactive，普通查询为 batch，管理员可将查询提升为 admin（记录在任务状态中）
+- 积压的调度事件按 (优先级, 待处理Block数) 从小到大启动；系统满载时仍启动 interactive/admin 查询，
+  其AI调用在公平共享闸门中优先放行（见 fair_share.py）
+- 每5秒向闸门刷新运行中查询的优先级与剩余Block数
+
+多进程 (见 process_role.py):
+- web 角色的进程不运行调度器
+- 启动查询前登记归属进程，每5秒续期，结束时释放；已由其他进程运行的查询不会重复启动
+- 每 block_lease_seconds/3 秒续约本进程持有的Block租约，并回收各进程已过期的租约（见 block_lease.py）
+- 进程退出时 shutdown_scheduler() 停止Worker、交还租约并释放归属，其他进程的恢复扫描随即接管
 """
 
 import time
 import threading
-from typing import Dict, List, Set, Optional
+from collections import deque
+from typing import Deque, Dict, List, Set, Optional
+from ..config import config_loader as config
 from ..redis.task_queue import TaskQueue
+from ..redis.scheduler_events import SchedulerEvents
 from ..redis.connection import redis_ping
 from ..load_data.user_dao import get_permission
 from ..load_data.query_dao import get_active_queries, mark_query_completed
 from .worker import spawn_workers, get_active_worker_count, BlockWorker
 from .sliding_window import get_current_tpm, get_current_rpm
 from .tpm_accumulator import start_accumulator
+from .api_key_pool import get_key_pool
+from .async_engine import get_async_engine, is_async_engine_enabled
+from .fair_share import (
+    get_fair_share_gate, priority_rank, PRIORITIES, PRIORITY_INTERACTIVE, PRIORITY_BATCH
+)
+from .process_role import runs_scheduler, get_process_id, start_heartbeat
+from .block_lease import get_lease_seconds, renew_all, reap_expired, hand_back_all
 
 # 全局状态
 _scheduler_running = False
 _scheduler_thread: Optional[threading.Thread] = None
 _managed_queries: Dict[str, List[BlockWorker]] = {}  # qid -> workers
 _managed_lock = threading.Lock()
+# 已收到但因系统满载尚未启动的查询事件
+_pending_events: Deque[Dict] = deque()
 
 
 def start_scheduler() -> None:
@@ -33,11 +62,18 @@ def start_scheduler() -> None:
     if _scheduler_running:
         return
     
+    if not runs_scheduler():
+        # web 角色：查询由Worker进程领取
+        return
+    
     _scheduler_running = True
     
     # 启动TPM累加器
     start_accumulator()
     
+    # 上报进程快照（管理员仪表板汇总各Worker进程）
+    start_heartbeat()
+    
     # 启动调度器线程
     _scheduler_thread = threading.Thread(
         target=_scheduler_loop,
@@ -55,10 +91,57 @@ def stop_scheduler() -> None:
     _scheduler_running = False
 
 
+def shutdown_scheduler(timeout: Optional[float] = None) -> None:
+    """
+    进程退出时停止调度器，并交还本进程运行的查询（Worker进程收到 SIGTERM 时调用）
+    
+    1. 停止调度循环，通知全部Worker处理完当前文献后退出
+    2. 等待Worker退出（最长 shutdown_timeout 秒）：缓冲区中的结果在退出前提交
+       （已终止的查询丢弃），处理到一半的Block只将未出结果的文献交还任务队列
+    3. 交还仍持有的租约（超时未退出的Worker、预取队列中的Block），释放查询归属
+    
+    Args:
+        timeout: 等待Worker退出的秒数，None 时读取 config.shutdown_timeout
+    """
+    stop_scheduler()
+    if timeout is None:
+        timeout = float(getattr(config, 'shutdown_timeout', 30) or 0)
+    deadline = time.time() + timeout
+    
+    # 等待调度循环退出，避免关闭期间再启动新的查询
+    if _scheduler_thread is not None:
+        _scheduler_thread.join(max(0.0, min(5.0, timeout)))
+    
+    with _managed_lock:
+        managed = list(_managed_queries.items())
+        _managed_queries.clear()
+    
+    for _, workers in managed:
+        for worker in workers:
+            worker.stop()
+    for _, workers in managed:
+        for worker in workers:
+            worker.join(max(0.0, deadline - time.time()))
+    
+    returned = hand_back_all()
+    for qid, workers in managed:
+        _release_flow(workers, qid)
+    
+    print(f"[Scheduler] 停止：交还 {len(managed)} 个查询、{returned} 个仍持有的租约")
+
+
 def _scheduler_loop() -> None:
-    """调度器主循环"""
+    """
+    调度器主循环
+    
+    阻塞等待调度事件（最长1秒），事件到达后立即启动Worker；
+    状态日志、完成检查、MySQL恢复扫描按各自周期执行
+    """
     last_status_log = 0
     last_completion_check = 0
+    last_recovery = 0
+    last_lease_check = 0
+    recovery_interval = max(5, int(getattr(config, 'scheduler_recovery_interval', 60) or 60))
     
     while _scheduler_running:
         try:
@@ -69,32 +152,126 @@ def _scheduler_loop() -> None:
                 last_status_log = current_time
                 _log_status()
             
-            # 每5秒检查任务完成状态
+            # 每5秒检查任务完成状态并刷新优先级
             if current_time - last_completion_check >= 5:
                 last_completion_check = current_time
                 _check_completions()
+                _refresh_running_queries()
+            
+            # 续约并回收过期的Block租约
+            if current_time - last_lease_check >= get_lease_seconds() / 3:
+                last_lease_check = current_time
+                renew_all()
+                reap_expired()
             
-            # 检查系统资源，决定是否可以处理新查询
-            if _can_accept_new_work():
+            can_accept = _can_accept_new_work()
+            
+            # 启动时及之后定期从MySQL恢复遗漏的查询（崩溃恢复）
+            if can_accept and current_time - last_recovery >= recovery_interval:
+                last_recovery = current_time
                 _process_pending_queries()
             
-            time.sleep(0.5)
+            # 满载时仍有积压事件则缩短等待，尽快重试
+            block_ms = 500 if _pending_events else 1000
+            events = SchedulerEvents.read(block_ms=block_ms)
+            if events is None:
+                # Redis不可用
+                time.sleep(0.5)
+                continue
+            _pending_events.extend(events)
+            
+            if _pending_events:
+                _process_events(_can_accept_new_work())
             
         except Exception as e:
             print(f"[Scheduler] 循环异常: {e}")
             time.sleep(1)
 
 
+def _process_events(can_accept: bool) -> None:
+    """
+    启动调度事件对应的查询
+    
+    按 (优先级, 待处理Block数) 从小到大启动；系统满载时只启动 interactive/admin 查询，
+    batch 查询的事件保留到下次
+    """
+    candidates = []
+    while _pending_events:
+        event = _pending_events.popleft()
+        uid, qid = event['uid'], event['qid']
+        if uid <= 0 or not qid:
+            continue
+        
+        pending = TaskQueue.get_pending_count(uid, qid)
+        if pending <= 0:
+            continue
+        
+        priority = _query_priority(uid, qid, event['is_distillation'])
+        candidates.append((priority_rank(priority), pending, event, priority))
+    
+    candidates.sort(key=lambda c: (c[0], c[1]))
+    for _, _, event, priority in candidates:
+        uid, qid = event['uid'], event['qid']
+        with _managed_lock:
+            if qid in _managed_queries:
+                continue
+        
+        if priority == PRIORITY_BATCH and not can_accept:
+            _pending_events.append(event)
+            continue
+        
+        permission = get_permission(uid)
+        if permission <= 0:
+            permission = 1  # 默认至少1个Worker
+        
+        _start_query_workers(uid, qid, permission, event['is_distillation'], priority)
+        can_accept = _can_accept_new_work()
+
+
+def _query_priority(uid: int, qid: str, is_distillation: Optional[bool]) -> str:
+    """
+    查询的优先级：任务状态中已记录的（如管理员提升）优先，否则蒸馏任务为 interactive，其他为 batch
+    
+    is_distillation 为None时从MySQL查询
+    """
+    status = TaskQueue.get_status(uid, qid) or {}
+    priority = status.get('priority')
+    if priority in PRIORITIES:
+        return priority
+    if is_distillation is None:
+        is_distillation = _is_distillation_query(qid)
+    return PRIORITY_INTERACTIVE if is_distillation else PRIORITY_BATCH
+
+
+def _refresh_running_queries() -> None:
+    """续期运行中查询的归属，并向公平共享闸门刷新其优先级与剩余Block数"""
+    with _managed_lock:
+        running = [(workers[0].uid, qid) for qid, workers in _managed_queries.items() if workers]
+    
+    gate = get_fair_share_gate()
+    owner = get_process_id()
+    for uid, qid in running:
+        if not TaskQueue.claim_owner(uid, qid, owner):
+            print(f"[Scheduler] 查询 {qid} 的归属续期失败")
+        status = TaskQueue.get_status(uid, qid) or {}
+        priority = status.get('priority')
+        if priority in PRIORITIES:
+            gate.set_priority(uid, qid, priority, TaskQueue.get_pending_count(uid, qid))
+
+
 def _log_status() -> None:
     """输出状态日志"""
     tpm = get_current_tpm()
     rpm = get_current_rpm()
     workers = get_active_worker_count()
+    key_pool = get_key_pool()
+    max_tpm, max_rpm = key_pool.get_capacity()
     
     with _managed_lock:
         active_queries = len(_managed_queries)
     
-    print(f"[Scheduler] 状态: TPM={tpm}, RPM={rpm}, "
+    print(f"[Scheduler] 状态: TPM={tpm}/{max_tpm}, RPM={rpm}/{max_rpm}, "
+          f"Keys={key_pool.get_key_count()}, "
           f"Workers={workers}, ActiveQueries={active_queries}")
 
 
@@ -102,26 +279,28 @@ def _can_accept_new_work() -> bool:
     """
     检查系统是否可以接受新的工作
     
-    基于TPM/RPM限制判断
+    基于TPM/RPM限制判断，限制为Key池中所有Key的
+    rpm_limit/tpm_limit 之和（来自api_list表）
+    已发出但尚未结算的请求按预扣的预估Token计入，避免在用量上报之前超额接单
     """
-    # 获取系统TPM/RPM限制
-    from ..load_data.journal_dao import get_journal_prices
-    from ..redis.system_cache import SystemCache
-    
-    # 简化实现：检查是否有足够的API资源
-    # 实际应该基于api_list表的rpm_limit/tpm_limit
     current_tpm = get_current_tpm()
     current_rpm = get_current_rpm()
     
-    # 默认限制
-    max_tpm = 500000  # 50万 TPM
-    max_rpm = 3000    # 3000 RPM
+    key_pool = get_key_pool()
+    max_tpm, max_rpm = key_pool.get_capacity()
+    reserved_tokens, in_flight = key_pool.get_reserved()
+    target = key_pool.get_target_ratio()
     
-    return current_tpm < max_tpm * 0.9 and current_rpm < max_rpm * 0.9
+    return (current_tpm + reserved_tokens < max_tpm * target
+            and current_rpm + in_flight < max_rpm * target)
 
 
 def _process_pending_queries() -> None:
-    """处理等待中的查询任务"""
+    """
+    处理等待中的查询任务（MySQL恢复扫描）
+    
+    正常情况下查询由调度事件启动，此处兜底处理进程重启或事件丢失的查询
+    """
     if not redis_ping():
         return
     
@@ -155,7 +334,9 @@ def _process_pending_queries() -> None:
         _start_query_workers(uid, qid, permission)
 
 
-def _start_query_workers(uid: int, qid: str, worker_count: int) -> None:
+def _start_query_workers(uid: int, qid: str, worker_count: int,
+                         is_distillation: Optional[bool] = None,
+                         priority: Optional[str] = None) -> None:
     """
     为查询启动Worker
     
@@ -165,9 +346,18 @@ def _start_query_workers(uid: int, qid: str, worker_count: int) -> None:
     修复28：区分普通查询和蒸馏任务，使用不同的Worker类
     - 普通查询: BlockWorker (正常费率)
     - 蒸馏任务: DistillWorker (动态蒸馏费率，从 SystemConfig 获取)
+    
+    worker_engine="async" 时由异步执行引擎以协程槽位代替线程，
+    槽位数同样为 min(permission, 待处理Block数量)
+    
+    is_distillation 由调度事件携带；为None时（恢复扫描）从MySQL查询
+    priority 为None时按 _query_priority() 确定，并记录到任务状态
     """
     from .search_paper import create_ai_processor
-    import json
+    
+    # 多Worker进程时同一查询只由一个进程运行（恢复扫描会反复遇到其他进程的查询，不输出日志）
+    if not TaskQueue.claim_owner(uid, qid, get_process_id()):
+        return
     
     # 获取待处理Block数量
     pending_blocks = TaskQueue.get_pending_count(uid, qid)
@@ -180,34 +370,35 @@ def _start_query_workers(uid: int, qid: str, worker_count: int) -> None:
     print(f"[Scheduler] 任务 {qid}: {pending_blocks} 个Block, "
           f"permission={worker_count}, 实际启动 {actual_workers} 个Worker")
     
-    # 创建AI处理器
-    ai_processor = create_ai_processor(uid, qid)
-    
     # 修复28：检查是否为蒸馏任务
-    from ..load_data.query_dao import get_query_by_id
-    query_info = get_query_by_id(qid)
-    is_distillation = False
-    if query_info:
-        search_params = query_info.get('search_params')
-        if isinstance(search_params, str):
-            try:
-                search_params = json.loads(search_params)
-            except (json.JSONDecodeError, TypeError):
-                search_params = {}
-        is_distillation = search_params.get('is_distillation', False) if search_params else False
+    if is_distillation is None:
+        is_distillation = _is_distillation_query(qid)
+    
+    # 登记公平共享权重（= permission，决定该查询在全局并发预算中的份额）与优先级，
+    # 在Worker发出第一次AI调用之前完成
+    if priority is None:
+        priority = _query_priority(uid, qid, is_distillation)
+    gate = get_fair_share_gate()
+    gate.set_weight(uid, qid, worker_count)
+    gate.set_priority(uid, qid, priority, pending_blocks)
     
     # 根据任务类型选择Worker
-    if is_distillation:
+    if is_async_engine_enabled():
+        workers = get_async_engine().spawn(uid, qid, actual_workers, is_distillation)
+    elif is_distillation:
         # 蒸馏任务使用 DistillWorker（0.1倍费率）
         from .distill import spawn_distill_workers
+        ai_processor = create_ai_processor(uid, qid)
         workers = spawn_distill_workers(uid, qid, actual_workers, ai_processor)
         print(f"[Scheduler] 蒸馏任务 {qid}: 使用 DistillWorker (动态蒸馏费率)")
     else:
         # 普通查询使用 BlockWorker
+        ai_processor = create_ai_processor(uid, qid)
         workers = spawn_workers(uid, qid, actual_workers, ai_processor)
     
     # 更新任务状态
     TaskQueue.set_state(uid, qid, 'RUNNING')
+    TaskQueue.set_priority(uid, qid, priority)
     
     # 记录到管理列表
     with _managed_lock:
@@ -216,25 +407,45 @@ def _start_query_workers(uid: int, qid: str, worker_count: int) -> None:
     print(f"[Scheduler] 启动查询 {qid}: {actual_workers} 个Worker")
 
 
+def _is_distillation_query(qid: str) -> bool:
+    """从MySQL查询 search_params 判断是否为蒸馏任务（修复28）"""
+    import json
+    from ..load_data.query_dao import get_query_by_id
+    
+    query_info = get_query_by_id(qid)
+    if not query_info:
+        return False
+    
+    search_params = query_info.get('search_params')
+    if isinstance(search_params, str):
+        try:
+            search_params = json.loads(search_params)
+        except (json.JSONDecodeError, TypeError):
+            search_params = {}
+    return bool(search_params.get('is_distillation', False)) if search_params else False
+
+
 def _check_completions() -> None:
     """
     检查并处理完成的查询
     
     修复41：删除暂停状态处理，只区分取消和正常完成
+
+    Worker全部退出时，只有完成数等于 total_blocks 且没有未结束的租约才标记完成；
+    否则（如Worker异常退出、租约待回收）只释放归属，
+    由租约回收重新入队后的调度事件或其他进程接管完成
     """
     done_qids = []  # 正常完成的
     cancelled_qids = []  # 取消的
-    
+    unfinished_qids = []  # Worker已退出但仍有未完成Block的
+
     with _managed_lock:
         for qid, workers in list(_managed_queries.items()):
             if not workers:
                 continue
             
             # 检查所有Worker是否都已退出
-            all_done = all(
-                not w._running or not w._thread or not w._thread.is_alive()
-                for w in workers
-            )
+            all_done = all(not w.is_alive() for w in workers)
             
             if all_done:
                 uid = workers[0].uid
@@ -245,26 +456,54 @@ def _check_completions() -> None:
                 if state == 'CANCELLED':
                     # 取消的任务，不标记完成
                     cancelled_qids.append(qid)
-                else:
+                elif _is_drained(uid, qid, status):
                     # 正常完成
                     done_qids.append(qid)
-    
+                else:
+                    unfinished_qids.append(qid)
+
     # 处理取消的查询（只从管理列表移除，保持原状态）
     for qid in cancelled_qids:
         with _managed_lock:
-            _managed_queries.pop(qid, None)
+            workers = _managed_queries.pop(qid, None)
+        _release_flow(workers, qid)
         print(f"[Scheduler] 查询已取消: {qid}")
+
+    # 未完成的查询只释放归属，不标记完成
+    for qid in unfinished_qids:
+        with _managed_lock:
+            workers = _managed_queries.pop(qid, None)
+        _release_flow(workers, qid)
+        print(f"[Scheduler] 查询 {qid} 的Worker已退出但仍有未完成Block，释放归属等待回收")
     
     # 处理正常完成的查询
     for qid in done_qids:
         with _managed_lock:
-            _managed_queries.pop(qid, None)
+            workers = _managed_queries.pop(qid, None)
+        _release_flow(workers, qid)
         
         # 更新数据库状态
         mark_query_completed(qid)
         print(f"[Scheduler] 查询完成: {qid}")
 
 
+def _is_drained(uid: int, qid: str, status: Optional[Dict]) -> bool:
+    """完成数等于 total_blocks 且租约集合为空"""
+    if not status:
+        return False
+    total = status.get('total_blocks', 0)
+    if total <= 0 or status.get('finished_blocks', 0) != total:
+        return False
+    return TaskQueue.get_lease_count(uid, qid) == 0
+
+
+def _release_flow(workers: Optional[List[BlockWorker]], qid: str) -> None:
+    """查询结束后移除公平共享流并释放归属"""
+    if workers:
+        get_fair_share_gate().remove_flow(workers[0].uid, qid)
+        TaskQueue.release_owner(workers[0].uid, qid, get_process_id())
+
+
 def submit_query(uid: int, qid: str, block_keys: List[str]) -> bool:
     """
     提交新的查询任务
@@ -294,15 +533,21 @@ def submit_query(uid: int, qid: str, block_keys: List[str]) -> bool:
     # 重置进度计数
     TaskQueue.reset_finished_count(uid, qid)
     
+    # 唤醒调度器
+    SchedulerEvents.publish_query(uid, qid)
+    
     print(f"[Scheduler] 提交查询 {qid}: {len(block_keys)} 个Blocks")
     return True
 
 
 def get_system_stats() -> Dict:
     """获取系统统计信息"""
+    max_tpm, max_rpm = get_key_pool().get_capacity()
     return {
         'tpm': get_current_tpm(),
         'rpm': get_current_rpm(),
+        'max_tpm': max_tpm,
+        'max_rpm': max_rpm,
         'active_workers': get_active_worker_count(),
         'active_queries': len(_managed_queries),
     }
@@ -4,9 +4,21 @@
 """
 
 import json
+import threading
 import time
 from typing import Dict, Optional, Any, Callable
 from ..config import config_loader as config
+from .llm_client import get_llm_client
+from .api_key_pool import get_key_pool
+from .fair_share import get_fair_share_gate
+from .token_estimator import get_token_estimator
+from .tpm_accumulator import report_tokens
+from .resilient_call import (
+    NoApiKeyError, CircuitOpenError, EmptyResponseError, classify_error, retry_after, backoff_delay,
+    get_max_retries, get_latency_tracker, RETRYABLE_ERRORS, CONGESTION_ERRORS
+)
+from .circuit_breaker import get_endpoint_breaker, ENDPOINT_FAILURE_ERRORS
+from ..redis.relevance_cache import RelevanceCache, TTL_RELEVANCE_CACHE
 
 # 修复36: 语言代码到语言名称的映射
 LANGUAGE_MAP = {
@@ -15,14 +27,13 @@ LANGUAGE_MAP = {
 }
 
 
-def create_ai_processor(uid: int, qid: str) -> Callable:
+def _load_search_params(qid: str) -> tuple:
     """
-    创建AI处理函数
+    读取查询参数
     
     Returns:
-        处理函数 (doi, title, abstract) -> {relevant, reason, _tokens}
+        (research_question, requirements, language)
     """
-    # 获取查询参数
     from ..load_data.query_dao import get_query_log
     
     query_info = get_query_log(qid) or {}
@@ -31,6 +42,18 @@ def create_ai_processor(uid: int, qid: str) -> Callable:
     research_question = search_params.get('research_question', '')
     requirements = search_params.get('requirements', '')
     language = search_params.get('language', 'zh')  # 修复36: 获取语言参数
+    return research_question, requirements, language
+
+
+def create_ai_processor(uid: int, qid: str) -> Callable:
+    """
+    创建AI处理函数
+    
+    Returns:
+        处理函数 (doi, title, abstract) -> {relevant, reason, _tokens}
+    """
+    # 获取查询参数
+    research_question, requirements, language = _load_search_params(qid)
     
     def processor(doi: str, title: str, abstract: str) -> Dict:
         """AI处理函数"""
@@ -48,6 +71,31 @@ def create_ai_processor(uid: int, qid: str) -> Callable:
     return processor
 
 
+def create_async_ai_processor(uid: int, qid: str) -> Callable:
+    """
+    创建异步AI处理函数（供异步执行引擎使用）
+    
+    Returns:
+        协程函数 (doi, title, abstract) -> {relevant, reason, _tokens}
+    """
+    research_question, requirements, language = _load_search_params(qid)
+    
+    async def processor(doi: str, title: str, abstract: str) -> Dict:
+        """异步AI处理函数"""
+        return await async_search_relevant_papers(
+            doi=doi,
+            title=title,
+            abstract=abstract,
+            research_question=research_question,
+            requirements=requirements,
+            uid=uid,
+            qid=qid,
+            language=language
+        )
+    
+    return processor
+
+
 def search_relevant_papers(doi: str, title: str, abstract: str,
                           research_question: str, requirements: str,
                           uid: int = None, qid: str = None,
@@ -69,9 +117,237 @@ def search_relevant_papers(doi: str, title: str, abstract: str,
         {
             relevant: "Y" 或 "N",
             reason: 判断理由,
-            _tokens: 消耗的Token数
+            _tokens: 消耗的Token数,
+            _cached: 是否命中相关性缓存（仅命中时存在）,
+            _failed/_retryable: AI调用重试后仍失败（仅失败时存在，Worker据此推迟该文献）
         }
     """
+    early_result, cache_key, cache_ttl, prompt = _prepare_request(
+        doi, title, abstract, research_question, requirements, uid, qid, language
+    )
+    if early_result is not None:
+        return early_result
+    
+    # 调用AI（占用全局公平共享槽位，超出并发预算时按查询权重排队；失败时退避重试）
+    try:
+        result = _call_with_retry(prompt, uid, qid)
+        _store_result(result, cache_key, cache_ttl)
+        return result
+    except Exception as e:
+        print(f"[SearchPaper] AI调用失败: {e}")
+        return _failed_result(f'AI error: {str(e)}', retryable=True)
+
+
+async def async_search_relevant_papers(doi: str, title: str, abstract: str,
+                                       research_question: str, requirements: str,
+                                       uid: int = None, qid: str = None,
+                                       language: str = 'zh') -> Dict:
+    """
+    判断论文与研究问题的相关性（异步版本，语义与 search_relevant_papers 相同）
+    
+    缓存读写为同步Redis调用，放到事件循环的默认线程池执行，避免阻塞事件循环
+    """
+    import asyncio
+    loop = asyncio.get_running_loop()
+    
+    early_result, cache_key, cache_ttl, prompt = await loop.run_in_executor(
+        None, _prepare_request,
+        doi, title, abstract, research_question, requirements, uid, qid, language
+    )
+    if early_result is not None:
+        return early_result
+    
+    try:
+        result = await _call_with_retry_async(prompt, uid, qid)
+        if cache_key and result.get('_tokens', 0) > 0:
+            await loop.run_in_executor(None, _store_result, result, cache_key, cache_ttl)
+        return result
+    except Exception as e:
+        print(f"[SearchPaper] AI调用失败: {e}")
+        return _failed_result(f'AI error: {str(e)}', retryable=True)
+
+
+def _failed_result(reason: str, retryable: bool) -> Dict:
+    """重试用尽后的失败结果（Worker据 _failed 推迟或免费写入，不按正常结果扣费）"""
+    return {
+        'relevant': 'N',
+        'reason': reason,
+        '_tokens': 0,
+        '_failed': True,
+        '_retryable': retryable,
+    }
+
+
+def _call_with_retry(prompt: str, uid: int, qid: str) -> Dict:
+    """
+    带重试的AI调用（线程Worker）
+    
+    每次尝试占用一个公平共享槽位；可重试错误在槽位外按指数退避等待后重试
+    """
+    gate = get_fair_share_gate()
+    max_retries = get_max_retries()
+    attempt = 0
+    while True:
+        with gate.slot(uid or 0, qid or ''):
+            result = _call_hedged(prompt)
+            _observe_call(gate, uid, qid, result)
+        
+        error = result.pop('_error', None)
+        wait = result.pop('_retry_after', 0)
+        if error is None:
+            return result
+        # 失败的调用可能已消耗Token（如响应为空），上报后再重试或放弃
+        _report_discarded(result)
+        if error not in RETRYABLE_ERRORS or attempt >= max_retries:
+            return _failed_result(result.get('reason', ''), error in RETRYABLE_ERRORS)
+        time.sleep(backoff_delay(attempt, wait))
+        attempt += 1
+
+
+async def _call_with_retry_async(prompt: str, uid: int, qid: str) -> Dict:
+    """带重试的AI调用（异步版本，语义与 _call_with_retry 相同）"""
+    import asyncio
+    gate = get_fair_share_gate()
+    max_retries = get_max_retries()
+    attempt = 0
+    while True:
+        async with gate.slot_async(uid or 0, qid or ''):
+            result = await _call_hedged_async(prompt)
+            _observe_call(gate, uid, qid, result)
+        
+        error = result.pop('_error', None)
+        wait = result.pop('_retry_after', 0)
+        if error is None:
+            return result
+        # 失败的调用可能已消耗Token（如响应为空），上报后再重试或放弃
+        _report_discarded(result)
+        if error not in RETRYABLE_ERRORS or attempt >= max_retries:
+            return _failed_result(result.get('reason', ''), error in RETRYABLE_ERRORS)
+        await asyncio.sleep(backoff_delay(attempt, wait))
+        attempt += 1
+
+
+# 对冲调用线程池（线程Worker开启对冲时，主请求与对冲请求都在池中执行）
+HEDGE_POOL_SIZE = 256
+_hedge_pool = None
+_hedge_pool_lock = threading.Lock()
+
+
+def _get_hedge_pool():
+    global _hedge_pool
+    
+    if _hedge_pool is None:
+        with _hedge_pool_lock:
+            if _hedge_pool is None:
+                from concurrent.futures import ThreadPoolExecutor
+                _hedge_pool = ThreadPoolExecutor(
+                    max_workers=HEDGE_POOL_SIZE, thread_name_prefix="AIHedge"
+                )
+    
+    return _hedge_pool
+
+
+def _report_discarded(result: Dict) -> None:
+    """未被采用的调用（对冲落选或调用失败）同样消耗了Token，上报到全局TPM"""
+    tokens = result.get('_tokens', 0)
+    if tokens > 0:
+        report_tokens(tokens)
+
+
+def _pick_hedged(first: Dict, second: Optional[Dict]) -> Dict:
+    """先返回的结果失败而另一个成功时采用成功的结果"""
+    if second is not None and first.get('_error') and not second.get('_error'):
+        first, second = second, first
+    if second is not None:
+        _report_discarded(second)
+    return first
+
+
+def _record_latency(result: Dict) -> Dict:
+    if result.get('_error') is None and result.get('_latency') is not None:
+        get_latency_tracker().record(result['_latency'])
+    return result
+
+
+def _call_hedged(prompt: str) -> Dict:
+    """
+    调用AI API；开启对冲时，超过近期 p95 仍未返回则再发一个相同请求，取先成功的结果
+    """
+    from concurrent.futures import FIRST_COMPLETED, TimeoutError as FutureTimeout, wait
+    
+    tracker = get_latency_tracker()
+    delay = tracker.hedge_delay()
+    if delay is None:
+        return _record_latency(_call_ai_api(prompt))
+    
+    pool = _get_hedge_pool()
+    primary = pool.submit(_call_ai_api, prompt)
+    try:
+        return _record_latency(primary.result(timeout=delay))
+    except FutureTimeout:
+        pass
+    if not tracker.try_hedge():
+        return _record_latency(primary.result())
+    
+    hedge = pool.submit(_call_ai_api, prompt)
+    done, pending = wait([primary, hedge], return_when=FIRST_COMPLETED)
+    first = done.pop()
+    other = primary if first is hedge else hedge
+    result = first.result()
+    if result.get('_error') and other in pending:
+        # 先返回的失败了，等待另一个
+        return _record_latency(_pick_hedged(result, other.result()))
+    if other in pending:
+        other.add_done_callback(lambda f: _report_discarded(f.result()))
+        return _record_latency(result)
+    return _record_latency(_pick_hedged(result, other.result()))
+
+
+async def _call_hedged_async(prompt: str) -> Dict:
+    """调用AI API（异步版本，对冲语义与 _call_hedged 相同，未采用的请求直接取消）"""
+    import asyncio
+    
+    tracker = get_latency_tracker()
+    delay = tracker.hedge_delay()
+    if delay is None:
+        return _record_latency(await _call_ai_api_async(prompt))
+    
+    primary = asyncio.ensure_future(_call_ai_api_async(prompt))
+    done, _ = await asyncio.wait({primary}, timeout=delay)
+    if done or not tracker.try_hedge():
+        return _record_latency(await primary)
+    
+    hedge = asyncio.ensure_future(_call_ai_api_async(prompt))
+    done, pending = await asyncio.wait({primary, hedge}, return_when=asyncio.FIRST_COMPLETED)
+    first = done.pop()
+    result = first.result()
+    if result.get('_error') and pending:
+        return _record_latency(_pick_hedged(result, await pending.pop()))
+    for task in pending:
+        task.cancel()
+    if done:
+        return _record_latency(_pick_hedged(result, done.pop().result()))
+    return _record_latency(result)
+
+
+def _observe_call(gate, uid: int, qid: str, result: Dict) -> None:
+    """把本次调用的延迟与拥塞信号反馈给自适应并发控制（取出内部字段，不写入结果）"""
+    latency = result.pop('_latency', None)
+    congested = result.pop('_congested', False)
+    gate.observe(uid or 0, qid or '', latency, congested)
+
+
+def _prepare_request(doi: str, title: str, abstract: str,
+                     research_question: str, requirements: str,
+                     uid: int = None, qid: str = None,
+                     language: str = 'zh') -> tuple:
+    """
+    AI调用前的准备：单元测试模式、无摘要、相关性缓存命中时直接给出结果
+    
+    Returns:
+        (early_result, cache_key, cache_ttl, prompt)
+        early_result 不为None时无需调用AI
+    """
     # 单元测试模式：返回模拟的AI响应，不实际调用API
     if getattr(config, 'unit_test_mode', False):
         import random
@@ -84,39 +360,52 @@ def search_relevant_papers(doi: str, title: str, abstract: str,
             '_tokens': mock_tokens,
             'uid': uid,
             'query_index': qid
-        }
+        }, None, 0, None
     
     if not abstract:
         return {
             'relevant': 'N',
             'reason': 'No abstract available',
             '_tokens': 0
-        }
+        }, None, 0, None
+    
+    # 查询相关性缓存：相同 (问题, 要求, DOI, 模型, 系统提示词) 直接复用结果
+    cache_key = None
+    cache_ttl = TTL_RELEVANCE_CACHE
+    if getattr(config, 'relevance_cache_enabled', True):
+        cache_ttl = int(getattr(config, 'relevance_cache_ttl', TTL_RELEVANCE_CACHE) or TTL_RELEVANCE_CACHE)
+        cache_key = RelevanceCache.build_key(
+            research_question, requirements, doi,
+            getattr(config, 'model_name', ''), _render_system_prompt(language)
+        )
+        cached = RelevanceCache.get(cache_key, cache_ttl)
+        if cached:
+            return {
+                'relevant': cached.get('relevant', 'N'),
+                'reason': cached.get('reason', ''),
+                '_tokens': 0,
+                '_cached': True
+            }, None, 0, None
     
     # 构造Prompt（修复36: 传递语言参数）
     prompt = _build_prompt(title, abstract, research_question, requirements, uid, qid, language)
-    
-    # 调用AI
-    try:
-        result = _call_ai_api(prompt)
-        return result
-    except Exception as e:
-        print(f"[SearchPaper] AI调用失败: {e}")
-        return {
-            'relevant': 'N',
-            'reason': f'AI error: {str(e)}',
-            '_tokens': 0
-        }
+    return None, cache_key, cache_ttl, prompt
 
 
-def _build_prompt(title: str, abstract: str, 
-                  research_question: str, requirements: str,
-                  uid: int = None, qid: str = None,
-                  language: str = 'zh') -> str:
+def _store_result(result: Dict, cache_key: Optional[str], cache_ttl: int) -> None:
+    """写入相关性缓存（仅缓存真实的AI判断，调用失败时 _tokens 为0，不缓存）"""
+    if cache_key and result.get('_tokens', 0) > 0:
+        RelevanceCache.set(
+            cache_key, result.get('relevant', 'N'),
+            result.get('reason', ''), cache_ttl
+        )
+
+
+def _render_system_prompt(language: str = 'zh') -> str:
     """
-    构造AI Prompt
+    生成系统提示词（替换 {language} 占位符）
     
-    修复36: 添加 language 参数，用于替换 system_prompt 中的 {language} 占位符
+    相关性缓存以渲染后的提示词哈希区分版本，修改提示词后旧缓存自动失效
     """
     # 将语言代码映射为语言名称
     lang_text = LANGUAGE_MAP.get(language, '中文')
@@ -134,7 +423,19 @@ Output format (JSON):
 """
     
     # 修复36: 替换 {language} 占位符为实际语言名称
-    system_prompt = system_prompt.replace('{language}', lang_text)
+    return system_prompt.replace('{language}', lang_text)
+
+
+def _build_prompt(title: str, abstract: str, 
+                  research_question: str, requirements: str,
+                  uid: int = None, qid: str = None,
+                  language: str = 'zh') -> str:
+    """
+    构造AI Prompt
+    
+    修复36: 添加 language 参数，用于替换 system_prompt 中的 {language} 占位符
+    """
+    system_prompt = _render_system_prompt(language)
     
     user_prompt = f"""
 Research Question: {research_question}
@@ -158,12 +459,28 @@ Please determine if this paper is relevant to the research question.
     })
 
 
+def _record_endpoint(endpoint, outcome: Optional[str]) -> None:
+    """向端点熔断器反馈调用结果（outcome 为None表示调用未完成，如对冲请求被取消）"""
+    if outcome is None:
+        endpoint.cancel()
+    else:
+        endpoint.record(outcome not in ENDPOINT_FAILURE_ERRORS)
+
+
 def _call_ai_api(prompt: str) -> Dict:
     """
     调用AI API
     
     实际实现应该使用OpenAI兼容的API
+    每次调用先按提示词预估Token数并预扣额度，再从Key池中选择余量最大的健康Key，
+    结束后按实际用量结算并校准预估器；API端点熔断时直接失败（CircuitOpenError），不等待超时
+    
+    结果中附带 _latency（API耗时）与 _congested（是否429/5xx/超时），供自适应并发控制使用；
+    失败时附带 _error（错误分类，见 resilient_call.py）与 _retry_after，由调用方决定是否重试；
+    响应正文为空时 _tokens 为已消耗的Token数
     """
+    started = None
+    tokens_used = 0
     try:
         import openai
         
@@ -172,37 +489,56 @@ def _call_ai_api(prompt: str) -> Dict:
         user_msg = prompt_data.get('user', '')
         
         # 获取API配置
-        api_key = _get_api_key()
         api_base = getattr(config, 'api_base_url', None)
         model_name = getattr(config, 'model_name', 'gpt-3.5-turbo')
         
-        if not api_key:
-            raise ValueError("No API key available")
+        estimator = get_token_estimator()
+        estimated = estimator.estimate(system_msg, user_msg)
         
-        # 创建客户端
-        client = openai.OpenAI(
-            api_key=api_key,
-            base_url=api_base
-        )
+        endpoint = get_endpoint_breaker(api_base)
+        if not endpoint.try_acquire():
+            raise CircuitOpenError("API endpoint circuit open", endpoint.retry_in())
         
-        # 调用API
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=[
-                {"role": "system", "content": system_msg},
-                {"role": "user", "content": user_msg}
-            ],
-            temperature=0.1,
-            max_tokens=500
-        )
+        key_pool = get_key_pool()
+        api_key = key_pool.acquire(tokens=estimated)
+        if not api_key:
+            endpoint.cancel()
+            raise NoApiKeyError("No API key available")
+        
+        outcome = None
+        try:
+            # 获取共享客户端（复用连接池，避免每篇文献重建TLS连接）
+            client = get_llm_client(api_key.api_key, api_base)
+            
+            # 调用API
+            started = time.time()
+            response = client.chat.completions.create(
+                model=model_name,
+                messages=[
+                    {"role": "system", "content": system_msg},
+                    {"role": "user", "content": user_msg}
+                ],
+                temperature=0.1,
+                max_tokens=500
+            )
+            tokens_used = response.usage.total_tokens if response.usage else 0
+            latency = time.time() - started
+            outcome = ''
+        except Exception as e:
+            outcome = classify_error(e)
+            raise
+        finally:
+            key_pool.release(api_key, tokens_used, reserved=estimated, error=outcome)
+            _record_endpoint(endpoint, outcome)
+            estimator.observe(estimated, tokens_used)
         
         # 解析响应
-        content = response.choices[0].message.content
-        tokens_used = response.usage.total_tokens if response.usage else 0
+        content = _response_content(response)
         
         # 尝试解析JSON响应
         result = _parse_ai_response(content)
         result['_tokens'] = tokens_used
+        result['_latency'] = latency
         
         return result
         
@@ -214,34 +550,104 @@ def _call_ai_api(prompt: str) -> Dict:
             '_tokens': 0
         }
     except Exception as e:
+        error = classify_error(e)
         return {
             'relevant': 'N',
             'reason': f'API call failed: {str(e)}',
-            '_tokens': 0
+            '_tokens': tokens_used,
+            '_latency': time.time() - started if started else None,
+            '_congested': error in CONGESTION_ERRORS,
+            '_error': error,
+            '_retry_after': retry_after(e),
         }
 
 
-def _get_api_key() -> Optional[str]:
-    """获取可用的API Key"""
-    # 优先从config获取
-    api_keys = getattr(config, 'API_KEYS', [])
-    if api_keys:
-        return api_keys[0]
+async def _call_ai_api_async(prompt: str) -> Dict:
+    """
+    调用AI API（异步版本）
     
-    # 从数据库获取
+    Key选择与用量上报与 _call_ai_api 相同，客户端为当前事件循环共享的 AsyncOpenAI
+    """
+    started = None
+    tokens_used = 0
     try:
-        from ..load_data.db_base import _get_connection
-        conn = _get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT api_key FROM api_list WHERE is_active = 1 LIMIT 1"
-        )
-        row = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        return row[0] if row else None
-    except Exception:
-        return None
+        from .llm_client import get_async_llm_client
+        
+        prompt_data = json.loads(prompt)
+        system_msg = prompt_data.get('system', '')
+        user_msg = prompt_data.get('user', '')
+        
+        api_base = getattr(config, 'api_base_url', None)
+        model_name = getattr(config, 'model_name', 'gpt-3.5-turbo')
+        
+        estimator = get_token_estimator()
+        estimated = estimator.estimate(system_msg, user_msg)
+        
+        endpoint = get_endpoint_breaker(api_base)
+        if not endpoint.try_acquire():
+            raise CircuitOpenError("API endpoint circuit open", endpoint.retry_in())
+        
+        key_pool = get_key_pool()
+        api_key = await key_pool.acquire_async(tokens=estimated)
+        if not api_key:
+            endpoint.cancel()
+            raise NoApiKeyError("No API key available")
+        
+        outcome = None
+        try:
+            client = get_async_llm_client(api_key.api_key, api_base)
+            started = time.time()
+            response = await client.chat.completions.create(
+                model=model_name,
+                messages=[
+                    {"role": "system", "content": system_msg},
+                    {"role": "user", "content": user_msg}
+                ],
+                temperature=0.1,
+                max_tokens=500
+            )
+            tokens_used = response.usage.total_tokens if response.usage else 0
+            latency = time.time() - started
+            outcome = ''
+        except Exception as e:
+            outcome = classify_error(e)
+            raise
+        finally:
+            await key_pool.release_async(api_key, tokens_used, reserved=estimated, error=outcome)
+            _record_endpoint(endpoint, outcome)
+            estimator.observe(estimated, tokens_used)
+        
+        result = _parse_ai_response(_response_content(response))
+        result['_tokens'] = tokens_used
+        result['_latency'] = latency
+        return result
+        
+    except ImportError:
+        return {
+            'relevant': 'N',
+            'reason': 'OpenAI library not installed',
+            '_tokens': 0
+        }
+    except Exception as e:
+        error = classify_error(e)
+        return {
+            'relevant': 'N',
+            'reason': f'API call failed: {str(e)}',
+            '_tokens': tokens_used,
+            '_latency': time.time() - started if started else None,
+            '_congested': error in CONGESTION_ERRORS,
+            '_error': error,
+            '_retry_after': retry_after(e),
+        }
+
+
+def _response_content(response) -> str:
+    """取出响应正文；正文为空时（如内容过滤、输出被截断）抛出 EmptyResponseError"""
+    choices = getattr(response, 'choices', None)
+    content = choices[0].message.content if choices else None
+    if not content or not content.strip():
+        raise EmptyResponseError("Empty AI response content")
+    return content
 
 
 def _parse_ai_response(content: str) -> Dict:
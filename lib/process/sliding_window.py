@@ -3,15 +3,51 @@
 实现TPM/RPM的实时统计
 
 滑动窗口设计:
-- 容量为60个单位的队列
-- 每单位存放1秒间隔内的数据
-- 队列中所有单位内存储的数量之和为当前的"已使用量"
+- 固定 slots 个桶组成的环形数组（默认60个，每桶1秒）
+- 桶下标 = 时间片编号 % slots；时间推进时滑出窗口的桶从合计中扣除并清零
+- 维护窗口内合计，读取"已使用量"无需遍历所有桶
+- 计数按线程分条（stripe），各条独立加锁，读取时汇总，
+  大量Worker同时上报时不再争抢同一把锁
+- add(value, count) 支持批量上报（累加器每秒一次性写入多个请求）
 """
 
+import itertools
 import time
 import threading
-from collections import deque
-from typing import Deque, Tuple
+from typing import List
+
+# 默认分条数（全局窗口由所有Worker线程共同写入）
+DEFAULT_STRIPES = 8
+
+
+class _Stripe:
+    """一条计数：环形数组 + 窗口内合计 + 独立锁"""
+
+    __slots__ = ('lock', 'epoch', 'values', 'counts', 'total', 'count')
+
+    def __init__(self, slots: int):
+        self.lock = threading.Lock()
+        self.epoch = 0  # 最新桶的时间片编号
+        self.values: List[float] = [0.0] * slots
+        self.counts: List[int] = [0] * slots
+        self.total = 0.0
+        self.count = 0
+
+    def advance(self, epoch: int, slots: int) -> None:
+        """推进到 epoch，滑出窗口的桶从合计中扣除并清零（调用者需持有锁）"""
+        steps = min(epoch - self.epoch, slots)
+        values = self.values
+        counts = self.counts
+        for k in range(1, steps + 1):
+            idx = (self.epoch + k) % slots
+            self.total -= values[idx]
+            self.count -= counts[idx]
+            values[idx] = 0.0
+            counts[idx] = 0
+        self.epoch = epoch
+        # 防止浮点数精度问题
+        if self.total < 0:
+            self.total = 0.0
 
 
 class SlidingWindow:
@@ -21,59 +57,79 @@ class SlidingWindow:
     用于统计最近60秒内的累计值（TPM或RPM）
     """
     
-    def __init__(self, window_size: int = 60):
+    def __init__(self, window_size: int = 60, slots: int = None,
+                 stripes: int = DEFAULT_STRIPES):
         """
         Args:
             window_size: 窗口大小（秒），默认60秒
+            slots: 桶数量（决定时间精度），默认每秒一个桶
+            stripes: 计数分条数，1 表示单锁
         """
         self.window_size = window_size
-        self._data: Deque[Tuple[float, float]] = deque()  # (timestamp, value)
-        self._lock = threading.Lock()
-        self._total = 0.0
+        self.slots = max(1, int(slots or window_size))
+        self.resolution = window_size / self.slots
+        self._stripes = [_Stripe(self.slots) for _ in range(max(1, stripes))]
+        self._local = threading.local()
+        self._next_stripe = itertools.count()
+    
+    def _stripe(self) -> _Stripe:
+        """为当前线程分配计数条（首次写入时轮流分配）"""
+        stripe = self._stripes[next(self._next_stripe) % len(self._stripes)]
+        self._local.stripe = stripe
+        return stripe
     
-    def add(self, value: float) -> None:
+    def add(self, value: float, count: int = 1) -> None:
         """
-        添加一个数据点
+        添加数据（均摊O(1)）
         
         Args:
             value: 要添加的值（如Token数或请求数）
+            count: 本次合并上报的数据点数量
         """
-        now = time.time()
-        with self._lock:
-            self._data.append((now, value))
-            self._total += value
-            self._cleanup(now)
+        epoch = int(time.time() / self.resolution)
+        try:
+            stripe = self._local.stripe
+        except AttributeError:
+            stripe = self._stripe()
+        with stripe.lock:
+            if epoch > stripe.epoch:
+                stripe.advance(epoch, self.slots)
+            # 时钟回拨时计入最新的桶
+            idx = stripe.epoch % self.slots
+            stripe.values[idx] += value
+            stripe.counts[idx] += count
+            stripe.total += value
+            stripe.count += count
+    
+    def _collect(self) -> tuple:
+        """汇总所有计数条的窗口内合计 (总和, 数据点数)"""
+        epoch = int(time.time() / self.resolution)
+        total = 0.0
+        count = 0
+        for stripe in self._stripes:
+            with stripe.lock:
+                if epoch > stripe.epoch:
+                    stripe.advance(epoch, self.slots)
+                total += stripe.total
+                count += stripe.count
+        return total, count
     
     def get_total(self) -> float:
         """获取当前窗口内的总和"""
-        now = time.time()
-        with self._lock:
-            self._cleanup(now)
-            return self._total
-    
-    def _cleanup(self, now: float) -> None:
-        """清理过期的数据点（不加锁，调用者需持有锁）"""
-        cutoff = now - self.window_size
-        while self._data and self._data[0][0] < cutoff:
-            _, old_value = self._data.popleft()
-            self._total -= old_value
-        
-        # 防止浮点数精度问题
-        if self._total < 0:
-            self._total = 0
+        return self._collect()[0]
     
     def clear(self) -> None:
         """清空窗口"""
-        with self._lock:
-            self._data.clear()
-            self._total = 0.0
+        for stripe in self._stripes:
+            with stripe.lock:
+                stripe.values[:] = [0.0] * self.slots
+                stripe.counts[:] = [0] * self.slots
+                stripe.total = 0.0
+                stripe.count = 0
     
     def get_count(self) -> int:
         """获取窗口内的数据点数量"""
-        now = time.time()
-        with self._lock:
-            self._cleanup(now)
-            return len(self._data)
+        return self._collect()[1]
 
 
 class TPMSlidingWindow(SlidingWindow):
@@ -99,9 +155,10 @@ class RPMSlidingWindow(SlidingWindow):
     用于统计系统每分钟发送的请求总数
     """
     
-    def add_request(self) -> None:
-        """添加一次请求"""
-        self.add(1.0)
+    def add_request(self, n: int = 1) -> None:
+        """添加 n 次请求"""
+        if n > 0:
+            self.add(float(n), n)
     
     def get_rpm(self) -> int:
         """获取当前RPM"""
@@ -0,0 +1,88 @@
+"""
+Token预估模块 (新架构)
+在调用API之前按提示词长度预估本次请求的Token数，用于预扣限流额度
+
+估算方法（不依赖分词器）:
+- 中日韩字符约 1 Token/字；其他字符约 4 字符/Token
+- 每条消息固定开销 MESSAGE_OVERHEAD，加上预估的回复长度 completion_tokens
+- 以实际 usage.total_tokens / 预估值 的指数滑动平均校准系数，
+  模型分词差异会在运行一段时间后被自动修正
+"""
+
+import re
+import threading
+from typing import Optional
+
+from ..config import config_loader as config
+
+# 每条消息的格式开销（role、分隔符等）
+MESSAGE_OVERHEAD = 4
+
+# 校准系数的平滑因子与上下限
+CALIBRATION_ALPHA = 0.05
+CALIBRATION_MIN = 0.5
+CALIBRATION_MAX = 3.0
+
+_CJK_RE = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]')
+
+
+def approx_tokens(text: str) -> int:
+    """粗略估算一段文本的Token数"""
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    other = len(text) - cjk
+    return cjk + (other + 3) // 4
+
+
+class TokenEstimator:
+    """带在线校准的Token预估器"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ratio = 1.0
+        self._samples = 0
+
+    def estimate(self, *messages: str) -> int:
+        """
+        预估一次请求的总Token数（提示词 + 回复）
+
+        Args:
+            messages: 各条消息的文本（system、user）
+        """
+        completion = int(getattr(config, 'estimated_completion_tokens', 60) or 0)
+        raw = sum(approx_tokens(m) + MESSAGE_OVERHEAD for m in messages) + completion
+        return max(1, int(raw * self._ratio))
+
+    def observe(self, estimated: int, actual: int) -> None:
+        """以实际用量校准（失败请求 actual=0 不参与校准）"""
+        if estimated <= 0 or actual <= 0:
+            return
+        with self._lock:
+            # estimated 已乘过当前系数，还原为原始估算后计算真实比例
+            raw = estimated / self._ratio
+            ratio = actual / raw
+            self._ratio += CALIBRATION_ALPHA * (ratio - self._ratio)
+            self._ratio = min(CALIBRATION_MAX, max(CALIBRATION_MIN, self._ratio))
+            self._samples += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {'ratio': round(self._ratio, 3), 'samples': self._samples}
+
+
+# 全局预估器实例
+_estimator: Optional[TokenEstimator] = None
+_estimator_lock = threading.Lock()
+
+
+def get_token_estimator() -> TokenEstimator:
+    """获取全局Token预估器"""
+    global _estimator
+
+    if _estimator is None:
+        with _estimator_lock:
+            if _estimator is None:
+                _estimator = TokenEstimator()
+
+    return _estimator
@@ -89,9 +89,7 @@ class TPMAccumulator:
             tpm_window.add_tokens(tokens)
         
         if requests > 0:
-            rpm_window = get_rpm_window()
-            for _ in range(requests):
-                rpm_window.add_request()
+            get_rpm_window().add_request(requests)
     
     def get_pending(self) -> tuple:
         """获取当前待发送的累积值（用于调试）"""
@@ -7,21 +7,41 @@ a) 任务拆解: Query -> Block Keys -> task:{uid}:{qid}:pending_blocks
 b) 线程启动: 根据permission启动对应数量的Worker
 c) 抢占执行: Worker循环领取Block，处理文献
 d) 终止响应: 检测terminate_signal，有信号时退出
+
+AI调用失败（重试用尽）的文献不扣费、不写结果，Block结束时作为重试Block重新入队，
+最多重新入队 ai_max_requeue 次，仍失败时按失败结果免费写入
+
+领取Block时登记租约（见 block_lease.py），Worker异常退出后租约过期，Block由回收线程重新入队；
+进程退出时 stop() 的Worker提交缓冲区后立即交还处理到一半的Block
 """
 
 import time
 import threading
 import json
 from typing import Dict, Optional, List, Any, Callable
+from ..config import config_loader as config
 from ..redis.task_queue import TaskQueue
 from ..redis.paper_blocks import PaperBlocks
-from ..redis.result_cache import ResultCache
-from ..redis.user_cache import UserCache
-from ..redis.billing import BillingQueue
+from ..redis.paper_record import PaperRecord
+from ..redis.paper_commit import (
+    PaperCommit, COMMIT_OK, COMMIT_DUPLICATE, COMMIT_TERMINATED,
+    COMMIT_INSUFFICIENT, COMMIT_NO_BALANCE, COMMIT_BUFFERED
+)
 from ..redis.system_cache import SystemCache
+from ..redis.system_config import SystemConfig
 from ..redis.connection import redis_ping
 from .tpm_accumulator import report_tokens
 from .sliding_window import get_current_tpm, get_current_rpm
+from .block_prefetch import (
+    PREFETCH_PENDING, acquire_prefetcher, release_prefetcher
+)
+from .block_lease import lease_block, complete_block, abandon_block, hand_back_block
+
+# AI调用失败，文献已推迟到重试Block（未扣费、未写结果）
+COMMIT_DEFERRED = 'DEFERRED'
+
+# 处理文献期间从Redis刷新终止信号的最小间隔（秒），其余时间读取本地标志
+TERMINATE_CHECK_INTERVAL = 1.0
 
 # 工作线程跟踪
 ACTIVE_WORKERS: Dict[threading.Thread, Dict] = {}
@@ -64,9 +84,28 @@ class BlockWorker:
         self.worker_id = _get_worker_id()
         self.ai_processor = ai_processor or self._default_processor
         self._running = False
+        # stop() 请求的退出（进程关闭），区别于异常退出
+        self._stopped = False
         self._thread: Optional[threading.Thread] = None
         self._processed_count = 0
         self._current_block: Optional[str] = None
+        self._handle: Any = None
+        # 终止信号的本地标志（AI调用前检查，按 TERMINATE_CHECK_INTERVAL 刷新）
+        self._terminated = False
+        self._terminate_checked = 0.0
+        # 缓存命中价格系数在初始化时缓存（与蒸馏费率相同，1次 vs N次）
+        self._cache_hit_rate = SystemConfig.get_cache_hit_rate()
+        # 批量提交：缓冲 commit_batch_size 篇或 commit_batch_ms 毫秒后一次提交（1 为逐篇提交）
+        self._batch_size = max(1, int(getattr(config, 'commit_batch_size', 1) or 1))
+        self._batch_interval = float(getattr(config, 'commit_batch_ms', 500) or 0) / 1000.0
+        self._commit_buffer: List[tuple] = []
+        self._buffer_since = 0.0
+        # Block预取（同一查询的Worker共享，注册时获取）
+        self._prefetcher = None
+        self._prefetched: Optional[tuple] = None
+        # 当前工作单元中AI调用失败、待重新入队的DOI
+        self._deferred: List[str] = []
+        self._max_requeue = max(0, int(getattr(config, 'ai_max_requeue', 2) or 0))
     
     def start(self) -> None:
         """启动Worker线程"""
@@ -81,88 +120,194 @@ class BlockWorker:
         )
         
         # 注册到活跃Worker列表
-        with _workers_lock:
-            ACTIVE_WORKERS[self._thread] = {
-                'uid': self.uid,
-                'qid': self.qid,
-                'worker_id': self.worker_id,
-                'start_time': time.time(),
-            }
+        self._register(self._thread)
         
         self._thread.start()
         print(f"[Worker-{self.worker_id}] 启动 uid={self.uid} qid={self.qid}")
     
     def stop(self) -> None:
-        """停止Worker"""
+        """停止Worker（处理完当前文献后退出，未处理完的Block在退出时交还）"""
+        self._stopped = True
         self._running = False
     
+    def join(self, timeout: Optional[float] = None) -> None:
+        """等待Worker线程退出"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+    
+    def is_alive(self) -> bool:
+        """Worker是否仍在运行"""
+        return self._running and self._thread is not None and self._thread.is_alive()
+    
+    def _register(self, handle: Any) -> None:
+        """
+        注册到活跃Worker列表
+        
+        Args:
+            handle: 线程模式为 threading.Thread；异步引擎为对应的协程句柄
+        """
+        self._handle = handle
+        self._prefetcher = acquire_prefetcher(self.uid, self.qid, self._read_block)
+        with _workers_lock:
+            ACTIVE_WORKERS[handle] = {
+                'uid': self.uid,
+                'qid': self.qid,
+                'worker_id': self.worker_id,
+                'start_time': time.time(),
+            }
+    
     def _run_loop(self) -> None:
         """Worker主循环 (规则R4.c)"""
         try:
             while self._running:
-                # 1. 检查终止信号 (R4.c.i)
-                if TaskQueue.is_terminated(self.uid, self.qid):
-                    # 终止信号：任务被强制取消，不推回Block
-                    self._current_block = None
-                    print(f"[Worker-{self.worker_id}] 收到终止信号，退出")
-                    break
-                
-                # 2. 领取任务 (R4.c.ii)
-                block_key = TaskQueue.pop_block(self.uid, self.qid)
-                
+                # 1-2. 检查终止信号并领取任务 (R4.c.i-ii)
+                block_key = self._next_block()
                 if not block_key:
-                    # 队列为空，检查是否完成
-                    if TaskQueue.is_completed(self.uid, self.qid):
-                        TaskQueue.set_state(self.uid, self.qid, 'DONE')
-                        print(f"[Worker-{self.worker_id}] 任务完成，退出")
                     break
                 
-                self._current_block = block_key
-                
                 # 3. 处理Block (R5规则)
                 self._process_block(block_key)
                 
-                # 4. 更新Block完成计数 (R6规则)
-                finished = TaskQueue.incr_finished_blocks(self.uid, self.qid)
-                status = TaskQueue.get_status(self.uid, self.qid)
-                total = status.get('total_blocks', 0) if status else 0
-                
-                # 完成判定前再次检查终止信号（防止终止后被错误标记为完成）
-                if total > 0 and finished >= total:
-                    # 检查是否被终止
-                    if TaskQueue.is_terminated(self.uid, self.qid):
-                        print(f"[Worker-{self.worker_id}] 检测到终止信号，不触发归档")
-                        self._current_block = None
-                        break
-                    
-                    # 没被终止时才设为完成
-                    TaskQueue.set_state(self.uid, self.qid, 'DONE')
-                    print(f"[Worker-{self.worker_id}] 所有Block处理完成")
-                    # 触发归档
-                    self._trigger_archive()
+                # 已停止时Block可能未处理完，不计完成数，退出时交还
+                if not self._running:
+                    break
                 
-                self._current_block = None
+                # 4. 更新Block完成计数 (R6规则)
+                if not self._finish_block():
+                    break
                 
         except Exception as e:
             print(f"[Worker-{self.worker_id}] 异常: {e}")
         finally:
             self._cleanup()
     
-    def _process_block(self, block_key: str) -> None:
+    def _next_block(self, wait: float = 0.5) -> Optional[str]:
         """
-        处理单个Block (规则R5)
+        检查终止信号并领取下一个Block (规则R4.c.i-ii)
         
-        a) 获取Block中所有文献的DOI和Bib
-        b) 逐篇解析并处理
-        c) 原子扣费并写入结果
+        启用预取时从预取队列取已解码的Block，否则直接从任务队列领取
+        
+        Args:
+            wait: 预取队列为空时每次等待的秒数；<=0 时不等待（异步引擎使用）
+        
+        Returns:
+            Block Key；收到终止信号或队列为空时返回None（Worker应退出）；
+            wait<=0 且预取尚未就绪时返回 PREFETCH_PENDING
+        """
+        if TaskQueue.is_terminated(self.uid, self.qid):
+            # 终止信号：任务被强制取消，不推回Block
+            self._current_block = None
+            print(f"[Worker-{self.worker_id}] 收到终止信号，退出")
+            return None
+        
+        if self._prefetcher is not None:
+            item = self._prefetcher.take(wait)
+            while item is PREFETCH_PENDING and wait > 0 and self._running:
+                item = self._prefetcher.take(wait)
+            if item is PREFETCH_PENDING:
+                return PREFETCH_PENDING if self._running else None
+            self._prefetched = item
+            block_key = item[0] if item else None
+            if not block_key:
+                # 预取结束后追加的工作单元（重试Block）
+                block_key = lease_block(self.uid, self.qid)
+        else:
+            block_key = lease_block(self.uid, self.qid)
+        
+        if not block_key:
+            # 队列为空，检查是否完成
+            if TaskQueue.is_completed(self.uid, self.qid):
+                TaskQueue.set_state(self.uid, self.qid, 'DONE')
+                print(f"[Worker-{self.worker_id}] 任务完成，退出")
+            return None
+        
+        self._current_block = block_key
+        return block_key
+    
+    def _finish_block(self) -> bool:
+        """
+        更新Block完成计数，全部完成时触发归档 (规则R6)
+        
+        Returns:
+            是否继续领取下一个Block（检测到终止信号时返回False）
+        """
+        # 先追加重试Block（总数+1）再计完成，避免被提前判定为完成
+        self._requeue_deferred()
+        
+        finished = complete_block(self.uid, self.qid, self._current_block)
+        if finished is None:
+            # 租约已过期并被回收，该Block由重新入队的工作单元计完成
+            print(f"[Worker-{self.worker_id}] Block租约已被回收，不计完成数")
+            self._current_block = None
+            return True
+        status = TaskQueue.get_status(self.uid, self.qid)
+        total = status.get('total_blocks', 0) if status else 0
+        
+        # 完成判定前再次检查终止信号（防止终止后被错误标记为完成）
+        if total > 0 and finished >= total:
+            # 检查是否被终止
+            if TaskQueue.is_terminated(self.uid, self.qid):
+                print(f"[Worker-{self.worker_id}] 检测到终止信号，不触发归档")
+                self._current_block = None
+                return False
+            
+            # 没被终止时才设为完成
+            TaskQueue.set_state(self.uid, self.qid, 'DONE')
+            print(f"[Worker-{self.worker_id}] 所有Block处理完成")
+            # 触发归档
+            self._trigger_archive()
+        
+        self._current_block = None
+        return True
+    
+    def _requeue_deferred(self) -> None:
+        """当前工作单元中失败的文献作为重试Block重新入队"""
+        deferred, self._deferred = self._deferred, []
+        if not deferred or not self._current_block:
+            return
+        if TaskQueue.is_terminated(self.uid, self.qid):
+            return
+        
+        attempt = PaperBlocks.retry_attempt(self._current_block) + 1
+        retry_key = PaperBlocks.make_retry_key(self._current_block, deferred, attempt)
+        if TaskQueue.append_block(self.uid, self.qid, retry_key):
+            print(f"[Worker-{self.worker_id}] {len(deferred)} 篇文献AI调用失败，"
+                  f"第 {attempt} 次重新入队")
+        else:
+            print(f"[Worker-{self.worker_id}] 重试Block入队失败，{len(deferred)} 篇文献未处理")
+    
+    def _load_block(self, block_key: str) -> tuple:
+        """
+        读取Block中的文献和期刊价格
+        
+        Returns:
+            ({doi: PaperRecord}, price)，Block为空时 papers 为空字典
         """
         print(f"[Worker-{self.worker_id}] 处理Block: {block_key}")
         
-        # 获取Block数据
-        papers = PaperBlocks.get_block_by_key(block_key)
+        # 预取器已读取并解码的Block直接使用
+        prefetched, self._prefetched = self._prefetched, None
+        if prefetched and prefetched[0] == block_key:
+            papers, price = prefetched[1], prefetched[2]
+        else:
+            papers, price = self._read_block(block_key)
+        
         if not papers:
             print(f"[Worker-{self.worker_id}] Block为空或不存在: {block_key}")
-            return
+        return papers, price
+    
+    @staticmethod
+    def _read_block(block_key: str) -> tuple:
+        """
+        读取Block的预解析记录和期刊价格（预取线程同样使用）
+        
+        Returns:
+            ({doi: PaperRecord}, price)
+        """
+        # 获取Block数据（预解析记录，无需再解析Bib）
+        papers = PaperBlocks.get_block_records(block_key)
+        if not papers:
+            return {}, 1
         
         # 获取期刊价格
         parsed = PaperBlocks.parse_block_key(block_key)
@@ -172,88 +317,197 @@ class BlockWorker:
         else:
             price = 1
         
+        return papers, price
+    
+    def _process_block(self, block_key: str) -> None:
+        """
+        处理单个Block (规则R5)
+        
+        a) 获取Block中所有文献的DOI和预解析记录
+        b) 逐篇处理
+        c) 原子扣费并写入结果
+        
+        每篇文献调用AI前检查终止信号，已终止的查询不再发起AI调用；
+        提交脚本同样检查终止信号，收到 TERMINATED 后停止处理本Block
+        """
+        papers, price = self._load_block(block_key)
+        
         # 逐篇处理
-        for doi, bib_str in papers.items():
-            if not self._running:
-                break
-            
-            # 再次检查终止信号
-            if TaskQueue.is_terminated(self.uid, self.qid):
+        for doi, record in papers.items():
+            if self._should_stop():
                 break
             
             try:
-                self._process_paper(doi, bib_str, block_key, price)
+                status = self._process_paper(doi, record, block_key, price)
             except Exception as e:
                 print(f"[Worker-{self.worker_id}] 处理文献失败 {doi}: {e}")
+                continue
+            
+            if status == COMMIT_TERMINATED:
+                self._terminated = True
+                break
+        
+        # Block结束前提交缓冲区（完成计数与归档依赖全部结果已写入）
+        self._flush_commits()
+    
+    def _should_stop(self) -> bool:
+        """
+        AI调用前检查是否停止处理：Worker已停止或查询已终止
+        
+        终止信号至多每 TERMINATE_CHECK_INTERVAL 秒查询一次Redis，
+        取消的查询最多再发起该间隔内的AI调用
+        """
+        if not self._running:
+            return True
+        if self._terminate_check_due():
+            self._refresh_terminated()
+        return self._terminated
+    
+    def _terminate_check_due(self) -> bool:
+        """是否需要从Redis刷新终止信号"""
+        return (not self._terminated and
+                time.time() - self._terminate_checked >= TERMINATE_CHECK_INTERVAL)
     
-    def _process_paper(self, doi: str, bib_str: str, 
-                       block_key: str, price: int) -> None:
+    def _refresh_terminated(self) -> bool:
+        """从Redis刷新终止信号的本地标志"""
+        self._terminate_checked = time.time()
+        if TaskQueue.is_terminated(self.uid, self.qid):
+            self._terminated = True
+        return self._terminated
+    
+    def _process_paper(self, doi: str, record: PaperRecord, 
+                       block_key: str, price: int) -> str:
         """
         处理单篇文献 (规则R5.b-d)
+        
+        Returns:
+            COMMIT_* 状态
+        """
+        record, price = self._unpack_paper(record, price)
+        
+        # 调用AI处理（标题和摘要已在加载时解析）
+        ai_result = self.ai_processor(doi, record.title, record.abstract)
+        return self._finish_paper(doi, ai_result, block_key, price)
+    
+    def _unpack_paper(self, record: PaperRecord, price: float) -> tuple:
+        """
+        确定单篇文献的记录和价格
+        
+        普通查询直接返回原值；蒸馏任务覆盖此方法（使用蒸馏费率）
+        
+        Returns:
+            (record, price)
+        """
+        return record, price
+    
+    def _finish_paper(self, doi: str, ai_result: Dict,
+                      block_key: str, price: float) -> str:
         """
-        # 解析Bib获取标题和摘要
-        title, abstract = self._parse_bib(bib_str)
+        AI调用结束后：上报Token、计算缓存价格、扣费并写入结果
         
-        # 调用AI处理
-        ai_result = self.ai_processor(doi, title, abstract)
+        Returns:
+            COMMIT_* 状态
+        """
         tokens_used = ai_result.pop('_tokens', 0)
         
         # 上报Token消耗
         if tokens_used > 0:
             report_tokens(tokens_used)
         
+        # AI调用失败：推迟到重试Block；不可重试或重新入队次数用尽时免费写入失败结果
+        if ai_result.pop('_failed', False):
+            retryable = ai_result.pop('_retryable', False)
+            if retryable and PaperBlocks.retry_attempt(block_key) < self._max_requeue:
+                self._deferred.append(doi)
+                return COMMIT_DEFERRED
+            price = 0
+        
+        # 命中相关性缓存时按缓存价格系数计费
+        if ai_result.pop('_cached', False):
+            price = price * self._cache_hit_rate
+        
+        # 结果中记录所属Block（切片Key还原为原Block，下载与蒸馏按Block读取Bib）
+        block_key = PaperBlocks.base_block_key(block_key)
+        
         # 原子扣费并写入结果 (R5.c)
-        balance = UserCache.get_balance(self.uid)
-        if balance is not None and balance >= price:
-            # 扣费
-            new_balance = UserCache.deduct_balance(self.uid, price)
-            
-            if new_balance is not None:
-                # 写入结果
-                ResultCache.set_result(
-                    self.uid, self.qid, doi,
-                    ai_result, block_key
-                )
-                
-                # 写入计费流水
-                BillingQueue.push_billing_record(
-                    self.uid, self.qid, doi, price
-                )
-                
-                # 更新进度
-                TaskQueue.incr_finished_count(self.uid, self.qid)
-                
-                self._processed_count += 1
-        else:
+        return self._commit_paper(doi, ai_result, block_key, price)
+    
+    def _commit_paper(self, doi: str, ai_result: Dict,
+                      block_key: str, price: float) -> str:
+        """
+        扣费并写入单篇文献结果 (规则R5.c)
+        
+        通过 PaperCommit 一次往返原子完成：终止检查、扣费、写结果、计费流水、进度+1
+        price <= 0 时（如缓存命中免费）不扣费、不写计费流水
+        
+        批量模式下先进入缓冲区，达到数量或时间阈值时整批提交；
+        加入缓冲区前检查终止信号，查询已终止时丢弃缓冲区并返回 COMMIT_TERMINATED
+        
+        Returns:
+            COMMIT_* 状态（批量模式未触发提交时为 COMMIT_BUFFERED）
+        """
+        if self._batch_size > 1:
+            if self._terminate_check_due():
+                self._refresh_terminated()
+            if self._terminated:
+                self._drop_commits()
+                return COMMIT_TERMINATED
+            if not self._commit_buffer:
+                self._buffer_since = time.time()
+            self._commit_buffer.append((doi, ai_result, block_key, price))
+            if (len(self._commit_buffer) >= self._batch_size or
+                    time.time() - self._buffer_since >= self._batch_interval):
+                return self._flush_commits()
+            return COMMIT_BUFFERED
+        
+        status = PaperCommit.commit(
+            self.uid, self.qid, doi, ai_result, block_key, price
+        )
+        
+        if status == COMMIT_OK:
+            self._processed_count += 1
+        elif status in (COMMIT_INSUFFICIENT, COMMIT_NO_BALANCE):
             print(f"[Worker-{self.worker_id}] 余额不足，跳过 {doi}")
+        elif status == COMMIT_DUPLICATE:
+            print(f"[Worker-{self.worker_id}] 结果已存在，跳过 {doi}")
+        
+        return status
     
-    def _parse_bib(self, bib_str: str) -> tuple:
-        """从Bib字符串解析标题和摘要"""
-        import re
+    def _flush_commits(self) -> str:
+        """
+        批量提交缓冲区中的文献结果（一次脚本往返）
         
-        title = ""
-        abstract = ""
+        已检测到终止信号时丢弃缓冲区，不再提交
         
-        try:
-            # 提取title
-            title_match = re.search(
-                r'title\s*=\s*[{"]([^}"]+)[}"]', 
-                bib_str, re.IGNORECASE
-            )
-            if title_match:
-                title = title_match.group(1).strip()
-            
-            # 提取abstract
-            abstract_match = re.search(
-                r'abstract\s*=\s*[{"]([^}"]+)[}"]', 
-                bib_str, re.IGNORECASE
-            )
-            if abstract_match:
-                abstract = abstract_match.group(1).strip()
-        except Exception:
-            pass
-        
-        return title, abstract
+        Returns:
+            COMMIT_OK / COMMIT_TERMINATED / COMMIT_ERROR
+        """
+        if self._terminated:
+            self._drop_commits()
+            return COMMIT_TERMINATED
+        if not self._commit_buffer:
+            return COMMIT_OK
+        
+        items, self._commit_buffer = self._commit_buffer, []
+        status, committed, duplicated, short = PaperCommit.commit_batch(
+            self.uid, self.qid, items
+        )
+        
+        if status == COMMIT_TERMINATED:
+            self._terminated = True
+        self._processed_count += committed
+        if short:
+            print(f"[Worker-{self.worker_id}] 余额不足，跳过 {short} 篇")
+        if duplicated:
+            print(f"[Worker-{self.worker_id}] 结果已存在，跳过 {duplicated} 篇")
+        
+        return status
+    
+    def _drop_commits(self) -> None:
+        """查询已终止：丢弃缓冲区中未提交的结果（不扣费、不写结果）"""
+        if self._commit_buffer:
+            print(f"[Worker-{self.worker_id}] 查询已终止，丢弃 {len(self._commit_buffer)} 篇未提交结果")
+            self._commit_buffer = []
     
     def _default_processor(self, doi: str, title: str, 
                            abstract: str) -> Dict:
@@ -277,10 +531,30 @@ class BlockWorker:
         """清理Worker"""
         self._running = False
         
+        # 缓冲区中的结果先提交（已终止时丢弃），交还Block时据此跳过已有结果的文献
+        if self._commit_buffer:
+            try:
+                self._flush_commits()
+            except Exception as e:
+                print(f"[Worker-{self.worker_id}] 提交缓冲区失败: {e}")
+        
+        # 未完成的Block：stop() 时立即交还；异常退出时停止续约，租约到期后重新入队
+        if self._current_block:
+            if self._stopped:
+                hand_back_block(self.uid, self.qid, self._current_block)
+            else:
+                abandon_block(self.uid, self.qid, self._current_block)
+            self._current_block = None
+            self._deferred = []
+        
         # 从活跃列表移除
         with _workers_lock:
-            if self._thread in ACTIVE_WORKERS:
-                del ACTIVE_WORKERS[self._thread]
+            if self._handle in ACTIVE_WORKERS:
+                del ACTIVE_WORKERS[self._handle]
+        
+        # 最后一个Worker退出时关闭预取器
+        release_prefetcher(self._prefetcher)
+        self._prefetcher = None
         
         print(f"[Worker-{self.worker_id}] 退出，处理了 {self._processed_count} 篇文献")
 
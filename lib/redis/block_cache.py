@@ -0,0 +1,210 @@
+"""
+已解码文献Block的进程内缓存 (新架构)
+热门期刊的Block被不同用户的Worker和下载生成反复读取、反复解码；
+同一进程内缓存解码结果，相同Block只解码一次
+
+- 以 block_key 为键，条目带Block版本号（idx:block_version，set_block 等写入时递增），
+  读取时版本号不一致即视为未命中，其他进程刷新Block后不会读到旧数据
+- 按估算的字节数计入内存预算（config.block_cache_mb），超出时按LRU淘汰
+- 同一Block并发未命中时只有一个线程解码，其余线程等待其结果
+- 只含字段的条目（Worker热路径，bib为空）不能满足需要Bib的读取，后者重新加载并替换
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from .paper_record import PaperRecord
+
+# 每篇记录的对象开销估算（PaperRecord元组、5个str对象、dict槽位）
+RECORD_OVERHEAD = 400
+
+# 等待其他线程解码同一Block的最长时间（秒）
+LOAD_WAIT_SECONDS = 10
+
+
+class CachedBlock(NamedTuple):
+    """已解码的Block"""
+    version: int
+    with_bib: bool
+    dois: List[str]                  # 存储顺序（与 idx:block_dois 一致，切片按下标取）
+    records: Dict[str, PaperRecord]
+    size: int
+
+
+def estimate_size(records: Dict[str, PaperRecord]) -> int:
+    """解码结果的内存占用估算（字节）"""
+    return sum(
+        len(doi) + len(r.title) + len(r.abstract) + len(r.url) + len(r.bib) + RECORD_OVERHEAD
+        for doi, r in records.items()
+    )
+
+
+class BlockCache:
+    """已解码Block的LRU缓存（按字节预算淘汰）"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max(0, int(max_bytes))
+        self._entries: "OrderedDict[str, CachedBlock]" = OrderedDict()
+        self._bytes = 0
+        self._loading: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._shared = 0
+        self._evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, block_key: str, version: int, with_bib: bool) -> Optional[CachedBlock]:
+        entry = self._entries.get(block_key)
+        if entry is None or entry.version != version or (with_bib and not entry.with_bib):
+            return None
+        self._entries.move_to_end(block_key)
+        return entry
+
+    def _store(self, block_key: str, entry: CachedBlock) -> None:
+        old = self._entries.pop(block_key, None)
+        if old is not None:
+            self._bytes -= old.size
+            # 并发加载时保留版本更新（或含Bib）的条目
+            if old.version > entry.version or (old.version == entry.version and old.with_bib):
+                entry = old
+        if entry.size > self.max_bytes:
+            return
+        self._entries[block_key] = entry
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self._evictions += 1
+
+    def get(self, block_key: str, version: int, with_bib: bool) -> Optional[CachedBlock]:
+        """只查缓存，不加载（计入命中统计）"""
+        with self._lock:
+            entry = self._lookup(block_key, version, with_bib)
+            if entry is not None:
+                self._hits += 1
+            return entry
+
+    def get_or_load(self, block_key: str, version: int, with_bib: bool,
+                    loader: Callable[[], Optional[CachedBlock]]) -> Optional[CachedBlock]:
+        """
+        读取缓存，未命中时加载
+
+        Args:
+            block_key: 原Block Key（不含切片区间）
+            version: 当前版本号（读取前从 idx:block_version 取得）
+            with_bib: 是否需要Bib原文
+            loader: 从Redis读取并解码整个Block；返回的条目带读取时的版本号
+
+        Returns:
+            CachedBlock；加载失败时返回None
+        """
+        deadline = time.time() + LOAD_WAIT_SECONDS
+        while True:
+            with self._lock:
+                entry = self._lookup(block_key, version, with_bib)
+                if entry is not None:
+                    self._hits += 1
+                    return entry
+                event = self._loading.get(block_key)
+                if event is None:
+                    event = threading.Event()
+                    self._loading[block_key] = event
+                    self._misses += 1
+                    break
+            # 其他线程正在解码该Block：等待后重新查找
+            if not event.wait(max(0.0, deadline - time.time())):
+                with self._lock:
+                    self._misses += 1
+                return loader()
+            with self._lock:
+                entry = self._lookup(block_key, version, with_bib)
+                if entry is not None:
+                    self._shared += 1
+                    return entry
+
+        try:
+            entry = loader()
+            if entry is not None:
+                with self._lock:
+                    self._store(block_key, entry)
+            return entry
+        finally:
+            with self._lock:
+                self._loading.pop(block_key, None)
+            event.set()
+
+    def put(self, block_key: str, entry: CachedBlock) -> None:
+        """写入已解码的Block（批量读取时使用）"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._store(block_key, entry)
+
+    def record_miss(self, count: int = 1) -> None:
+        with self._lock:
+            self._misses += count
+
+    def invalidate(self, block_key: str) -> None:
+        """移除本进程中的条目（其他进程依靠版本号失效）"""
+        with self._lock:
+            entry = self._entries.pop(block_key, None)
+            if entry is not None:
+                self._bytes -= entry.size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict:
+        """
+        命中统计
+
+        Returns:
+            {entries, bytes, max_bytes, hits, shared, misses, evictions, hit_rate}
+            shared 为等待其他线程解码后命中的次数，计入 hit_rate
+        """
+        with self._lock:
+            hits = self._hits + self._shared
+            lookups = hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'shared': self._shared,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# 全局缓存实例
+_cache: Optional[BlockCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_block_cache() -> BlockCache:
+    """获取全局Block缓存（预算取自 config.block_cache_mb）"""
+    global _cache
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    from ..config import config_loader as config
+                    budget_mb = int(getattr(config, 'block_cache_mb', 256) or 0)
+                except Exception:
+                    budget_mb = 0
+                _cache = BlockCache(budget_mb * 1024 * 1024)
+
+    return _cache
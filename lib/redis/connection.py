@@ -20,6 +20,9 @@ _thread_local = threading.local()
 _global_client: Optional[object] = None
 _global_lock = threading.Lock()
 
+# 二进制客户端（decode_responses=False，读取v2文献Block等二进制Value）
+_binary_client: Optional[object] = None
+
 
 def _get_redis_url() -> str:
     """获取Redis URL"""
@@ -76,6 +79,42 @@ def get_redis_client() -> Optional[object]:
     return _global_client
 
 
+def get_binary_client() -> Optional[object]:
+    """
+    获取二进制Redis客户端（不解码响应，返回bytes）
+    
+    文献Block的v2记录为原始二进制，不能经由 decode_responses=True 的客户端读取
+    
+    Returns:
+        Redis客户端实例，或None（如果不可用）
+    """
+    global _binary_client
+    
+    if not REDIS_AVAILABLE:
+        return None
+    
+    url = _get_redis_url()
+    if not url:
+        return None
+    
+    if _binary_client is None:
+        with _global_lock:
+            if _binary_client is None:
+                try:
+                    _binary_client = redis.Redis.from_url(
+                        url,
+                        decode_responses=False,
+                        socket_timeout=5,
+                        socket_connect_timeout=5,
+                        retry_on_timeout=True,
+                    )
+                except Exception as e:
+                    print(f"[Redis] 二进制客户端连接失败: {e}")
+                    return None
+    
+    return _binary_client
+
+
 def redis_ping() -> bool:
     """检查Redis连接是否可用"""
     client = get_redis_client()
@@ -89,14 +128,48 @@ def redis_ping() -> bool:
 
 def close_redis() -> None:
     """关闭Redis连接"""
-    global _global_client
+    global _global_client, _binary_client
     with _global_lock:
-        if _global_client is not None:
-            try:
-                _global_client.close()
-            except Exception:
-                pass
-            _global_client = None
+        for client in (_global_client, _binary_client):
+            if client is not None:
+                try:
+                    client.close()
+                except Exception:
+                    pass
+        _global_client = None
+        _binary_client = None
+
+
+# Lua脚本缓存: (脚本内容, 是否二进制) -> redis Script 对象（按SHA执行，NOSCRIPT时自动重新加载）
+_scripts: dict = {}
+_scripts_lock = threading.Lock()
+
+
+def get_script(script: str, binary: bool = False) -> Optional[object]:
+    """
+    获取已注册的Lua脚本对象（同一脚本只注册一次）
+    
+    Args:
+        binary: 注册到二进制客户端（脚本返回二进制数据时使用）
+    
+    Returns:
+        redis Script 对象（调用时执行 EVALSHA），或None（Redis不可用）
+    """
+    client = get_binary_client() if binary else get_redis_client()
+    if not client:
+        return None
+    
+    cache_key = (script, binary)
+    lua = _scripts.get(cache_key)
+    if lua is not None and lua.registered_client is client:
+        return lua
+    
+    with _scripts_lock:
+        lua = _scripts.get(cache_key)
+        if lua is None or lua.registered_client is not client:
+            lua = client.register_script(script)
+            _scripts[cache_key] = lua
+    return lua
 
 
 def execute_lua_script(script: str, keys: list, args: list) -> Optional[any]:
@@ -111,11 +184,10 @@ def execute_lua_script(script: str, keys: list, args: list) -> Optional[any]:
     Returns:
         脚本执行结果
     """
-    client = get_redis_client()
-    if not client:
+    lua = get_script(script)
+    if lua is None:
         return None
     try:
-        lua = client.register_script(script)
         return lua(keys=keys, args=args)
     except Exception as e:
         print(f"[Redis] Lua脚本执行失败: {e}")
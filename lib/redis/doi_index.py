@@ -0,0 +1,389 @@
+"""
+DOI反向索引模块 (新架构)
+DOI → block_key 的紧凑索引，替代单个大Hash idx:doi_to_block
+
+Key设计:
+- idx:doi:{bucket} (Hash, 二进制) - 分桶索引，共 DOI_BUCKETS 个桶
+  - Field: DOI指纹（blake2b摘要的后8字节；前2字节决定桶号）
+  - Value: Block ID（整数）
+- idx:block_ids   (Hash)   - Block字典 block_key → Block ID
+- idx:block_keys  (Hash)   - Block字典 Block ID → block_key
+- idx:block_id_seq (String) - Block ID计数器
+- idx:doi_bloom   (String) - 已索引DOI的布隆过滤器（BLOOM_BITS 位，BLOOM_HASHES 个哈希）
+- idx:doi_bloom:ready (String) - 布隆过滤器已覆盖全部已索引DOI（全量构建/迁移/修复后设置）
+
+内存:
+- 500万DOI时每桶约76条，低于 hash-max-listpack-entries（默认128），桶保持listpack编码；
+  每条只占 8字节指纹 + 整数ID，不再重复存储DOI和 "meta:{Journal}:{Year}" 字符串
+- DOI数量远超500万时应调大 hash-max-listpack-entries（或增加桶数并重建索引）
+
+指纹为64位：同一桶内两个DOI指纹相同的概率可以忽略；
+Block ID分配后不再改变，进程内永久缓存
+
+完整性:
+- 索引条目与布隆过滤器的位由 PaperBlocks 在写入Block的同一事务中写入（见 add），索引视为完整，
+  查询不到即不存在，不再遍历全部Block（损坏后由 scripts/repair_doi_index.py 离线修复）
+- 查询时布隆过滤器与分桶HMGET在同一次往返中读取：分桶未命中且布隆过滤器为否时直接判定不存在；
+  布隆过滤器为是（误判，或索引缺条目）时才回退到旧索引。
+  ready 标记设置前（旧索引中的DOI尚未迁移）未命中的DOI一律回退
+- 布隆过滤器只增不减（Block删除后留下的位只会增加误判），修复脚本可整体重建
+
+旧索引 idx:doi_to_block 在迁移完成前作为回退（scripts/migrate_doi_index.py 重建后删除）
+"""
+
+import hashlib
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .connection import get_redis_client, get_binary_client, get_script
+
+# 旧版单Hash索引（迁移期间回退读取）
+KEY_LEGACY_DOI_INDEX = "idx:doi_to_block"
+
+KEY_BLOCK_IDS = "idx:block_ids"
+KEY_BLOCK_KEYS = "idx:block_keys"
+KEY_BLOCK_ID_SEQ = "idx:block_id_seq"
+
+BUCKET_PREFIX = "idx:doi:"
+
+# 桶数（由指纹前2字节决定，修改需重建索引）
+DOI_BUCKETS = 65536
+
+# 每次pipeline查询/写入的桶数
+PIPELINE_BATCH = 1000
+
+KEY_DOI_BLOOM = "idx:doi_bloom"
+KEY_DOI_BLOOM_READY = "idx:doi_bloom:ready"
+
+# 布隆过滤器: 2^26 位（8MB），7个哈希；500万DOI时误判率约0.2%
+BLOOM_BITS = 1 << 26
+BLOOM_HASHES = 7
+
+# 每条BITFIELD命令包含的DOI数
+BLOOM_BATCH = 256
+
+# 分配Block ID（已存在时直接返回）
+ASSIGN_BLOCK_ID_SCRIPT = """
+local id = redis.call('HGET', KEYS[1], ARGV[1])
+if id then
+    return tonumber(id)
+end
+id = redis.call('INCR', KEYS[3])
+redis.call('HSET', KEYS[1], ARGV[1], id)
+redis.call('HSET', KEYS[2], id, ARGV[1])
+return id
+"""
+
+_block_ids: Dict[str, int] = {}
+_block_keys: Dict[int, str] = {}
+_lock = threading.Lock()
+
+
+def fingerprint(doi: str) -> Tuple[str, bytes]:
+    """DOI的 (桶Key, 桶内Field)"""
+    digest = hashlib.blake2b(doi.encode('utf-8'), digest_size=10).digest()
+    bucket = int.from_bytes(digest[:2], 'big') % DOI_BUCKETS
+    return f"{BUCKET_PREFIX}{bucket}", digest[2:]
+
+
+def bloom_offsets(doi: str) -> List[int]:
+    """DOI在布隆过滤器中的位偏移（双重哈希）"""
+    digest = hashlib.blake2b(doi.encode('utf-8'), digest_size=16, person=b'doibloom').digest()
+    h1 = int.from_bytes(digest[:8], 'big')
+    h2 = int.from_bytes(digest[8:], 'big') | 1
+    return [(h1 + i * h2) % BLOOM_BITS for i in range(BLOOM_HASHES)]
+
+
+def _bloom_ops(dois: List[str], op: str) -> List:
+    """BITFIELD 参数: op 为 'GET' 或 'SET'"""
+    args = []
+    for doi in dois:
+        for offset in bloom_offsets(doi):
+            args.extend((op, 'u1', offset) if op == 'GET' else (op, 'u1', offset, 1))
+    return args
+
+
+class DoiIndex:
+    """DOI反向索引管理器"""
+
+    # ------------------------------------------------------------
+    # Block字典
+    # ------------------------------------------------------------
+
+    @classmethod
+    def block_id(cls, block_key: str) -> Optional[int]:
+        """获取（必要时分配）Block ID"""
+        block_id = _block_ids.get(block_key)
+        if block_id is not None:
+            return block_id
+
+        script = get_script(ASSIGN_BLOCK_ID_SCRIPT)
+        if script is None or not block_key:
+            return None
+        try:
+            block_id = int(script(keys=[KEY_BLOCK_IDS, KEY_BLOCK_KEYS, KEY_BLOCK_ID_SEQ],
+                                  args=[block_key]))
+        except Exception as e:
+            print(f"[DoiIndex] 分配Block ID失败 {block_key}: {e}")
+            return None
+        with _lock:
+            _block_ids[block_key] = block_id
+            _block_keys[block_id] = block_key
+        return block_id
+
+    @classmethod
+    def resolve_block_ids(cls, block_ids: Iterable[int]) -> Dict[int, str]:
+        """批量将Block ID解析为block_key（未缓存的一次HMGET）"""
+        wanted = set(block_ids)
+        missing = [i for i in wanted if i not in _block_keys]
+        if missing:
+            client = get_redis_client()
+            if client:
+                try:
+                    values = client.hmget(KEY_BLOCK_KEYS, missing)
+                except Exception:
+                    values = []
+                with _lock:
+                    for block_id, block_key in zip(missing, values):
+                        if block_key:
+                            _block_keys[block_id] = block_key
+                            _block_ids[block_key] = block_id
+        return {i: _block_keys[i] for i in wanted if i in _block_keys}
+
+    # ------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------
+
+    @classmethod
+    def add(cls, pipe, doi_blocks: Dict[str, str]) -> int:
+        """
+        写入索引条目（加入调用方的pipeline，与Block写入一同执行）
+
+        Args:
+            pipe: Redis pipeline（文本或二进制客户端均可，Field为bytes）
+            doi_blocks: {doi: block_key}
+
+        Returns:
+            写入的条目数；Block ID分配失败的条目跳过
+        """
+        buckets: Dict[str, Dict[bytes, int]] = {}
+        ids: Dict[str, Optional[int]] = {}
+        for doi, block_key in doi_blocks.items():
+            if block_key not in ids:
+                ids[block_key] = cls.block_id(block_key)
+            block_id = ids[block_key]
+            if block_id is None or not doi:
+                continue
+            bucket, field = fingerprint(doi)
+            buckets.setdefault(bucket, {})[field] = block_id
+
+        for bucket, mapping in buckets.items():
+            pipe.hset(bucket, mapping=mapping)
+        indexed = [doi for doi, block_key in doi_blocks.items() if doi and ids.get(block_key)]
+        cls.add_bloom(pipe, indexed)
+        return sum(len(m) for m in buckets.values())
+
+    @classmethod
+    def add_bloom(cls, pipe, dois: List[str], key: str = KEY_DOI_BLOOM) -> None:
+        """将DOI加入布隆过滤器（加入调用方的pipeline）"""
+        for i in range(0, len(dois), BLOOM_BATCH):
+            pipe.execute_command('BITFIELD', key, *_bloom_ops(dois[i:i + BLOOM_BATCH], 'SET'))
+
+    @classmethod
+    def remove(cls, pipe, dois: List[str]) -> None:
+        """删除索引条目（加入调用方的pipeline；布隆过滤器的位保留）"""
+        buckets: Dict[str, List[bytes]] = {}
+        for doi in dois:
+            bucket, field = fingerprint(doi)
+            buckets.setdefault(bucket, []).append(field)
+        for bucket, fields in buckets.items():
+            pipe.hdel(bucket, *fields)
+
+    @classmethod
+    def set(cls, doi_blocks: Dict[str, str]) -> int:
+        """写入索引条目（独立执行）"""
+        binary = get_binary_client()
+        if not binary or not doi_blocks:
+            return 0
+        try:
+            pipe = binary.pipeline(transaction=False)
+            count = cls.add(pipe, doi_blocks)
+            pipe.execute()
+            return count
+        except Exception as e:
+            print(f"[DoiIndex] 写入索引失败: {e}")
+            return 0
+
+    # ------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------
+
+    @classmethod
+    def get(cls, doi: str) -> Optional[str]:
+        """查询单个DOI所在的block_key"""
+        if not doi:
+            return None
+        return cls.get_many([doi]).get(doi)
+
+    @classmethod
+    def get_many(cls, dois: List[str], legacy: bool = True) -> Dict[str, str]:
+        """
+        批量查询DOI所在的block_key
+
+        按桶分组后每桶一次HMGET，与布隆过滤器的BITFIELD GET在同一个pipeline中执行，
+        Block ID在进程内解析。分桶未命中的DOI：布隆过滤器为否即不存在；
+        为是时再查一次旧索引（迁移完成、旧Key删除后该HMGET返回空）
+
+        Args:
+            legacy: 是否回退到旧索引（修复脚本校验时关闭）
+
+        Returns:
+            {doi: block_key}，未索引的DOI不出现
+        """
+        binary = get_binary_client()
+        if not binary or not dois:
+            return {}
+
+        unique = list(dict.fromkeys(d for d in dois if d))
+        groups: Dict[str, List[Tuple[str, bytes]]] = {}
+        for doi in unique:
+            bucket, field = fingerprint(doi)
+            groups.setdefault(bucket, []).append((doi, field))
+
+        found: Dict[str, int] = {}
+        maybe: List[str] = []
+        buckets = list(groups.items())
+        for i in range(0, len(buckets), PIPELINE_BATCH):
+            batch = buckets[i:i + PIPELINE_BATCH]
+            batch_dois = [doi for _, entries in batch for doi, _ in entries]
+            pipe = binary.pipeline(transaction=False)
+            for bucket, entries in batch:
+                pipe.hmget(bucket, [field for _, field in entries])
+            if legacy:
+                pipe.exists(KEY_DOI_BLOOM_READY)
+                for j in range(0, len(batch_dois), BLOOM_BATCH):
+                    pipe.execute_command('BITFIELD', KEY_DOI_BLOOM,
+                                         *_bloom_ops(batch_dois[j:j + BLOOM_BATCH], 'GET'))
+            results = pipe.execute()
+
+            for (_, entries), values in zip(batch, results):
+                for (doi, _), value in zip(entries, values):
+                    if value is not None:
+                        found[doi] = int(value)
+            if legacy:
+                bloom_ready = results[len(batch)]
+                bits = [b for reply in results[len(batch) + 1:] for b in reply]
+                for j, doi in enumerate(batch_dois):
+                    if doi in found:
+                        continue
+                    # 布隆过滤器尚未覆盖全部DOI（迁移前）时无法判定，一律回退
+                    if not bloom_ready or all(bits[j * BLOOM_HASHES:(j + 1) * BLOOM_HASHES]):
+                        maybe.append(doi)
+
+        block_keys = cls.resolve_block_ids(found.values())
+        output = {doi: block_keys[i] for doi, i in found.items() if i in block_keys}
+
+        if maybe:
+            output.update(cls._get_legacy(maybe))
+        return output
+
+    @classmethod
+    def might_contain(cls, dois: List[str]) -> Dict[str, bool]:
+        """
+        布隆过滤器判定（False 表示一定未索引；过滤器未就绪时全部为True）
+        """
+        binary = get_binary_client()
+        if not binary or not dois:
+            return {}
+        try:
+            pipe = binary.pipeline(transaction=False)
+            pipe.exists(KEY_DOI_BLOOM_READY)
+            for i in range(0, len(dois), BLOOM_BATCH):
+                pipe.execute_command('BITFIELD', KEY_DOI_BLOOM,
+                                     *_bloom_ops(dois[i:i + BLOOM_BATCH], 'GET'))
+            results = pipe.execute()
+        except Exception:
+            return {doi: True for doi in dois}
+        if not results[0]:
+            return {doi: True for doi in dois}
+        bits = [b for reply in results[1:] for b in reply]
+        return {
+            doi: all(bits[i * BLOOM_HASHES:(i + 1) * BLOOM_HASHES])
+            for i, doi in enumerate(dois)
+        }
+
+    @classmethod
+    def _get_legacy(cls, dois: List[str]) -> Dict[str, str]:
+        """旧索引 idx:doi_to_block 回退查询"""
+        client = get_redis_client()
+        if not client:
+            return {}
+        try:
+            output = {}
+            for i in range(0, len(dois), PIPELINE_BATCH):
+                batch = dois[i:i + PIPELINE_BATCH]
+                for doi, block_key in zip(batch, client.hmget(KEY_LEGACY_DOI_INDEX, batch)):
+                    if block_key:
+                        output[doi] = block_key
+            return output
+        except Exception:
+            return {}
+
+    # ------------------------------------------------------------
+    # 统计与维护
+    # ------------------------------------------------------------
+
+    @classmethod
+    def bucket_keys(cls) -> List[str]:
+        return [f"{BUCKET_PREFIX}{i}" for i in range(DOI_BUCKETS)]
+
+    @classmethod
+    def size(cls) -> int:
+        """索引条目数（逐桶HLEN）"""
+        client = get_redis_client()
+        if not client:
+            return 0
+        try:
+            total = 0
+            keys = cls.bucket_keys()
+            for i in range(0, len(keys), PIPELINE_BATCH):
+                pipe = client.pipeline(transaction=False)
+                for key in keys[i:i + PIPELINE_BATCH]:
+                    pipe.hlen(key)
+                total += sum(pipe.execute())
+            return total
+        except Exception:
+            return 0
+
+    @classmethod
+    def mark_bloom_ready(cls, rebuilt_key: Optional[str] = None) -> bool:
+        """
+        标记布隆过滤器已覆盖全部已索引DOI
+
+        Args:
+            rebuilt_key: 重建的过滤器Key；给出时先以它替换当前过滤器（RENAME，原子生效）
+        """
+        client = get_redis_client()
+        if not client:
+            return False
+        try:
+            pipe = client.pipeline()
+            if rebuilt_key:
+                pipe.rename(rebuilt_key, KEY_DOI_BLOOM)
+            pipe.set(KEY_DOI_BLOOM_READY, 1)
+            pipe.execute()
+            return True
+        except Exception as e:
+            print(f"[DoiIndex] 设置布隆过滤器失败: {e}")
+            return False
+
+    @classmethod
+    def exists(cls) -> bool:
+        """索引是否已构建（已分配过Block ID，或旧索引存在）"""
+        client = get_redis_client()
+        if not client:
+            return False
+        try:
+            return client.exists(KEY_BLOCK_ID_SEQ, KEY_LEGACY_DOI_INDEX) > 0
+        except Exception:
+            return False
@@ -16,6 +16,7 @@ from collections import defaultdict
 from .connection import get_redis_client, redis_ping
 from .system_cache import SystemCache
 from .paper_blocks import PaperBlocks
+from .doi_index import DoiIndex
 
 
 def load_tags_from_mysql(conn) -> bool:
@@ -310,7 +311,7 @@ def check_redis_data_loaded() -> Dict[str, bool]:
             break
         
         # 检查DOI反向索引
-        results['doi_index_loaded'] = client.exists("idx:doi_to_block") > 0
+        results['doi_index_loaded'] = DoiIndex.exists()
             
     except Exception:
         pass
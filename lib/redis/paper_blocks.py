@@ -3,23 +3,128 @@
 以Block为单位存储文献数据，支持高效的批量查询
 
 Key设计:
-- meta:{JournalName}:{Year} (Hash) - 文献Block
+- meta:{JournalName}:{Year} (Hash 或 String) - 文献Block
+  Hash格式:
   - Field: DOI
-  - Value: 压缩后的Bib字符串
-- idx:doi_to_block (Hash) - DOI反向索引
-  - Field: DOI
-  - Value: block_key (如 "meta:NATURE:2024")
+  - Value: 预解析记录（title/abstract/url/year + Bib，见 paper_record.py）
+           已登记压缩字典时写入v2二进制记录，否则写入v1；旧数据为压缩后的Bib字符串，读取时兼容
+  String格式: 整个Block的列式快照（见 paper_snapshot.py），paper_block_format=snapshot 时写入；
+  读取时按Key类型区分，两种格式可以并存（scripts/convert_block_snapshots.py 转换）
+- idx:doi:{bucket} (Hash) - DOI反向索引（分桶，Value为Block ID，见 doi_index.py）
+  - set_block / set_paper 在写入Block的同一事务中写入，索引视为完整：查不到即不存在
+- idx:block_dois:{block_key} (List) - Block内DOI的固定顺序，用于按区间切分
+  - 如 idx:block_dois:meta:NATURE:2024
+- idx:block_version (Hash) - Block版本号
+  - Field: block_key，Value: 每次写入Block时递增；进程内的已解码Block缓存据此判断是否过期
+
+Block切片（工作单元）:
+- 大Block按DOI区间切分为多个切片Key，如 "meta:NATURE:2024#0-499"（闭区间）
+- 切片不单独存储：Hash格式 LRANGE 取区间内DOI，再对原Block做 HMGET；快照格式按下标取
+
+重试Block（工作单元）:
+- AI调用失败的文献以 "retry:{attempt}:{block_key}|{doi列表}" 重新入队（DOI之间以制表符分隔，见 worker.py）
+- 同样不单独存储：对原Block（或蒸馏Block）按DOI做 HMGET
+
+Block的Value一律经二进制客户端（get_binary_client）读取，v2记录不经过UTF-8解码；
+Hash的Field（DOI）读取后解码为字符串。读取整个Block或部分DOI时由 READ_BLOCK_SCRIPT
+按Key类型选择 GET 或 HGETALL/HMGET，两种格式都只需一次往返
+
+整Block读取（Worker切片、重试Block、下载）经过进程内的已解码Block缓存（见 block_cache.py）：
+先取版本号，命中时不再读取和解码；未命中时读取整个Block，解码结果供同一进程的其他读取共用
 """
 
 import json
 import zlib
-from typing import Optional, Dict, List, Tuple
+from typing import Callable, Optional, Dict, List, Tuple
 
-from .connection import get_redis_client
+from .connection import get_redis_client, get_binary_client, get_script
+from .paper_record import (
+    PaperRecord, unpack_record, unpack_payload, is_record, is_record_v2, record_dict_id,
+    record_payload, encode_payload, encode_payload_v2, build_record
+)
+from .paper_dict import PaperDictionary
+from .block_cache import CachedBlock, get_block_cache, estimate_size
+from .doi_index import DoiIndex
+from .paper_snapshot import (
+    SNAPSHOT_PEEK, encode_snapshot, decode_snapshot, decode_dois, decode_frame,
+    frame_size, read_header, read_count, is_snapshot, FRAME_SIZE
+)
 
 
-# DOI反向索引Key（用于O(1)查询DOI对应的block_key）
-KEY_DOI_INDEX = "idx:doi_to_block"
+# Block版本号Key（Field: block_key）
+KEY_BLOCK_VERSION = "idx:block_version"
+
+# Block切片Key分隔符: {block_key}#{start}-{end}
+SLICE_SEP = "#"
+
+# 重试Block前缀与DOI分隔符: retry:{attempt}:{block_key}|{doi}<TAB>{doi}...
+RETRY_PREFIX = "retry:"
+RETRY_DOI_SEP = "\t"
+
+# v2迁移：Value未被并发修改时才替换（ARGV 按 field, 旧值, 新值 三个一组）
+REPLACE_IF_UNCHANGED_SCRIPT = """
+local replaced = 0
+for i = 1, #ARGV, 3 do
+    if redis.call('HGET', KEYS[1], ARGV[i]) == ARGV[i + 1] then
+        redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 2])
+        replaced = replaced + 1
+    end
+end
+return replaced
+"""
+
+# v2迁移每次脚本调用替换的文献数
+MIGRATE_BATCH = 200
+
+BLOCK_FORMAT_HASH = 'hash'
+BLOCK_FORMAT_SNAPSHOT = 'snapshot'
+
+# 读取Block：快照整体GET；Hash按模式取全部、下标区间（切片）或指定DOI
+# KEYS: block, idx:block_dois:{block}, idx:block_version; ARGV: 'all' | 'span', start, end | 'dois', doi...
+# 返回 {'snapshot', blob, 版本号} 或 {'hash', {doi, value, ...}, 版本号[, DOI顺序]}
+# （Hash的 'all' 模式附带 idx:block_dois 中的DOI顺序，供缓存按下标取切片）
+READ_BLOCK_SCRIPT = """
+local version = redis.call('HGET', KEYS[3], KEYS[1]) or '0'
+if redis.call('TYPE', KEYS[1]).ok == 'string' then
+    return {'snapshot', redis.call('GET', KEYS[1]) or false, version}
+end
+if ARGV[1] == 'all' then
+    return {'hash', redis.call('HGETALL', KEYS[1]), version, redis.call('LRANGE', KEYS[2], 0, -1)}
+end
+local dois
+if ARGV[1] == 'span' then
+    dois = redis.call('LRANGE', KEYS[2], tonumber(ARGV[2]), tonumber(ARGV[3]))
+else
+    dois = {}
+    for i = 2, #ARGV do
+        dois[#dois + 1] = ARGV[i]
+    end
+end
+local out = {}
+for i = 1, #dois, 1000 do
+    local batch = {}
+    for j = i, math.min(i + 999, #dois) do
+        batch[#batch + 1] = dois[j]
+    end
+    local values = redis.call('HMGET', KEYS[1], unpack(batch))
+    for j, value in ipairs(values) do
+        if value then
+            out[#out + 1] = batch[j]
+            out[#out + 1] = value
+        end
+    end
+end
+return {'hash', out, version}
+"""
+
+# 单篇查询：快照返回前 ARGV[2] 字节（头部+帧表+索引段），Hash直接 HGET
+# （HGET 为nil时返回 false：Lua表中的nil会截断数组，回复只剩一个元素）
+LOOKUP_PAPER_SCRIPT = """
+if redis.call('TYPE', KEYS[1]).ok == 'string' then
+    return {'snapshot', redis.call('GETRANGE', KEYS[1], 0, tonumber(ARGV[2]) - 1)}
+end
+return {'hash', redis.call('HGET', KEYS[1], ARGV[1]) or false}
+"""
 
 
 class PaperBlocks:
@@ -30,16 +135,86 @@ class PaperBlocks:
         return f"meta:{journal}:{year}"
     
     @staticmethod
-    def parse_block_key(block_key: str) -> Optional[Tuple[str, int]]:
+    def _key_block_dois(block_key: str) -> str:
+        return f"idx:block_dois:{block_key}"
+    
+    @staticmethod
+    def split_slice(block_key: str) -> Tuple[str, Optional[Tuple[int, int]]]:
+        """
+        拆分切片Key
+        
+        Args:
+            block_key: 如 "meta:NATURE:2024#0-499" 或 "meta:NATURE:2024"
+            
+        Returns:
+            (所属Block Key, (start, end))；非切片Key时区间为None
+        """
+        if not block_key or SLICE_SEP not in block_key:
+            return block_key, None
+        
+        base, _, span = block_key.rpartition(SLICE_SEP)
+        try:
+            start, end = span.split("-", 1)
+            return base, (int(start), int(end))
+        except ValueError:
+            return block_key, None
+    
+    @staticmethod
+    def make_retry_key(block_key: str, dois: List[str], attempt: int) -> str:
+        """
+        构造重试Block Key
+
+        Args:
+            block_key: 失败文献所在的工作单元（Block、切片、蒸馏Block或重试Block）
+            dois: 需要重试的DOI
+            attempt: 第几次重试（从1开始）
+        """
+        base = PaperBlocks.base_block_key(block_key)
+        return f"{RETRY_PREFIX}{attempt}:{base}|" + RETRY_DOI_SEP.join(dois)
+
+    @staticmethod
+    def split_retry(block_key: str) -> Optional[Tuple[str, int, List[str]]]:
+        """
+        拆分重试Block Key
+
+        Returns:
+            (所属Block Key, 重试次数, DOI列表)；非重试Key时返回None
+        """
+        if not block_key or not block_key.startswith(RETRY_PREFIX):
+            return None
+        try:
+            attempt, _, rest = block_key[len(RETRY_PREFIX):].partition(":")
+            base, _, dois = rest.partition("|")
+            return base, int(attempt), [d for d in dois.split(RETRY_DOI_SEP) if d]
+        except ValueError:
+            return None
+
+    @classmethod
+    def retry_attempt(cls, block_key: str) -> int:
+        """工作单元的重试次数（普通Block为0）"""
+        retry = cls.split_retry(block_key)
+        return retry[1] if retry else 0
+
+    @classmethod
+    def base_block_key(cls, block_key: str) -> str:
+        """获取切片/重试Block所属的Block Key（普通Block Key原样返回）"""
+        retry = cls.split_retry(block_key)
+        if retry:
+            return retry[0]
+        return cls.split_slice(block_key)[0]
+    
+    @classmethod
+    def parse_block_key(cls, block_key: str) -> Optional[Tuple[str, int]]:
         """
         解析Block Key
         
         Args:
-            block_key: 如 "meta:NATURE:2024"
+            block_key: 如 "meta:NATURE:2024"（切片Key "meta:NATURE:2024#0-499" 同样适用）
             
         Returns:
             (journal, year) 元组，或None
         """
+        block_key = cls.base_block_key(block_key)
         if not block_key or not block_key.startswith("meta:"):
             return None
         
@@ -54,19 +229,52 @@ class PaperBlocks:
         return None
     
     @staticmethod
-    def _compress_bib(bib: str) -> str:
-        """压缩Bib字符串"""
-        try:
-            compressed = zlib.compress(bib.encode('utf-8'))
-            # 使用base64编码以便存储为字符串
-            import base64
-            return base64.b64encode(compressed).decode('ascii')
-        except Exception:
-            return bib  # 压缩失败则返回原文
+    def _pack_record(record: PaperRecord):
+        """编码为存储格式（已登记字典时为v2二进制记录）"""
+        payload = record_payload(record)
+        current = PaperDictionary.get_current()
+        if current:
+            return encode_payload_v2(payload, current[0], current[1])
+        return encode_payload(payload)
+    
+    @classmethod
+    def _pack(cls, bib: str):
+        """将Bib解析并编码为存储格式"""
+        return cls._pack_record(build_record(bib))
+    
+    @staticmethod
+    def _encode_snapshot(records: List[Tuple[str, PaperRecord]],
+                         dict_id: Optional[int] = None, zdict: Optional[bytes] = None) -> bytes:
+        """编码列式快照（默认使用当前字典）"""
+        if dict_id is None:
+            current = PaperDictionary.get_current()
+            dict_id, zdict = current if current else (0, None)
+        return encode_snapshot(records, dict_id, zdict)
     
     @staticmethod
-    def _decompress_bib(data: str) -> str:
-        """解压Bib字符串"""
+    def _unpack(value, with_bib: bool = True) -> PaperRecord:
+        """解码预解析记录（v2记录按头部的字典ID取字典）"""
+        zdict = PaperDictionary.get(record_dict_id(value)) if is_record_v2(value) else None
+        return unpack_record(value, with_bib, zdict)
+    
+    @staticmethod
+    def _decode_fields(data: Dict) -> Dict[str, bytes]:
+        """二进制客户端读取的Hash：Field解码为字符串，Value保持bytes"""
+        return {
+            (doi.decode('utf-8') if isinstance(doi, bytes) else doi): value
+            for doi, value in data.items()
+        }
+    
+    @classmethod
+    def _decompress_bib(cls, data) -> str:
+        """解压Bib字符串（兼容预解析记录格式）"""
+        if is_record(data):
+            try:
+                return cls._unpack(data).bib
+            except Exception:
+                return ''
+        if isinstance(data, bytes):
+            data = data.decode('utf-8', errors='replace')
         try:
             import base64
             compressed = base64.b64decode(data.encode('ascii'))
@@ -74,6 +282,191 @@ class PaperBlocks:
         except Exception:
             return data  # 解压失败则假设是原文
     
+    @staticmethod
+    def _block_format() -> str:
+        """新写入Block的存储格式（config.json 的 paper_block_format）"""
+        try:
+            from ..config import config_loader as config
+            return getattr(config, 'paper_block_format', BLOCK_FORMAT_HASH) or BLOCK_FORMAT_HASH
+        except Exception:
+            return BLOCK_FORMAT_HASH
+    
+    @staticmethod
+    def _snapshot_dict(header) -> Optional[bytes]:
+        return PaperDictionary.get(header.dict_id) if header.dict_id else None
+    
+    @classmethod
+    def _read_block_args(cls, block_key: str, span: Optional[Tuple[int, int]] = None,
+                         dois: Optional[List[str]] = None) -> Tuple[List[str], List]:
+        """READ_BLOCK_SCRIPT 的 (KEYS, ARGV)"""
+        keys = [block_key, cls._key_block_dois(block_key), KEY_BLOCK_VERSION]
+        if span is not None:
+            return keys, ['span', span[0], span[1]]
+        if dois is not None:
+            return keys, ['dois', *dois]
+        return keys, ['all']
+    
+    @classmethod
+    def _parse_read_block(cls, block_key: str, result, with_bib: bool,
+                          span: Optional[Tuple[int, int]] = None,
+                          dois: Optional[List[str]] = None) -> Dict[str, PaperRecord]:
+        """将 READ_BLOCK_SCRIPT 的结果解码为 {DOI: PaperRecord}"""
+        if not result:
+            return {}
+        kind, data = result[0], result[1] if len(result) > 1 else None
+        if kind == b'snapshot':
+            if not data:
+                return {}
+            header = read_header(data)
+            if header is None:
+                return {}
+            return decode_snapshot(data, cls._snapshot_dict(header), with_bib, span,
+                                   None if span is not None else dois)
+        
+        records = {}
+        for i in range(0, len(data or []), 2):
+            try:
+                records[data[i].decode('utf-8')] = cls._unpack(data[i + 1], with_bib)
+            except Exception:
+                continue
+        return records
+    
+    @classmethod
+    def _load_records(cls, block_key: str, with_bib: bool,
+                      span: Optional[Tuple[int, int]] = None,
+                      dois: Optional[List[str]] = None) -> Dict[str, PaperRecord]:
+        """
+        读取 meta: Block（Hash或快照）
+        
+        未启用缓存时一次往返；启用缓存时先读取版本号（HGET），命中则不读取Block，
+        未命中时再执行一次读取脚本。切片/指定DOI的读取未命中时只读取所需部分，
+        不加载整个Block（超出缓存预算或已被淘汰的大Block，每个切片不重复下载整个Block）
+        
+        Args:
+            block_key: 原Block Key（不含切片区间）
+            with_bib: 是否需要Bib原文
+            span: 只取下标闭区间（切片）
+            dois: 只取这些DOI
+        """
+        script = get_script(READ_BLOCK_SCRIPT, binary=True)
+        if script is None or not block_key:
+            return {}
+        if dois is not None and not dois:
+            return {}
+        
+        cache = get_block_cache()
+        if cache.enabled:
+            client = get_redis_client()
+            if not client:
+                return {}
+            version = int(client.hget(KEY_BLOCK_VERSION, block_key) or 0)
+            if span is None and dois is None:
+                entry = cls._load_cached(block_key, version, with_bib)
+                return dict(entry.records) if entry is not None else {}
+            
+            entry = cache.get(block_key, version, with_bib)
+            if entry is not None:
+                if span is not None:
+                    return {doi: entry.records[doi] for doi in entry.dois[max(0, span[0]):span[1] + 1]}
+                return {doi: entry.records[doi] for doi in dois if doi in entry.records}
+            cache.record_miss()
+        
+        keys, args = cls._read_block_args(block_key, span, dois)
+        return cls._parse_read_block(block_key, script(keys=keys, args=args), with_bib, span, dois)
+    
+    @classmethod
+    def _to_cached(cls, block_key: str, result, with_bib: bool) -> Optional[CachedBlock]:
+        """将 READ_BLOCK_SCRIPT 'all' 模式的结果转为缓存条目（空Block返回None）"""
+        records = cls._parse_read_block(block_key, result, with_bib)
+        if not records:
+            return None
+        version = int(result[2] or 0)
+        if result[0] == b'snapshot':
+            dois = list(records)
+        else:
+            # Hash按 idx:block_dois 的顺序排列（列表缺失的DOI按排序追加在末尾）
+            order = [doi.decode('utf-8') for doi in (result[3] if len(result) > 3 else None) or []]
+            dois = [doi for doi in order if doi in records]
+            if len(dois) < len(records):
+                listed = set(dois)
+                dois += sorted(doi for doi in records if doi not in listed)
+            records = {doi: records[doi] for doi in dois}
+        return CachedBlock(version, with_bib, dois, records, estimate_size(records))
+    
+    @classmethod
+    def _load_cached(cls, block_key: str, version: int, with_bib: bool) -> Optional[CachedBlock]:
+        """
+        经进程内缓存读取整个Block
+        
+        Args:
+            version: 读取前取得的版本号（只用于查找）；加载的条目带读取脚本同时返回的版本号，
+                     查找与读取之间Block被改写时不会以旧版本号缓存新数据
+        """
+        script = get_script(READ_BLOCK_SCRIPT, binary=True)
+        if script is None:
+            return None
+        
+        def load() -> Optional[CachedBlock]:
+            keys, args = cls._read_block_args(block_key)
+            return cls._to_cached(block_key, script(keys=keys, args=args), with_bib)
+        
+        return get_block_cache().get_or_load(block_key, version, with_bib, load)
+    
+    @staticmethod
+    def _bump_version(pipe, block_key: str) -> None:
+        """Block写入时递增版本号（与写入放在同一pipeline/事务中）"""
+        pipe.hincrby(KEY_BLOCK_VERSION, block_key, 1)
+        get_block_cache().invalidate(block_key)
+    
+    @classmethod
+    def _lookup_bib(cls, block_key: str, doi: str) -> Optional[str]:
+        """
+        读取单篇文献的Bib（Hash为 HGET；快照读取头部与索引后只取所在的Bib帧）
+        """
+        binary = get_binary_client()
+        script = get_script(LOOKUP_PAPER_SCRIPT, binary=True)
+        if not binary or script is None:
+            return None
+        
+        result = script(keys=[block_key], args=[doi, SNAPSHOT_PEEK])
+        kind, data = result[0], result[1] if len(result) > 1 else None
+        if kind != b'snapshot':
+            return cls._decompress_bib(data) if data else None
+        if not data:
+            return None
+        
+        header = read_header(data)
+        if header is None or header.frames_offset > len(data):
+            # 帧表或索引段超出首次读取的范围（文献数极多的Block）：按头部给出的长度重读
+            size = header.frames_offset if header else len(data) * 8
+            data = binary.getrange(block_key, 0, size - 1)
+            header = read_header(data)
+            if header is None or header.frames_offset > len(data):
+                data = binary.get(block_key)
+                header = read_header(data)
+        zdict = cls._snapshot_dict(header)
+        try:
+            position = decode_dois(data, header, zdict).index(doi)
+        except ValueError:
+            return None
+        frame = position // FRAME_SIZE
+        start, length = header.frame_span(frame)
+        records = decode_frame(binary.getrange(block_key, start, start + length - 1),
+                               frame_size(header, frame), zdict)
+        return records[position % FRAME_SIZE].bib
+    
+    @classmethod
+    def _list_block_dois(cls, block_key: str) -> List[str]:
+        """Block内的全部DOI（快照按存储顺序，Hash按DOI排序）"""
+        binary = get_binary_client()
+        if not binary:
+            return []
+        if binary.type(block_key) == b'string':
+            data = binary.get(block_key)
+            header = read_header(data) if is_snapshot(data) else None
+            return decode_dois(data, header, cls._snapshot_dict(header)) if header else []
+        return sorted(doi.decode('utf-8') for doi in binary.hkeys(block_key) or [])
+    
     @classmethod
     def get_paper(cls, journal: str, year: int, doi: str) -> Optional[str]:
         """
@@ -82,15 +475,11 @@ class PaperBlocks:
         Returns:
             Bib字符串，或None
         """
-        client = get_redis_client()
-        if not client or not journal or not year or not doi:
+        if not journal or not year or not doi:
             return None
         
         try:
-            data = client.hget(cls._key_block(journal, year), doi)
-            if data:
-                return cls._decompress_bib(data)
-            return None
+            return cls._lookup_bib(cls._key_block(journal, year), doi)
         except Exception:
             return None
     
@@ -102,18 +491,17 @@ class PaperBlocks:
         Returns:
             {DOI: Bib} 字典
         """
-        client = get_redis_client()
-        if not client or not journal or not year:
+        if not journal or not year:
             return {}
         
         try:
-            data = client.hgetall(cls._key_block(journal, year)) or {}
-            return {doi: cls._decompress_bib(bib) for doi, bib in data.items()}
+            records = cls._load_records(cls._key_block(journal, year), with_bib=True)
+            return {doi: record.bib for doi, record in records.items()}
         except Exception:
             return {}
     
     @classmethod
-    def _parse_distill_block_value(cls, value: str) -> str:
+    def _parse_distill_block_value(cls, value) -> str:
         """
         解析蒸馏Block的Value值，提取真正的bib字符串
         
@@ -128,6 +516,8 @@ class PaperBlocks:
         """
         if not value:
             return ''
+        if isinstance(value, bytes):
+            value = value.decode('utf-8', errors='replace')
         
         try:
             data = json.loads(value)
@@ -139,6 +529,30 @@ class PaperBlocks:
         # 如果不是JSON格式或解析失败，返回原值
         return value
     
+    @classmethod
+    def _parse_distill_block_price(cls, value) -> Optional[float]:
+        """
+        解析蒸馏Block的Value值中的期刊价格
+        
+        Returns:
+            JSON中的 price；不是JSON格式或没有价格时返回None
+        """
+        if not value:
+            return None
+        if isinstance(value, bytes):
+            value = value.decode('utf-8', errors='replace')
+        
+        try:
+            data = json.loads(value)
+        except (json.JSONDecodeError, TypeError):
+            return None
+        if not isinstance(data, dict):
+            return None
+        try:
+            return float(data['price'])
+        except (KeyError, TypeError, ValueError):
+            return None
+    
     @classmethod
     def get_block_by_key(cls, block_key: str) -> Dict[str, str]:
         """
@@ -152,11 +566,11 @@ class PaperBlocks:
         """
         # 修复29/39：蒸馏专用Block直接从Redis获取，并解析JSON
         if block_key and block_key.startswith("distill:"):
-            client = get_redis_client()
+            client = get_binary_client()
             if not client:
                 return {}
             try:
-                data = client.hgetall(block_key) or {}
+                data = cls._decode_fields(client.hgetall(block_key) or {})
                 # 修复39: distill block 存储的是 JSON {"bib": "...", "price": N}
                 # 需要解析JSON提取真正的bib
                 return {doi: cls._parse_distill_block_value(value) for doi, value in data.items()}
@@ -167,32 +581,242 @@ class PaperBlocks:
         parsed = cls.parse_block_key(block_key)
         if not parsed:
             return {}
+        base_key, span = cls.split_slice(block_key)
+        if span:
+            try:
+                records = cls._load_records(base_key, with_bib=True, span=span)
+                return {doi: record.bib for doi, record in records.items()}
+            except Exception:
+                return {}
         return cls.get_block(parsed[0], parsed[1])
     
+    @classmethod
+    def get_block_records(cls, block_key: str) -> Dict[str, PaperRecord]:
+        """
+        根据Block Key获取所有文献的预解析记录（Worker热路径）
+        
+        只解压 title/abstract/url/year，不解压Bib正文；
+        旧格式数据和蒸馏Block回退为运行时解析
+        
+        Returns:
+            {DOI: PaperRecord} 字典（记录的 bib 字段可能为空）
+        """
+        client = get_binary_client()
+        if not client or not block_key:
+            return {}
+        
+        retry = cls.split_retry(block_key)
+        if retry:
+            base_key, _, dois = retry
+            if not base_key.startswith("distill:"):
+                try:
+                    return cls._load_records(base_key, with_bib=False, dois=dois)
+                except Exception:
+                    return {}
+            try:
+                values = client.hmget(base_key, dois) if dois else []
+            except Exception:
+                return {}
+            data = {doi: value for doi, value in zip(dois, values) if value}
+            return cls._decode_records(base_key, data)
+        
+        if block_key.startswith("distill:"):
+            try:
+                data = cls._decode_fields(client.hgetall(block_key) or {})
+            except Exception:
+                return {}
+            return cls._decode_records(block_key, data)
+        
+        if not cls.parse_block_key(block_key):
+            return {}
+        
+        try:
+            base_key, span = cls.split_slice(block_key)
+            return cls._load_records(base_key, with_bib=False, span=span)
+        except Exception:
+            return {}
+    
+    @classmethod
+    def _decode_records(cls, block_key: str, data: Dict[str, bytes]) -> Dict[str, PaperRecord]:
+        """将蒸馏Block的 {DOI: 原始Value}（JSON）解码为记录（保留JSON中的价格）"""
+        return {
+            doi: build_record(cls._parse_distill_block_value(value))._replace(
+                price=cls._parse_distill_block_price(value)
+            )
+            for doi, value in data.items()
+        }
+    
+    @classmethod
+    def _build_block_dois(cls, client, block_key: str) -> int:
+        """
+        为旧数据构建Block的DOI顺序列表
+        
+        Returns:
+            DOI数量
+        """
+        dois = cls._list_block_dois(block_key)
+        if not dois:
+            return 0
+        list_key = cls._key_block_dois(block_key)
+        pipe = client.pipeline()
+        pipe.delete(list_key)
+        for i in range(0, len(dois), 1000):
+            pipe.rpush(list_key, *dois[i:i + 1000])
+        pipe.execute()
+        return len(dois)
+    
+    @classmethod
+    def split_into_slices(cls, block_keys: List[str], slice_size: int) -> List[str]:
+        """
+        将大Block切分为固定大小的DOI区间（工作单元）
+        
+        不超过 slice_size 篇的Block保持原Key；DOI顺序列表缺失（旧数据）时现场构建
+        
+        Args:
+            block_keys: Block Key列表，如 ["meta:NATURE:2024", ...]
+            slice_size: 每个切片的文献数，<=0 时不切分
+            
+        Returns:
+            工作单元Key列表，如 ["meta:NATURE:2024#0-499", "meta:NATURE:2024#500-999", ...]
+        """
+        client = get_redis_client()
+        if not client or not block_keys or slice_size <= 0:
+            return list(block_keys or [])
+        
+        try:
+            pipe = client.pipeline()
+            for block_key in block_keys:
+                pipe.llen(cls._key_block_dois(block_key))
+            lengths = pipe.execute()
+        except Exception as e:
+            print(f"[PaperBlocks] split_into_slices 失败: {e}")
+            return list(block_keys)
+        
+        units = []
+        for block_key, length in zip(block_keys, lengths):
+            if not length:
+                try:
+                    length = cls._build_block_dois(client, block_key)
+                except Exception:
+                    length = 0
+            if length <= slice_size:
+                units.append(block_key)
+                continue
+            for start in range(0, length, slice_size):
+                end = min(start + slice_size, length) - 1
+                units.append(f"{block_key}{SLICE_SEP}{start}-{end}")
+        return units
+    
     @classmethod
     def get_block_dois(cls, journal: str, year: int) -> List[str]:
         """获取Block中所有DOI"""
-        client = get_redis_client()
-        if not client or not journal or not year:
+        if not journal or not year:
             return []
         
         try:
-            return list(client.hkeys(cls._key_block(journal, year)) or [])
+            return cls._list_block_dois(cls._key_block(journal, year))
         except Exception:
             return []
     
     @classmethod
     def get_block_size(cls, journal: str, year: int) -> int:
         """获取Block中的文献数量"""
-        client = get_redis_client()
-        if not client or not journal or not year:
+        binary = get_binary_client()
+        if not binary or not journal or not year:
             return 0
         
         try:
-            return client.hlen(cls._key_block(journal, year)) or 0
+            key = cls._key_block(journal, year)
+            if binary.type(key) == b'string':
+                return read_count(binary.getrange(key, 0, 63))
+            return binary.hlen(key) or 0
         except Exception:
             return 0
     
+    @classmethod
+    def _rewrite_block(cls, block_key: str, rewrite: Callable,
+                       extra: Optional[Callable] = None) -> Optional[Tuple[int, int]]:
+        """
+        读取Block的全部记录并整体重写（WATCH事务，并发修改时重试）
+        
+        Args:
+            rewrite: (records, 是否快照) -> 新Value；bytes 写为快照，dict 写为Hash，
+                     None 表示不修改。records 为按存储顺序排列的 [(DOI, PaperRecord)]
+            extra: (pipe) -> None，在同一事务中追加的写入（如DOI索引）
+        
+        Returns:
+            (重写前字节数, 重写后字节数)；未修改或失败时返回None
+        """
+        binary = get_binary_client()
+        if not binary:
+            return None
+        
+        from redis.exceptions import WatchError
+        with binary.pipeline() as pipe:
+            for _ in range(5):
+                try:
+                    pipe.watch(block_key)
+                    if pipe.type(block_key) == b'string':
+                        blob = pipe.get(block_key) or b''
+                        header = read_header(blob)
+                        records = list(decode_snapshot(
+                            blob, cls._snapshot_dict(header) if header else None
+                        ).items())
+                        before, snapshot = len(blob), True
+                    else:
+                        data = pipe.hgetall(block_key) or {}
+                        order = [doi.decode('utf-8') for doi in
+                                 pipe.lrange(cls._key_block_dois(block_key), 0, -1) or []]
+                        values = cls._decode_fields(data)
+                        ordered = [doi for doi in order if doi in values]
+                        ordered += sorted(set(values) - set(ordered))
+                        records = [(doi, cls._unpack(values[doi])) for doi in ordered]
+                        before, snapshot = sum(len(v) for v in data.values()), False
+                    
+                    value = rewrite(records, snapshot)
+                    if value is None:
+                        pipe.unwatch()
+                        return None
+                    pipe.multi()
+                    pipe.delete(block_key)
+                    cls._bump_version(pipe, block_key)
+                    if isinstance(value, bytes):
+                        pipe.set(block_key, value)
+                        after = len(value)
+                    else:
+                        if value:
+                            pipe.hset(block_key, mapping=value)
+                        after = sum(len(v) for v in value.values())
+                    if extra is not None:
+                        extra(pipe)
+                    pipe.execute()
+                    return before, after
+                except WatchError:
+                    continue
+        return None
+    
+    @classmethod
+    def convert_block(cls, block_key: str, block_format: str) -> Optional[Tuple[int, int]]:
+        """
+        转换Block的存储格式（DOI顺序不变，进行中的切片仍然有效）
+        
+        Args:
+            block_format: BLOCK_FORMAT_SNAPSHOT 或 BLOCK_FORMAT_HASH
+        
+        Returns:
+            (转换前字节数, 转换后字节数)；已是目标格式或失败时返回None
+        """
+        to_snapshot = block_format == BLOCK_FORMAT_SNAPSHOT
+        
+        def rewrite(records, snapshot):
+            if snapshot == to_snapshot or not records:
+                return None
+            if to_snapshot:
+                return cls._encode_snapshot(records)
+            return {doi: cls._pack_record(record) for doi, record in records}
+        
+        return cls._rewrite_block(block_key, rewrite)
+    
     @classmethod
     def set_paper(cls, journal: str, year: int, doi: str, bib: str,
                   compress: bool = True, update_index: bool = True) -> bool:
@@ -204,7 +828,7 @@ class PaperBlocks:
             year: 年份
             doi: 文献DOI
             bib: Bib字符串
-            compress: 是否压缩Bib
+            compress: 是否编码为压缩的预解析记录
             update_index: 是否更新DOI反向索引
         """
         client = get_redis_client()
@@ -213,22 +837,52 @@ class PaperBlocks:
         
         try:
             key = cls._key_block(journal, year)
-            value = cls._compress_bib(bib) if compress else bib
+            if client.type(key) == 'string':
+                return cls._set_snapshot_paper(key, doi, bib, update_index)
+            value = cls._pack(bib) if compress else bib
             
             # 使用pipeline同时设置文献和更新索引
             pipe = client.pipeline()
             pipe.hset(key, doi, value)
+            cls._bump_version(pipe, key)
             if update_index:
-                pipe.hset(KEY_DOI_INDEX, doi, key)
-            pipe.execute()
+                DoiIndex.add(pipe, {doi: key})
+            added = pipe.execute()[0]
+            # 新增DOI追加到顺序列表末尾（列表不存在时由切分时构建）
+            if added:
+                client.rpushx(cls._key_block_dois(key), doi)
             # 文献Block永不过期，不设置TTL
             return True
         except Exception:
             return False
     
+    @classmethod
+    def _set_snapshot_paper(cls, block_key: str, doi: str, bib: str, update_index: bool) -> bool:
+        """快照格式的Block中新增或替换一篇文献（整体重写，新增DOI追加在末尾）"""
+        added = []
+        
+        def rewrite(records, snapshot):
+            record = build_record(bib)
+            updated = [(d, record if d == doi else r) for d, r in records]
+            added[:] = [] if any(d == doi for d, _ in records) else [doi]
+            if added:
+                updated.append((doi, record))
+            if snapshot:
+                return cls._encode_snapshot(updated)
+            return {d: cls._pack_record(r) for d, r in updated}
+        
+        def extra(pipe):
+            if update_index:
+                DoiIndex.add(pipe, {doi: block_key})
+            if added:
+                pipe.rpushx(cls._key_block_dois(block_key), doi)
+        
+        return cls._rewrite_block(block_key, rewrite, extra) is not None
+    
     @classmethod
     def set_block(cls, journal: str, year: int, papers: Dict[str, str],
-                  compress: bool = True, update_index: bool = True) -> bool:
+                  compress: bool = True, update_index: bool = True,
+                  snapshot: Optional[bool] = None) -> bool:
         """
         批量设置Block数据
         
@@ -236,29 +890,41 @@ class PaperBlocks:
             journal: 期刊名
             year: 年份
             papers: {DOI: Bib} 字典
-            compress: 是否压缩Bib
+            compress: 是否编码为压缩的预解析记录
             update_index: 是否更新DOI反向索引
+            snapshot: 是否写为列式快照；None 时按 paper_block_format 配置（不压缩时总是写为Hash）
         """
         client = get_redis_client()
         if not client or not journal or not year or not papers:
             return False
         
+        if snapshot is None:
+            snapshot = cls._block_format() == BLOCK_FORMAT_SNAPSHOT
+        
         try:
             key = cls._key_block(journal, year)
-            if compress:
-                mapping = {doi: cls._compress_bib(bib) for doi, bib in papers.items()}
-            else:
-                mapping = papers
+            dois = sorted(papers.keys())
             
             # 使用pipeline批量写入（文献Block永不过期）
             pipe = client.pipeline()
             pipe.delete(key)
-            pipe.hset(key, mapping=mapping)
+            cls._bump_version(pipe, key)
+            if snapshot and compress:
+                pipe.set(key, cls._encode_snapshot([(doi, build_record(papers[doi])) for doi in dois]))
+            elif compress:
+                pipe.hset(key, mapping={doi: cls._pack(bib) for doi, bib in papers.items()})
+            else:
+                pipe.hset(key, mapping=papers)
+            
+            # 重建DOI顺序列表（切片区间依赖该顺序，快照内的顺序与之相同）
+            list_key = cls._key_block_dois(key)
+            pipe.delete(list_key)
+            for i in range(0, len(dois), 1000):
+                pipe.rpush(list_key, *dois[i:i + 1000])
             
             # 同时更新DOI反向索引
             if update_index and papers:
-                index_mapping = {doi: key for doi in papers.keys()}
-                pipe.hset(KEY_DOI_INDEX, mapping=index_mapping)
+                DoiIndex.add(pipe, {doi: key for doi in papers.keys()})
             
             pipe.execute()
             return True
@@ -285,11 +951,77 @@ class PaperBlocks:
             return False
         
         try:
-            client.delete(cls._key_block(journal, year))
+            key = cls._key_block(journal, year)
+            dois = cls._list_block_dois(key)
+            pipe = client.pipeline()
+            pipe.delete(key, cls._key_block_dois(key))
+            DoiIndex.remove(pipe, dois)
+            # 版本号不删除：之后重建的Block版本号继续递增，缓存不会误命中
+            cls._bump_version(pipe, key)
+            pipe.execute()
             return True
         except Exception:
             return False
     
+    @classmethod
+    def to_payload(cls, value) -> bytes:
+        """任意格式的存储值转为记录payload（v1/v2记录直接解压，不重新解析Bib）"""
+        zdict = PaperDictionary.get(record_dict_id(value)) if is_record_v2(value) else None
+        payload = unpack_payload(value, zdict)
+        if payload is None:
+            payload = record_payload(build_record(cls._decompress_bib(value)))
+        return payload
+    
+    @classmethod
+    def migrate_block_v2(cls, block_key: str, dict_id: int,
+                         zdict: bytes) -> Tuple[int, int, int]:
+        """
+        将Block内的记录转码为v2（使用指定字典）
+        
+        已是该字典的v2记录跳过；转码期间被重新写入的文献不覆盖；
+        快照格式的Block整体以该字典重新编码。
+        Hash逐篇转码不改变解码结果，不递增版本号（已缓存的解码结果仍然有效）
+        
+        Returns:
+            (转码篇数, 转码前Value字节数, 转码后Value字节数)
+        """
+        binary = get_binary_client()
+        script = get_script(REPLACE_IF_UNCHANGED_SCRIPT)
+        if not binary or script is None or not block_key:
+            return 0, 0, 0
+        
+        if binary.type(block_key) == b'string':
+            counted = []
+            
+            def rewrite(records, snapshot):
+                counted[:] = [len(records)]
+                if not snapshot:
+                    return None
+                return encode_snapshot(records, dict_id, zdict)
+            
+            header = read_header(binary.getrange(block_key, 0, SNAPSHOT_PEEK - 1))
+            if header is not None and header.dict_id == dict_id:
+                return 0, 0, 0
+            sizes = cls._rewrite_block(block_key, rewrite)
+            return (counted[0], sizes[0], sizes[1]) if sizes else (0, 0, 0)
+        
+        data = binary.hgetall(block_key) or {}
+        converted = before = after = 0
+        args: List[bytes] = []
+        for doi, value in data.items():
+            if is_record_v2(value) and record_dict_id(value) == dict_id:
+                continue
+            new_value = encode_payload_v2(cls.to_payload(value), dict_id, zdict)
+            args.extend((doi, value, new_value))
+            before += len(value)
+            after += len(new_value)
+            if len(args) >= MIGRATE_BATCH * 3:
+                converted += int(script(keys=[block_key], args=args))
+                args = []
+        if args:
+            converted += int(script(keys=[block_key], args=args))
+        return converted, before, after
+    
     @classmethod
     def list_blocks(cls, pattern: str = "meta:*") -> List[str]:
         """列出所有Block Key"""
@@ -307,37 +1039,46 @@ class PaperBlocks:
         """
         根据DOI查找文献
         
-        优先使用DOI反向索引实现O(1)查询，索引不存在时回退到遍历模式
+        DOI反向索引由Block写入时同步维护，索引中没有即视为不存在（布隆过滤器快速判定），
+        不再遍历全部Block；索引损坏时用 scripts/repair_doi_index.py 离线修复
         
         Returns:
             (block_key, bib) 元组，或None
         """
-        client = get_redis_client()
-        if not client or not doi:
+        if not doi:
             return None
         
         try:
-            # 优先从反向索引获取block_key (O(1))
-            block_key = client.hget(KEY_DOI_INDEX, doi)
-            if block_key:
-                data = client.hget(block_key, doi)
-                if data:
-                    return (block_key, cls._decompress_bib(data))
-            
-            # 索引不存在时回退到遍历模式（兼容旧数据）
-            for block_key in cls.list_blocks():
-                data = client.hget(block_key, doi)
-                if data:
-                    # 顺便更新索引
-                    try:
-                        client.hset(KEY_DOI_INDEX, doi, block_key)
-                    except Exception:
-                        pass
-                    return (block_key, cls._decompress_bib(data))
-            return None
+            block_key = DoiIndex.get(doi)
+            if not block_key:
+                return None
+            bib = cls._lookup_bib(block_key, doi)
+            return (block_key, bib) if bib is not None else None
         except Exception:
             return None
     
+    @classmethod
+    def batch_get_papers_by_doi(cls, dois: List[str]) -> Dict[str, Tuple[str, str]]:
+        """
+        批量根据DOI查找文献（一次索引查询 + 按Block分组的一次Pipeline读取）
+        
+        Returns:
+            {doi: (block_key, bib)}，找不到的DOI不出现
+        """
+        if not dois:
+            return {}
+        
+        try:
+            block_map = DoiIndex.get_many(dois)
+        except Exception as e:
+            print(f"[PaperBlocks] batch_get_papers_by_doi 失败: {e}")
+            return {}
+        block_dois: Dict[str, List[str]] = {}
+        for doi, block_key in block_map.items():
+            block_dois.setdefault(block_key, []).append(doi)
+        bibs = cls.batch_get_papers(block_dois)
+        return {doi: (block_map[doi], bib) for doi, bib in bibs.items()}
+    
     @classmethod
     def get_block_key_by_doi(cls, doi: str) -> Optional[str]:
         """
@@ -354,14 +1095,16 @@ class PaperBlocks:
             return None
         
         try:
-            return client.hget(KEY_DOI_INDEX, doi)
+            return DoiIndex.get(doi)
         except Exception:
             return None
     
     @classmethod
     def batch_get_block_keys(cls, dois: List[str]) -> Dict[str, str]:
         """
-        批量获取多个DOI对应的block_key（Pipeline优化）
+        批量获取多个DOI对应的block_key
+        
+        按索引桶分组，每桶一次HMGET（Pipeline批量执行）
         
         Args:
             dois: DOI列表
@@ -369,23 +1112,11 @@ class PaperBlocks:
         Returns:
             {doi: block_key} 字典
         """
-        client = get_redis_client()
-        if not client or not dois:
+        if not dois:
             return {}
         
         try:
-            pipe = client.pipeline()
-            for doi in dois:
-                pipe.hget(KEY_DOI_INDEX, doi)
-            
-            results = pipe.execute()
-            
-            output = {}
-            for i, block_key in enumerate(results):
-                if block_key:
-                    output[dois[i]] = block_key
-            
-            return output
+            return DoiIndex.get_many(dois)
         except Exception as e:
             print(f"[PaperBlocks] batch_get_block_keys 失败: {e}")
             return {}
@@ -418,16 +1149,17 @@ class PaperBlocks:
                 # 收集所有DOI和对应的block_key
                 index_mapping = {}
                 for block_key in batch_keys:
-                    dois = client.hkeys(block_key) or []
+                    dois = cls._list_block_dois(block_key)
                     for doi in dois:
                         index_mapping[doi] = block_key
                 
                 # 批量写入索引
                 if index_mapping:
-                    pipe.hset(KEY_DOI_INDEX, mapping=index_mapping)
+                    total_count += DoiIndex.add(pipe, index_mapping)
                     pipe.execute()
-                    total_count += len(index_mapping)
             
+            # 布隆过滤器已覆盖全部Block中的DOI
+            DoiIndex.mark_bloom_ready()
             return total_count
         except Exception as e:
             print(f"[PaperBlocks] build_doi_index 失败: {e}")
@@ -436,19 +1168,41 @@ class PaperBlocks:
     @classmethod
     def get_doi_index_size(cls) -> int:
         """获取DOI索引中的条目数量"""
-        client = get_redis_client()
-        if not client:
-            return 0
-        
-        try:
-            return client.hlen(KEY_DOI_INDEX) or 0
-        except Exception:
-            return 0
+        return DoiIndex.size()
     
     # ============================================================
     # 批量获取方法 (Pipeline优化，用于下载等场景)
     # ============================================================
     
+    @classmethod
+    def _cached_blocks(cls, client, block_keys: List[str],
+                       record_misses: bool = False) -> Dict[str, CachedBlock]:
+        """
+        批量查找进程内缓存中含完整Bib的Block（一次HMGET取版本号）
+        
+        Args:
+            record_misses: 未命中是否计入统计（调用方不会随后读取并写入缓存时为True）
+        
+        Returns:
+            {block_key: CachedBlock}，只含命中的 meta: Block
+        """
+        cache = get_block_cache()
+        keys = [k for k in block_keys if not k.startswith("distill:")]
+        if not cache.enabled or not keys or not len(cache):
+            if record_misses and cache.enabled and keys:
+                cache.record_miss(len(keys))
+            return {}
+        
+        versions = client.hmget(KEY_BLOCK_VERSION, keys)
+        cached = {}
+        for block_key, version in zip(keys, versions):
+            entry = cache.get(block_key, int(version or 0), True)
+            if entry is not None:
+                cached[block_key] = entry
+        if record_misses and len(cached) < len(keys):
+            cache.record_miss(len(keys) - len(cached))
+        return cached
+    
     @classmethod
     def batch_get_papers(cls, block_dois: Dict[str, List[str]]) -> Dict[str, str]:
         """
@@ -464,37 +1218,50 @@ class PaperBlocks:
         Returns:
             {doi: bib_str} 字典
         """
-        client = get_redis_client()
-        if not client or not block_dois:
+        client = get_binary_client()
+        script = get_script(READ_BLOCK_SCRIPT, binary=True)
+        if not client or script is None or not block_dois:
             return {}
         
         try:
-            # 构建Pipeline命令
-            pipe = client.pipeline()
-            
-            # 记录每个命令对应的(block_key, doi)
-            command_mapping: List[Tuple[str, str]] = []  # [(block_key, doi), ...]
+            # 已缓存完整Bib的Block直接取（未命中的只读取所需DOI，不写入缓存）
+            output: Dict[str, str] = {}
+            cached = cls._cached_blocks(client, [k for k, dois in block_dois.items() if dois],
+                                        record_misses=True)
+            for block_key, entry in cached.items():
+                for doi in block_dois[block_key]:
+                    record = entry.records.get(doi)
+                    if record is not None:
+                        output[doi] = record.bib
             
+            # 构建Pipeline命令：每个Block一条（meta: Block按类型读取快照或HMGET）
+            pipe = client.pipeline()
+            commands: List[Tuple[str, List[str]]] = []
             for block_key, dois in block_dois.items():
-                for doi in dois:
-                    pipe.hget(block_key, doi)
-                    command_mapping.append((block_key, doi))
+                if not dois or block_key in cached:
+                    continue
+                if block_key.startswith("distill:"):
+                    pipe.hmget(block_key, dois)
+                else:
+                    keys, args = cls._read_block_args(block_key, dois=dois)
+                    script(keys=keys, args=args, client=pipe)
+                commands.append((block_key, dois))
             
             # 执行所有命令
-            results = pipe.execute()
+            results = pipe.execute() if commands else []
             
             # 组装结果
-            output: Dict[str, str] = {}
-            for i, data in enumerate(results):
-                if data:
-                    block_key, doi = command_mapping[i]
-                    # 修复39: 区分 distill: 和 meta: 前缀的数据格式
-                    if block_key.startswith("distill:"):
-                        # 蒸馏Block存储JSON格式 {"bib": "...", "price": N}
-                        output[doi] = cls._parse_distill_block_value(data)
-                    else:
-                        # 普通Block存储压缩后的bib
-                        output[doi] = cls._decompress_bib(data)
+            for (block_key, dois), result in zip(commands, results):
+                # 修复39: 区分 distill: 和 meta: 前缀的数据格式
+                if block_key.startswith("distill:"):
+                    # 蒸馏Block存储JSON格式 {"bib": "...", "price": N}
+                    for doi, data in zip(dois, result):
+                        if data:
+                            output[doi] = cls._parse_distill_block_value(data)
+                else:
+                    records = cls._parse_read_block(block_key, result, True, dois=dois)
+                    for doi, record in records.items():
+                        output[doi] = record.bib
             
             return output
         except Exception as e:
@@ -516,37 +1283,52 @@ class PaperBlocks:
         Returns:
             {block_key: {doi: bib_str}} 嵌套字典
         """
-        client = get_redis_client()
-        if not client or not block_keys:
+        client = get_binary_client()
+        script = get_script(READ_BLOCK_SCRIPT, binary=True)
+        if not client or script is None or not block_keys:
             return {}
         
         try:
+            # 已缓存的Block直接取，其余读取后写入缓存
+            cache = get_block_cache()
+            output: Dict[str, Dict[str, str]] = {}
+            cached = cls._cached_blocks(client, block_keys)
+            for block_key, entry in cached.items():
+                output[block_key] = {doi: r.bib for doi, r in entry.records.items()}
+            pending = [k for k in block_keys if k not in cached]
+            
             # 构建Pipeline命令
             pipe = client.pipeline()
-            for block_key in block_keys:
-                pipe.hgetall(block_key)
+            for block_key in pending:
+                if block_key.startswith("distill:"):
+                    pipe.hgetall(block_key)
+                else:
+                    keys, args = cls._read_block_args(block_key)
+                    script(keys=keys, args=args, client=pipe)
             
             # 执行所有命令
-            results = pipe.execute()
+            results = pipe.execute() if pending else []
             
             # 组装结果
-            output: Dict[str, Dict[str, str]] = {}
-            for i, data in enumerate(results):
-                if data:
-                    block_key = block_keys[i]
-                    # 修复39: 区分 distill: 和 meta: 前缀的数据格式
-                    if block_key.startswith("distill:"):
-                        # 蒸馏Block存储JSON格式 {"bib": "...", "price": N}
-                        output[block_key] = {
-                            doi: cls._parse_distill_block_value(value) 
-                            for doi, value in data.items()
-                        }
-                    else:
-                        # 普通Block存储压缩后的bib
+            for block_key, data in zip(pending, results):
+                # 修复39: 区分 distill: 和 meta: 前缀的数据格式
+                if block_key.startswith("distill:"):
+                    # 蒸馏Block存储JSON格式 {"bib": "...", "price": N}
+                    if data:
                         output[block_key] = {
-                            doi: cls._decompress_bib(bib) 
-                            for doi, bib in data.items()
+                            doi: cls._parse_distill_block_value(value)
+                            for doi, value in cls._decode_fields(data).items()
                         }
+                elif cache.enabled:
+                    cache.record_miss()
+                    entry = cls._to_cached(block_key, data, True)
+                    if entry is not None:
+                        cache.put(block_key, entry)
+                        output[block_key] = {doi: r.bib for doi, r in entry.records.items()}
+                else:
+                    records = cls._parse_read_block(block_key, data, True)
+                    if records:
+                        output[block_key] = {doi: r.bib for doi, r in records.items()}
             
             return output
         except Exception as e:
@@ -0,0 +1,226 @@
+"""
+单篇文献提交模块 (新架构)
+一次Redis往返完成单篇文献的 终止检查 + 扣费 + 写结果 + 计费流水 + 进度更新
+
+原实现每篇文献需要 EXISTS(终止信号)、GET+EXPIRE(余额)、EVAL(扣费)、
+HSET+EXPIRE(结果)、RPUSH(流水)、INCR(进度) 共约8次往返，且余额检查与扣减分离。
+现合并为一个Lua脚本，按SHA执行（EVALSHA），原子完成全部步骤。
+
+脚本涉及的Key:
+- KEYS[1] query:{uid}:{qid}:terminate_signal
+- KEYS[2] user:{uid}:balance
+- KEYS[3] result:{uid}:{qid}
+- KEYS[4] billing_queue:{uid}
+- KEYS[5] progress:{uid}:{qid}:finished_count
+
+幂等: 同一 (qid, DOI) 已有结果时直接返回 DUPLICATE，不重复扣费和计数
+
+批量提交 (commit_batch): 一次脚本提交多篇文献，结果多字段HSET、流水批量RPUSH、
+进度一次INCRBY；逐篇检查余额，只提交余额足以覆盖的文献
+"""
+
+import json
+import time
+from typing import Dict, List, Tuple
+
+from .connection import get_redis_client, get_script, TTL_RESULT, TTL_USER_BALANCE
+from .task_queue import TaskQueue
+from .user_cache import UserCache
+from .result_cache import ResultCache
+from .billing import BillingQueue
+
+# 提交结果状态
+COMMIT_OK = 'OK'                      # 已扣费并写入结果
+COMMIT_DUPLICATE = 'DUPLICATE'        # 该DOI已有结果（幂等跳过）
+COMMIT_TERMINATED = 'TERMINATED'      # 任务已收到终止信号
+COMMIT_INSUFFICIENT = 'INSUFFICIENT'  # 余额不足
+COMMIT_NO_BALANCE = 'NO_BALANCE'      # 余额缓存不存在
+COMMIT_ERROR = 'ERROR'                # Redis不可用或脚本执行失败
+COMMIT_BUFFERED = 'BUFFERED'          # 批量模式：已进入缓冲区，稍后提交
+
+
+COMMIT_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 'TERMINATED'
+end
+if redis.call('HEXISTS', KEYS[3], ARGV[1]) == 1 then
+    return 'DUPLICATE'
+end
+local price = tonumber(ARGV[3])
+if price > 0 then
+    local current = redis.call('GET', KEYS[2])
+    if not current then
+        return 'NO_BALANCE'
+    end
+    current = tonumber(current)
+    if current < price then
+        return 'INSUFFICIENT'
+    end
+    redis.call('SET', KEYS[2], tostring(current - price), 'EX', ARGV[5])
+    redis.call('RPUSH', KEYS[4], ARGV[6])
+end
+redis.call('HSET', KEYS[3], ARGV[1], ARGV[2])
+redis.call('EXPIRE', KEYS[3], ARGV[4])
+redis.call('INCR', KEYS[5])
+return 'OK'
+"""
+
+
+# ARGV: ttl_result, ttl_balance, n, 然后每篇文献4个参数 (doi, result_json, price, billing_json)
+# 返回: {status, 提交数, 重复数, 余额不足数}
+COMMIT_BATCH_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return {'TERMINATED', 0, 0, 0}
+end
+local n = tonumber(ARGV[3])
+local balance = redis.call('GET', KEYS[2])
+if balance then
+    balance = tonumber(balance)
+end
+local fields = {}
+local bills = {}
+local seen = {}
+local ok, dup, short, spent = 0, 0, 0, 0
+for i = 0, n - 1 do
+    local base = 4 + i * 4
+    local doi = ARGV[base]
+    if seen[doi] or redis.call('HEXISTS', KEYS[3], doi) == 1 then
+        dup = dup + 1
+    else
+        local price = tonumber(ARGV[base + 2])
+        local covered = true
+        if price > 0 then
+            if balance and balance >= price then
+                balance = balance - price
+                spent = spent + price
+                bills[#bills + 1] = ARGV[base + 3]
+            else
+                covered = false
+                short = short + 1
+            end
+        end
+        if covered then
+            seen[doi] = true
+            fields[#fields + 1] = doi
+            fields[#fields + 1] = ARGV[base + 1]
+            ok = ok + 1
+        end
+    end
+end
+if spent > 0 then
+    redis.call('SET', KEYS[2], tostring(balance), 'EX', ARGV[2])
+    for i = 1, #bills, 500 do
+        redis.call('RPUSH', KEYS[4], unpack(bills, i, math.min(i + 499, #bills)))
+    end
+end
+if ok > 0 then
+    for i = 1, #fields, 1000 do
+        redis.call('HSET', KEYS[3], unpack(fields, i, math.min(i + 999, #fields)))
+    end
+    redis.call('EXPIRE', KEYS[3], ARGV[1])
+    redis.call('INCRBY', KEYS[5], ok)
+end
+return {'OK', ok, dup, short}
+"""
+
+
+class PaperCommit:
+    """单篇文献原子提交"""
+
+    @staticmethod
+    def _keys(uid: int, qid: str) -> List[str]:
+        return [
+            TaskQueue._key_terminate(uid, qid),
+            UserCache._key_balance(uid),
+            ResultCache._key_result(uid, qid),
+            BillingQueue._key_billing(uid),
+            TaskQueue._key_progress(uid, qid),
+        ]
+
+    @staticmethod
+    def _encode(qid: str, doi: str, ai_result: Dict,
+                block_key: str, price: float) -> Tuple[str, str]:
+        """编码结果值和计费流水"""
+        result_value = json.dumps({
+            'ai_result': ai_result,
+            'block_key': block_key or '',
+        }, ensure_ascii=False)
+        billing_record = json.dumps({
+            'timestamp': time.time(),
+            'qid': qid,
+            'doi': doi,
+            'cost': price,
+        })
+        return result_value, billing_record
+
+    @classmethod
+    def commit(cls, uid: int, qid: str, doi: str, ai_result: Dict,
+               block_key: str, price: float) -> str:
+        """
+        原子提交单篇文献结果
+
+        price <= 0 时（如缓存命中免费）不扣费、不写计费流水
+
+        Args:
+            uid: 用户ID
+            qid: 查询ID
+            doi: 文献DOI
+            ai_result: AI分析结果 {relevant, reason}
+            block_key: 所属Block Key
+            price: 本篇扣费金额
+
+        Returns:
+            COMMIT_* 状态
+        """
+        client = get_redis_client()
+        if not client or uid <= 0 or not qid or not doi:
+            return COMMIT_ERROR
+
+        result_value, billing_record = cls._encode(qid, doi, ai_result, block_key, price)
+
+        try:
+            script = get_script(COMMIT_SCRIPT)
+            status = script(
+                keys=cls._keys(uid, qid),
+                args=[doi, result_value, str(price), str(TTL_RESULT),
+                      str(TTL_USER_BALANCE), billing_record],
+            )
+            return status or COMMIT_ERROR
+        except Exception as e:
+            print(f"[PaperCommit] 提交失败 {doi}: {e}")
+            return COMMIT_ERROR
+
+    @classmethod
+    def commit_batch(cls, uid: int, qid: str,
+                     items: List[Tuple[str, Dict, str, float]]) -> Tuple[str, int, int, int]:
+        """
+        原子批量提交多篇文献结果
+
+        逐篇按顺序检查余额，余额不足的文献不写结果、不扣费（与逐篇提交语义一致）
+
+        Args:
+            uid: 用户ID
+            qid: 查询ID
+            items: [(doi, ai_result, block_key, price), ...]
+
+        Returns:
+            (状态, 提交数, 重复数, 余额不足数)；状态为 COMMIT_OK / COMMIT_TERMINATED / COMMIT_ERROR
+        """
+        client = get_redis_client()
+        if not client or uid <= 0 or not qid:
+            return COMMIT_ERROR, 0, 0, 0
+        if not items:
+            return COMMIT_OK, 0, 0, 0
+
+        args = [str(TTL_RESULT), str(TTL_USER_BALANCE), str(len(items))]
+        for doi, ai_result, block_key, price in items:
+            result_value, billing_record = cls._encode(qid, doi, ai_result, block_key, price)
+            args.extend([doi, result_value, str(price), billing_record])
+
+        try:
+            script = get_script(COMMIT_BATCH_SCRIPT)
+            status, ok, dup, short = script(keys=cls._keys(uid, qid), args=args)
+            return status, int(ok), int(dup), int(short)
+        except Exception as e:
+            print(f"[PaperCommit] 批量提交失败 ({len(items)} 篇): {e}")
+            return COMMIT_ERROR, 0, 0, 0
@@ -0,0 +1,136 @@
+"""
+文献记录压缩字典模块 (新架构)
+v2记录（见 paper_record.py）以预置字典压缩，字典按ID版本化存储；
+记录头部带字典ID，换用新字典后旧记录仍按原ID解码
+
+Key设计:
+- paper:dict:{id}     (String, 二进制) - 字典内容（写入后不再修改）
+- paper:dict:current  (String)         - 新写入记录使用的字典ID
+- paper:dict:seq      (String)         - 字典ID计数器
+
+字典由迁移工具训练并登记（scripts/migrate_paper_blocks_v2.py）；
+未登记字典时 PaperBlocks 仍写入v1记录
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from .connection import get_redis_client, get_binary_client
+
+KEY_DICT_CURRENT = "paper:dict:current"
+KEY_DICT_SEQ = "paper:dict:seq"
+
+# 字典ID写入记录头部（uint16）
+MAX_DICT_ID = 65535
+
+# 当前字典ID的进程内缓存时长（秒）；字典内容按ID不可变，永久缓存
+CURRENT_CACHE_SECONDS = 60
+
+_dicts: Dict[int, bytes] = {}
+_current: Optional[Tuple[int, bytes]] = None
+_current_checked = 0.0
+_lock = threading.Lock()
+
+
+class PaperDictionary:
+    """文献记录压缩字典管理器"""
+
+    @staticmethod
+    def _key_dict(dict_id: int) -> str:
+        return f"paper:dict:{dict_id}"
+
+    @classmethod
+    def save(cls, zdict: bytes) -> Optional[int]:
+        """
+        登记新字典（不切换当前字典）
+
+        Returns:
+            字典ID，或None
+        """
+        client = get_redis_client()
+        binary = get_binary_client()
+        if not client or not binary or not zdict:
+            return None
+
+        try:
+            dict_id = int(client.incr(KEY_DICT_SEQ))
+            if dict_id > MAX_DICT_ID:
+                print(f"[PaperDictionary] 字典ID超出上限: {dict_id}")
+                return None
+            binary.set(cls._key_dict(dict_id), zdict)
+            with _lock:
+                _dicts[dict_id] = zdict
+            return dict_id
+        except Exception as e:
+            print(f"[PaperDictionary] 登记字典失败: {e}")
+            return None
+
+    @classmethod
+    def set_current(cls, dict_id: int) -> bool:
+        """切换新写入记录使用的字典"""
+        global _current, _current_checked
+        client = get_redis_client()
+        if not client or cls.get(dict_id) is None:
+            return False
+
+        try:
+            client.set(KEY_DICT_CURRENT, dict_id)
+            with _lock:
+                _current = None
+                _current_checked = 0.0
+            return True
+        except Exception:
+            return False
+
+    @classmethod
+    def get(cls, dict_id: int) -> Optional[bytes]:
+        """按ID获取字典（进程内缓存）"""
+        zdict = _dicts.get(dict_id)
+        if zdict is not None:
+            return zdict
+
+        binary = get_binary_client()
+        if not binary:
+            return None
+        try:
+            zdict = binary.get(cls._key_dict(dict_id))
+        except Exception:
+            return None
+        if zdict:
+            with _lock:
+                _dicts[dict_id] = zdict
+        return zdict
+
+    @classmethod
+    def get_current(cls) -> Optional[Tuple[int, bytes]]:
+        """
+        当前字典
+
+        Returns:
+            (字典ID, 字典内容)；未登记字典时返回None
+        """
+        global _current, _current_checked
+        now = time.time()
+        if now - _current_checked < CURRENT_CACHE_SECONDS:
+            return _current
+
+        client = get_redis_client()
+        current = None
+        if client:
+            try:
+                value = client.get(KEY_DICT_CURRENT)
+                if value:
+                    dict_id = int(value)
+                    zdict = cls.get(dict_id)
+                    if zdict:
+                        current = (dict_id, zdict)
+            except (ValueError, TypeError):
+                pass
+            except Exception:
+                return _current
+
+        with _lock:
+            _current = current
+            _current_checked = now
+        return current
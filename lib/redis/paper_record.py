@@ -0,0 +1,333 @@
+"""
+文献记录编码模块 (新架构)
+在加载文献Block时预先解析 title / abstract / url / year，与原始Bib一起打包存储，
+Worker读取时直接取字段，不再对每篇文献做正则解析
+
+存储格式 (meta:{Journal}:{Year} 的 Value):
+- v2: b"R2" + struct('<H': 字典ID) + raw deflate(payload, 预置字典)   （二进制，须用二进制客户端读取）
+- v1: "R1:" + base64(zlib(payload))
+  payload = 头部 struct('<HIIII': year, len(title), len(abstract), len(url), len(bib))
+            + title + abstract + url + bib   （均为UTF-8字节）
+- 旧格式: base64(zlib(bib)) 或未压缩的Bib原文，读取时回退为运行时解析
+
+字段在前、Bib在后：只需要标题和摘要时按长度部分解压，不解压Bib正文
+
+v2 去掉了 base64（+33%），并以语料训练的预置字典压缩：单条Bib只有几KB，
+独立的zlib流来不及积累字典，期刊名、字段名、常见词组在每条记录中都要重新编码一次。
+字典按ID版本化存储在Redis中（见 paper_dict.py），旧ID的字典保留，已有数据无需随字典更新重写
+"""
+
+import base64
+import re
+import struct
+import zlib
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+RECORD_PREFIX = "R1:"
+RECORD_PREFIX_V2 = b"R2"
+
+_HEADER = struct.Struct('<HIIII')
+_V2_HEADER = struct.Struct('<2sH')
+
+# raw deflate（不含zlib头和校验和，每条省6字节）
+_WBITS_RAW = -15
+# zlib预置字典最多使用32KB
+MAX_DICT_SIZE = 32768
+
+# 字典训练: 以空白结尾的词元，取1~4个连续词元作为候选片段
+_TOKEN_RE = re.compile(rb'\S+\s*')
+_MAX_NGRAM = 4
+_MIN_SEGMENT = 4
+
+# BibTeX 字段名: name = value
+_FIELD_NAME_RE = re.compile(r'([A-Za-z][\w\-:.]*)\s*=\s*')
+# 花括号值内只需关注 { 和 }；引号值内还需关注转义和结束引号
+_BRACE_RE = re.compile(r'[{}]')
+_QUOTED_RE = re.compile(r'\\.|[{}"]', re.DOTALL)
+
+
+class PaperRecord(NamedTuple):
+    """预解析的文献记录"""
+    title: str
+    abstract: str
+    url: str
+    year: int
+    bib: str
+    # 蒸馏Block中随记录保存的期刊价格（普通Block为None，按期刊查询）
+    price: Optional[float] = None
+
+
+def _read_value(bib: str, pos: int) -> Tuple[str, int]:
+    """
+    读取一个字段值（支持嵌套花括号、引号、裸值）
+
+    Returns:
+        (字段值, 值结束后的位置)
+    """
+    n = len(bib)
+    if pos >= n:
+        return '', pos
+
+    ch = bib[pos]
+    if ch == '{':
+        depth = 0
+        for m in _BRACE_RE.finditer(bib, pos):
+            if m.group() == '{':
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return bib[pos + 1:m.start()], m.end()
+        return bib[pos + 1:], n
+
+    if ch == '"':
+        depth = 0
+        for m in _QUOTED_RE.finditer(bib, pos + 1):
+            c = m.group()
+            if c[0] == '\\':
+                continue
+            if c == '{':
+                depth += 1
+            elif c == '}':
+                depth -= 1
+            elif depth <= 0:
+                return bib[pos + 1:m.start()], m.end()
+        return bib[pos + 1:], n
+
+    # 裸值（数字或宏），到逗号或右花括号为止
+    end = pos
+    while end < n and bib[end] not in ',}':
+        end += 1
+    return bib[pos:end].strip(), end
+
+
+def _clean(value: str) -> str:
+    """去除多余的外层花括号（如 {{Title}}）并合并空白"""
+    value = value.strip()
+    while len(value) >= 2 and value[0] == '{' and value[-1] == '}':
+        inner = value[1:-1]
+        # 仅当外层花括号互相匹配时才去除，避免误删 "{A} and {B}"
+        depth = 0
+        for m in _BRACE_RE.finditer(inner):
+            depth += 1 if m.group() == '{' else -1
+            if depth < 0:
+                break
+        if depth != 0:
+            break
+        value = inner.strip()
+    return ' '.join(value.split())
+
+
+def parse_bib_fields(bib: str) -> Dict[str, str]:
+    """
+    解析BibTeX条目中的全部字段（字段名小写）
+
+    与原先的 [^}"]+ 正则不同，字段值中的花括号和引号不会截断内容，
+    且 booktitle 等字段不会被误认为 title
+
+    Returns:
+        {field_name: value}，同名字段保留第一个
+    """
+    fields: Dict[str, str] = {}
+    if not bib:
+        return fields
+
+    start = bib.find('{')
+    if start < 0:
+        return fields
+    # 跳过条目头 "@article{citekey,"
+    comma = bib.find(',', start)
+    if comma < 0:
+        return fields
+
+    pos = comma + 1
+    n = len(bib)
+    while pos < n:
+        while pos < n and (bib[pos].isspace() or bib[pos] == ','):
+            pos += 1
+        if pos >= n or bib[pos] == '}':
+            break
+
+        m = _FIELD_NAME_RE.match(bib, pos)
+        if not m:
+            break
+        value, pos = _read_value(bib, m.end())
+        fields.setdefault(m.group(1).lower(), _clean(value))
+
+    return fields
+
+
+def build_record(bib: str) -> PaperRecord:
+    """从Bib原文解析记录"""
+    fields = parse_bib_fields(bib)
+    try:
+        year = int(fields.get('year', '') or 0)
+    except ValueError:
+        year = 0
+    return PaperRecord(
+        title=fields.get('title', ''),
+        abstract=fields.get('abstract', ''),
+        url=fields.get('url', ''),
+        year=year if 0 <= year <= 65535 else 0,
+        bib=bib or '',
+    )
+
+
+def record_payload(record: PaperRecord) -> bytes:
+    """记录的未压缩payload"""
+    title = record.title.encode('utf-8')
+    abstract = record.abstract.encode('utf-8')
+    url = record.url.encode('utf-8')
+    raw_bib = record.bib.encode('utf-8')
+    header = _HEADER.pack(record.year, len(title), len(abstract), len(url), len(raw_bib))
+    return header + title + abstract + url + raw_bib
+
+
+def pack_record(bib: str) -> str:
+    """将Bib解析并编码为存储格式（v1）"""
+    return encode_payload(record_payload(build_record(bib)))
+
+
+def encode_payload(payload: bytes) -> str:
+    """将payload编码为v1格式"""
+    return RECORD_PREFIX + base64.b64encode(zlib.compress(payload)).decode('ascii')
+
+
+def pack_record_v2(bib: str, dict_id: int, zdict: bytes) -> bytes:
+    """将Bib解析并编码为v2二进制格式"""
+    return encode_payload_v2(record_payload(build_record(bib)), dict_id, zdict)
+
+
+def encode_payload_v2(payload: bytes, dict_id: int, zdict: bytes) -> bytes:
+    """以预置字典压缩payload（迁移工具直接转码v1记录，不重新解析Bib）"""
+    compressor = zlib.compressobj(9, zlib.DEFLATED, _WBITS_RAW, zdict=zdict)
+    return (_V2_HEADER.pack(RECORD_PREFIX_V2, dict_id)
+            + compressor.compress(payload) + compressor.flush())
+
+
+def is_record_v2(value: Union[str, bytes]) -> bool:
+    """是否为v2二进制格式"""
+    return isinstance(value, bytes) and value[:2] == RECORD_PREFIX_V2
+
+
+def record_dict_id(value: bytes) -> int:
+    """v2记录使用的字典ID"""
+    return _V2_HEADER.unpack_from(value)[1]
+
+
+def is_record(value: Union[str, bytes]) -> bool:
+    """是否为预解析记录格式（v1或v2）"""
+    if isinstance(value, bytes):
+        return value[:2] == RECORD_PREFIX_V2 or value.startswith(RECORD_PREFIX.encode('ascii'))
+    return bool(value) and value.startswith(RECORD_PREFIX)
+
+
+def _decompress(compressed: bytes, with_bib: bool, wbits: int = zlib.MAX_WBITS,
+                zdict: Optional[bytes] = None) -> bytes:
+    decompressor = (zlib.decompressobj(wbits, zdict=zdict) if zdict
+                    else zlib.decompressobj(wbits))
+    if with_bib:
+        return decompressor.decompress(compressed) + decompressor.flush()
+    payload = decompressor.decompress(compressed, _HEADER.size)
+    year, t_len, a_len, u_len, _ = _HEADER.unpack_from(payload)
+    # 只解压到字段末尾，跳过Bib正文
+    return payload + decompressor.decompress(
+        decompressor.unconsumed_tail, t_len + a_len + u_len
+    )
+
+
+def unpack_payload(value: Union[str, bytes], zdict: Optional[bytes] = None) -> Optional[bytes]:
+    """
+    取出预解析记录的完整payload（迁移工具与字典训练使用）
+
+    Returns:
+        payload；非预解析记录格式时返回None
+    """
+    if is_record_v2(value):
+        return _decompress(value[_V2_HEADER.size:], True, _WBITS_RAW, zdict)
+    if isinstance(value, bytes):
+        value = value.decode('ascii', errors='replace')
+    if not is_record(value):
+        return None
+    return zlib.decompress(base64.b64decode(value[len(RECORD_PREFIX):]))
+
+
+def unpack_record(value: Union[str, bytes], with_bib: bool = True,
+                  zdict: Optional[bytes] = None) -> PaperRecord:
+    """
+    解码存储值
+
+    Args:
+        value: Redis中的Value（v2二进制、v1或旧格式）
+        with_bib: 是否需要Bib原文；False 时只解压字段部分（Worker热路径）
+        zdict: v2记录的预置字典（按 record_dict_id 取得）
+
+    Returns:
+        PaperRecord（旧格式回退为运行时解析）
+    """
+    if is_record_v2(value):
+        payload = _decompress(value[_V2_HEADER.size:], with_bib, _WBITS_RAW, zdict)
+    else:
+        if isinstance(value, bytes):
+            value = value.decode('utf-8', errors='replace')
+        if not is_record(value):
+            return build_record(_decode_legacy(value))
+        payload = _decompress(base64.b64decode(value[len(RECORD_PREFIX):]), with_bib)
+
+    year, t_len, a_len, u_len, b_len = _HEADER.unpack_from(payload)
+    pos = _HEADER.size
+    title = payload[pos:pos + t_len].decode('utf-8')
+    pos += t_len
+    abstract = payload[pos:pos + a_len].decode('utf-8')
+    pos += a_len
+    url = payload[pos:pos + u_len].decode('utf-8')
+    pos += u_len
+    bib = payload[pos:pos + b_len].decode('utf-8') if with_bib else ''
+    return PaperRecord(title, abstract, url, year, bib)
+
+
+def _decode_legacy(value: str) -> str:
+    """解码旧格式 base64(zlib(bib))，失败时视为原文"""
+    try:
+        return zlib.decompress(base64.b64decode(value.encode('ascii'))).decode('utf-8')
+    except Exception:
+        return value or ''
+
+
+def train_dictionary(samples: List[bytes], size: int = MAX_DICT_SIZE) -> bytes:
+    """
+    从样本payload训练预置字典
+
+    统计1~4个连续词元组成的片段在多少条样本中出现，按 出现条数 × 长度 选取，
+    直到填满字典；得分最高的片段放在末尾（deflate回溯距离越短编码越省）
+
+    Args:
+        samples: 样本payload（record_payload 的结果）
+        size: 字典大小上限（字节，不超过32KB）
+    """
+    size = min(size, MAX_DICT_SIZE)
+    counts: Counter = Counter()
+    for sample in samples:
+        tokens = _TOKEN_RE.findall(sample)
+        segments = set()
+        for n in range(1, _MAX_NGRAM + 1):
+            for i in range(len(tokens) - n + 1):
+                segment = b''.join(tokens[i:i + n])
+                if len(segment) >= _MIN_SEGMENT:
+                    segments.add(segment)
+        counts.update(segments)
+
+    min_count = max(2, len(samples) // 100)
+    candidates = sorted(
+        ((df * len(segment), segment) for segment, df in counts.items() if df >= min_count),
+        reverse=True
+    )
+    chosen = []
+    total = 0
+    for _, segment in candidates:
+        if total + len(segment) > size:
+            continue
+        chosen.append(segment)
+        total += len(segment)
+    return b''.join(reversed(chosen))
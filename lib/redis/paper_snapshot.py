@@ -0,0 +1,245 @@
+"""
+文献Block列式快照编码模块 (新架构)
+整个Block存为一个String（与Hash格式共用 meta:{Journal}:{Year} 这个Key，按类型区分），
+一次 GET 取回、一遍解码，不再对每篇文献单独解压；也没有Hash的逐Field内存开销
+
+布局（整数均为小端）:
+- 头部 struct('<4sHII'): magic "APS1", 字典ID（0表示不用字典）, 文献数, 索引段长度
+- 帧表: ceil(文献数 / FRAME_SIZE) 个 uint32，每帧的压缩长度
+- 索引段（压缩）: DOI列，以 "\\n" 连接；顺序与 idx:block_dois 一致，切片区间直接按下标取
+- 帧（各自压缩）: 每 FRAME_SIZE 篇一帧，帧内按列存放
+      year[u16 × n] + len(title)/len(abstract)/len(url)/len(bib)[各 u32 × n]
+      + 全部title + 全部abstract + 全部url + 全部bib
+
+读取方式:
+- 字段列在帧内位于Bib列之前，Worker热路径只解压到字段列末尾，不解压Bib正文
+- Bib与同帧的title/abstract在同一压缩流中，重复文本以回溯引用编码，不重复占用空间
+- 单篇查询先 GETRANGE 头部+帧表+索引段（SNAPSHOT_PEEK 字节内通常已包含），
+  再 GETRANGE 所在的一帧
+
+压缩: raw deflate；指定字典时使用与v2记录相同的预置字典（见 paper_record.py / paper_dict.py）
+"""
+
+import struct
+import zlib
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from .paper_record import PaperRecord
+
+SNAPSHOT_MAGIC = b"APS1"
+
+_HEADER = struct.Struct('<4sHII')
+_U32 = struct.Struct('<I')
+
+# 每帧的文献数（单篇查询只解压所在帧；Bib须在其title/abstract的32KB窗口内）
+FRAME_SIZE = 16
+
+# 单篇查询第一次读取的字节数（头部+帧表+索引段）
+SNAPSHOT_PEEK = 32768
+
+_WBITS_RAW = -15
+
+# 帧内每篇的定长部分: year(u16) + 4个长度(u32)
+_ROW_SIZE = 2 + 4 * 4
+
+
+class SnapshotHeader(NamedTuple):
+    """快照头部"""
+    dict_id: int
+    count: int
+    frame_lens: Tuple[int, ...]
+    index_offset: int
+    index_len: int
+
+    @property
+    def frames_offset(self) -> int:
+        return self.index_offset + self.index_len
+
+    def frame_span(self, frame: int) -> Tuple[int, int]:
+        """第 frame 帧的 (起始偏移, 长度)"""
+        offset = self.frames_offset + sum(self.frame_lens[:frame])
+        return offset, self.frame_lens[frame]
+
+
+def _compress(data: bytes, zdict: Optional[bytes]) -> bytes:
+    compressor = (zlib.compressobj(9, zlib.DEFLATED, _WBITS_RAW, zdict=zdict) if zdict
+                  else zlib.compressobj(9, zlib.DEFLATED, _WBITS_RAW))
+    return compressor.compress(data) + compressor.flush()
+
+
+def _decompressor(zdict: Optional[bytes]):
+    return zlib.decompressobj(_WBITS_RAW, zdict=zdict) if zdict else zlib.decompressobj(_WBITS_RAW)
+
+
+def _decompress(data: bytes, zdict: Optional[bytes]) -> bytes:
+    decompressor = _decompressor(zdict)
+    return decompressor.decompress(data) + decompressor.flush()
+
+
+def _pack_lengths(values: Sequence[bytes]) -> bytes:
+    return struct.pack(f'<{len(values)}I', *(len(v) for v in values))
+
+
+def _split(data: bytes, lengths: Sequence[int], offset: int) -> Tuple[List[str], int]:
+    """按长度列切出字符串列，返回 (列, 结束偏移)"""
+    values = []
+    for length in lengths:
+        values.append(data[offset:offset + length].decode('utf-8'))
+        offset += length
+    return values, offset
+
+
+def is_snapshot(value) -> bool:
+    """是否为列式快照"""
+    return isinstance(value, bytes) and value[:4] == SNAPSHOT_MAGIC
+
+
+def _encode_frame(records: Sequence[PaperRecord], zdict: Optional[bytes]) -> bytes:
+    titles = [r.title.encode('utf-8') for r in records]
+    abstracts = [r.abstract.encode('utf-8') for r in records]
+    urls = [r.url.encode('utf-8') for r in records]
+    bibs = [r.bib.encode('utf-8') for r in records]
+    return _compress(
+        struct.pack(f'<{len(records)}H', *(r.year for r in records))
+        + _pack_lengths(titles) + _pack_lengths(abstracts) + _pack_lengths(urls) + _pack_lengths(bibs)
+        + b''.join(titles) + b''.join(abstracts) + b''.join(urls) + b''.join(bibs),
+        zdict
+    )
+
+
+def encode_snapshot(records: Sequence[Tuple[str, PaperRecord]], dict_id: int = 0,
+                    zdict: Optional[bytes] = None) -> bytes:
+    """
+    编码列式快照
+
+    Args:
+        records: [(DOI, PaperRecord), ...]，顺序即快照内的下标顺序
+        dict_id: 预置字典ID（0表示不用字典）
+        zdict: 预置字典
+    """
+    zdict = zdict if dict_id else None
+    index = _compress('\n'.join(doi for doi, _ in records).encode('utf-8'), zdict)
+    frames = [
+        _encode_frame([r for _, r in records[start:start + FRAME_SIZE]], zdict)
+        for start in range(0, len(records), FRAME_SIZE)
+    ]
+    return b''.join([
+        _HEADER.pack(SNAPSHOT_MAGIC, dict_id, len(records), len(index)),
+        struct.pack(f'<{len(frames)}I', *(len(f) for f in frames)),
+        index,
+        *frames,
+    ])
+
+
+def read_count(prefix: bytes) -> int:
+    """快照中的文献数（只需头部）"""
+    if len(prefix) < _HEADER.size or prefix[:4] != SNAPSHOT_MAGIC:
+        return 0
+    return _HEADER.unpack_from(prefix)[2]
+
+
+def read_header(prefix: bytes) -> Optional[SnapshotHeader]:
+    """
+    解析头部与帧表
+
+    Returns:
+        SnapshotHeader；prefix 不足以包含帧表时返回None
+    """
+    if len(prefix) < _HEADER.size:
+        return None
+    magic, dict_id, count, index_len = _HEADER.unpack_from(prefix)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("不是列式快照")
+    frame_count = (count + FRAME_SIZE - 1) // FRAME_SIZE
+    index_offset = _HEADER.size + frame_count * _U32.size
+    if len(prefix) < index_offset:
+        return None
+    return SnapshotHeader(
+        dict_id=dict_id,
+        count=count,
+        frame_lens=struct.unpack_from(f'<{frame_count}I', prefix, _HEADER.size),
+        index_offset=index_offset,
+        index_len=index_len,
+    )
+
+
+def decode_dois(blob: bytes, header: SnapshotHeader, zdict: Optional[bytes] = None) -> List[str]:
+    """解码DOI列（blob 至少包含到索引段末尾）"""
+    if not header.count:
+        return []
+    data = blob[header.index_offset:header.frames_offset]
+    return _decompress(data, zdict).decode('utf-8').split('\n')
+
+
+def frame_size(header: SnapshotHeader, frame: int) -> int:
+    """第 frame 帧的文献数"""
+    return min(FRAME_SIZE, header.count - frame * FRAME_SIZE)
+
+
+def decode_frame(data: bytes, count: int, zdict: Optional[bytes] = None,
+                 with_bib: bool = True) -> List[PaperRecord]:
+    """
+    解码一帧
+
+    Args:
+        data: 帧的压缩数据
+        count: 帧内文献数
+        with_bib: False 时只解压到字段列末尾，记录的 bib 为空
+    """
+    decompressor = _decompressor(zdict)
+    raw = decompressor.decompress(data, count * _ROW_SIZE)
+    years = struct.unpack_from(f'<{count}H', raw)
+    lengths = struct.unpack_from(f'<{count * 4}I', raw, count * 2)
+    t_lens, a_lens = lengths[:count], lengths[count:count * 2]
+    u_lens, b_lens = lengths[count * 2:count * 3], lengths[count * 3:]
+    if with_bib:
+        raw += decompressor.decompress(decompressor.unconsumed_tail) + decompressor.flush()
+    else:
+        raw += decompressor.decompress(decompressor.unconsumed_tail,
+                                       sum(t_lens) + sum(a_lens) + sum(u_lens))
+
+    titles, offset = _split(raw, t_lens, count * _ROW_SIZE)
+    abstracts, offset = _split(raw, a_lens, offset)
+    urls, offset = _split(raw, u_lens, offset)
+    bibs = _split(raw, b_lens, offset)[0] if with_bib else [''] * count
+    return [PaperRecord(titles[i], abstracts[i], urls[i], years[i], bibs[i]) for i in range(count)]
+
+
+def decode_snapshot(blob: bytes, zdict: Optional[bytes] = None, with_bib: bool = True,
+                    span: Optional[Tuple[int, int]] = None,
+                    dois: Optional[Sequence[str]] = None) -> Dict[str, PaperRecord]:
+    """
+    解码快照
+
+    Args:
+        blob: 完整快照
+        zdict: 预置字典（header.dict_id 非0时必需）
+        with_bib: 是否解压Bib列；False 时记录的 bib 为空（Worker热路径）
+        span: 只取下标闭区间 [start, end]（Block切片）
+        dois: 只取这些DOI（重试Block、批量查询）
+
+    Returns:
+        {DOI: PaperRecord}
+    """
+    header = read_header(blob)
+    if header is None or not header.count:
+        return {}
+    count = header.count
+    all_dois = decode_dois(blob, header, zdict)
+
+    if span is not None:
+        wanted = range(max(0, span[0]), min(count - 1, span[1]) + 1)
+    elif dois is not None:
+        position = {doi: i for i, doi in enumerate(all_dois)}
+        wanted = sorted(position[d] for d in set(dois) if d in position)
+    else:
+        wanted = range(count)
+
+    records: Dict[int, PaperRecord] = {}
+    for frame in sorted({i // FRAME_SIZE for i in wanted}):
+        start, length = header.frame_span(frame)
+        decoded = decode_frame(blob[start:start + length], frame_size(header, frame), zdict, with_bib)
+        for j, record in enumerate(decoded):
+            records[frame * FRAME_SIZE + j] = record
+
+    return {all_dois[i]: records[i] for i in wanted}
@@ -0,0 +1,88 @@
+"""
+进程注册表模块 (新架构)
+Worker进程（运行调度器与执行引擎的进程）定期上报运行快照，
+Web进程据此汇总整个集群的Worker数、TPM/RPM与各查询的AI并发
+
+Key设计:
+- proc:{process_id} (String) - 进程快照（JSON），TTL内未续期视为进程已退出
+- proc:index        (Set)    - 所有上报过的进程ID（读取时清理已过期的成员）
+"""
+
+import json
+from typing import Dict, List
+
+from .connection import get_redis_client
+
+KEY_PROC_INDEX = "proc:index"
+
+# 快照有效期（秒），应大于上报间隔的数倍
+TTL_PROCESS = 15
+
+
+class ProcessRegistry:
+    """进程注册表管理器"""
+
+    @staticmethod
+    def _key_process(process_id: str) -> str:
+        return f"proc:{process_id}"
+
+    @classmethod
+    def heartbeat(cls, process_id: str, snapshot: Dict, ttl: int = TTL_PROCESS) -> bool:
+        """上报进程快照并续期"""
+        client = get_redis_client()
+        if not client or not process_id:
+            return False
+
+        try:
+            pipe = client.pipeline()
+            pipe.set(cls._key_process(process_id), json.dumps(snapshot, ensure_ascii=False), ex=ttl)
+            pipe.sadd(KEY_PROC_INDEX, process_id)
+            pipe.execute()
+            return True
+        except Exception as e:
+            print(f"[ProcessRegistry] 上报失败 {process_id}: {e}")
+            return False
+
+    @classmethod
+    def unregister(cls, process_id: str) -> bool:
+        """进程正常退出时注销"""
+        client = get_redis_client()
+        if not client or not process_id:
+            return False
+
+        try:
+            pipe = client.pipeline()
+            pipe.delete(cls._key_process(process_id))
+            pipe.srem(KEY_PROC_INDEX, process_id)
+            pipe.execute()
+            return True
+        except Exception:
+            return False
+
+    @classmethod
+    def get_all(cls) -> List[Dict]:
+        """获取所有存活进程的快照"""
+        client = get_redis_client()
+        if not client:
+            return []
+
+        try:
+            process_ids = sorted(client.smembers(KEY_PROC_INDEX) or [])
+            if not process_ids:
+                return []
+            values = client.mget([cls._key_process(pid) for pid in process_ids])
+            snapshots = []
+            expired = []
+            for pid, value in zip(process_ids, values):
+                if value is None:
+                    expired.append(pid)
+                    continue
+                try:
+                    snapshots.append(json.loads(value))
+                except (json.JSONDecodeError, TypeError):
+                    expired.append(pid)
+            if expired:
+                client.srem(KEY_PROC_INDEX, *expired)
+            return snapshots
+        except Exception:
+            return []
@@ -0,0 +1,204 @@
+"""
+分布式限流模块 (新架构)
+以Redis令牌桶实现跨进程共享的TPM/RPM限额，多个后端容器共用同一份API额度
+
+Key设计:
+- ratelimit:global       (Hash) - 全局令牌桶（容量为所有Key限额之和）
+- ratelimit:key:{key_id} (Hash) - 单个API Key的令牌桶
+  - t: 剩余Token额度, r: 剩余请求额度, ts: 上次更新时间（Redis TIME）
+
+令牌桶:
+- 容量 = 每分钟限额，按 限额/60 每秒匀速回填（空闲桶满额，允许一分钟内的突发）
+- 获取: 按预估Token数预扣 t 和 1 个 r；全局桶与候选Key桶在同一脚本中原子检查
+- 结算: 调用结束后按实际 usage.total_tokens 与预估的差额调整 t（可为负，之后的请求需等待回填）
+- 退还: 预扣后未发出请求（如Key的熔断探测名额已被占用）时退还 t 和 1 个 r
+- 桶空闲 BUCKET_TTL 秒后过期（届时已回填满额）
+"""
+
+from typing import List, Optional, Tuple
+
+from .connection import get_script
+
+KEY_GLOBAL_BUCKET = "ratelimit:global"
+
+# 空闲令牌桶过期时间（秒），超过一个回填周期即可
+BUCKET_TTL = 120
+
+
+# KEYS[1] 全局桶, KEYS[2..n] 候选Key桶（按优先顺序）
+# ARGV[1] 预估Token, ARGV[2] 全局TPM, ARGV[3] 全局RPM, 之后每个候选Key两个参数 (tpm, rpm)
+# 返回 {选中的候选序号(从1开始，0表示都不可用), 建议等待秒数}
+ACQUIRE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local need = tonumber(ARGV[1])
+
+local function load(key, tpm, rpm)
+    local v = redis.call('HMGET', key, 't', 'r', 'ts')
+    local t = tonumber(v[1]) or tpm
+    local r = tonumber(v[2]) or rpm
+    local ts = tonumber(v[3]) or now
+    local dt = math.max(0, now - ts)
+    t = math.min(tpm, t + dt * tpm / 60)
+    r = math.min(rpm, r + dt * rpm / 60)
+    return t, r
+end
+
+local function wait_for(t, r, tpm, rpm)
+    -- 预估超过桶容量时按满桶计，避免永远无法获取
+    local n = math.min(need, tpm)
+    local w = 0
+    if t < n then w = (n - t) * 60 / tpm end
+    if r < 1 then w = math.max(w, (1 - r) * 60 / rpm) end
+    return w
+end
+
+local function save(key, t, r)
+    redis.call('HSET', key, 't', tostring(t), 'r', tostring(r), 'ts', tostring(now))
+    redis.call('EXPIRE', key, ARGV[#ARGV])
+end
+
+local gtpm = tonumber(ARGV[2])
+local grpm = tonumber(ARGV[3])
+local gt, gr = load(KEYS[1], gtpm, grpm)
+local gwait = wait_for(gt, gr, gtpm, grpm)
+if gwait > 0 then
+    return {0, tostring(gwait)}
+end
+
+local best = nil
+for i = 2, #KEYS do
+    local tpm = tonumber(ARGV[2 + (i - 1) * 2])
+    local rpm = tonumber(ARGV[3 + (i - 1) * 2])
+    local t, r = load(KEYS[i], tpm, rpm)
+    local w = wait_for(t, r, tpm, rpm)
+    if w <= 0 then
+        save(KEYS[i], t - need, r - 1)
+        save(KEYS[1], gt - need, gr - 1)
+        return {i - 1, '0'}
+    end
+    if best == nil or w < best then
+        best = w
+    end
+end
+return {0, tostring(best or 1)}
+"""
+
+
+# 结算差额：只调整仍存在的桶（已过期的桶视为满额，无需结算）
+# KEYS 为需要结算的桶, ARGV[1] Token差额(实际-预估), ARGV[2] TTL
+RECONCILE_SCRIPT = """
+for i = 1, #KEYS do
+    if redis.call('EXISTS', KEYS[i]) == 1 then
+        redis.call('HINCRBYFLOAT', KEYS[i], 't', -tonumber(ARGV[1]))
+        redis.call('EXPIRE', KEYS[i], ARGV[2])
+    end
+end
+return 1
+"""
+
+
+# 退还预扣额度：只调整仍存在的桶
+# KEYS 为需要退还的桶, ARGV[1] Token数, ARGV[2] TTL
+REFUND_SCRIPT = """
+for i = 1, #KEYS do
+    if redis.call('EXISTS', KEYS[i]) == 1 then
+        redis.call('HINCRBYFLOAT', KEYS[i], 't', tonumber(ARGV[1]))
+        redis.call('HINCRBYFLOAT', KEYS[i], 'r', 1)
+        redis.call('EXPIRE', KEYS[i], ARGV[2])
+    end
+end
+return 1
+"""
+
+
+class RateLimiter:
+    """Redis令牌桶限流器"""
+
+    @staticmethod
+    def _key_bucket(key_id: str) -> str:
+        return f"ratelimit:key:{key_id}"
+
+    @classmethod
+    def try_acquire(cls, candidates: List[Tuple[str, int, int]],
+                    global_limits: Tuple[int, int],
+                    tokens: int) -> Optional[Tuple[int, float]]:
+        """
+        尝试从全局桶和某个候选Key桶预扣额度（一次脚本往返）
+
+        Args:
+            candidates: [(key_id, tpm_limit, rpm_limit), ...]，按优先顺序
+            global_limits: (全局TPM, 全局RPM)
+            tokens: 本次请求的预估Token数
+
+        Returns:
+            (选中的候选下标, 0)；额度不足时为 (-1, 建议等待秒数)；Redis不可用时返回None
+        """
+        if not candidates:
+            return -1, 1.0
+
+        script = get_script(ACQUIRE_SCRIPT)
+        if script is None:
+            return None
+
+        keys = [KEY_GLOBAL_BUCKET] + [cls._key_bucket(key_id) for key_id, _, _ in candidates]
+        args = [str(max(0, int(tokens))), str(max(1, global_limits[0])), str(max(1, global_limits[1]))]
+        for _, tpm, rpm in candidates:
+            args.extend([str(max(1, tpm)), str(max(1, rpm))])
+        args.append(str(BUCKET_TTL))
+
+        try:
+            index, wait = script(keys=keys, args=args)
+            return int(index) - 1, float(wait)
+        except Exception as e:
+            print(f"[RateLimiter] 获取额度失败: {e}")
+            return None
+
+    @classmethod
+    def reconcile(cls, key_id: str, delta: int) -> bool:
+        """
+        按实际用量结算（delta = 实际Token - 预估Token，负数表示退还）
+
+        Args:
+            key_id: API Key标识
+            delta: Token差额
+        """
+        if not delta:
+            return True
+
+        script = get_script(RECONCILE_SCRIPT)
+        if script is None:
+            return False
+
+        try:
+            script(
+                keys=[KEY_GLOBAL_BUCKET, cls._key_bucket(key_id)],
+                args=[str(delta), str(BUCKET_TTL)],
+            )
+            return True
+        except Exception as e:
+            print(f"[RateLimiter] 结算失败 key={key_id}: {e}")
+            return False
+
+    @classmethod
+    def refund(cls, key_id: str, tokens: int) -> bool:
+        """
+        退还 try_acquire() 预扣的额度（请求未发出）
+
+        Args:
+            key_id: API Key标识
+            tokens: 预扣的Token数
+        """
+        script = get_script(REFUND_SCRIPT)
+        if script is None:
+            return False
+
+        try:
+            script(
+                keys=[KEY_GLOBAL_BUCKET, cls._key_bucket(key_id)],
+                args=[str(max(0, int(tokens))), str(BUCKET_TTL)],
+            )
+            return True
+        except Exception as e:
+            print(f"[RateLimiter] 退还额度失败 key={key_id}: {e}")
+            return False
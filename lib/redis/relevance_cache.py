@@ -0,0 +1,142 @@
+"""
+相关性结果缓存模块 (新架构)
+跨查询复用AI相关性判断结果，相同输入不再重复调用AI
+
+Key设计:
+- relcache:{sha1} (String) - JSON {relevant, reason}
+  - sha1 = hash(规范化研究问题, 规范化筛选要求, DOI, model_name, system_prompt哈希)
+  - 带TTL，命中时刷新TTL（滑动过期，近似LRU：长期未被命中的条目自然淘汰）
+- relcache:stats (Hash) - 命中统计
+  - hits / misses / stores
+
+说明:
+- 文献Block等永久Key与缓存共用同一个Redis，不能开启 allkeys-lru，
+  因此缓存条目依靠TTL淘汰
+- system_prompt 修改（或界面语言不同）后哈希随之变化，旧条目自动失效
+"""
+
+import hashlib
+import json
+import re
+from typing import Optional, Dict
+
+from .connection import get_redis_client
+
+# 默认缓存时长: 30天
+TTL_RELEVANCE_CACHE = 30 * 24 * 3600
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def _normalize(text: str) -> str:
+    """规范化文本：合并空白并忽略大小写"""
+    return _WHITESPACE_RE.sub(' ', text or '').strip().casefold()
+
+
+class RelevanceCache:
+    """相关性结果缓存管理器"""
+
+    PREFIX = "relcache:"
+    STATS_KEY = "relcache:stats"
+
+    @classmethod
+    def build_key(cls, research_question: str, requirements: str, doi: str,
+                  model_name: str, system_prompt: str) -> str:
+        """
+        生成内容寻址的缓存Key
+
+        Args:
+            research_question: 研究问题
+            requirements: 筛选要求
+            doi: 文献DOI
+            model_name: 模型名称
+            system_prompt: 渲染后的系统提示词（已替换语言占位符）
+        """
+        prompt_hash = hashlib.sha1((system_prompt or '').encode('utf-8')).hexdigest()
+        material = '\x1f'.join([
+            _normalize(research_question),
+            _normalize(requirements),
+            (doi or '').strip().lower(),
+            model_name or '',
+            prompt_hash,
+        ])
+        return f"{cls.PREFIX}{hashlib.sha1(material.encode('utf-8')).hexdigest()}"
+
+    @classmethod
+    def get(cls, cache_key: str, ttl: int = TTL_RELEVANCE_CACHE) -> Optional[Dict]:
+        """
+        读取缓存结果，命中时刷新TTL
+
+        Returns:
+            {relevant, reason}，未命中返回None
+        """
+        client = get_redis_client()
+        if not client:
+            return None
+
+        try:
+            pipe = client.pipeline()
+            pipe.get(cache_key)
+            pipe.expire(cache_key, ttl)
+            data, _ = pipe.execute()
+            client.hincrby(cls.STATS_KEY, 'hits' if data else 'misses', 1)
+            if data:
+                return json.loads(data)
+            return None
+        except Exception:
+            return None
+
+    @classmethod
+    def set(cls, cache_key: str, relevant: str, reason: str,
+            ttl: int = TTL_RELEVANCE_CACHE) -> bool:
+        """写入缓存结果"""
+        client = get_redis_client()
+        if not client:
+            return False
+
+        try:
+            value = json.dumps({'relevant': relevant, 'reason': reason}, ensure_ascii=False)
+            pipe = client.pipeline()
+            pipe.set(cache_key, value, ex=ttl)
+            pipe.hincrby(cls.STATS_KEY, 'stores', 1)
+            pipe.execute()
+            return True
+        except Exception:
+            return False
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, int]:
+        """
+        获取命中统计
+
+        Returns:
+            {hits, misses, stores, hit_rate}
+        """
+        client = get_redis_client()
+        stats = {'hits': 0, 'misses': 0, 'stores': 0, 'hit_rate': 0.0}
+        if not client:
+            return stats
+
+        try:
+            raw = client.hgetall(cls.STATS_KEY) or {}
+            for field in ('hits', 'misses', 'stores'):
+                stats[field] = int(raw.get(field, 0) or 0)
+            lookups = stats['hits'] + stats['misses']
+            if lookups > 0:
+                stats['hit_rate'] = round(stats['hits'] / lookups, 4)
+            return stats
+        except Exception:
+            return stats
+
+    @classmethod
+    def reset_stats(cls) -> bool:
+        """清空命中统计"""
+        client = get_redis_client()
+        if not client:
+            return False
+
+        try:
+            client.delete(cls.STATS_KEY)
+            return True
+        except Exception:
+            return False
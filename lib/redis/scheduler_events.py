@@ -0,0 +1,161 @@
+"""
+调度事件模块 (新架构)
+查询入队后发布唤醒事件，调度器阻塞等待事件并立即启动Worker，
+不再每0.5秒轮询MySQL的 query_log
+
+Key设计:
+- sched:events (Stream) - 调度事件流
+  - 字段: uid, qid, distill ("1"/"0"), ts
+  - 消费组 scheduler：多个后端进程时每个事件只被一个调度器领取
+  - 读取后立即确认；进程在读取与确认之间退出时，事件留在消费组的待确认列表中，
+    空闲超过 RECLAIM_IDLE_MS 后由其他调度器领取（XAUTOCLAIM）
+"""
+
+import os
+import socket
+import time
+from typing import Dict, List, Optional
+
+from .connection import get_redis_client
+
+KEY_SCHED_EVENTS = "sched:events"
+SCHED_GROUP = "scheduler"
+
+# 事件流最大长度（近似裁剪，事件领取后即确认，无需长期保留）
+MAX_EVENTS = 10000
+
+# 待确认事件空闲多久后可被其他调度器领取（毫秒）及检查间隔（秒）
+RECLAIM_IDLE_MS = 30000
+RECLAIM_INTERVAL = 10
+
+
+class SchedulerEvents:
+    """调度事件流管理器"""
+
+    _group_ready = False
+    _last_reclaim = 0.0
+    _consumer = f"{socket.gethostname()}-{os.getpid()}"
+
+    @classmethod
+    def publish_query(cls, uid: int, qid: str, is_distillation: bool = False) -> bool:
+        """
+        发布"查询已入队"事件（produce_tasks / distillation_producer 调用）
+
+        Args:
+            uid: 用户ID
+            qid: 查询ID
+            is_distillation: 是否为蒸馏任务
+        """
+        client = get_redis_client()
+        if not client or uid <= 0 or not qid:
+            return False
+
+        try:
+            client.xadd(
+                KEY_SCHED_EVENTS,
+                {
+                    'uid': str(uid),
+                    'qid': qid,
+                    'distill': '1' if is_distillation else '0',
+                    'ts': str(time.time()),
+                },
+                maxlen=MAX_EVENTS,
+                approximate=True,
+            )
+            return True
+        except Exception as e:
+            print(f"[SchedulerEvents] 发布事件失败 {qid}: {e}")
+            return False
+
+    @classmethod
+    def _ensure_group(cls, client) -> None:
+        """创建消费组（已存在时忽略）"""
+        if cls._group_ready:
+            return
+        try:
+            client.xgroup_create(KEY_SCHED_EVENTS, SCHED_GROUP, id='$', mkstream=True)
+        except Exception as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+        cls._group_ready = True
+
+    @classmethod
+    def read(cls, block_ms: int = 1000, count: int = 100) -> Optional[List[Dict]]:
+        """
+        阻塞读取新事件（连同其他调度器遗留的待确认事件），读取后立即确认
+
+        未能及时处理的事件（如系统满载）由调度器在内存中暂存，进程崩溃时随之丢失，
+        由调度器定期的MySQL恢复扫描兜底
+
+        Args:
+            block_ms: 最长阻塞毫秒数
+            count: 单次最多读取的事件数
+
+        Returns:
+            [{uid, qid, is_distillation}, ...]；Redis不可用时返回None
+        """
+        client = get_redis_client()
+        if not client:
+            return None
+
+        try:
+            cls._ensure_group(client)
+            messages = cls._reclaim(client, count)
+            response = client.xreadgroup(
+                SCHED_GROUP, cls._consumer, {KEY_SCHED_EVENTS: '>'},
+                count=count, block=block_ms
+            )
+        except Exception as e:
+            # 事件流被删除（如清空Redis）后需要重建消费组
+            cls._group_ready = False
+            print(f"[SchedulerEvents] 读取事件失败: {e}")
+            return None
+
+        for _, stream_messages in response or []:
+            messages.extend(stream_messages)
+
+        events = []
+        ids = []
+        for message_id, fields in messages:
+            ids.append(message_id)
+            if not fields:
+                # 已被裁剪出事件流的待确认事件
+                continue
+            try:
+                events.append({
+                    'uid': int(fields.get('uid', 0)),
+                    'qid': fields.get('qid', ''),
+                    'is_distillation': fields.get('distill') == '1',
+                })
+            except (TypeError, ValueError):
+                continue
+
+        if ids:
+            try:
+                client.xack(KEY_SCHED_EVENTS, SCHED_GROUP, *ids)
+            except Exception:
+                pass
+
+        return events
+
+    @classmethod
+    def _reclaim(cls, client, count: int) -> List:
+        """
+        领取其他调度器读取后未确认（进程退出）的事件，每 RECLAIM_INTERVAL 秒检查一次
+
+        Returns:
+            [(message_id, fields), ...]
+        """
+        now = time.time()
+        if now - cls._last_reclaim < RECLAIM_INTERVAL:
+            return []
+        cls._last_reclaim = now
+
+        reply = client.xautoclaim(
+            KEY_SCHED_EVENTS, SCHED_GROUP, cls._consumer,
+            min_idle_time=RECLAIM_IDLE_MS, start_id='0-0', count=count
+        )
+        messages = list(reply[1]) if reply and len(reply) > 1 else []
+        if messages:
+            print(f"[SchedulerEvents] 领取 {len(messages)} 个未确认的调度事件")
+        return messages
@@ -9,6 +9,7 @@ Key设计:
 - permission_min: 用户权限最小值 (默认 1)
 - permission_max: 用户权限最大值 (默认 10)
 - distill_rate: 蒸馏任务价格系数 (默认 0.1)
+- cache_hit_rate: 相关性缓存命中时的价格系数 (默认 1.0)
 """
 
 from typing import Optional, Tuple, Dict
@@ -26,6 +27,7 @@ class SystemConfig:
         'permission_min': '1',
         'permission_max': '10',
         'distill_rate': '0.1',
+        'cache_hit_rate': '1.0',
     }
     
     @classmethod
@@ -185,6 +187,16 @@ class SystemConfig:
         """
         return cls.get_float('distill_rate', 0.1)
     
+    @classmethod
+    def get_cache_hit_rate(cls) -> float:
+        """
+        获取相关性缓存命中时的价格系数
+        
+        Returns:
+            命中缓存的文献按 价格×系数 扣费，默认 1.0（与正常调用同价）
+        """
+        return cls.get_float('cache_hit_rate', 1.0)
+    
     @classmethod
     def set_permission_range(cls, min_val: int, max_val: int) -> bool:
         """设置用户权限范围"""
@@ -198,5 +210,12 @@ class SystemConfig:
         if rate < 0 or rate > 1:
             return False
         return cls.set('distill_rate', str(rate))
+    
+    @classmethod
+    def set_cache_hit_rate(cls, rate: float) -> bool:
+        """设置缓存命中价格系数"""
+        if rate < 0 or rate > 1:
+            return False
+        return cls.set('cache_hit_rate', str(rate))
 
 
@@ -7,13 +7,91 @@ Key设计:
 - query:{uid}:{qid}:status        (Hash) - 任务状态
 - query:{uid}:{qid}:terminate_signal (String) - 终止信号
 - progress:{uid}:{qid}:finished_count (String) - 已完成计数
+- query:{uid}:{qid}:owner         (String) - 运行该查询的进程ID（带TTL，进程定期续期）
+- task:{uid}:{qid}:leases         (ZSet)   - 已领取未完成的Block，score为租约到期时间
+- task:leased_queries             (Set)    - 存在租约的查询 "uid:qid"（回收线程遍历）
+
+Block租约:
+- pop_block 在同一脚本中 LPOP 并登记租约；持有进程定期续约（renew_leases）
+- complete_block 删除租约并累加完成数；租约已被回收时不计数（由重新入队的工作单元计数）
+- Worker线程或整个进程异常退出后租约过期，由回收线程（见 process/block_lease.py）
+  通过 claim_expired_leases 领取并重新入队，避免 finished_blocks 永远达不到 total_blocks
+- 回收中的租约以 REAP_PREFIX 为前缀暂存，回收进程中途退出时到期后再次被回收
 """
 
 import json
 import time
 from typing import Optional, Dict, List, Any
 
-from .connection import get_redis_client
+from .connection import get_redis_client, get_script
+
+# 查询归属的有效期（秒），运行查询的进程每5秒续期
+TTL_OWNER = 30
+
+# 归属不存在或已属于本进程时（重新）登记并续期
+CLAIM_OWNER_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if not current or current == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+    return 1
+end
+return 0
+"""
+
+# 仅释放本进程持有的归属
+RELEASE_OWNER_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+KEY_LEASED_QUERIES = "task:leased_queries"
+REAP_PREFIX = "reap:"
+
+# Block租约默认时长（秒）
+DEFAULT_LEASE_SECONDS = 120
+
+# 领取Block并登记租约
+# KEYS: pending, leases, leased_queries; ARGV: 到期时间, "uid:qid"
+LEASE_BLOCK_SCRIPT = """
+local block = redis.call('LPOP', KEYS[1])
+if block then
+    redis.call('ZADD', KEYS[2], ARGV[1], block)
+    redis.call('SADD', KEYS[3], ARGV[2])
+end
+return block
+"""
+
+# 删除租约并累加完成数；租约不存在（已被回收）时返回 -1
+# KEYS: leases, status; ARGV: block_key
+COMPLETE_BLOCK_SCRIPT = """
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 0 then
+    return -1
+end
+return redis.call('HINCRBY', KEYS[2], 'finished_blocks', 1)
+"""
+
+# 领取到期租约：改为回收租约（REAP_PREFIX + Block，到期时间 ARGV[2]）并返回原Block Key；
+# 没有租约的查询从 leased_queries 中移除
+# KEYS: leases, leased_queries; ARGV: 当前时间, 回收租约到期时间, 上限, "uid:qid", 前缀
+CLAIM_EXPIRED_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[3]))
+local blocks = {}
+for _, member in ipairs(expired) do
+    redis.call('ZREM', KEYS[1], member)
+    local block = member
+    if string.sub(member, 1, string.len(ARGV[5])) == ARGV[5] then
+        block = string.sub(member, string.len(ARGV[5]) + 1)
+    end
+    redis.call('ZADD', KEYS[1], ARGV[2], ARGV[5] .. block)
+    table.insert(blocks, block)
+end
+if redis.call('ZCARD', KEYS[1]) == 0 then
+    redis.call('SREM', KEYS[2], ARGV[4])
+end
+return blocks
+"""
 
 
 class TaskQueue:
@@ -35,6 +113,14 @@ class TaskQueue:
     def _key_progress(uid: int, qid: str) -> str:
         return f"progress:{uid}:{qid}:finished_count"
     
+    @staticmethod
+    def _key_owner(uid: int, qid: str) -> str:
+        return f"query:{uid}:{qid}:owner"
+    
+    @staticmethod
+    def _key_leases(uid: int, qid: str) -> str:
+        return f"task:{uid}:{qid}:leases"
+    
     # ==================== 任务队列操作 ====================
     
     @classmethod
@@ -59,31 +145,196 @@ class TaskQueue:
             return False
     
     @classmethod
-    def pop_block(cls, uid: int, qid: str) -> Optional[str]:
+    def pop_block(cls, uid: int, qid: str,
+                  lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[str]:
         """
-        从队列头部弹出一个Block Key（LPOP）
+        从队列头部领取一个Block Key并登记租约（一次脚本往返）
+        
+        领取后须通过 complete_block / push_back_block 结束租约，处理期间定期 renew_leases
         
         Returns:
             Block Key，或None（队列为空）
         """
+        script = get_script(LEASE_BLOCK_SCRIPT)
+        if script is None or uid <= 0 or not qid:
+            return None
+        
+        try:
+            return script(
+                keys=[cls._key_pending(uid, qid), cls._key_leases(uid, qid), KEY_LEASED_QUERIES],
+                args=[str(time.time() + lease_seconds), f"{uid}:{qid}"]
+            )
+        except Exception:
+            return None
+    
+    @classmethod
+    def push_back_block(cls, uid: int, qid: str, block_key: str,
+                        replacement: Optional[str] = None) -> bool:
+        """
+        将Block Key推回队列头部并结束租约（用于预取器关闭、进程退出时交还）
+        
+        Args:
+            replacement: 代替原Block入队的工作单元（如只含未处理文献的重试Block）；None 时推回原Block
+        """
         client = get_redis_client()
-        if not client or uid <= 0 or not qid:
+        if not client or uid <= 0 or not qid or not block_key:
+            return False
+        
+        try:
+            pipe = client.pipeline(transaction=True)
+            pipe.lpush(cls._key_pending(uid, qid), replacement or block_key)
+            pipe.zrem(cls._key_leases(uid, qid), block_key)
+            pipe.execute()
+            return True
+        except Exception:
+            return False
+    
+    @classmethod
+    def complete_block(cls, uid: int, qid: str, block_key: str) -> Optional[int]:
+        """
+        结束Block租约并累加完成数（原子操作）
+        
+        Returns:
+            更新后的完成数；租约已过期被回收时返回None（该Block已重新入队，不重复计数）
+        """
+        script = get_script(COMPLETE_BLOCK_SCRIPT)
+        if script is None or uid <= 0 or not qid or not block_key:
             return None
         
         try:
-            return client.lpop(cls._key_pending(uid, qid))
+            finished = int(script(
+                keys=[cls._key_leases(uid, qid), cls._key_status(uid, qid)],
+                args=[block_key]
+            ))
+        except Exception:
+            return None
+        return finished if finished >= 0 else None
+    
+    @classmethod
+    def renew_leases(cls, uid: int, qid: str, block_keys: List[str],
+                     lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        """续约本进程持有的Block（只更新仍存在的租约，已被回收的不会复活）"""
+        client = get_redis_client()
+        if not client or uid <= 0 or not qid or not block_keys:
+            return False
+        
+        try:
+            deadline = time.time() + lease_seconds
+            client.zadd(cls._key_leases(uid, qid), {key: deadline for key in block_keys}, xx=True)
+            return True
+        except Exception:
+            return False
+    
+    @classmethod
+    def drop_lease(cls, uid: int, qid: str, block_key: str) -> bool:
+        """放弃租约且不重新入队（已终止的任务）"""
+        client = get_redis_client()
+        if not client or uid <= 0 or not qid or not block_key:
+            return False
+        
+        try:
+            client.zrem(cls._key_leases(uid, qid), block_key)
+            return True
+        except Exception:
+            return False
+    
+    @classmethod
+    def get_lease_count(cls, uid: int, qid: str) -> Optional[int]:
+        """已领取未完成的Block数（含回收中的租约）；读取失败时返回None"""
+        client = get_redis_client()
+        if not client or uid <= 0 or not qid:
+            return None
+
+        try:
+            return client.zcard(cls._key_leases(uid, qid)) or 0
         except Exception:
             return None
+
+    @classmethod
+    def get_leased_queries(cls) -> List[tuple]:
+        """存在租约的查询 [(uid, qid), ...]"""
+        client = get_redis_client()
+        if not client:
+            return []
+        
+        try:
+            queries = []
+            for member in client.smembers(KEY_LEASED_QUERIES) or []:
+                uid, _, qid = member.partition(":")
+                if uid.isdigit() and qid:
+                    queries.append((int(uid), qid))
+            return queries
+        except Exception:
+            return []
+    
+    @classmethod
+    def claim_expired_leases(cls, uid: int, qid: str, reap_seconds: float,
+                             limit: int = 100) -> List[str]:
+        """
+        领取到期的租约（多个回收进程并发调用时每个租约只被领取一次）
+        
+        领取后租约改为 REAP_PREFIX 前缀的回收租约，调用方须通过 requeue_reaped 结束
+        
+        Args:
+            reap_seconds: 回收租约时长，回收进程中途退出时到期后重新回收
+        
+        Returns:
+            到期的Block Key列表
+        """
+        script = get_script(CLAIM_EXPIRED_SCRIPT)
+        if script is None or uid <= 0 or not qid:
+            return []
+        
+        now = time.time()
+        try:
+            return list(script(
+                keys=[cls._key_leases(uid, qid), KEY_LEASED_QUERIES],
+                args=[str(now), str(now + reap_seconds), str(limit), f"{uid}:{qid}", REAP_PREFIX]
+            ) or [])
+        except Exception as e:
+            print(f"[TaskQueue] 领取到期租约失败 {qid}: {e}")
+            return []
+    
+    @classmethod
+    def requeue_reaped(cls, uid: int, qid: str, block_key: str,
+                       replacement: Optional[str]) -> bool:
+        """
+        结束回收租约，并将替代工作单元推回队列头部
+        
+        Args:
+            block_key: claim_expired_leases 返回的Block Key
+            replacement: 重新入队的工作单元；None 表示直接丢弃（如任务已终止）
+        """
+        client = get_redis_client()
+        if not client or uid <= 0 or not qid or not block_key:
+            return False
+        
+        try:
+            pipe = client.pipeline(transaction=True)
+            if replacement:
+                pipe.lpush(cls._key_pending(uid, qid), replacement)
+            pipe.zrem(cls._key_leases(uid, qid), REAP_PREFIX + block_key)
+            pipe.execute()
+            return True
+        except Exception:
+            return False
     
     @classmethod
-    def push_back_block(cls, uid: int, qid: str, block_key: str) -> bool:
-        """将Block Key推回队列头部（用于暂停时回退）"""
+    def append_block(cls, uid: int, qid: str, block_key: str) -> bool:
+        """
+        运行中追加一个工作单元（如AI调用失败文献的重试Block）
+        
+        总Block数+1 与入队在同一事务中完成，完成判定会等待追加的工作单元
+        """
         client = get_redis_client()
         if not client or uid <= 0 or not qid or not block_key:
             return False
         
         try:
-            client.lpush(cls._key_pending(uid, qid), block_key)
+            pipe = client.pipeline(transaction=True)
+            pipe.hincrby(cls._key_status(uid, qid), 'total_blocks', 1)
+            pipe.rpush(cls._key_pending(uid, qid), block_key)
+            pipe.execute()
             return True
         except Exception:
             return False
@@ -210,6 +461,19 @@ class TaskQueue:
         except Exception:
             return False
     
+    @classmethod
+    def set_priority(cls, uid: int, qid: str, priority: str) -> bool:
+        """设置任务优先级（admin/interactive/batch，见 fair_share.py）"""
+        client = get_redis_client()
+        if not client or uid <= 0 or not qid:
+            return False
+        
+        try:
+            client.hset(cls._key_status(uid, qid), 'priority', priority)
+            return True
+        except Exception:
+            return False
+    
     @classmethod
     def is_completed(cls, uid: int, qid: str) -> bool:
         """检查任务是否已完成"""
@@ -309,4 +573,35 @@ class TaskQueue:
             return True
         except Exception:
             return False
-
+    
+    # ==================== 归属操作（多Worker进程） ====================
+    
+    @classmethod
+    def claim_owner(cls, uid: int, qid: str, owner: str, ttl: int = TTL_OWNER) -> bool:
+        """
+        登记运行该查询的进程（已由本进程持有时续期）
+        
+        Returns:
+            True 表示本进程持有该查询；False 表示已由其他存活进程运行或Redis不可用
+        """
+        script = get_script(CLAIM_OWNER_SCRIPT)
+        if script is None or uid <= 0 or not qid:
+            return False
+        
+        try:
+            return bool(script(keys=[cls._key_owner(uid, qid)], args=[owner, str(ttl)]))
+        except Exception as e:
+            print(f"[TaskQueue] 登记查询归属失败 {qid}: {e}")
+            return False
+    
+    @classmethod
+    def release_owner(cls, uid: int, qid: str, owner: str) -> bool:
+        """释放本进程持有的查询归属（查询结束或取消时）"""
+        script = get_script(RELEASE_OWNER_SCRIPT)
+        if script is None or uid <= 0 or not qid:
+            return False
+        
+        try:
+            return bool(script(keys=[cls._key_owner(uid, qid)], args=[owner]))
+        except Exception:
+            return False
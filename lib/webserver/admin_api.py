@@ -19,8 +19,16 @@ from ..load_data.query_dao import (
 from ..redis.task_queue import TaskQueue
 from ..redis.connection import redis_ping
 from ..redis.billing import BillingQueue
+from ..redis.relevance_cache import RelevanceCache
+from ..redis.block_cache import get_block_cache
+from ..redis.process_registry import ProcessRegistry
 from ..process.sliding_window import get_current_tpm, get_current_rpm
 from ..process.worker import get_active_worker_count, stop_workers_for_query
+from ..process.api_key_pool import get_key_pool
+from ..process.fair_share import get_fair_share_gate, PRIORITIES
+from ..process.token_estimator import get_token_estimator
+from ..process.resilient_call import get_latency_tracker
+from ..process.circuit_breaker import get_breaker_stats
 
 
 def handle_admin_api(path: str, method: str, headers: Dict, 
@@ -81,6 +89,9 @@ def handle_admin_api(path: str, method: str, headers: Dict,
     if path == '/api/admin/tasks/batch_terminate' and method == 'POST':
         return _handle_batch_terminate_tasks(data)
     
+    if path == '/api/admin/tasks/batch_priority' and method == 'POST':
+        return _handle_batch_set_priority(data)
+    
     if path == '/api/admin/admins' and method == 'GET':
         return _handle_get_admins()
     
@@ -123,10 +134,24 @@ def _handle_logout(headers: Dict) -> Tuple[int, Dict]:
 
 def _handle_dashboard() -> Tuple[int, Dict]:
     """处理监控大盘数据"""
-    # 系统统计
-    tpm = get_current_tpm()
-    rpm = get_current_rpm()
-    active_workers = get_active_worker_count()
+    # 系统统计：汇总所有运行调度器的进程上报的快照（web 角色的本进程不运行Worker），
+    # 没有快照时（如Redis不可用）使用本进程数据
+    gate = get_fair_share_gate()
+    processes = ProcessRegistry.get_all()
+    if processes:
+        tpm = sum(p.get('tpm', 0) for p in processes)
+        rpm = sum(p.get('rpm', 0) for p in processes)
+        active_workers = sum(p.get('active_workers', 0) for p in processes)
+        flows = {}
+        for p in processes:
+            flows.update(p.pop('flows', None) or {})
+    else:
+        tpm = get_current_tpm()
+        rpm = get_current_rpm()
+        active_workers = get_active_worker_count()
+        flows = gate.get_all_flow_stats()
+    key_pool = get_key_pool()
+    max_tpm, max_rpm = key_pool.get_capacity()
     
     # 活跃任务
     tasks = []
@@ -137,6 +162,8 @@ def _handle_dashboard() -> Tuple[int, Dict]:
         if uid and qid:
             status = TaskQueue.get_status(uid, qid)
             if status:
+                # 全局公平共享闸门中的权重、自适应并发上限与在途/排队AI调用数
+                flow_stats = flows.get(f"{uid}:{qid}") or gate.get_flow_stats(uid, qid)
                 tasks.append({
                     'query_id': qid,
                     'uid': uid,
@@ -144,6 +171,11 @@ def _handle_dashboard() -> Tuple[int, Dict]:
                     'total_blocks': status.get('total_blocks', 0),
                     'finished_blocks': status.get('finished_blocks', 0),
                     'pending_blocks': TaskQueue.get_pending_count(uid, qid),
+                    'ai_weight': flow_stats['weight'],
+                    'ai_in_flight': flow_stats['in_flight'],
+                    'ai_queued': flow_stats['queued'],
+                    'ai_limit': flow_stats['limit'],
+                    'priority': status.get('priority') or flow_stats['priority'],
                 })
     
     # 健康检查
@@ -151,13 +183,24 @@ def _handle_dashboard() -> Tuple[int, Dict]:
         'redis': redis_ping(),
         'mysql': _check_mysql(),
         'billing_queue_size': _get_total_billing_queue_size(),
+        'circuit_breakers': get_breaker_stats(),
+        'worker_processes': len(processes),
     }
     
     return 200, {
         'success': True,
         'tpm': tpm,
         'rpm': rpm,
+        'max_tpm': max_tpm,
+        'max_rpm': max_rpm,
+        'api_keys': key_pool.get_stats(),
+        'relevance_cache': RelevanceCache.get_stats(),
+        'block_cache': get_block_cache().get_stats(),
+        'fair_share': gate.get_stats(),
+        'token_estimator': get_token_estimator().get_stats(),
+        'ai_latency': get_latency_tracker().get_stats(),
         'active_workers': active_workers,
+        'processes': processes,
         'active_queries': len(tasks),
         'tasks': tasks,
         'health': health,
@@ -326,7 +369,7 @@ def _handle_get_settings() -> Tuple[int, Dict]:
     """获取所有系统配置"""
     from ..load_data.system_settings_dao import (
         get_all_settings, get_permission_range, get_distill_rate,
-        is_debug_console_enabled,
+        get_cache_hit_rate, is_debug_console_enabled,
         # 修复35新增
         is_announcement_enabled, get_announcement_content,
         is_maintenance_mode, get_maintenance_message
@@ -339,6 +382,7 @@ def _handle_get_settings() -> Tuple[int, Dict]:
         # 也返回当前生效的关键配置值（可能来自 Redis 缓存）
         min_perm, max_perm = get_permission_range()
         distill_rate = get_distill_rate()
+        cache_hit_rate = get_cache_hit_rate()
         debug_console = is_debug_console_enabled()
         # 修复35新增
         announcement_enabled = is_announcement_enabled()
@@ -353,6 +397,7 @@ def _handle_get_settings() -> Tuple[int, Dict]:
                 'permission_min': min_perm,
                 'permission_max': max_perm,
                 'distill_rate': distill_rate,
+                'cache_hit_rate': cache_hit_rate,
                 'debug_console_enabled': 'true' if debug_console else 'false',
                 # 修复35新增
                 'announcement_enabled': 'true' if announcement_enabled else 'false',
@@ -367,7 +412,9 @@ def _handle_get_settings() -> Tuple[int, Dict]:
 
 def _handle_update_settings(data: Dict) -> Tuple[int, Dict]:
     """更新系统配置"""
-    from ..load_data.system_settings_dao import set_setting, set_permission_range, set_distill_rate
+    from ..load_data.system_settings_dao import (
+        set_setting, set_permission_range, set_distill_rate, set_cache_hit_rate
+    )
     
     try:
         settings = data.get('settings', {})
@@ -403,9 +450,19 @@ def _handle_update_settings(data: Dict) -> Tuple[int, Dict]:
             else:
                 errors.append('蒸馏系数更新失败')
         
+        # 处理缓存命中价格系数
+        if 'cache_hit_rate' in settings:
+            rate = float(settings.get('cache_hit_rate', 1.0))
+            if rate < 0 or rate > 1:
+                errors.append('cache_hit_rate 必须在 0-1 之间')
+            elif set_cache_hit_rate(rate):
+                updated.append('cache_hit_rate')
+            else:
+                errors.append('缓存命中系数更新失败')
+        
         # 处理其他通用配置
         for key, value in settings.items():
-            if key not in ('permission_min', 'permission_max', 'distill_rate'):
+            if key not in ('permission_min', 'permission_max', 'distill_rate', 'cache_hit_rate'):
                 if set_setting(key, str(value)):
                     updated.append(key)
                 else:
@@ -657,3 +714,38 @@ def _handle_batch_terminate_tasks(data: Dict) -> Tuple[int, Dict]:
         return 400, {'success': False, 'message': '批量终止失败'}
 
 
+def _handle_batch_set_priority(data: Dict) -> Tuple[int, Dict]:
+    """
+    批量设置任务优先级（调度器5秒内同步到公平共享闸门）
+    
+    请求格式:
+    {
+        "items": [{"uid": 1, "query_id": "xxx"}, ...],
+        "priority": "admin" | "interactive" | "batch"
+    }
+    """
+    items = data.get('items', [])
+    priority = data.get('priority')
+    
+    if not items:
+        return 400, {'success': False, 'message': '未选择任何任务'}
+    if priority not in PRIORITIES:
+        return 400, {'success': False, 'message': '优先级无效'}
+    
+    success_count = 0
+    for item in items:
+        try:
+            uid = int(item.get('uid'))
+        except (TypeError, ValueError):
+            continue
+        qid = item.get('query_id')
+        if qid and TaskQueue.get_status(uid, qid) and TaskQueue.set_priority(uid, qid, priority):
+            success_count += 1
+    
+    if success_count == 0:
+        return 400, {'success': False, 'message': '设置优先级失败'}
+    return 200, {
+        'success': True,
+        'message': f'已设置 {success_count}/{len(items)} 个任务的优先级',
+        'success_count': success_count
+    }
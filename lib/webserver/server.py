@@ -475,11 +475,15 @@ def run_server(host: str = '127.0.0.1', port: int = 8080):
         port: 监听端口
     """
     try:
-        # 启动后台调度器
+        # 启动后台调度器（web 角色由独立的Worker进程运行调度器）
         try:
+            from ..process.process_role import runs_scheduler
             from ..process.scheduler import start_scheduler
-            start_scheduler()
-            print("[Init] 后台调度器已启动")
+            if runs_scheduler():
+                start_scheduler()
+                print("[Init] 后台调度器已启动")
+            else:
+                print("[Init] web 角色，调度器由Worker进程运行")
         except Exception as e:
             print(f"[Init] 启动后台调度器失败: {e}")
         
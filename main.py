@@ -1,23 +1,41 @@
-﻿import os
+﻿import argparse
+import multiprocessing
+import os
 from lib.config import config_loader as config
 from lib.log.debug_console import init_debug_console
+from lib.process.process_role import (
+    ROLES, ROLE_ALL, ROLE_WORKER, set_role, run_worker
+)
 from lib.webserver.server import run_server
 
-if __name__ == "__main__":
+# 下载Worker线程数（每个运行下载Worker的进程）
+DOWNLOAD_POOL_SIZE = 10
+
+
+def _parse_args():
+    """
+    进程角色（见 lib/process/process_role.py）:
+    - all:    HTTP服务 + 调度器 + 执行引擎 + 下载Worker（默认）
+    - web:    仅HTTP服务与BillingSyncer
+    - worker: 仅调度器、执行引擎与下载Worker；--processes N 启动N个Worker进程
+    """
+    parser = argparse.ArgumentParser(description="AutoPaperWeb 后端")
+    parser.add_argument('--role', choices=ROLES, default=os.getenv("APW_ROLE", ROLE_ALL),
+                        help='进程角色，默认取环境变量 APW_ROLE，未设置时为 all')
+    parser.add_argument('--processes', type=int, default=int(os.getenv("APW_WORKER_PROCESSES", "1")),
+                        help='worker 角色启动的进程数')
+    return parser.parse_args()
+
+
+def _init_process(role: str) -> None:
+    """每个进程的基础初始化：加载配置、调试控制台、设置角色"""
     config.load_config()
     init_debug_console()
-    # 打印 Feature Flags（来自 config.json 单一真源）
-    try:
-        q = bool(getattr(config, 'QUEUE_ENABLED', True))
-        s = bool(getattr(config, 'SCHEDULER_ENABLED', True))
-        tpr = int(getattr(config, 'TOKENS_PER_REQ', 550))
-        print(f"[flags] queue_enabled={q}, scheduler_enabled={s}, tokens_per_req={tpr}")
-    except Exception:
-        pass
-    # Start backend web service
-    # - Local developer mode: listen on 127.0.0.1
-    # - Production/container mode: listen on 0.0.0.0 to expose the port
-    
+    set_role(role)
+
+
+def _init_shared_data() -> None:
+    """初始化价格系统、MySQL -> Redis 数据同步与系统配置（每次部署由 web/all 进程执行一次）"""
     # 初始化价格系统
     try:
         from lib.price_calculate.init_db import initialize_price_system
@@ -50,6 +68,34 @@ if __name__ == "__main__":
         print("[Init] 系统配置已加载到Redis")
     except Exception as e:
         print(f"[Init] 系统配置加载失败: {e}")
+
+
+def _worker_process_main() -> None:
+    """--processes > 1 时额外启动的Worker子进程入口"""
+    _init_process(ROLE_WORKER)
+    run_worker(download_pool_size=DOWNLOAD_POOL_SIZE)
+
+
+def _run_workers(processes: int) -> None:
+    """启动 processes 个Worker进程（当前进程为其中之一），各进程通过Redis任务Key协作"""
+    ctx = multiprocessing.get_context('spawn')
+    children = []
+    for _ in range(max(1, processes) - 1):
+        child = ctx.Process(target=_worker_process_main, daemon=False)
+        child.start()
+        children.append(child)
+    try:
+        run_worker(download_pool_size=DOWNLOAD_POOL_SIZE)
+    finally:
+        for child in children:
+            child.terminate()
+        for child in children:
+            child.join()
+
+
+def _run_web(role: str) -> None:
+    """web/all 进程：初始化共享数据、启动后台服务并运行HTTP服务器"""
+    _init_shared_data()
     
     # 启动BillingSyncer后台线程（新架构：异步计费同步）
     try:
@@ -60,12 +106,14 @@ if __name__ == "__main__":
         print(f"[Init] BillingSyncer启动失败: {e}")
     
     # 启动DownloadWorkerPool后台线程（新架构：异步下载处理）
-    try:
-        from lib.process.download_worker import start_download_workers
-        start_download_workers(pool_size=10)  # 10个Worker处理下载任务
-        print("[Init] DownloadWorkerPool已启动 (10个Worker)")
-    except Exception as e:
-        print(f"[Init] DownloadWorkerPool启动失败: {e}")
+    # web 角色不生成下载文件（CSV/Bib生成是CPU密集任务），由Worker进程处理下载队列
+    if role == ROLE_ALL:
+        try:
+            from lib.process.download_worker import start_download_workers
+            start_download_workers(pool_size=DOWNLOAD_POOL_SIZE)
+            print(f"[Init] DownloadWorkerPool已启动 ({DOWNLOAD_POOL_SIZE}个Worker)")
+        except Exception as e:
+            print(f"[Init] DownloadWorkerPool启动失败: {e}")
     
     # 启动后端 Web 服务：
     # - 本地开发者模式：仅监听本机 127.0.0.1
@@ -78,3 +126,22 @@ if __name__ == "__main__":
         in_container = False
     host = "127.0.0.1" if (getattr(config, "local_develop_mode", False) and not in_container) else "0.0.0.0"
     run_server(host=host, port=port)
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    _init_process(args.role)
+    # 打印 Feature Flags（来自 config.json 单一真源）
+    try:
+        q = bool(getattr(config, 'QUEUE_ENABLED', True))
+        s = bool(getattr(config, 'SCHEDULER_ENABLED', True))
+        tpr = int(getattr(config, 'TOKENS_PER_REQ', 550))
+        print(f"[flags] role={args.role}, queue_enabled={q}, scheduler_enabled={s}, tokens_per_req={tpr}")
+    except Exception:
+        pass
+    
+    if args.role == ROLE_WORKER:
+        # Worker进程不监听端口，数据同步由 web/all 进程完成
+        _run_workers(args.processes)
+    else:
+        _run_web(args.role)
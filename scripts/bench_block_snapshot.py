@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+文献Block列式快照基准测试
+
+用途：
+    对比整Block读取的两种存储格式（单进程，即每核）：
+    - hash: 每篇一个v2记录（Hash的Field），整Block读取需逐篇解压
+    - snapshot: 整Block一个列式快照（见 lib/redis/paper_snapshot.py），一遍解码
+
+    输出每个Block的Value字节数，以及只读字段（Worker热路径）和读取完整Bib
+    两种情况下的整Block解码吞吐。语料与 bench_paper_block_v2.py 相同。
+    Hash每个Field另有约几十字节的Redis编码开销，未计入Value字节数；
+    以转换脚本输出的 MEMORY USAGE 为准。
+
+使用方法：
+    python scripts/bench_block_snapshot.py
+    python scripts/bench_block_snapshot.py --blocks 50 --block-size 1000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# 添加项目根目录到路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from lib.redis.paper_record import (
+    build_record, pack_record_v2, record_payload, train_dictionary, unpack_record
+)
+from lib.redis.paper_snapshot import encode_snapshot, decode_snapshot
+
+from bench_paper_block_v2 import Corpus
+
+
+def throughput(decode, blocks: list, papers: int) -> float:
+    """整Block解码吞吐（篇/秒）"""
+    start = time.perf_counter()
+    for block in blocks:
+        decode(block)
+    return papers / max(time.perf_counter() - start, 1e-9)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文献Block列式快照基准测试")
+    parser.add_argument('--blocks', type=int, default=20, help='测试Block数量')
+    parser.add_argument('--block-size', type=int, default=500, help='每个Block的文献数')
+    parser.add_argument('--train', type=int, default=5000, help='字典训练样本数（不与测试集重叠）')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    corpus = Corpus(random.Random(args.seed))
+    zdict = train_dictionary([record_payload(build_record(corpus.bib(i))) for i in range(args.train)])
+
+    hashes, snapshots = [], []
+    n = args.train
+    for _ in range(args.blocks):
+        bibs = {}
+        for _ in range(args.block_size):
+            bibs[f"10.1000/x.{n}"] = corpus.bib(n)
+            n += 1
+        hashes.append({doi: pack_record_v2(bib, 1, zdict) for doi, bib in bibs.items()})
+        snapshots.append(encode_snapshot(
+            [(doi, build_record(bib)) for doi, bib in sorted(bibs.items())], 1, zdict
+        ))
+    papers = args.blocks * args.block_size
+
+    full = decode_snapshot(snapshots[0], zdict)
+    assert all(full[doi] == unpack_record(v, True, zdict) for doi, v in hashes[0].items())
+
+    def decode_hash(with_bib):
+        return lambda block: {doi: unpack_record(v, with_bib, zdict) for doi, v in block.items()}
+
+    def decode_snap(with_bib):
+        return lambda blob: decode_snapshot(blob, zdict, with_bib)
+
+    hash_bytes = sum(len(k) + len(v) for block in hashes for k, v in block.items()) / args.blocks
+    snap_bytes = sum(len(blob) for blob in snapshots) / args.blocks
+
+    print(f"{args.blocks} 个Block × {args.block_size} 篇，字典 {len(zdict)} B")
+    print()
+    print(f"{'格式':<10}{'Value(KB/Block)':>16}{'字段解码(篇/s)':>18}{'完整解码(篇/s)':>18}")
+    hash_fields = throughput(decode_hash(False), hashes, papers)
+    snap_fields = throughput(decode_snap(False), snapshots, papers)
+    print(f"{'hash':<10}{hash_bytes / 1024:>16.1f}{hash_fields:>18.0f}"
+          f"{throughput(decode_hash(True), hashes, papers):>18.0f}")
+    print(f"{'snapshot':<10}{snap_bytes / 1024:>16.1f}{snap_fields:>18.0f}"
+          f"{throughput(decode_snap(True), snapshots, papers):>18.0f}")
+    print()
+    print(f"Value缩小 {(1 - snap_bytes / hash_bytes) * 100:.1f}%（不含Hash逐Field开销）；"
+          f"字段解码 {snap_fields / hash_fields:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
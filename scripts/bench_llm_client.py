@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+LLM客户端复用基准测试
+
+用途：
+    在本机启动一个 OpenAI 兼容的模拟接口，对比两种调用方式的单篇文献开销：
+    - fresh:  每篇文献新建 openai.OpenAI 客户端（旧实现）
+    - pooled: 使用 lib.process.llm_client 的进程级共享客户端（新实现）
+
+    输出每篇文献的延迟（平均/P50/P95）、CPU耗时，以及模拟接口收到的TCP连接数，
+    用于确认 keep-alive 生效（pooled 模式下连接数应约等于并发线程数）。
+
+使用方法：
+    python scripts/bench_llm_client.py
+    python scripts/bench_llm_client.py --papers 2000 --threads 16 --server-delay-ms 20
+
+注意：
+    - 模拟接口为纯HTTP，不包含TLS握手；线上HTTPS场景下复用连接的收益更大
+    - 需要安装 openai（其依赖 httpx）
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 添加项目根目录到路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+
+MOCK_RESPONSE = {
+    "id": "chatcmpl-bench",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "bench-model",
+    "choices": [{
+        "index": 0,
+        "message": {"role": "assistant", "content": "{\"relevant\": \"N\", \"reason\": \"bench\"}"},
+        "finish_reason": "stop",
+    }],
+    "usage": {"prompt_tokens": 300, "completion_tokens": 20, "total_tokens": 320},
+}
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    """OpenAI 兼容的 /chat/completions 模拟接口（支持 keep-alive）"""
+
+    protocol_version = "HTTP/1.1"
+    server_delay = 0.0
+    connections = 0
+    _conn_lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with _MockHandler._conn_lock:
+            _MockHandler.connections += 1
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0) or 0)
+        if length:
+            self.rfile.read(length)
+        if self.server_delay > 0:
+            time.sleep(self.server_delay)
+        body = json.dumps(MOCK_RESPONSE).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_mock_server(delay_ms: float) -> ThreadingHTTPServer:
+    """在后台线程启动模拟接口，返回server实例"""
+    _MockHandler.server_delay = delay_ms / 1000.0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _MockHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _call(client) -> None:
+    client.chat.completions.create(
+        model="bench-model",
+        messages=[
+            {"role": "system", "content": "bench"},
+            {"role": "user", "content": "Paper Title: bench\nPaper Abstract: bench"},
+        ],
+        temperature=0.1,
+        max_tokens=500,
+    )
+
+
+def run_mode(mode: str, base_url: str, papers: int, threads: int) -> dict:
+    """按指定模式执行 papers 次调用，返回统计结果"""
+    import openai
+    from lib.process.llm_client import get_llm_client, close_llm_clients
+
+    latencies = []
+    lat_lock = threading.Lock()
+
+    def one_paper(_):
+        start = time.perf_counter()
+        if mode == "fresh":
+            client = openai.OpenAI(api_key="bench-key", base_url=base_url)
+            _call(client)
+        else:
+            _call(get_llm_client("bench-key", base_url))
+        elapsed = time.perf_counter() - start
+        with lat_lock:
+            latencies.append(elapsed)
+
+    _MockHandler.connections = 0
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one_paper, range(papers)))
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    if mode == "pooled":
+        close_llm_clients()
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "papers": papers,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "cpu_ms_per_paper": cpu * 1000 / papers,
+        "throughput": papers / wall if wall > 0 else 0,
+        "connections": _MockHandler.connections,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM客户端复用基准测试")
+    parser.add_argument("--papers", type=int, default=500, help="每种模式的调用次数")
+    parser.add_argument("--threads", type=int, default=8, help="并发线程数")
+    parser.add_argument("--server-delay-ms", type=float, default=5.0, help="模拟接口响应延迟(毫秒)")
+    args = parser.parse_args()
+
+    server = start_mock_server(args.server_delay_ms)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    print("=" * 78)
+    print(f"LLM客户端基准: papers={args.papers}, threads={args.threads}, "
+          f"server_delay={args.server_delay_ms}ms")
+    print("=" * 78)
+    print(f"{'mode':<8}{'mean(ms)':>10}{'p50(ms)':>10}{'p95(ms)':>10}"
+          f"{'cpu/paper(ms)':>15}{'papers/s':>11}{'TCP conns':>11}")
+
+    results = []
+    for mode in ("fresh", "pooled"):
+        # 预热，排除首次导入开销
+        run_mode(mode, base_url, min(20, args.papers), args.threads)
+        r = run_mode(mode, base_url, args.papers, args.threads)
+        results.append(r)
+        print(f"{r['mode']:<8}{r['mean_ms']:>10.2f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+              f"{r['cpu_ms_per_paper']:>15.3f}{r['throughput']:>11.1f}{r['connections']:>11}")
+
+    fresh, pooled = results
+    if pooled["mean_ms"] > 0 and pooled["cpu_ms_per_paper"] > 0:
+        print()
+        print(f"延迟降低: {fresh['mean_ms'] / pooled['mean_ms']:.2f}x, "
+              f"CPU降低: {fresh['cpu_ms_per_paper'] / pooled['cpu_ms_per_paper']:.2f}x")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
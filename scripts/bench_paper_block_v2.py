@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+文献Block v2编码基准测试
+
+用途：
+    对比文献记录的两种存储编码（单进程，即每核）：
+    - v1: "R1:" + base64(zlib(payload))
+    - v2: b"R2" + 字典ID + raw deflate(payload, 预置字典)
+
+    输出每篇平均Value大小、推算到 --project-papers 篇的内存节省，
+    以及只读字段（Worker热路径）和读取完整Bib两种情况下的解码吞吐。
+
+    合成语料按Zipf分布从伪词表取词，期刊名、出版社、字段名重复出现；
+    真实语料的压缩率以迁移脚本 --dry-run 的留出样本估算为准。
+
+使用方法：
+    python scripts/bench_paper_block_v2.py
+    python scripts/bench_paper_block_v2.py --papers 50000 --train 10000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# 添加项目根目录到路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from lib.redis.paper_record import (
+    pack_record, pack_record_v2, unpack_record, build_record, record_payload, train_dictionary
+)
+
+SYLLABLES = (
+    "ka ro mi tu len sor pha gen tic ion al ous ent ment struc ture pro cess "
+    "bio chem neu ral quan tum"
+).split()
+PUBLISHERS = ["Elsevier", "Springer Nature", "Wiley", "IEEE", "American Chemical Society"]
+
+
+class Corpus:
+    """合成BibTeX语料"""
+
+    def __init__(self, rng: random.Random, vocab_size: int = 8000):
+        self.rng = rng
+        self.vocab = [
+            ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4)))
+            for _ in range(vocab_size)
+        ]
+        self.weights = [1 / (i + 1) for i in range(vocab_size)]
+        self.journals = [self._words(2).title() for _ in range(50)]
+
+    def _words(self, n: int) -> str:
+        return ' '.join(self.rng.choices(self.vocab, self.weights, k=n))
+
+    def bib(self, i: int) -> str:
+        rng = self.rng
+        return (
+            f"@article{{paper{i},\n"
+            f"  author = {{{self._words(2).title()} and {self._words(2).title()}}},\n"
+            f"  title = {{{self._words(10).title()}}},\n"
+            f"  journal = {{Journal of {rng.choice(self.journals)}}},\n"
+            f"  volume = {{{rng.randint(1, 300)}}},\n"
+            f"  pages = {{{rng.randint(1, 999)}--{rng.randint(1000, 2000)}}},\n"
+            f"  year = {{{rng.randint(1990, 2024)}}},\n"
+            f"  doi = {{10.{rng.randint(1000, 9999)}/j.x.{i}}},\n"
+            f"  url = {{https://doi.org/10.1000/x.{i}}},\n"
+            f"  abstract = {{{self._words(rng.randint(80, 220))}}},\n"
+            f"  publisher = {{{rng.choice(PUBLISHERS)}}},\n"
+            f"}}"
+        )
+
+
+def throughput(values: list, with_bib: bool, zdict: bytes = None) -> float:
+    """解码吞吐（篇/秒）"""
+    start = time.perf_counter()
+    for value in values:
+        unpack_record(value, with_bib, zdict)
+    return len(values) / max(time.perf_counter() - start, 1e-9)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文献Block v2编码基准测试")
+    parser.add_argument('--papers', type=int, default=20000, help='测试文献数量')
+    parser.add_argument('--train', type=int, default=5000, help='字典训练样本数（不与测试集重叠）')
+    parser.add_argument('--project-papers', type=int, default=5000000, help='推算的文献总数')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    corpus = Corpus(random.Random(args.seed))
+    training = [record_payload(build_record(corpus.bib(i))) for i in range(args.train)]
+    bibs = [corpus.bib(args.train + i) for i in range(args.papers)]
+
+    start = time.perf_counter()
+    zdict = train_dictionary(training)
+    train_secs = time.perf_counter() - start
+
+    v1_values = [pack_record(b) for b in bibs]
+    v2_values = [pack_record_v2(b, 1, zdict) for b in bibs]
+    assert all(unpack_record(v, True, zdict).bib == b for v, b in zip(v2_values, bibs))
+
+    v1_avg = sum(len(v) for v in v1_values) / len(bibs)
+    v2_avg = sum(len(v) for v in v2_values) / len(bibs)
+    saved_gb = (v1_avg - v2_avg) * args.project_papers / 1e9
+
+    print(f"字典 {len(zdict)} B（{args.train} 篇样本，训练 {train_secs:.1f}s）")
+    print()
+    print(f"{'编码':<6}{'平均大小(B/篇)':>16}{'字段解码(篇/s)':>18}{'完整解码(篇/s)':>18}")
+    print(f"{'v1':<6}{v1_avg:>16.0f}{throughput(v1_values, False):>18.0f}"
+          f"{throughput(v1_values, True):>18.0f}")
+    print(f"{'v2':<6}{v2_avg:>16.0f}{throughput(v2_values, False, zdict):>18.0f}"
+          f"{throughput(v2_values, True, zdict):>18.0f}")
+    print()
+    print(f"Value缩小 {(1 - v2_avg / v1_avg) * 100:.1f}%；"
+          f"按 {args.project_papers} 篇推算节省 {saved_gb:.2f} GB（不含Hash编码开销）")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+文献记录解析基准测试
+
+用途：
+    对比Worker读取单篇文献标题/摘要的两种方式（每10万篇的耗时）：
+    - legacy: base64(zlib(bib)) 解压 + 两个 [^}"]+ 正则（旧实现）
+    - record: 预解析记录 unpack_record(with_bib=False)（新实现，只解压字段部分）
+
+    同时统计旧正则在摘要含花括号/引号时被截断的篇数。
+
+使用方法：
+    python scripts/bench_paper_record.py
+    python scripts/bench_paper_record.py --papers 200000 --tricky-ratio 0.2
+"""
+
+import argparse
+import base64
+import os
+import random
+import re
+import sys
+import time
+import zlib
+
+# 添加项目根目录到路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from lib.redis.paper_record import pack_record, unpack_record, build_record
+
+
+WORDS = (
+    "neural network protein structure climate model quantum lattice catalyst "
+    "graphene genome sequencing inference bayesian turbulence membrane "
+    "photonic crystal superconducting enzyme kinetics spectroscopy"
+).split()
+
+_TITLE_RE = re.compile(r'title\s*=\s*[{"]([^}"]+)[}"]', re.IGNORECASE)
+_ABSTRACT_RE = re.compile(r'abstract\s*=\s*[{"]([^}"]+)[}"]', re.IGNORECASE)
+
+
+def _sentence(rng: random.Random, n: int) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(n))
+
+
+def make_bib(rng: random.Random, i: int, tricky: bool) -> str:
+    """生成一条合成Bib；tricky=True 时摘要包含花括号和引号"""
+    title = _sentence(rng, 10).title()
+    abstract = _sentence(rng, 150)
+    if tricky:
+        cut = len(abstract) // 3
+        abstract = (abstract[:cut] + ' the {CO2} "effective" rate ' + abstract[cut:])
+    return (
+        f"@article{{paper{i},\n"
+        f"  author = {{Doe, J. and Roe, R.}},\n"
+        f"  title = {{{title}}},\n"
+        f"  journal = {{Bench Journal}},\n"
+        f"  year = {{2024}},\n"
+        f"  doi = {{10.1000/bench.{i}}},\n"
+        f"  url = {{https://doi.org/10.1000/bench.{i}}},\n"
+        f"  abstract = {{{abstract}}},\n"
+        f"}}"
+    )
+
+
+def legacy_encode(bib: str) -> str:
+    return base64.b64encode(zlib.compress(bib.encode('utf-8'))).decode('ascii')
+
+
+def legacy_read(value: str) -> tuple:
+    """旧实现：完整解压 + 正则提取"""
+    bib = zlib.decompress(base64.b64decode(value.encode('ascii'))).decode('utf-8')
+    title = abstract = ''
+    m = _TITLE_RE.search(bib)
+    if m:
+        title = m.group(1).strip()
+    m = _ABSTRACT_RE.search(bib)
+    if m:
+        abstract = m.group(1).strip()
+    return title, abstract
+
+
+def record_read(value: str) -> tuple:
+    """新实现：预解析记录，部分解压"""
+    record = unpack_record(value, with_bib=False)
+    return record.title, record.abstract
+
+
+def timed(func, values) -> tuple:
+    start = time.perf_counter()
+    results = [func(v) for v in values]
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文献记录解析基准测试")
+    parser.add_argument('--papers', type=int, default=100000, help='文献数量')
+    parser.add_argument('--tricky-ratio', type=float, default=0.1,
+                        help='摘要含花括号/引号的文献比例')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    bibs = [make_bib(rng, i, rng.random() < args.tricky_ratio) for i in range(args.papers)]
+
+    print(f"生成 {len(bibs)} 条Bib，编码中...")
+    legacy_values = [legacy_encode(b) for b in bibs]
+    start = time.perf_counter()
+    record_values = [pack_record(b) for b in bibs]
+    pack_secs = time.perf_counter() - start
+
+    legacy_secs, legacy_results = timed(legacy_read, legacy_values)
+    record_secs, record_results = timed(record_read, record_values)
+
+    # 以完整解析结果为基准统计截断
+    truncated = 0
+    mismatched = 0
+    for bib, (_, legacy_abs), (_, record_abs) in zip(bibs, legacy_results, record_results):
+        expected = build_record(bib).abstract
+        if legacy_abs != expected:
+            truncated += 1
+        if record_abs != expected:
+            mismatched += 1
+
+    scale = 100000 / max(1, len(bibs))
+    legacy_size = sum(len(v) for v in legacy_values)
+    record_size = sum(len(v) for v in record_values)
+
+    print()
+    print(f"{'方式':<10}{'耗时/10万篇(ms)':>18}{'存储(MB)':>12}")
+    print(f"{'legacy':<10}{legacy_secs * scale * 1000:>18.1f}{legacy_size / 1e6:>12.2f}")
+    print(f"{'record':<10}{record_secs * scale * 1000:>18.1f}{record_size / 1e6:>12.2f}")
+    print()
+    print(f"加载时编码耗时/10万篇: {pack_secs * scale * 1000:.1f} ms（一次性，reload时付出）")
+    print(f"读取加速: {legacy_secs / max(record_secs, 1e-9):.2f}x")
+    print(f"旧正则截断摘要: {truncated} 篇；新记录与完整解析不一致: {mismatched} 篇")
+
+
+if __name__ == '__main__':
+    main()
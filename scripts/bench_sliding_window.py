@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+滑动窗口并发上报基准测试
+
+用途：
+    模拟大量Worker线程同时上报用量，对比两种滑动窗口实现的吞吐：
+    - legacy: deque 保存 (timestamp, value) + 全局锁 + 每次写入清理（旧实现）
+    - ring:   固定桶环形数组 + 分条计数（新实现 lib/process/sliding_window.py）
+
+    另外对比累加器每秒写入 N 个请求的方式：逐个 add_request() 与批量 add_request(n)。
+
+使用方法：
+    python scripts/bench_sliding_window.py
+    python scripts/bench_sliding_window.py --threads 64 --ops 20000
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+# 添加项目根目录到路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from lib.process.sliding_window import RPMSlidingWindow, TPMSlidingWindow
+
+
+class LegacyWindow:
+    """旧实现：每个数据点一个元组，所有线程共用一把锁"""
+
+    def __init__(self, window_size: int = 60):
+        self.window_size = window_size
+        self._data = deque()
+        self._lock = threading.Lock()
+        self._total = 0.0
+
+    def add(self, value: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._data.append((now, value))
+            self._total += value
+            self._cleanup(now)
+
+    def get_total(self) -> float:
+        now = time.time()
+        with self._lock:
+            self._cleanup(now)
+            return self._total
+
+    def _cleanup(self, now: float) -> None:
+        cutoff = now - self.window_size
+        while self._data and self._data[0][0] < cutoff:
+            _, old_value = self._data.popleft()
+            self._total -= old_value
+
+
+def run_reporters(add, read, threads: int, ops: int) -> tuple:
+    """threads 个线程各上报 ops 次，同时一个读线程持续读取总量"""
+    barrier = threading.Barrier(threads + 1)
+    stop = threading.Event()
+    reads = [0]
+
+    def reporter():
+        barrier.wait()
+        for _ in range(ops):
+            add(1.0)
+
+    def reader():
+        while not stop.is_set():
+            read()
+            reads[0] += 1
+            time.sleep(0.001)
+
+    workers = [threading.Thread(target=reporter) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    reader_thread = threading.Thread(target=reader)
+    reader_thread.start()
+
+    barrier.wait()
+    start = time.perf_counter()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    reader_thread.join()
+    return elapsed, read(), reads[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="滑动窗口并发上报基准测试")
+    parser.add_argument('--threads', type=int, default=64, help='并发上报线程数')
+    parser.add_argument('--ops', type=int, default=20000, help='每个线程的上报次数')
+    parser.add_argument('--batch', type=int, default=5000, help='累加器单次写入的请求数')
+    args = parser.parse_args()
+
+    total_ops = args.threads * args.ops
+    print(f"{args.threads} 个线程 × {args.ops} 次上报 = {total_ops} 次\n")
+    print(f"{'实现':<10}{'耗时(s)':>10}{'上报/秒':>14}{'读取次数':>10}{'窗口总量':>12}")
+
+    legacy = LegacyWindow(60)
+    elapsed, total, reads = run_reporters(legacy.add, legacy.get_total, args.threads, args.ops)
+    legacy_rate = total_ops / elapsed
+    print(f"{'legacy':<10}{elapsed:>10.2f}{legacy_rate:>14.0f}{reads:>10}{int(total):>12}")
+
+    ring = TPMSlidingWindow(60)
+    elapsed, total, reads = run_reporters(ring.add, ring.get_total, args.threads, args.ops)
+    ring_rate = total_ops / elapsed
+    print(f"{'ring':<10}{elapsed:>10.2f}{ring_rate:>14.0f}{reads:>10}{int(total):>12}")
+    print(f"\n上报吞吐提升: {ring_rate / legacy_rate:.2f}x")
+
+    # 累加器写入: 逐个 vs 批量
+    window = RPMSlidingWindow(60)
+    start = time.perf_counter()
+    for _ in range(args.batch):
+        window.add_request()
+    loop_secs = time.perf_counter() - start
+    window.clear()
+    start = time.perf_counter()
+    window.add_request(args.batch)
+    batch_secs = time.perf_counter() - start
+    print(f"累加器写入 {args.batch} 个请求: 逐个 {loop_secs * 1000:.2f} ms, "
+          f"批量 {batch_secs * 1000:.3f} ms (RPM={window.get_rpm()})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+文献Block存储格式转换脚本
+
+用途：
+    将 meta:{Journal}:{Year} 在Hash（逐篇记录）与列式快照（整Block一个String，
+    见 lib/redis/paper_snapshot.py）两种格式之间转换，并输出Redis内存占用的变化。
+
+    新写入的Block由 config.json 的 paper_block_format 决定格式；
+    已有的Block需用本脚本转换。
+
+使用方法：
+    python scripts/convert_block_snapshots.py                    # 全部转为快照
+    python scripts/convert_block_snapshots.py --to hash          # 全部转回Hash
+    python scripts/convert_block_snapshots.py --limit 100        # 只转换前100个Block（试运行）
+
+注意：
+    - 可在服务运行时执行：每个Block在WATCH事务中整体重写，DOI顺序不变，进行中的切片仍然有效
+    - 快照格式的单篇写入（set_paper）需要重写整个Block，适合只读为主的文献库
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# 添加项目根目录到路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from lib.redis.connection import get_binary_client, redis_ping
+from lib.redis.paper_blocks import PaperBlocks, BLOCK_FORMAT_HASH, BLOCK_FORMAT_SNAPSHOT
+
+
+def memory_usage(client, key: str) -> int:
+    """Key的内存占用（MEMORY USAGE 不可用时返回0）"""
+    try:
+        return int(client.memory_usage(key, samples=0) or 0)
+    except Exception:
+        return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文献Block存储格式转换")
+    parser.add_argument('--to', choices=[BLOCK_FORMAT_SNAPSHOT, BLOCK_FORMAT_HASH],
+                        default=BLOCK_FORMAT_SNAPSHOT, help='目标格式')
+    parser.add_argument('--limit', type=int, default=0, help='最多转换的Block数（0表示全部）')
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("文献Block存储格式转换工具")
+    print("=" * 50)
+
+    if not redis_ping():
+        print("[错误] Redis不可用")
+        sys.exit(1)
+
+    client = get_binary_client()
+    block_keys = PaperBlocks.list_blocks()
+    if args.limit > 0:
+        block_keys = block_keys[:args.limit]
+    print(f"[步骤1] 共 {len(block_keys)} 个Block，目标格式: {args.to}")
+
+    converted = skipped = 0
+    value_before = value_after = 0
+    mem_before = mem_after = 0
+    start = time.perf_counter()
+    for i, block_key in enumerate(block_keys, 1):
+        before = memory_usage(client, block_key)
+        sizes = PaperBlocks.convert_block(block_key, args.to)
+        if sizes is None:
+            skipped += 1
+            continue
+        converted += 1
+        value_before += sizes[0]
+        value_after += sizes[1]
+        mem_before += before
+        mem_after += memory_usage(client, block_key)
+        if i % 500 == 0:
+            print(f"  {i}/{len(block_keys)} 个Block，已转换 {converted}")
+    elapsed = time.perf_counter() - start
+
+    print()
+    print(f"[步骤2] 转换 {converted} 个Block，跳过 {skipped} 个（已是目标格式或为空），耗时 {elapsed:.1f}s")
+    if converted:
+        print(f"Value字节数: {value_before / 1e6:.1f} MB -> {value_after / 1e6:.1f} MB")
+        if mem_before:
+            print(f"Redis内存占用（MEMORY USAGE）: {mem_before / 1e6:.1f} MB -> {mem_after / 1e6:.1f} MB"
+                  f"（{(1 - mem_after / mem_before) * 100:.1f}%）")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+DOI反向索引迁移脚本
+
+用途：
+    将单个大Hash idx:doi_to_block（DOI → "meta:{Journal}:{Year}"）迁移为分桶索引
+    idx:doi:{bucket}（DOI指纹 → Block ID，见 lib/redis/doi_index.py），并输出内存占用对比。
+
+    1. HSCAN 旧索引，按Block分配ID后写入分桶索引与布隆过滤器（旧索引不存在时遍历全部Block重建），
+       完成后标记布隆过滤器就绪（此后未命中的DOI不再回退到旧索引）
+    2. 输出旧索引与分桶索引的 MEMORY USAGE（分桶索引按抽样的桶推算）
+    3. 指定 --drop-legacy 时删除旧索引（删除前分桶索引的查询会回退到旧索引）
+
+使用方法：
+    python scripts/migrate_doi_index.py
+    python scripts/migrate_doi_index.py --drop-legacy
+    python scripts/migrate_doi_index.py --from-blocks       # 忽略旧索引，从Block重建
+
+注意：
+    - 可在服务运行时执行；新写入的Block已直接写入分桶索引
+    - 分桶保持listpack编码需要 hash-max-listpack-entries >= 128（Redis默认值）
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# 添加项目根目录到路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from lib.redis.connection import get_redis_client, redis_ping
+from lib.redis.paper_blocks import PaperBlocks
+from lib.redis.doi_index import DoiIndex, KEY_LEGACY_DOI_INDEX, DOI_BUCKETS
+
+
+def memory_usage(client, key: str) -> int:
+    """Key的内存占用（MEMORY USAGE 不可用时返回0）"""
+    try:
+        return int(client.memory_usage(key) or 0)
+    except Exception:
+        return 0
+
+
+def bucket_memory(client, samples: int) -> int:
+    """按抽样的桶推算分桶索引的总内存"""
+    keys = random.Random(42).sample(DoiIndex.bucket_keys(), min(samples, DOI_BUCKETS))
+    sampled = sum(memory_usage(client, key) for key in keys)
+    return int(sampled * DOI_BUCKETS / max(len(keys), 1))
+
+
+def bucket_encodings(client, samples: int) -> dict:
+    """抽样桶的编码分布（listpack / hashtable）"""
+    counts = {}
+    for key in random.Random(7).sample(DoiIndex.bucket_keys(), min(samples, DOI_BUCKETS)):
+        try:
+            encoding = client.object('encoding', key)
+        except Exception:
+            continue
+        if encoding:
+            counts[encoding] = counts.get(encoding, 0) + 1
+    return counts
+
+
+def migrate_legacy(client, batch: int) -> int:
+    """从旧索引迁移"""
+    migrated = 0
+    pending = {}
+    for doi, block_key in client.hscan_iter(KEY_LEGACY_DOI_INDEX, count=batch):
+        pending[doi] = block_key
+        if len(pending) >= batch:
+            migrated += DoiIndex.set(pending)
+            pending = {}
+            if migrated % 100000 < batch:
+                print(f"  已迁移 {migrated} 条")
+    if pending:
+        migrated += DoiIndex.set(pending)
+    return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DOI反向索引迁移")
+    parser.add_argument('--from-blocks', action='store_true', help='忽略旧索引，遍历全部Block重建')
+    parser.add_argument('--drop-legacy', action='store_true', help='迁移后删除旧索引')
+    parser.add_argument('--batch', type=int, default=5000, help='每批写入的条目数')
+    parser.add_argument('--samples', type=int, default=500, help='推算内存时抽样的桶数')
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("DOI反向索引迁移工具")
+    print("=" * 50)
+
+    if not redis_ping():
+        print("[错误] Redis不可用")
+        sys.exit(1)
+    client = get_redis_client()
+
+    legacy_entries = client.hlen(KEY_LEGACY_DOI_INDEX) or 0
+    legacy_memory = memory_usage(client, KEY_LEGACY_DOI_INDEX)
+    start = time.perf_counter()
+    if legacy_entries and not args.from_blocks:
+        print(f"[步骤1] 从旧索引迁移 {legacy_entries} 条...")
+        migrated = migrate_legacy(client, args.batch)
+        DoiIndex.mark_bloom_ready()
+    else:
+        print("[步骤1] 遍历全部Block重建索引...")
+        migrated = PaperBlocks.build_doi_index()
+    print(f"  写入 {migrated} 条，耗时 {time.perf_counter() - start:.1f}s")
+
+    print("[步骤2] 内存占用")
+    new_memory = bucket_memory(client, args.samples)
+    print(f"  分桶索引: {DoiIndex.size()} 条，约 {new_memory / 1e6:.1f} MB"
+          f"（抽样 {args.samples} 个桶推算），编码分布 {bucket_encodings(client, args.samples)}")
+    if legacy_memory:
+        print(f"  旧索引: {legacy_entries} 条，{legacy_memory / 1e6:.1f} MB"
+              f"（{legacy_memory / max(new_memory, 1):.1f}x）")
+
+    if args.drop_legacy and legacy_entries:
+        client.unlink(KEY_LEGACY_DOI_INDEX)
+        print(f"[步骤3] 已删除旧索引 {KEY_LEGACY_DOI_INDEX}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+文献Block v2编码迁移脚本
+
+用途：
+    将 meta:{Journal}:{Year} 中的v1记录（"R1:" + base64(zlib)）及旧格式Bib
+    转码为v2二进制记录（预置字典 + raw deflate，见 lib/redis/paper_record.py）。
+
+    1. 从随机抽样的Block中取样本payload训练压缩字典，登记为新的字典版本
+    2. 切换当前字典，之后新写入的记录直接编码为v2
+    3. 逐Block转码（已使用该字典的v2记录跳过，转码期间被重新写入的文献不覆盖）
+    4. 输出转码前后的Value字节数，并按平均每篇大小推算到 --project-papers 篇
+
+使用方法：
+    python scripts/migrate_paper_blocks_v2.py --dry-run          # 只训练字典并估算
+    python scripts/migrate_paper_blocks_v2.py
+    python scripts/migrate_paper_blocks_v2.py --dict-id 3        # 使用已登记的字典，不重新训练
+
+注意：
+    - 可在服务运行时执行；v1与v2记录可以并存，读取时按前缀区分
+    - 字典切换后，未升级到本版本的进程无法读取v2记录，须先升级全部Web/Worker进程
+    - 旧版本字典不会删除，已转码的记录按头部的字典ID解码
+"""
+
+import argparse
+import base64
+import os
+import random
+import sys
+import time
+import zlib
+
+# 添加项目根目录到路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from lib.redis.connection import get_binary_client, redis_ping
+from lib.redis.paper_blocks import PaperBlocks
+from lib.redis.paper_dict import PaperDictionary
+from lib.redis.paper_record import (
+    MAX_DICT_SIZE, RECORD_PREFIX, train_dictionary, encode_payload_v2
+)
+
+
+def sample_payloads(block_keys: list, samples: int, rng: random.Random) -> list:
+    """从随机Block中抽取样本payload"""
+    client = get_binary_client()
+    keys = list(block_keys)
+    rng.shuffle(keys)
+    per_block = max(1, samples // max(1, min(len(keys), 200)))
+
+    payloads = []
+    for block_key in keys:
+        if len(payloads) >= samples:
+            break
+        values = list((client.hgetall(block_key) or {}).values())
+        for value in rng.sample(values, min(per_block, len(values))):
+            try:
+                payloads.append(PaperBlocks.to_payload(value))
+            except Exception:
+                continue
+    return payloads[:samples]
+
+
+def estimate(holdout: list, zdict: bytes) -> None:
+    """在未参与训练的样本上估算压缩效果"""
+    if not holdout:
+        return
+    v1 = sum(len(RECORD_PREFIX) + len(base64.b64encode(zlib.compress(p))) for p in holdout)
+    v2 = sum(len(encode_payload_v2(p, 0, zdict)) for p in holdout)
+    print(f"  留出样本 {len(holdout)} 篇：v1 平均 {v1 / len(holdout):.0f} B/篇，"
+          f"v2 平均 {v2 / len(holdout):.0f} B/篇（节省 {(1 - v2 / max(v1, 1)) * 100:.1f}%）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文献Block v2编码迁移")
+    parser.add_argument('--samples', type=int, default=20000, help='字典训练样本数')
+    parser.add_argument('--dict-size', type=int, default=MAX_DICT_SIZE, help='字典大小（字节）')
+    parser.add_argument('--dict-id', type=int, default=0, help='使用已登记的字典ID，不重新训练')
+    parser.add_argument('--dry-run', action='store_true', help='只训练字典并估算，不登记、不转码')
+    parser.add_argument('--project-papers', type=int, default=5000000,
+                        help='按平均每篇大小推算的文献总数')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("文献Block v2编码迁移工具")
+    print("=" * 50)
+
+    if not redis_ping():
+        print("[错误] Redis不可用")
+        sys.exit(1)
+
+    block_keys = PaperBlocks.list_blocks()
+    print(f"[步骤1] 共 {len(block_keys)} 个Block")
+    if not block_keys:
+        return
+
+    rng = random.Random(args.seed)
+    if args.dict_id:
+        dict_id = args.dict_id
+        zdict = PaperDictionary.get(dict_id)
+        if not zdict:
+            print(f"[错误] 字典 {dict_id} 不存在")
+            sys.exit(1)
+        print(f"[步骤2] 使用已登记的字典 {dict_id}（{len(zdict)} B）")
+    else:
+        print(f"[步骤2] 抽样 {args.samples} 篇训练字典...")
+        payloads = sample_payloads(block_keys, args.samples, rng)
+        holdout = payloads[::10]
+        training = [p for i, p in enumerate(payloads) if i % 10]
+        start = time.perf_counter()
+        zdict = train_dictionary(training, args.dict_size)
+        print(f"  字典 {len(zdict)} B，训练耗时 {time.perf_counter() - start:.1f}s")
+        estimate(holdout, zdict)
+        if args.dry_run:
+            return
+        dict_id = PaperDictionary.save(zdict)
+        if not dict_id:
+            print("[错误] 登记字典失败")
+            sys.exit(1)
+        print(f"  已登记为字典 {dict_id}")
+
+    if args.dry_run:
+        return
+
+    if not PaperDictionary.set_current(dict_id):
+        print("[错误] 切换当前字典失败")
+        sys.exit(1)
+    print(f"[步骤3] 当前字典已切换为 {dict_id}，逐Block转码...")
+    converted = before = after = 0
+    start = time.perf_counter()
+    for i, block_key in enumerate(block_keys, 1):
+        n, b, a = PaperBlocks.migrate_block_v2(block_key, dict_id, zdict)
+        converted += n
+        before += b
+        after += a
+        if i % 500 == 0:
+            print(f"  {i}/{len(block_keys)} 个Block，已转码 {converted} 篇")
+    elapsed = time.perf_counter() - start
+
+    print()
+    print(f"转码 {converted} 篇，耗时 {elapsed:.1f}s")
+    if converted:
+        saved = before - after
+        print(f"Value字节数: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB"
+              f"（节省 {saved / 1e6:.1f} MB，{saved / max(before, 1) * 100:.1f}%）")
+        per_paper = saved / converted
+        print(f"按 {args.project_papers} 篇推算节省: {per_paper * args.project_papers / 1e9:.2f} GB"
+              f"（平均 {per_paper:.0f} B/篇，不含Hash编码开销）")
+
+
+if __name__ == '__main__':
+    main()
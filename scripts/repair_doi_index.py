@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+DOI反向索引离线修复脚本
+
+用途：
+    PaperBlocks.get_paper_by_doi 不再在索引未命中时遍历全部Block（每个未知DOI曾需数千次往返），
+    索引由 set_block / set_paper 在写入Block的同一事务中维护。索引损坏（如手工修改Redis、
+    旧版本进程写入）时用本脚本离线修复：
+
+    1. 遍历全部 meta: Block，逐Block批量查询其DOI的索引条目（不回退旧索引）
+    2. 缺失或指向其他Block的条目重新写入（同时补齐布隆过滤器）
+    3. 指定 --rebuild-bloom 时按全部Block中的DOI重建布隆过滤器并替换
+       （清除已删除Block留下的位；请在没有Block写入时执行，替换前写入的DOI会丢失其位）
+
+使用方法：
+    python scripts/repair_doi_index.py --dry-run          # 只检查，不修改
+    python scripts/repair_doi_index.py
+    python scripts/repair_doi_index.py --rebuild-bloom
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# 添加项目根目录到路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from lib.redis.connection import get_binary_client, redis_ping
+from lib.redis.paper_blocks import PaperBlocks
+from lib.redis.doi_index import DoiIndex, KEY_DOI_BLOOM
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DOI反向索引离线修复")
+    parser.add_argument('--dry-run', action='store_true', help='只检查，不修改')
+    parser.add_argument('--rebuild-bloom', action='store_true', help='重建布隆过滤器')
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("DOI反向索引修复工具")
+    print("=" * 50)
+
+    if not redis_ping():
+        print("[错误] Redis不可用")
+        sys.exit(1)
+
+    binary = get_binary_client()
+    rebuilt_key = f"{KEY_DOI_BLOOM}:rebuild"
+    if args.rebuild_bloom and not args.dry_run:
+        binary.delete(rebuilt_key)
+
+    block_keys = PaperBlocks.list_blocks()
+    print(f"[步骤1] 检查 {len(block_keys)} 个Block...")
+    checked = missing = moved = 0
+    start = time.perf_counter()
+    for i, block_key in enumerate(block_keys, 1):
+        parsed = PaperBlocks.parse_block_key(block_key)
+        dois = PaperBlocks.get_block_dois(*parsed) if parsed else []
+        if not dois:
+            continue
+        indexed = DoiIndex.get_many(dois, legacy=False)
+        fixes = {}
+        for doi in dois:
+            current = indexed.get(doi)
+            if current == block_key:
+                continue
+            if current is None:
+                missing += 1
+            else:
+                moved += 1
+            fixes[doi] = block_key
+        checked += len(dois)
+
+        if not args.dry_run:
+            if fixes:
+                DoiIndex.set(fixes)
+            if args.rebuild_bloom:
+                pipe = binary.pipeline(transaction=False)
+                DoiIndex.add_bloom(pipe, dois, rebuilt_key)
+                pipe.execute()
+        if i % 500 == 0:
+            print(f"  {i}/{len(block_keys)} 个Block，缺失 {missing}，指向错误 {moved}")
+
+    print(f"  检查 {checked} 个DOI，缺失 {missing}，指向错误 {moved}，"
+          f"耗时 {time.perf_counter() - start:.1f}s")
+    if args.dry_run:
+        return
+    if missing or moved:
+        print(f"[步骤2] 已修复 {missing + moved} 个索引条目")
+
+    if args.rebuild_bloom:
+        if binary.exists(rebuilt_key) and DoiIndex.mark_bloom_ready(rebuilt_key):
+            print("[步骤3] 布隆过滤器已重建")
+    else:
+        DoiIndex.mark_bloom_ready()
+
+
+if __name__ == '__main__':
+    main()
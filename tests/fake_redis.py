@@ -0,0 +1,71 @@
+"""
+单元测试用的内存Redis
+
+以 fakeredis（Lua脚本由 lupa 执行）替换 lib.redis.connection 的全局客户端，
+Redis数据层的Lua脚本、Pipeline与事务按真实语义执行，无需启动Redis服务
+
+依赖：
+    pip install "fakeredis[lua]"
+"""
+
+import os
+import sys
+import unittest
+
+# 添加项目根目录到路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+try:
+    import fakeredis
+    import lupa  # noqa: F401  fakeredis 执行Lua脚本需要
+    FAKEREDIS_AVAILABLE = True
+except ImportError:
+    fakeredis = None
+    FAKEREDIS_AVAILABLE = False
+
+
+def reset_process_state() -> None:
+    """清空进程内缓存（Block缓存、DOI索引的Block ID、压缩字典、租约、熔断器、事件消费组）"""
+    from lib.redis import block_cache, doi_index, paper_dict
+    from lib.redis.scheduler_events import SchedulerEvents
+    from lib.process import block_lease, circuit_breaker
+
+    block_cache._cache = None
+    doi_index._block_ids.clear()
+    doi_index._block_keys.clear()
+    paper_dict._dicts.clear()
+    paper_dict._current = None
+    paper_dict._current_checked = 0.0
+    block_lease._held.clear()
+    circuit_breaker._breakers.clear()
+    SchedulerEvents._group_ready = False
+    SchedulerEvents._last_reclaim = 0.0
+
+
+@unittest.skipUnless(FAKEREDIS_AVAILABLE, "需要 fakeredis[lua]")
+class RedisTestCase(unittest.TestCase):
+    """
+    每个测试使用独立的内存Redis
+
+    self.redis 为文本客户端（decode_responses=True），self.binary 为二进制客户端，
+    二者共享同一份数据，与 get_redis_client / get_binary_client 一致
+    """
+
+    def setUp(self):
+        from lib.redis import connection
+
+        server = fakeredis.FakeServer()
+        self.redis = fakeredis.FakeRedis(server=server, decode_responses=True)
+        self.binary = fakeredis.FakeRedis(server=server)
+        self._saved_clients = (connection._global_client, connection._binary_client)
+        connection._global_client = self.redis
+        connection._binary_client = self.binary
+        reset_process_state()
+        self.addCleanup(self._restore_clients)
+
+    def _restore_clients(self):
+        from lib.redis import connection
+
+        connection._global_client, connection._binary_client = self._saved_clients
+        reset_process_state()
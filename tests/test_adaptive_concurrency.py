@@ -0,0 +1,75 @@
+"""
+AIMD自适应并发上限单元测试
+"""
+
+import unittest
+
+from lib.process.adaptive_concurrency import AIMDLimit, BACKOFF, MIN_WINDOW
+
+
+def run_window(limiter, latency=1.0, in_flight=None, congested=False):
+    """喂入一个完整评估窗口的样本"""
+    in_flight = limiter.get_limit() if in_flight is None else in_flight
+    for _ in range(max(MIN_WINDOW, limiter.get_limit())):
+        limiter.observe(latency, congested, in_flight)
+
+
+class AIMDLimitTest(unittest.TestCase):
+
+    def test_slow_start_doubles_until_max(self):
+        limiter = AIMDLimit(2, 16)
+        run_window(limiter)
+        self.assertEqual(limiter.get_limit(), 4)
+        run_window(limiter)
+        run_window(limiter)
+        run_window(limiter)
+        self.assertEqual(limiter.get_limit(), 16)
+        self.assertTrue(limiter.slow_start)
+
+    def test_no_growth_when_limit_is_not_the_bottleneck(self):
+        limiter = AIMDLimit(8, 64)
+        run_window(limiter, in_flight=3)
+        self.assertEqual(limiter.get_limit(), 8)
+        self.assertIsNotNone(limiter.baseline)
+
+    def test_congestion_backs_off_once_per_window(self):
+        limiter = AIMDLimit(20, 64)
+        limiter.observe(None, True, 20)
+        self.assertEqual(limiter.get_limit(), int(20 * BACKOFF))
+        self.assertFalse(limiter.slow_start)
+
+        # 同一窗口内的后续拥塞信号不再叠加退避
+        limiter.observe(None, True, 14)
+        self.assertEqual(limiter.get_limit(), int(20 * BACKOFF))
+
+    def test_additive_increase_after_slow_start(self):
+        limiter = AIMDLimit(10, 64)
+        limiter.observe(None, True, 10)
+        limit = limiter.get_limit()
+        run_window(limiter)
+        self.assertEqual(limiter.get_limit(), limit + 1)
+        run_window(limiter)
+        self.assertEqual(limiter.get_limit(), limit + 2)
+
+    def test_latency_above_baseline_backs_off(self):
+        limiter = AIMDLimit(10, 64, tolerance=1.5)
+        run_window(limiter, latency=1.0)
+        limit = limiter.get_limit()
+        run_window(limiter, latency=3.0)
+        self.assertEqual(limiter.get_limit(), int(limit * BACKOFF))
+        self.assertAlmostEqual(limiter.baseline, 1.0)
+
+    def test_limit_stays_within_bounds(self):
+        limiter = AIMDLimit(3, 4)
+        for _ in range(10):
+            limiter.observe(None, True, 1)
+            run_window(limiter, congested=True)
+        self.assertEqual(limiter.get_limit(), 1)
+
+        limiter.set_max(2)
+        self.assertEqual(limiter.max_limit, 2)
+        self.assertEqual(limiter.get_stats()['limit'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
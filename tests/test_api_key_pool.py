@@ -0,0 +1,90 @@
+"""
+API Key池单元测试（分布式限流路径的选Key与熔断探测名额、结束请求时的RPM计数）
+"""
+
+import unittest
+from unittest import mock
+
+from lib.config import config_loader as config
+from tests.fake_redis import RedisTestCase
+
+
+class SharedAcquireTest(RedisTestCase):
+
+    def setUp(self):
+        super().setUp()
+        from lib.process.api_key_pool import ApiKeyPool
+
+        for name, value in (('API_KEYS', ['sk-aaaaaaaa0000', 'sk-bbbbbbbb1111']),
+                            ('USE_REDIS_RATELIMITER', True), ('rate_limit_max_wait', 0)):
+            patcher = mock.patch.object(config, name, value, create=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.pool = ApiKeyPool()
+        self.pool.refresh()
+        self.keys = {k.key_id: k for k in self.pool._keys.values()}
+
+    def _open_then_half_open(self, key):
+        breaker = key.breaker
+        breaker._open(0.0, 1.0)
+        breaker._opened_at = 0.0  # 开启时长已过，下一次检查转为 HALF_OPEN
+
+    def test_half_open_key_admits_a_single_probe(self):
+        self._open_then_half_open(self.keys['cfg0'])
+        self._open_then_half_open(self.keys['cfg1'])
+
+        first = self.pool.acquire(tokens=100)
+        second = self.pool.acquire(tokens=100)
+        third = self.pool.acquire(tokens=100)
+
+        # 两个Key各放行一个探测请求，之后没有可用Key
+        self.assertEqual({first.key_id, second.key_id}, {'cfg0', 'cfg1'})
+        self.assertIsNone(third)
+
+    def test_rejected_probe_refunds_reservation_and_uses_next_key(self):
+        from lib.redis.rate_limiter import RateLimiter
+
+        cfg0 = self.keys['cfg0']
+        # 选Key时仍显示可用，但探测名额在此期间被其他进程的请求占用
+        with mock.patch.object(cfg0.breaker, 'try_acquire', return_value=False):
+            key = self.pool.acquire(tokens=100)
+
+        self.assertEqual(key.key_id, 'cfg1')
+        self.assertEqual(cfg0.in_flight, 0)
+        bucket = self.redis.hgetall(RateLimiter._key_bucket('cfg0'))
+        self.assertAlmostEqual(float(bucket['t']), int(cfg0.tpm_limit * self.pool.get_target_ratio()),
+                               delta=5)
+        self.assertAlmostEqual(float(bucket['r']), int(cfg0.rpm_limit * self.pool.get_target_ratio()),
+                               delta=1)
+
+
+class ReleaseTest(RedisTestCase):
+    """只有已发出的请求计入RPM，未完成的请求只归还在途名额与预扣额度"""
+
+    def setUp(self):
+        super().setUp()
+        from lib.process.api_key_pool import ApiKeyPool
+
+        for name, value in (('API_KEYS', ['sk-aaaaaaaa0000']), ('USE_REDIS_RATELIMITER', False)):
+            patcher = mock.patch.object(config, name, value, create=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.pool = ApiKeyPool()
+        self.pool.refresh()
+
+    def test_unfinished_call_is_not_counted(self):
+        key = self.pool.acquire(tokens=100)
+        self.assertEqual((key.in_flight, key.reserved), (1, 100))
+        self.pool.release(key, 0, 100, error=None)
+        self.assertEqual((key.in_flight, key.reserved, key.rpm_window.get_rpm()), (0, 0, 0))
+
+        for error in ('', 'timeout'):
+            key = self.pool.acquire(tokens=100)
+            self.pool.release(key, 80 if not error else 0, 100, error=error)
+        self.assertEqual((key.in_flight, key.reserved), (0, 0))
+        self.assertEqual(key.rpm_window.get_rpm(), 2)
+        self.assertEqual(key.tpm_window.get_tpm(), 80)
+
+
+if __name__ == '__main__':
+    unittest.main()
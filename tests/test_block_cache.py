@@ -0,0 +1,215 @@
+"""
+已解码Block进程内缓存单元测试（字节预算LRU、版本失效、Bib升级、并发未命中只加载一次、切片按区间读取）
+"""
+
+import threading
+import unittest
+from unittest import mock
+
+from lib.redis.block_cache import BlockCache, CachedBlock, estimate_size
+from lib.redis.paper_record import PaperRecord
+from tests.fake_redis import RedisTestCase
+
+
+BIB = '@article{k%d, title={Title %d}, abstract={Abstract %d}}'
+
+
+def _entry(version=1, with_bib=False, size=100, title='T'):
+    record = PaperRecord(title, 'A', '', 2020, 'bib' if with_bib else '')
+    return CachedBlock(version, with_bib, ['10.1/a'], {'10.1/a': record}, size)
+
+
+class BlockCacheTest(unittest.TestCase):
+
+    def test_lru_eviction_by_bytes(self):
+        cache = BlockCache(250)
+        cache.put('a', _entry())
+        cache.put('b', _entry())
+        self.assertIsNotNone(cache.get('a', 1, False))  # a 变为最近使用
+        cache.put('c', _entry())
+
+        self.assertIsNone(cache.get('b', 1, False))
+        self.assertIsNotNone(cache.get('a', 1, False))
+        self.assertIsNotNone(cache.get('c', 1, False))
+        stats = cache.get_stats()
+        self.assertEqual((stats['entries'], stats['bytes'], stats['evictions']), (2, 200, 1))
+
+        # 超过整个预算的条目不缓存
+        cache.put('d', _entry(size=300))
+        self.assertIsNone(cache.get('d', 1, False))
+        self.assertEqual(len(cache), 2)
+
+    def test_version_mismatch_is_a_miss(self):
+        cache = BlockCache(1000)
+        cache.put('a', _entry(version=1))
+        self.assertIsNone(cache.get('a', 2, False))
+
+        loaded = cache.get_or_load('a', 2, False, lambda: _entry(version=2, title='new'))
+        self.assertEqual(loaded.records['10.1/a'].title, 'new')
+        self.assertIs(cache.get('a', 2, False), loaded)
+
+        # 并发加载时旧版本的结果不覆盖新版本
+        cache.put('a', _entry(version=1))
+        self.assertEqual(cache.get('a', 2, False).version, 2)
+
+        cache.invalidate('a')
+        self.assertEqual(cache.get_stats()['bytes'], 0)
+
+    def test_field_only_entry_is_upgraded_for_bib_reads(self):
+        cache = BlockCache(1000)
+        cache.put('a', _entry(with_bib=False))
+        self.assertIsNone(cache.get('a', 1, True))
+
+        full = cache.get_or_load('a', 1, True, lambda: _entry(with_bib=True))
+        self.assertTrue(full.with_bib)
+        # 含Bib的条目同样满足只需字段的读取，且不被只含字段的条目替换
+        self.assertIs(cache.get('a', 1, False), full)
+        cache.put('a', _entry(with_bib=False))
+        self.assertTrue(cache.get('a', 1, False).with_bib)
+
+    def test_concurrent_misses_load_once(self):
+        cache = BlockCache(1000)
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def loader():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return _entry()
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            cache.get_or_load('a', 1, False, loader))) for _ in range(4)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(r is results[0] for r in results))
+        stats = cache.get_stats()
+        self.assertEqual((stats['misses'], stats['hits'] + stats['shared']), (1, 3))
+
+    def test_failed_load_is_not_cached(self):
+        cache = BlockCache(1000)
+        self.assertIsNone(cache.get_or_load('a', 1, False, lambda: None))
+        self.assertEqual(len(cache), 0)
+        self.assertFalse(BlockCache(0).enabled)
+
+    def test_estimate_size_counts_text_and_overhead(self):
+        records = {'d': PaperRecord('tt', 'aaa', 'u', 2020, 'bbbb')}
+        self.assertEqual(estimate_size(records), 1 + 2 + 3 + 1 + 4 + 400)
+
+
+class PaperBlocksCacheTest(RedisTestCase):
+
+    def setUp(self):
+        super().setUp()
+        from lib.redis.block_cache import get_block_cache
+        from lib.redis.paper_blocks import PaperBlocks
+
+        self.cache = get_block_cache()
+        self.assertTrue(self.cache.enabled)
+        PaperBlocks.set_block('J', 2020, {f'10.1/{i}': BIB % (i, i, i) for i in range(3)},
+                              snapshot=False)
+
+    def test_repeated_reads_decode_once(self):
+        from lib.redis.paper_blocks import PaperBlocks
+
+        first = PaperBlocks.get_block_records('meta:J:2020')
+        second = PaperBlocks.get_block_records('meta:J:2020#1-2')
+        self.assertEqual(list(second), ['10.1/1', '10.1/2'])
+        self.assertEqual(second['10.1/1'], first['10.1/1'])
+        stats = self.cache.get_stats()
+        self.assertEqual((stats['misses'], stats['hits']), (1, 1))
+
+    def test_set_paper_invalidates_cached_block(self):
+        from lib.redis.paper_blocks import PaperBlocks
+
+        self.assertEqual(PaperBlocks.get_block_records('meta:J:2020')['10.1/0'].title, 'Title 0')
+        PaperBlocks.set_paper('J', 2020, '10.1/0', BIB % (0, 99, 0))
+        self.assertEqual(PaperBlocks.get_block_records('meta:J:2020')['10.1/0'].title, 'Title 99')
+
+    def test_other_process_write_is_seen_via_version(self):
+        from lib.redis.paper_blocks import KEY_BLOCK_VERSION, PaperBlocks
+
+        PaperBlocks.get_block_records('meta:J:2020')
+        # 其他进程写入：本进程的缓存条目没有被移除，只有版本号递增
+        self.redis.hset('meta:J:2020', '10.1/0', PaperBlocks._pack(BIB % (0, 42, 0)))
+        self.redis.hincrby(KEY_BLOCK_VERSION, 'meta:J:2020', 1)
+        self.assertEqual(PaperBlocks.get_block_records('meta:J:2020')['10.1/0'].title, 'Title 42')
+
+    def test_bib_read_upgrades_field_only_entry(self):
+        from lib.redis.paper_blocks import PaperBlocks
+
+        self.assertEqual(PaperBlocks.get_block_records('meta:J:2020')['10.1/2'].bib, '')
+        self.assertEqual(PaperBlocks.get_block('J', 2020)['10.1/2'], BIB % (2, 2, 2))
+        self.assertTrue(self.cache._entries['meta:J:2020'].with_bib)
+
+
+class SliceReadTest(RedisTestCase):
+    """缓存未命中的切片只读取自己的区间，不下载整个Block"""
+
+    def setUp(self):
+        super().setUp()
+        from lib.redis import paper_blocks
+        from lib.redis.paper_blocks import PaperBlocks, READ_BLOCK_SCRIPT
+
+        PaperBlocks.set_block('J', 2020, {f'10.1/{i:02d}': BIB % (i, i, i) for i in range(40)},
+                              snapshot=False)
+        self.slices = PaperBlocks.split_into_slices(['meta:J:2020'], 10)
+
+        self.reads = []
+        get_script = paper_blocks.get_script
+
+        def counting_get_script(source, binary=False):
+            script = get_script(source, binary=binary)
+            if source != READ_BLOCK_SCRIPT or script is None:
+                return script
+
+            def call(keys, args):
+                self.reads.append(args[0])
+                return script(keys=keys, args=args)
+            return call
+
+        patcher = mock.patch.object(paper_blocks, 'get_script', side_effect=counting_get_script)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _read_slices(self):
+        from lib.redis.paper_blocks import PaperBlocks
+
+        dois = []
+        for slice_key in self.slices:
+            records = PaperBlocks.get_block_records(slice_key)
+            start, end = PaperBlocks.split_slice(slice_key)[1]
+            self.assertEqual(list(records), [f'10.1/{i:02d}' for i in range(start, end + 1)])
+            dois += list(records)
+        return dois
+
+    def test_block_over_budget_reads_one_span_per_slice(self):
+        from lib.redis import block_cache
+
+        block_cache._cache = BlockCache(1000)
+        self.assertEqual(len(self._read_slices()), 40)
+        self.assertEqual(self.reads, ['span'] * 4)
+        self.assertEqual(len(block_cache._cache), 0)
+
+    def test_cached_block_serves_slices_without_reading(self):
+        from lib.redis import block_cache
+        from lib.redis.paper_blocks import PaperBlocks
+
+        block_cache._cache = BlockCache(1 << 20)
+        PaperBlocks.get_block_records('meta:J:2020')
+        self._read_slices()
+        self.assertEqual(self.reads, ['all'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,258 @@
+"""
+Block租约单元测试（领取、完成、过期回收重新入队、查询完成判定与进程退出时交还）
+"""
+
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from tests.fake_redis import RedisTestCase
+
+
+BIB = '@article{k%d, title={T%d}, abstract={A%d}}'
+
+
+class BlockLeaseTest(RedisTestCase):
+
+    def setUp(self):
+        super().setUp()
+        from lib.redis.paper_blocks import PaperBlocks
+        from lib.redis.task_queue import TaskQueue
+
+        self.uid, self.qid = 1, 'q'
+        self.block_key = 'meta:J:2020'
+        PaperBlocks.set_block('J', 2020, {f'10.1/{i}': BIB % (i, i, i) for i in range(3)})
+        TaskQueue.init_status(self.uid, self.qid, 1)
+        TaskQueue.enqueue_blocks(self.uid, self.qid, [self.block_key])
+
+    def _leases(self):
+        from lib.redis.task_queue import TaskQueue
+
+        return self.redis.zrange(TaskQueue._key_leases(self.uid, self.qid), 0, -1)
+
+    def _expire_leases(self):
+        from lib.redis.task_queue import TaskQueue
+
+        key = TaskQueue._key_leases(self.uid, self.qid)
+        for member in self.redis.zrange(key, 0, -1):
+            self.redis.zadd(key, {member: 0})
+
+    def test_lease_then_complete_counts_once(self):
+        from lib.process.block_lease import complete_block, lease_block
+        from lib.redis.task_queue import TaskQueue
+
+        self.assertEqual(lease_block(self.uid, self.qid), self.block_key)
+        self.assertEqual(self._leases(), [self.block_key])
+        self.assertEqual(TaskQueue.get_lease_count(self.uid, self.qid), 1)
+
+        self.assertEqual(complete_block(self.uid, self.qid, self.block_key), 1)
+        self.assertEqual(self._leases(), [])
+        self.assertIsNone(complete_block(self.uid, self.qid, self.block_key))
+        self.assertEqual(TaskQueue.get_status(self.uid, self.qid)['finished_blocks'], 1)
+
+    def test_expired_lease_is_requeued(self):
+        from lib.process.block_lease import lease_block, reap_expired
+        from lib.redis.task_queue import KEY_LEASED_QUERIES, TaskQueue
+
+        lease_block(self.uid, self.qid)
+        self.assertEqual(reap_expired(), 0)  # 未到期
+
+        self._expire_leases()
+        self.assertEqual(reap_expired(), 1)
+        self.assertEqual(TaskQueue.get_all_pending(self.uid, self.qid), [self.block_key])
+        self.assertEqual(self._leases(), [])
+        # 下一轮回收发现没有租约，从待回收集合中移除
+        reap_expired()
+        self.assertFalse(self.redis.sismember(KEY_LEASED_QUERIES, f'{self.uid}:{self.qid}'))
+
+    def test_partially_processed_block_requeues_remaining_papers(self):
+        from lib.process.block_lease import lease_block, reap_expired
+        from lib.redis.paper_blocks import PaperBlocks
+        from lib.redis.result_cache import ResultCache
+        from lib.redis.task_queue import TaskQueue
+
+        lease_block(self.uid, self.qid)
+        self.redis.hset(ResultCache._key_result(self.uid, self.qid), '10.1/1', '{}')
+        self._expire_leases()
+        reap_expired()
+
+        expected = PaperBlocks.make_retry_key(self.block_key, ['10.1/0', '10.1/2'], 0)
+        pending = TaskQueue.get_all_pending(self.uid, self.qid)
+        self.assertEqual(len(pending), 1)
+        self.assertEqual(PaperBlocks.split_retry(pending[0]), PaperBlocks.split_retry(expected))
+        self.assertEqual(PaperBlocks.retry_attempt(pending[0]), 0)
+
+    def test_terminated_query_drops_expired_lease(self):
+        from lib.process.block_lease import lease_block, reap_expired
+        from lib.redis.task_queue import TaskQueue
+
+        lease_block(self.uid, self.qid)
+        TaskQueue.set_terminate_signal(self.uid, self.qid)
+        self._expire_leases()
+
+        self.assertEqual(reap_expired(), 0)
+        self.assertEqual(TaskQueue.get_pending_count(self.uid, self.qid), 0)
+        self.assertEqual(self._leases(), [])
+
+    def test_late_completion_after_reap_is_not_counted(self):
+        from lib.process.block_lease import complete_block, lease_block, reap_expired
+        from lib.redis.task_queue import TaskQueue
+
+        lease_block(self.uid, self.qid)
+        self._expire_leases()
+        reap_expired()
+
+        self.assertIsNone(complete_block(self.uid, self.qid, self.block_key))
+        self.assertEqual(TaskQueue.get_status(self.uid, self.qid).get('finished_blocks', 0), 0)
+
+
+class CompletionCheckTest(RedisTestCase):
+    """Worker全部退出后，只有完成数等于总数且没有租约时才标记完成"""
+
+    def setUp(self):
+        super().setUp()
+        from lib.process import scheduler
+        from lib.redis.task_queue import TaskQueue
+
+        self.scheduler = scheduler
+        self.uid, self.qid = 1, 'q'
+        TaskQueue.init_status(self.uid, self.qid, 2)
+        TaskQueue.enqueue_blocks(self.uid, self.qid, ['meta:J:2020', 'meta:J:2021'])
+        TaskQueue.claim_owner(self.uid, self.qid, scheduler.get_process_id())
+
+        patcher = mock.patch.object(scheduler, 'mark_query_completed')
+        self.mark_completed = patcher.start()
+        self.addCleanup(patcher.stop)
+        worker = SimpleNamespace(uid=self.uid, is_alive=lambda: False)
+        with scheduler._managed_lock:
+            scheduler._managed_queries[self.qid] = [worker]
+        self.addCleanup(scheduler._managed_queries.pop, self.qid, None)
+
+    def _owner(self):
+        from lib.redis.task_queue import TaskQueue
+
+        return self.redis.get(TaskQueue._key_owner(self.uid, self.qid))
+
+    def test_all_blocks_finished_marks_completed(self):
+        from lib.redis.task_queue import TaskQueue
+
+        for _ in range(2):
+            block_key = TaskQueue.pop_block(self.uid, self.qid)
+            TaskQueue.complete_block(self.uid, self.qid, block_key)
+
+        self.scheduler._check_completions()
+        self.mark_completed.assert_called_once_with(self.qid)
+        self.assertNotIn(self.qid, self.scheduler._managed_queries)
+
+    def test_outstanding_lease_only_releases_owner(self):
+        from lib.redis.task_queue import TaskQueue
+
+        block_key = TaskQueue.pop_block(self.uid, self.qid)
+        TaskQueue.complete_block(self.uid, self.qid, block_key)
+        # 第二个Block的Worker异常退出，租约留待回收
+        TaskQueue.pop_block(self.uid, self.qid)
+
+        self.scheduler._check_completions()
+        self.mark_completed.assert_not_called()
+        self.assertNotIn(self.qid, self.scheduler._managed_queries)
+        self.assertIsNone(self._owner())
+
+    def test_finished_count_short_of_total_is_not_completed(self):
+        from lib.redis.task_queue import TaskQueue
+
+        block_key = TaskQueue.pop_block(self.uid, self.qid)
+        TaskQueue.complete_block(self.uid, self.qid, block_key)
+
+        self.scheduler._check_completions()
+        self.mark_completed.assert_not_called()
+        self.assertIsNone(self._owner())
+
+
+class ShutdownTest(RedisTestCase):
+    """进程退出时停止Worker、提交缓冲区、交还租约并释放归属"""
+
+    def setUp(self):
+        super().setUp()
+        from lib.process import scheduler
+        from lib.redis.paper_blocks import PaperBlocks
+        from lib.redis.task_queue import TaskQueue
+        from lib.redis.user_cache import UserCache
+
+        self.scheduler = scheduler
+        self.uid, self.qid = 1, 'q'
+        self.block_key = 'meta:J:2020'
+        PaperBlocks.set_block('J', 2020, {f'10.1/{i}': BIB % (i, i, i) for i in range(6)})
+        TaskQueue.init_status(self.uid, self.qid, 1)
+        TaskQueue.enqueue_blocks(self.uid, self.qid, [self.block_key])
+        TaskQueue.claim_owner(self.uid, self.qid, scheduler.get_process_id())
+        UserCache.set_balance(self.uid, 100)
+        self.addCleanup(scheduler._managed_queries.pop, self.qid, None)
+
+    def _state(self):
+        from lib.redis.result_cache import ResultCache
+        from lib.redis.task_queue import TaskQueue
+
+        status = TaskQueue.get_status(self.uid, self.qid)
+        return (
+            sorted(self.redis.hkeys(ResultCache._key_result(self.uid, self.qid))),
+            TaskQueue.get_all_pending(self.uid, self.qid),
+            TaskQueue.get_lease_count(self.uid, self.qid),
+            status.get('finished_blocks', 0),
+            self.redis.get(TaskQueue._key_owner(self.uid, self.qid)),
+        )
+
+    def test_stopped_worker_flushes_and_hands_back_remaining_papers(self):
+        from lib.process import block_lease
+        from lib.process.worker import BlockWorker
+        from lib.redis.paper_blocks import PaperBlocks
+
+        reached = threading.Event()
+
+        def ai_processor(doi, title, abstract):
+            if doi == '10.1/1':
+                # 第2篇处理中收到 SIGTERM
+                reached.set()
+                deadline = time.time() + 5
+                while worker._running and time.time() < deadline:
+                    time.sleep(0.01)
+            return {'relevant': 'Y', 'reason': 'r', '_tokens': 0}
+
+        worker = BlockWorker(self.uid, self.qid, ai_processor)
+        worker._batch_size = 10
+        worker._batch_interval = 3600
+        worker.start()
+        with self.scheduler._managed_lock:
+            self.scheduler._managed_queries[self.qid] = [worker]
+        self.assertTrue(reached.wait(5))
+
+        self.scheduler.shutdown_scheduler(timeout=5)
+
+        results, pending, leases, finished, owner = self._state()
+        # 缓冲区中的2篇已提交，Block未计完成，剩余4篇作为替代工作单元交还
+        self.assertEqual(results, ['10.1/0', '10.1/1'])
+        self.assertEqual(len(pending), 1)
+        self.assertEqual(PaperBlocks.split_retry(pending[0]), PaperBlocks.split_retry(
+            PaperBlocks.make_retry_key(self.block_key, [f'10.1/{i}' for i in range(2, 6)], 0)))
+        self.assertEqual((leases, finished, owner), (0, 0, None))
+        self.assertNotIn(self.qid, self.scheduler._managed_queries)
+        self.assertEqual(block_lease._held, {})
+
+    def test_leases_of_unfinished_workers_are_handed_back(self):
+        from lib.process.block_lease import lease_block
+        from lib.redis.task_queue import TaskQueue
+
+        self.assertEqual(lease_block(self.uid, self.qid), self.block_key)
+        self.scheduler.shutdown_scheduler(timeout=0)
+        self.assertEqual(self._state()[1:4], ([self.block_key], 0, 0))
+
+        # 已终止的查询只删除租约
+        lease_block(self.uid, self.qid)
+        TaskQueue.set_terminate_signal(self.uid, self.qid)
+        self.scheduler.shutdown_scheduler(timeout=0)
+        self.assertEqual(self._state()[1:3], ([], 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Block预取单元测试（领取并预读、队列耗尽后回退直接领取、关闭时归还租约）
+"""
+
+import time
+import unittest
+
+from tests.fake_redis import RedisTestCase
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("等待超时")
+        time.sleep(0.01)
+
+
+class BlockPrefetchTest(RedisTestCase):
+
+    def setUp(self):
+        super().setUp()
+        from lib.redis.task_queue import TaskQueue
+
+        self.uid, self.qid = 1, 'q'
+        self.blocks = [f'meta:J:{2000 + i}' for i in range(3)]
+        TaskQueue.init_status(self.uid, self.qid, len(self.blocks))
+        TaskQueue.enqueue_blocks(self.uid, self.qid, self.blocks)
+        self.loaded = []
+
+    def _loader(self, block_key):
+        self.loaded.append(block_key)
+        return {f'{block_key}/doi': None}, 2
+
+    def _prefetcher(self, depth):
+        from lib.process.block_prefetch import BlockPrefetcher
+
+        prefetcher = BlockPrefetcher(self.uid, self.qid, depth, self._loader)
+        self.addCleanup(prefetcher.close)
+        return prefetcher
+
+    def _leases(self):
+        from lib.redis.task_queue import TaskQueue
+
+        return set(self.redis.zrange(TaskQueue._key_leases(self.uid, self.qid), 0, -1))
+
+    def _pending(self):
+        from lib.redis.task_queue import TaskQueue
+
+        return TaskQueue.get_all_pending(self.uid, self.qid)
+
+    def test_each_block_is_leased_and_loaded_once(self):
+        prefetcher = self._prefetcher(depth=1)
+
+        taken = []
+        while True:
+            item = prefetcher.take(timeout=1.0)
+            if item is None:
+                break
+            block_key, papers, price = item
+            self.assertIn(block_key, self._leases())
+            self.assertEqual((list(papers), price), ([f'{block_key}/doi'], 2))
+            taken.append(block_key)
+
+        self.assertEqual(taken, self.blocks)
+        self.assertEqual(self.loaded, self.blocks)
+        self.assertEqual(self._pending(), [])
+        self.assertTrue(prefetcher.is_finished())
+
+    def test_worker_falls_back_to_lease_block_after_exhaustion(self):
+        from lib.process.block_lease import complete_block
+        from lib.process.worker import BlockWorker
+        from lib.redis.task_queue import TaskQueue
+
+        worker = BlockWorker(self.uid, self.qid)
+        worker._running = True
+        worker._prefetcher = self._prefetcher(depth=3)
+        for block_key in self.blocks:
+            self.assertEqual(worker._next_block(), block_key)
+            complete_block(self.uid, self.qid, block_key)
+        wait_until(worker._prefetcher.is_finished)
+
+        # 预取结束后追加的重试Block由Worker直接领取
+        TaskQueue.append_block(self.uid, self.qid, 'retry:1:meta:J:2000|10.1/a')
+        self.assertEqual(worker._next_block(), 'retry:1:meta:J:2000|10.1/a')
+        self.assertEqual(self._leases(), {'retry:1:meta:J:2000|10.1/a'})
+        self.assertIsNone(worker._prefetched)
+        self.assertEqual(self.loaded, self.blocks)
+
+    def test_close_returns_held_leases(self):
+        prefetcher = self._prefetcher(depth=1)
+        # 队列中1个，预取线程手中1个（等待放入队列）
+        wait_until(lambda: len(self.loaded) == 2)
+        first = prefetcher.take(timeout=1.0)[0]
+
+        prefetcher.close()
+        prefetcher._thread.join(5)
+        self.assertEqual(self._leases(), {first})
+        self.assertEqual(sorted(self._pending()), sorted(b for b in self.blocks if b != first))
+
+    def test_close_after_terminate_drops_leases(self):
+        from lib.redis.task_queue import TaskQueue
+
+        prefetcher = self._prefetcher(depth=2)
+        wait_until(lambda: prefetcher._queue.full())
+        TaskQueue.set_terminate_signal(self.uid, self.qid)
+
+        prefetcher.close()
+        prefetcher._thread.join(5)
+        self.assertEqual(self._leases(), set())
+        self.assertEqual(self._pending(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+大Block切片单元测试（切片覆盖每篇文献恰好一次、切片只读取自己的区间、生产者入队切片）
+"""
+
+import unittest
+from unittest import mock
+
+from lib.config import config_loader as config
+from tests.fake_redis import RedisTestCase
+
+
+BIB = '@article{k%d, title={T%d}, abstract={A%d}}'
+
+
+class BlockSliceTest(RedisTestCase):
+
+    def setUp(self):
+        super().setUp()
+        from lib.redis.paper_blocks import PaperBlocks
+
+        self.papers = {f'10.1/{i:02d}': BIB % (i, i, i) for i in range(23)}
+        PaperBlocks.set_block('J', 2020, self.papers, snapshot=False)
+        PaperBlocks.set_block('S', 2020, self.papers, snapshot=True)
+        PaperBlocks.set_block('K', 2021, {'10.1/k': BIB % (0, 0, 0)}, snapshot=False)
+
+    def test_slices_cover_every_record_once(self):
+        from lib.redis.paper_blocks import PaperBlocks
+
+        units = PaperBlocks.split_into_slices(['meta:J:2020', 'meta:K:2021'], 10)
+        self.assertEqual(units, ['meta:J:2020#0-9', 'meta:J:2020#10-19', 'meta:J:2020#20-22',
+                                 'meta:K:2021'])
+
+        for block_key in ('meta:J:2020', 'meta:S:2020'):
+            dois = []
+            for slice_key in PaperBlocks.split_into_slices([block_key], 10):
+                self.assertEqual(PaperBlocks.base_block_key(slice_key), block_key)
+                dois += list(PaperBlocks.get_block_records(slice_key))
+            self.assertEqual(sorted(dois), sorted(self.papers))
+            self.assertEqual(len(dois), len(set(dois)))
+
+    def test_slice_read_returns_only_its_span(self):
+        from lib.redis.paper_blocks import PaperBlocks
+
+        for block_key in ('meta:J:2020', 'meta:S:2020'):
+            records = PaperBlocks.get_block_records(f'{block_key}#20-22')
+            self.assertEqual(list(records), ['10.1/20', '10.1/21', '10.1/22'])
+            self.assertEqual(records['10.1/21'].title, 'T21')
+            self.assertEqual(PaperBlocks.get_block_by_key(f'{block_key}#3-4'),
+                             {'10.1/03': self.papers['10.1/03'], '10.1/04': self.papers['10.1/04']})
+
+    def test_split_key_and_small_blocks(self):
+        from lib.redis.paper_blocks import PaperBlocks
+
+        self.assertEqual(PaperBlocks.split_slice('meta:J:2020#10-19'), ('meta:J:2020', (10, 19)))
+        self.assertEqual(PaperBlocks.split_slice('meta:J:2020'), ('meta:J:2020', None))
+        self.assertEqual(PaperBlocks.split_into_slices(['meta:J:2020'], 0), ['meta:J:2020'])
+        self.assertEqual(PaperBlocks.split_into_slices(['meta:J:2020'], 23), ['meta:J:2020'])
+
+    def test_missing_doi_list_is_rebuilt(self):
+        from lib.redis.paper_blocks import PaperBlocks
+
+        self.redis.delete(PaperBlocks._key_block_dois('meta:J:2020'))
+        units = PaperBlocks.split_into_slices(['meta:J:2020'], 20)
+        self.assertEqual(units, ['meta:J:2020#0-19', 'meta:J:2020#20-22'])
+        self.assertEqual(list(PaperBlocks.get_block_records(units[1])),
+                         ['10.1/20', '10.1/21', '10.1/22'])
+
+    def test_produce_tasks_enqueues_slices(self):
+        from lib.process import paper_processor
+        from lib.redis.task_queue import TaskQueue
+
+        with mock.patch.object(config, 'block_slice_size', 10, create=True), \
+                mock.patch.object(paper_processor, 'get_year_number',
+                                  side_effect=lambda j: {2020: 23} if j == 'J' else {2021: 1}), \
+                mock.patch.object(paper_processor, 'update_query_status'), \
+                mock.patch.object(paper_processor, 'mark_query_completed'):
+            paper_processor.produce_tasks(['J', 'K'], {'include_all': True}, 1000, 'q', 1, '', '')
+
+        pending = TaskQueue.get_all_pending(1, 'q')
+        self.assertEqual(sorted(pending), ['meta:J:2020#0-9', 'meta:J:2020#10-19',
+                                           'meta:J:2020#20-22', 'meta:K:2021'])
+        self.assertEqual(TaskQueue.get_status(1, 'q')['total_blocks'], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
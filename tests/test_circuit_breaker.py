@@ -0,0 +1,101 @@
+"""
+熔断器状态机单元测试
+"""
+
+import unittest
+from unittest import mock
+
+from lib.config import config_loader as config
+from lib.process import circuit_breaker
+from lib.process.circuit_breaker import (
+    KEY_FAILURE_ERRORS, MIN_REQUESTS, STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN, CircuitBreaker
+)
+from lib.process.resilient_call import ERR_BAD_REQUEST, ERR_RATE_LIMIT, ERR_SERVER
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patchers = [
+            mock.patch.object(circuit_breaker.time, 'time', side_effect=lambda: self.now),
+            mock.patch.object(config, 'circuit_open_seconds', 10, create=True),
+            mock.patch.object(config, 'circuit_error_rate', 0.5, create=True),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker('key:test')
+
+    def _trip(self):
+        for _ in range(MIN_REQUESTS):
+            self.breaker.record(False)
+        self.assertEqual(self.breaker.get_state(), STATE_OPEN)
+
+    def test_opens_on_error_rate_after_min_requests(self):
+        for _ in range(MIN_REQUESTS - 1):
+            self.breaker.record(False)
+        self.assertEqual(self.breaker.get_state(), STATE_CLOSED)
+
+        self.breaker.record(False)
+        self.assertEqual(self.breaker.get_state(), STATE_OPEN)
+        self.assertFalse(self.breaker.try_acquire())
+        self.assertFalse(self.breaker.is_available())
+        self.assertEqual(self.breaker.retry_in(), 10)
+
+    def test_error_rate_below_threshold_stays_closed(self):
+        for i in range(20):
+            self.breaker.record(i % 3 != 0)
+        self.assertEqual(self.breaker.get_state(), STATE_CLOSED)
+
+    def test_half_open_admits_a_single_probe(self):
+        self._trip()
+        self.now += 10
+        self.assertEqual(self.breaker.get_state(), STATE_HALF_OPEN)
+
+        self.assertTrue(self.breaker.try_acquire())
+        self.assertFalse(self.breaker.try_acquire())
+        self.assertFalse(self.breaker.is_available())
+
+        # 调用未发出时归还探测名额
+        self.breaker.cancel()
+        self.assertTrue(self.breaker.try_acquire())
+
+        # 探测请求长时间没有结果时允许新的探测
+        self.now += 10
+        self.assertTrue(self.breaker.try_acquire())
+
+    def test_probe_success_closes(self):
+        self._trip()
+        self.now += 10
+        self.assertTrue(self.breaker.try_acquire())
+        self.breaker.record(True)
+
+        self.assertEqual(self.breaker.get_state(), STATE_CLOSED)
+        # 统计已清空，单次失败不会再次打开
+        self.breaker.record(False)
+        self.assertEqual(self.breaker.get_state(), STATE_CLOSED)
+
+    def test_probe_failure_doubles_open_time(self):
+        self._trip()
+        for expected in (20, 40, 80):
+            self.now += self.breaker.retry_in()
+            self.assertTrue(self.breaker.try_acquire())
+            self.breaker.record(False)
+            self.assertEqual(self.breaker.get_state(), STATE_OPEN)
+            self.assertEqual(self.breaker.retry_in(), expected)
+        self.assertEqual(self.breaker.get_stats()['trips'], 4)
+
+    def test_rate_limit_and_bad_request_do_not_count(self):
+        self.assertNotIn(ERR_RATE_LIMIT, KEY_FAILURE_ERRORS)
+        self.assertNotIn(ERR_BAD_REQUEST, KEY_FAILURE_ERRORS)
+        self.assertIn(ERR_SERVER, KEY_FAILURE_ERRORS)
+
+        # 与 ApiKeyPool.release() 相同的反馈方式
+        for _ in range(MIN_REQUESTS * 2):
+            self.breaker.record(ERR_RATE_LIMIT not in KEY_FAILURE_ERRORS)
+        self.assertEqual(self.breaker.get_state(), STATE_CLOSED)
+
+
+if __name__ == '__main__':
+    unittest.main()
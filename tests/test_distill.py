@@ -0,0 +1,76 @@
+"""
+蒸馏Worker单元测试：按蒸馏Block中保存的期刊价格计费
+"""
+
+import json
+import unittest
+
+from tests.fake_redis import RedisTestCase
+
+
+BIB = '@article{k%d, title={Title %d}, abstract={Abstract %d}, year={2024}}'
+
+
+class DistillPriceTest(RedisTestCase):
+
+    def setUp(self):
+        super().setUp()
+        from lib.redis.system_config import SystemConfig
+        from lib.redis.task_queue import TaskQueue
+        from lib.redis.user_cache import UserCache
+
+        self.uid, self.qid = 1, 'distill_q'
+        self.block_key = f"distill:{self.uid}:{self.qid}:0"
+        self.redis.hset(self.block_key, mapping={
+            f'10.1/d{i}': json.dumps({'bib': BIB % (i, i, i), 'price': 5})
+            for i in range(3)
+        })
+        SystemConfig.set_distill_rate(0.1)
+        SystemConfig.set_cache_hit_rate(0.1)
+        TaskQueue.init_status(self.uid, self.qid, 1)
+        TaskQueue.enqueue_blocks(self.uid, self.qid, [self.block_key])
+        UserCache.set_balance(self.uid, 100)
+
+    def _run_block(self, ai_result):
+        from lib.process.distill import DistillWorker
+
+        titles = []
+
+        def ai_processor(doi, title, abstract):
+            titles.append(title)
+            return dict(ai_result)
+
+        inner = DistillWorker.build_block_worker(self.uid, self.qid, ai_processor)
+        inner._running = True
+        inner._process_block(self.block_key)
+        return titles
+
+    def test_records_keep_stored_price(self):
+        from lib.redis.paper_blocks import PaperBlocks
+
+        records = PaperBlocks.get_block_records(self.block_key)
+        self.assertEqual(len(records), 3)
+        for record in records.values():
+            self.assertEqual(record.price, 5)
+            self.assertTrue(record.title.startswith('Title'))
+
+    def test_deducts_stored_price_times_distill_rate(self):
+        from lib.redis.user_cache import UserCache
+
+        titles = self._run_block({'relevant': 'Y', 'reason': 'ok', '_tokens': 0})
+
+        self.assertEqual(len(titles), 3)
+        self.assertAlmostEqual(UserCache.get_balance(self.uid), 100 - 3 * 5 * 0.1)
+
+    def test_block_without_price_falls_back_to_default(self):
+        from lib.redis.user_cache import UserCache
+
+        self.redis.hset(self.block_key, '10.1/d0', BIB % (0, 0, 0))
+        self._run_block({'relevant': 'N', 'reason': 'no', '_tokens': 0})
+
+        # 无价格的旧格式记录按默认价格1计费
+        self.assertAlmostEqual(UserCache.get_balance(self.uid), 100 - (5 + 5 + 1) * 0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
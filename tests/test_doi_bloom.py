@@ -0,0 +1,104 @@
+"""
+DOI查询的布隆过滤器单元测试（未命中的快速否定、误判回退、索引的事务维护与离线修复）
+"""
+
+import importlib.util
+import os
+import unittest
+from unittest import mock
+
+from tests.fake_redis import RedisTestCase, project_root
+
+
+BIB = '@article{k%d, title={T%d}, abstract={A%d}}'
+
+
+def _load_repair_script():
+    path = os.path.join(project_root, 'scripts', 'repair_doi_index.py')
+    spec = importlib.util.spec_from_file_location('repair_doi_index', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class DoiBloomTest(RedisTestCase):
+
+    def setUp(self):
+        super().setUp()
+        from lib.redis.doi_index import DoiIndex
+        from lib.redis.paper_blocks import PaperBlocks
+
+        PaperBlocks.set_block('J', 2020, {f'10.1/{i}': BIB % (i, i, i) for i in range(5)},
+                              snapshot=False)
+        DoiIndex.mark_bloom_ready()
+        patcher = mock.patch.object(DoiIndex, '_get_legacy', wraps=DoiIndex._get_legacy)
+        self.legacy = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_miss_with_negative_bloom_skips_legacy_lookup(self):
+        from lib.redis.doi_index import DoiIndex
+        from lib.redis.paper_blocks import PaperBlocks
+
+        self.assertEqual(DoiIndex.might_contain(['10.1/0', '10.1/unknown']),
+                         {'10.1/0': True, '10.1/unknown': False})
+        with mock.patch.object(PaperBlocks, 'list_blocks') as list_blocks:
+            self.assertIsNone(PaperBlocks.get_paper_by_doi('10.1/unknown'))
+            list_blocks.assert_not_called()
+        self.legacy.assert_not_called()
+
+        found = PaperBlocks.batch_get_papers_by_doi(['10.1/1', '10.1/unknown'])
+        self.assertEqual(found, {'10.1/1': ('meta:J:2020', BIB % (1, 1, 1))})
+        self.legacy.assert_not_called()
+
+    def test_bloom_positive_miss_falls_back_to_legacy(self):
+        from lib.redis.doi_index import KEY_LEGACY_DOI_INDEX, DoiIndex
+
+        # 旧索引中的DOI：布隆过滤器为是（模拟误判或迁移遗漏）时才回退
+        self.redis.hset(KEY_LEGACY_DOI_INDEX, '10.1/old', 'meta:OLD:2019')
+        pipe = self.binary.pipeline()
+        DoiIndex.add_bloom(pipe, ['10.1/old'])
+        pipe.execute()
+
+        self.assertEqual(DoiIndex.get('10.1/old'), 'meta:OLD:2019')
+        self.legacy.assert_called_once_with(['10.1/old'])
+
+    def test_every_miss_falls_back_until_bloom_is_ready(self):
+        from lib.redis.doi_index import KEY_DOI_BLOOM_READY, DoiIndex
+
+        self.redis.delete(KEY_DOI_BLOOM_READY)
+        self.assertIsNone(DoiIndex.get('10.1/unknown'))
+        self.legacy.assert_called_once_with(['10.1/unknown'])
+        self.assertEqual(DoiIndex.might_contain(['10.1/unknown']), {'10.1/unknown': True})
+
+    def test_set_paper_maintains_index_and_bloom(self):
+        from lib.redis.doi_index import DoiIndex
+        from lib.redis.paper_blocks import PaperBlocks
+
+        PaperBlocks.set_paper('K', 2021, '10.1/new', BIB % (9, 9, 9))
+        self.assertEqual(DoiIndex.might_contain(['10.1/new']), {'10.1/new': True})
+        self.assertEqual(PaperBlocks.get_paper_by_doi('10.1/new'), ('meta:K:2021', BIB % (9, 9, 9)))
+        self.legacy.assert_not_called()
+
+    def test_repair_script_restores_missing_entries(self):
+        from lib.redis.doi_index import DoiIndex
+        from lib.redis.paper_blocks import PaperBlocks
+
+        pipe = self.binary.pipeline()
+        DoiIndex.remove(pipe, ['10.1/2'])
+        pipe.execute()
+        self.assertIsNone(PaperBlocks.get_paper_by_doi('10.1/2'))
+
+        repair = _load_repair_script()
+        with mock.patch('sys.argv', ['repair_doi_index.py', '--dry-run']):
+            repair.main()
+        self.assertIsNone(DoiIndex.get('10.1/2'))
+
+        with mock.patch('sys.argv', ['repair_doi_index.py', '--rebuild-bloom']):
+            repair.main()
+        self.assertEqual(PaperBlocks.get_paper_by_doi('10.1/2'), ('meta:J:2020', BIB % (2, 2, 2)))
+        self.assertEqual(DoiIndex.might_contain(['10.1/2', '10.1/unknown']),
+                         {'10.1/2': True, '10.1/unknown': False})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+"""
+分桶DOI反向索引单元测试（指纹分桶、Block ID字典、批量查询、旧索引回退）
+"""
+
+import unittest
+
+from lib.redis.doi_index import BUCKET_PREFIX, DOI_BUCKETS, fingerprint
+from tests.fake_redis import RedisTestCase
+
+
+class FingerprintTest(unittest.TestCase):
+
+    def test_stable_bucket_and_short_field(self):
+        bucket, field = fingerprint('10.1038/nature12373')
+        self.assertEqual((bucket, field), fingerprint('10.1038/nature12373'))
+        self.assertTrue(bucket.startswith(BUCKET_PREFIX))
+        self.assertLess(int(bucket[len(BUCKET_PREFIX):]), DOI_BUCKETS)
+        self.assertEqual(len(field), 8)
+        self.assertNotEqual(field, fingerprint('10.1038/nature12374')[1])
+
+
+class DoiIndexTest(RedisTestCase):
+
+    def test_set_and_batch_get(self):
+        from lib.redis.doi_index import DoiIndex
+
+        doi_blocks = {f'10.1/{i}': f'meta:J{i % 3}:2020' for i in range(30)}
+        self.assertEqual(DoiIndex.set(doi_blocks), 30)
+
+        self.assertEqual(DoiIndex.get('10.1/4'), 'meta:J1:2020')
+        self.assertEqual(DoiIndex.get_many(list(doi_blocks) + ['10.1/none', '']), doi_blocks)
+        self.assertIsNone(DoiIndex.get('10.1/none'))
+        self.assertIsNone(DoiIndex.get(''))
+
+    def test_values_are_integer_block_ids(self):
+        from lib.redis.doi_index import KEY_BLOCK_KEYS, DoiIndex
+
+        DoiIndex.set({'10.1/a': 'meta:J:2020', '10.1/b': 'meta:J:2020', '10.1/c': 'meta:K:2021'})
+        block_id = DoiIndex.block_id('meta:J:2020')
+        self.assertEqual(DoiIndex.block_id('meta:K:2021'), block_id + 1)
+
+        bucket, field = fingerprint('10.1/a')
+        self.assertEqual(int(self.binary.hget(bucket, field)), block_id)
+        self.assertEqual(self.redis.hget(KEY_BLOCK_KEYS, str(block_id)), 'meta:J:2020')
+
+    def test_block_ids_resolve_after_process_cache_is_cleared(self):
+        from lib.redis import doi_index
+        from lib.redis.doi_index import DoiIndex
+
+        DoiIndex.set({'10.1/a': 'meta:J:2020'})
+        block_id = DoiIndex.block_id('meta:J:2020')
+        doi_index._block_ids.clear()
+        doi_index._block_keys.clear()
+
+        # 其他进程：同一Block得到相同ID，查询时从Redis解析
+        self.assertEqual(DoiIndex.get('10.1/a'), 'meta:J:2020')
+        self.assertEqual(DoiIndex.block_id('meta:J:2020'), block_id)
+
+    def test_remove_entries(self):
+        from lib.redis.doi_index import DoiIndex
+
+        DoiIndex.set({'10.1/a': 'meta:J:2020', '10.1/b': 'meta:J:2020'})
+        pipe = self.binary.pipeline()
+        DoiIndex.remove(pipe, ['10.1/a'])
+        pipe.execute()
+        self.assertEqual(DoiIndex.get_many(['10.1/a', '10.1/b'], legacy=False),
+                         {'10.1/b': 'meta:J:2020'})
+
+    def test_legacy_index_fallback_before_migration(self):
+        from lib.redis.doi_index import KEY_LEGACY_DOI_INDEX, DoiIndex
+
+        self.redis.hset(KEY_LEGACY_DOI_INDEX, mapping={'10.1/old': 'meta:OLD:2019'})
+        DoiIndex.set({'10.1/new': 'meta:J:2020'})
+
+        self.assertEqual(DoiIndex.get_many(['10.1/old', '10.1/new']),
+                         {'10.1/old': 'meta:OLD:2019', '10.1/new': 'meta:J:2020'})
+        self.assertEqual(DoiIndex.get_many(['10.1/old'], legacy=False), {})
+        self.assertTrue(DoiIndex.exists())
+
+    def test_paper_blocks_batch_lookup_uses_index(self):
+        from lib.redis.paper_blocks import PaperBlocks
+
+        PaperBlocks.set_block('J', 2020, {'10.1/a': '@article{a, title={A}}'}, snapshot=False)
+        PaperBlocks.set_block('K', 2021, {'10.1/b': '@article{b, title={B}}'}, snapshot=False)
+
+        self.assertEqual(PaperBlocks.batch_get_block_keys(['10.1/a', '10.1/b', '10.1/c']),
+                         {'10.1/a': 'meta:J:2020', '10.1/b': 'meta:K:2021'})
+        self.assertEqual(PaperBlocks.get_block_key_by_doi('10.1/b'), 'meta:K:2021')
+
+        PaperBlocks.delete_block('J', 2020)
+        self.assertIsNone(PaperBlocks.get_block_key_by_doi('10.1/a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
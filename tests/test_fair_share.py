@@ -0,0 +1,110 @@
+"""
+全局公平共享闸门单元测试（放行顺序、优先级老化、槽位归还）
+"""
+
+import unittest
+from unittest import mock
+
+from lib.config import config_loader as config
+from lib.process import fair_share
+from lib.process.fair_share import (
+    FairShareGate, PRIORITY_ADMIN, PRIORITY_BATCH, PRIORITY_INTERACTIVE
+)
+
+
+class FairShareGateTest(unittest.TestCase):
+
+    def setUp(self):
+        for name, value in (('fair_share_concurrency', 1), ('adaptive_concurrency', False),
+                            ('priority_aging_seconds', 10)):
+            patcher = mock.patch.object(config, name, value, create=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.gate = FairShareGate()
+        self.gate._refresh_capacity()
+
+    def _enqueue(self, uid, qid):
+        with self.gate._lock:
+            return self.gate._enqueue(uid, qid)
+
+    def test_grants_immediately_within_capacity(self):
+        waiter = self._enqueue(1, 'a')
+        self.assertTrue(waiter.granted)
+        self.assertFalse(self._enqueue(2, 'b').granted)
+
+        stats = self.gate.get_stats()
+        self.assertEqual((stats['capacity'], stats['in_flight'], stats['queued']), (1, 1, 1))
+
+    def test_higher_priority_released_first(self):
+        self._enqueue(1, 'busy')
+        self.gate.set_priority(2, 'batch', PRIORITY_BATCH, remaining=0)
+        self.gate.set_priority(3, 'admin', PRIORITY_ADMIN, remaining=1000)
+        batch = self._enqueue(2, 'batch')
+        admin = self._enqueue(3, 'admin')
+
+        self.gate.release(1, 'busy')
+        self.assertTrue(admin.granted)
+        self.assertFalse(batch.granted)
+
+        self.gate.release(3, 'admin')
+        self.assertTrue(batch.granted)
+
+    def test_less_remaining_work_first_within_priority(self):
+        self._enqueue(1, 'busy')
+        self.gate.set_priority(2, 'big', PRIORITY_INTERACTIVE, remaining=500)
+        self.gate.set_priority(3, 'small', PRIORITY_INTERACTIVE, remaining=1)
+        big = self._enqueue(2, 'big')
+        small = self._enqueue(3, 'small')
+
+        self.gate.release(1, 'busy')
+        self.assertTrue(small.granted)
+        self.assertFalse(big.granted)
+
+    def test_old_batch_request_ages_past_new_admin(self):
+        self._enqueue(1, 'busy')
+        self.gate.set_priority(2, 'batch', PRIORITY_BATCH, remaining=1000)
+        self.gate.set_priority(3, 'admin', PRIORITY_ADMIN, remaining=0)
+        with mock.patch.object(fair_share.time, 'time', return_value=1000.0):
+            batch = self._enqueue(2, 'batch')
+        # batch 宽限时间不超过 10s，20s 后到达的 admin 请求时限更晚
+        with mock.patch.object(fair_share.time, 'time', return_value=1020.0):
+            admin = self._enqueue(3, 'admin')
+
+        self.gate.release(1, 'busy')
+        self.assertTrue(batch.granted)
+        self.assertFalse(admin.granted)
+
+    def test_slot_releases_on_exit(self):
+        with self.gate.slot(1, 'a'):
+            self.assertEqual(self.gate.get_flow_stats(1, 'a')['in_flight'], 1)
+        self.assertEqual(self.gate.get_stats()['in_flight'], 0)
+        self.assertTrue(self._enqueue(2, 'b').granted)
+
+    def test_remove_flow_waits_for_in_flight_calls(self):
+        self._enqueue(1, 'a')
+        self.gate.remove_flow(1, 'a')
+        self.assertEqual(self.gate.get_stats()['flows'], 1)
+
+        # 移除标记后归还的槽位仍计入全局在途数
+        self.gate.release(1, 'a')
+        stats = self.gate.get_stats()
+        self.assertEqual((stats['flows'], stats['in_flight']), (0, 0))
+        self.assertTrue(self._enqueue(2, 'b').granted)
+
+    def test_remove_flow_after_queued_request_cancelled(self):
+        self._enqueue(1, 'busy')
+        waiter = self._enqueue(2, 'b')
+        self.gate.remove_flow(2, 'b')
+        self.gate._cancel(waiter)
+        self.assertEqual(self.gate.get_flow_stats(2, 'b')['weight'], 0)
+
+    def test_restarted_query_keeps_its_flow(self):
+        self._enqueue(1, 'a')
+        self.gate.remove_flow(1, 'a')
+        self.gate.set_weight(1, 'a', 4)
+        self.gate.release(1, 'a')
+        self.assertEqual(self.gate.get_flow_stats(1, 'a')['weight'], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
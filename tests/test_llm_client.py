@@ -0,0 +1,64 @@
+"""
+LLM客户端池单元测试（同步客户端复用、异步客户端在各自的事件循环中关闭）
+"""
+
+import asyncio
+import threading
+import unittest
+
+from lib.process import llm_client
+
+
+class LLMClientCloseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.addCleanup(llm_client.close_llm_clients)
+
+    def _run_loop(self):
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+
+        def stop():
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(5)
+            loop.close()
+        self.addCleanup(stop)
+        return loop
+
+    @staticmethod
+    async def _get_client(api_key):
+        return llm_client.get_async_llm_client(api_key, 'http://localhost:1/v1')
+
+    def test_sync_client_is_shared_and_closed(self):
+        client = llm_client.get_llm_client('sk-a', 'http://localhost:1/v1')
+        self.assertIs(llm_client.get_llm_client('sk-a', 'http://localhost:1/v1'), client)
+
+        llm_client.close_llm_clients()
+        self.assertTrue(client.is_closed())
+        self.assertEqual(llm_client._clients, {})
+
+    def test_async_clients_are_closed_on_their_own_loop(self):
+        loops = [self._run_loop(), self._run_loop()]
+        clients = [asyncio.run_coroutine_threadsafe(self._get_client('sk-a'), loop).result(5)
+                   for loop in loops]
+        self.assertIsNot(clients[0], clients[1])
+        self.assertIs(asyncio.run_coroutine_threadsafe(
+            self._get_client('sk-a'), loops[0]).result(5), clients[0])
+
+        llm_client.close_llm_clients()
+        self.assertTrue(all(client.is_closed() for client in clients))
+        self.assertEqual(llm_client._async_clients, {})
+
+    def test_client_of_stopped_loop_is_closed_in_caller_thread(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        client = loop.run_until_complete(self._get_client('sk-b'))
+
+        llm_client.close_llm_clients()
+        self.assertTrue(client.is_closed())
+        self.assertEqual(llm_client._async_clients, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,203 @@
+"""
+文献结果原子提交单元测试（COMMIT_SCRIPT、COMMIT_BATCH_SCRIPT 与 Worker 的终止检查）
+"""
+
+import json
+import unittest
+
+from tests.fake_redis import RedisTestCase
+
+
+UID, QID = 1, 'q1'
+
+
+class PaperCommitTest(RedisTestCase):
+
+    def setUp(self):
+        super().setUp()
+        from lib.redis.task_queue import TaskQueue
+        from lib.redis.user_cache import UserCache
+
+        TaskQueue.init_status(UID, QID, 1)
+        UserCache.set_balance(UID, 10)
+
+    def _commit(self, doi, price):
+        from lib.redis.paper_commit import PaperCommit
+        return PaperCommit.commit(UID, QID, doi, {'relevant': 'Y', 'reason': 'r'}, 'meta:J:2020', price)
+
+    def _state(self):
+        from lib.redis.billing import BillingQueue
+        from lib.redis.result_cache import ResultCache
+        from lib.redis.task_queue import TaskQueue
+        from lib.redis.user_cache import UserCache
+
+        return (
+            UserCache.get_balance(UID),
+            self.redis.hlen(ResultCache._key_result(UID, QID)),
+            self.redis.llen(BillingQueue._key_billing(UID)),
+            int(self.redis.get(TaskQueue._key_progress(UID, QID)) or 0),
+        )
+
+    def test_commit_charges_writes_result_bill_and_progress(self):
+        from lib.redis.paper_commit import COMMIT_OK
+        from lib.redis.result_cache import ResultCache
+
+        self.assertEqual(self._commit('10.1/a', 3), COMMIT_OK)
+        self.assertEqual(self._state(), (7, 1, 1, 1))
+
+        stored = json.loads(self.redis.hget(ResultCache._key_result(UID, QID), '10.1/a'))
+        self.assertEqual(stored['ai_result']['relevant'], 'Y')
+        self.assertEqual(stored['block_key'], 'meta:J:2020')
+
+    def test_duplicate_is_not_charged_twice(self):
+        from lib.redis.paper_commit import COMMIT_DUPLICATE
+
+        self._commit('10.1/a', 3)
+        self.assertEqual(self._commit('10.1/a', 3), COMMIT_DUPLICATE)
+        self.assertEqual(self._state(), (7, 1, 1, 1))
+
+    def test_free_commit_writes_no_bill(self):
+        from lib.redis.paper_commit import COMMIT_OK
+
+        self.assertEqual(self._commit('10.1/a', 0), COMMIT_OK)
+        self.assertEqual(self._state(), (10, 1, 0, 1))
+
+    def test_insufficient_and_missing_balance(self):
+        from lib.redis.paper_commit import COMMIT_INSUFFICIENT, COMMIT_NO_BALANCE
+        from lib.redis.user_cache import UserCache
+
+        self.assertEqual(self._commit('10.1/a', 11), COMMIT_INSUFFICIENT)
+        self.assertEqual(self._state(), (10, 0, 0, 0))
+
+        UserCache.delete_balance(UID)
+        self.assertEqual(self._commit('10.1/a', 1), COMMIT_NO_BALANCE)
+        self.assertEqual(self._state()[1], 0)
+
+    def test_terminated_query_is_rejected(self):
+        from lib.redis.paper_commit import COMMIT_TERMINATED
+        from lib.redis.task_queue import TaskQueue
+
+        TaskQueue.set_terminate_signal(UID, QID)
+        self.assertEqual(self._commit('10.1/a', 1), COMMIT_TERMINATED)
+        self.assertEqual(self._state(), (10, 0, 0, 0))
+
+
+class PaperCommitBatchTest(RedisTestCase):
+
+    def setUp(self):
+        super().setUp()
+        from lib.redis.task_queue import TaskQueue
+        from lib.redis.user_cache import UserCache
+
+        TaskQueue.init_status(UID, QID, 1)
+        UserCache.set_balance(UID, 10)
+
+    def _commit_batch(self, prices):
+        from lib.redis.paper_commit import PaperCommit
+        items = [(doi, {'relevant': 'N', 'reason': ''}, 'meta:J:2020', price)
+                 for doi, price in prices]
+        return PaperCommit.commit_batch(UID, QID, items)
+
+    def test_balance_cut_off_is_per_paper(self):
+        from lib.redis.billing import BillingQueue
+        from lib.redis.paper_commit import COMMIT_OK
+        from lib.redis.result_cache import ResultCache
+        from lib.redis.task_queue import TaskQueue
+        from lib.redis.user_cache import UserCache
+
+        result = self._commit_batch([('a', 4), ('b', 4), ('c', 4), ('d', 0), ('e', 2)])
+
+        # c 余额不足被跳过，其后更便宜的 e 仍可提交
+        self.assertEqual(result, (COMMIT_OK, 4, 0, 1))
+        self.assertEqual(UserCache.get_balance(UID), 0)
+        self.assertEqual(sorted(self.redis.hkeys(ResultCache._key_result(UID, QID))),
+                         ['a', 'b', 'd', 'e'])
+        self.assertEqual(self.redis.llen(BillingQueue._key_billing(UID)), 3)
+        self.assertEqual(self.redis.get(TaskQueue._key_progress(UID, QID)), '4')
+
+    def test_duplicates_within_batch_and_existing(self):
+        from lib.redis.paper_commit import COMMIT_OK
+        from lib.redis.user_cache import UserCache
+
+        self._commit_batch([('a', 1)])
+        result = self._commit_batch([('a', 1), ('b', 1), ('b', 1)])
+
+        self.assertEqual(result, (COMMIT_OK, 1, 2, 0))
+        self.assertEqual(UserCache.get_balance(UID), 8)
+
+    def test_terminated_batch_writes_nothing(self):
+        from lib.redis.paper_commit import COMMIT_TERMINATED
+        from lib.redis.task_queue import TaskQueue
+        from lib.redis.user_cache import UserCache
+
+        TaskQueue.set_terminate_signal(UID, QID)
+        self.assertEqual(self._commit_batch([('a', 1)]), (COMMIT_TERMINATED, 0, 0, 0))
+        self.assertEqual(UserCache.get_balance(UID), 10)
+
+
+class WorkerTerminateTest(RedisTestCase):
+    """终止信号在AI调用前生效，不依赖提交脚本"""
+
+    def setUp(self):
+        super().setUp()
+        from lib.process import worker as worker_module
+        from lib.redis.paper_blocks import PaperBlocks
+        from lib.redis.task_queue import TaskQueue
+        from lib.redis.user_cache import UserCache
+
+        PaperBlocks.set_block('J', 2020, {
+            f'10.1/{i}': '@article{k%d, title={T%d}, abstract={A%d}}' % (i, i, i) for i in range(10)
+        })
+        TaskQueue.init_status(UID, QID, 1)
+        UserCache.set_balance(UID, 100)
+
+        saved = worker_module.TERMINATE_CHECK_INTERVAL
+        worker_module.TERMINATE_CHECK_INTERVAL = 0
+        self.addCleanup(setattr, worker_module, 'TERMINATE_CHECK_INTERVAL', saved)
+
+    def _run(self, batch_size=1):
+        from lib.process.worker import BlockWorker
+        from lib.redis.task_queue import TaskQueue
+
+        calls = []
+
+        def ai_processor(doi, title, abstract):
+            calls.append(doi)
+            if len(calls) == 3:
+                TaskQueue.set_terminate_signal(UID, QID)
+            return {'relevant': 'Y', 'reason': 'r', '_tokens': 0}
+
+        worker = BlockWorker(UID, QID, ai_processor)
+        worker._batch_size = batch_size
+        worker._batch_interval = 3600
+        worker._running = True
+        worker._process_block('meta:J:2020')
+        return worker, calls
+
+    def test_no_ai_call_after_terminate(self):
+        from lib.redis.result_cache import ResultCache
+        from lib.redis.user_cache import UserCache
+
+        worker, calls = self._run()
+
+        self.assertEqual(len(calls), 3)
+        self.assertTrue(worker._terminated)
+        # 第3篇在终止后提交，被提交脚本拒绝
+        self.assertEqual(self.redis.hlen(ResultCache._key_result(UID, QID)), 2)
+        self.assertEqual(UserCache.get_balance(UID), 98)
+
+    def test_batch_buffer_dropped_on_terminate(self):
+        from lib.redis.result_cache import ResultCache
+        from lib.redis.user_cache import UserCache
+
+        worker, calls = self._run(batch_size=5)
+
+        # 终止后不再调用AI，缓冲区中未提交的2篇被丢弃
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(worker._commit_buffer, [])
+        self.assertEqual(self.redis.hlen(ResultCache._key_result(UID, QID)), 0)
+        self.assertEqual(UserCache.get_balance(UID), 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
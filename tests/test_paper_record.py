@@ -0,0 +1,141 @@
+"""
+文献记录编码单元测试（Bib字段解析、v1/v2记录往返、只解压字段、预置字典训练与登记）
+"""
+
+import base64
+import unittest
+import zlib
+
+from lib.redis.paper_record import (
+    RECORD_PREFIX, build_record, encode_payload, is_record, is_record_v2, pack_record,
+    pack_record_v2, parse_bib_fields, record_dict_id, record_payload, train_dictionary,
+    unpack_payload, unpack_record
+)
+from tests.fake_redis import RedisTestCase
+
+
+BIB = ('@article{k%d, title={Deep {Learning} for Protein Folding %d}, '
+       'booktitle={Proceedings}, journal={Nature}, year={2021}, '
+       'abstract={We study "protein" structures {with} transformers, sample %d.}, '
+       'url={https://doi.org/10.1/%d}}')
+
+
+def _bibs(n):
+    return [BIB % (i, i, i, i) for i in range(n)]
+
+
+class ParseBibFieldsTest(unittest.TestCase):
+
+    def test_nested_braces_and_quotes_are_kept(self):
+        fields = parse_bib_fields(BIB % (1, 1, 1, 1))
+        self.assertEqual(fields['title'], 'Deep {Learning} for Protein Folding 1')
+        self.assertEqual(fields['booktitle'], 'Proceedings')
+        self.assertIn('"protein"', fields['abstract'])
+
+        record = build_record(BIB % (1, 1, 1, 1))
+        self.assertEqual((record.year, record.url), (2021, 'https://doi.org/10.1/1'))
+
+    def test_quoted_values_and_bad_year(self):
+        record = build_record('@article{k, title = "A \\"quoted\\" {title}", year = {n.d.}}')
+        self.assertIn('quoted', record.title)
+        self.assertEqual(record.year, 0)
+        self.assertEqual(build_record('').title, '')
+
+
+class RecordRoundTripTest(unittest.TestCase):
+
+    def setUp(self):
+        self.bib = BIB % (7, 7, 7, 7)
+        self.expected = build_record(self.bib)
+
+    def test_v1_round_trip(self):
+        value = pack_record(self.bib)
+        self.assertTrue(value.startswith(RECORD_PREFIX))
+        self.assertTrue(is_record(value))
+        self.assertFalse(is_record_v2(value))
+        self.assertEqual(unpack_record(value), self.expected)
+        # 二进制客户端读出的bytes同样可解码
+        self.assertEqual(unpack_record(value.encode('ascii')), self.expected)
+
+    def test_v2_round_trip_with_dictionary(self):
+        zdict = train_dictionary([record_payload(build_record(b)) for b in _bibs(50)])
+        value = pack_record_v2(self.bib, 3, zdict)
+        self.assertTrue(is_record_v2(value))
+        self.assertEqual(record_dict_id(value), 3)
+        self.assertEqual(unpack_record(value, zdict=zdict), self.expected)
+        self.assertEqual(unpack_payload(value, zdict), record_payload(self.expected))
+        # 预置字典与去掉base64使v2明显小于v1
+        self.assertLess(len(value), len(pack_record(self.bib)) * 0.75)
+
+    def test_field_only_decode_skips_bib(self):
+        zdict = train_dictionary([record_payload(build_record(b)) for b in _bibs(20)])
+        for value, kwargs in ((pack_record(self.bib), {}),
+                              (pack_record_v2(self.bib, 1, zdict), {'zdict': zdict})):
+            record = unpack_record(value, with_bib=False, **kwargs)
+            self.assertEqual(record._replace(bib=self.bib), self.expected)
+            self.assertEqual(record.bib, '')
+
+    def test_legacy_values_fall_back_to_parsing(self):
+        legacy = base64.b64encode(zlib.compress(self.bib.encode('utf-8'))).decode('ascii')
+        self.assertFalse(is_record(legacy))
+        self.assertEqual(unpack_record(legacy), self.expected)
+        self.assertEqual(unpack_record(self.bib), self.expected)
+        self.assertIsNone(unpack_payload(self.bib))
+
+    def test_unicode_fields(self):
+        bib = '@article{k, title={蛋白质折叠 Ångström}, abstract={摘要}, year={2020}}'
+        record = unpack_record(encode_payload(record_payload(build_record(bib))), with_bib=False)
+        self.assertEqual((record.title, record.abstract), ('蛋白质折叠 Ångström', '摘要'))
+
+
+class TrainDictionaryTest(unittest.TestCase):
+
+    def test_keeps_shared_segments_within_size(self):
+        samples = [record_payload(build_record(b)) for b in _bibs(30)]
+        zdict = train_dictionary(samples, size=512)
+        self.assertLessEqual(len(zdict), 512)
+        self.assertIn(b'Protein', zdict)
+        # 只在一条样本中出现的片段不入选
+        self.assertNotIn(b'sample 17.', zdict)
+        self.assertEqual(train_dictionary([]), b'')
+
+
+class PaperDictionaryTest(RedisTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.zdict = train_dictionary([record_payload(build_record(b)) for b in _bibs(20)])
+
+    def test_current_dictionary_switches_new_writes_to_v2(self):
+        from lib.redis.paper_blocks import PaperBlocks
+        from lib.redis.paper_dict import PaperDictionary
+
+        self.assertIsNone(PaperDictionary.get_current())
+        PaperBlocks.set_block('J', 2020, {'10.1/old': BIB % (0, 0, 0, 0)}, snapshot=False)
+
+        dict_id = PaperDictionary.save(self.zdict)
+        self.assertTrue(PaperDictionary.set_current(dict_id))
+        self.assertEqual(PaperDictionary.get_current(), (dict_id, self.zdict))
+        PaperBlocks.set_block('J', 2021, {'10.1/new': BIB % (1, 1, 1, 1)}, snapshot=False)
+
+        self.assertTrue(self.binary.hget('meta:J:2020', '10.1/old').startswith(b'R1:'))
+        value = self.binary.hget('meta:J:2021', '10.1/new')
+        self.assertTrue(is_record_v2(value))
+        self.assertEqual(record_dict_id(value), dict_id)
+
+        # 进程内缓存清空后按记录头部的ID从Redis取字典
+        from lib.redis import paper_dict
+        paper_dict._dicts.clear()
+        records = PaperBlocks.get_block_records('meta:J:2021')
+        self.assertEqual(records['10.1/new'].title, 'Deep {Learning} for Protein Folding 1')
+        self.assertEqual(PaperBlocks.get_paper('J', 2021, '10.1/new'), BIB % (1, 1, 1, 1))
+
+    def test_unknown_dictionary_is_not_current(self):
+        from lib.redis.paper_dict import PaperDictionary
+
+        self.assertFalse(PaperDictionary.set_current(42))
+        self.assertIsNone(PaperDictionary.get(42))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+"""
+列式快照单元测试（编码往返、只解压字段、切片与单篇查询）
+"""
+
+import unittest
+from unittest import mock
+
+from lib.redis.paper_record import build_record, record_payload, train_dictionary
+from lib.redis.paper_snapshot import (
+    FRAME_SIZE, decode_snapshot, encode_snapshot, is_snapshot, read_count
+)
+from tests.fake_redis import RedisTestCase
+
+
+BIB = '@article{k%d, title={Title %d}, abstract={Abstract of paper %d}, url={u%d}, year={20%02d}}'
+COUNT = FRAME_SIZE * 2 + 5
+
+
+def _papers(n=COUNT):
+    return {f'10.1/{i:03d}': BIB % (i, i, i, i, i % 30) for i in range(n)}
+
+
+def _records(papers):
+    return [(doi, build_record(bib)) for doi, bib in sorted(papers.items())]
+
+
+class SnapshotCodecTest(unittest.TestCase):
+
+    def setUp(self):
+        self.records = _records(_papers())
+        self.expected = dict(self.records)
+
+    def test_round_trip_with_and_without_dictionary(self):
+        zdict = train_dictionary([record_payload(r) for _, r in self.records])
+        for dict_id, zdict in ((0, None), (5, zdict)):
+            blob = encode_snapshot(self.records, dict_id, zdict)
+            self.assertTrue(is_snapshot(blob))
+            self.assertEqual(read_count(blob), COUNT)
+            decoded = decode_snapshot(blob, zdict)
+            self.assertEqual(list(decoded), [doi for doi, _ in self.records])
+            self.assertEqual(decoded, self.expected)
+
+    def test_field_only_decode(self):
+        decoded = decode_snapshot(encode_snapshot(self.records), with_bib=False)
+        for doi, record in decoded.items():
+            self.assertEqual(record.bib, '')
+            self.assertEqual(record._replace(bib=self.expected[doi].bib), self.expected[doi])
+
+    def test_span_and_doi_subsets(self):
+        blob = encode_snapshot(self.records)
+        dois = [doi for doi, _ in self.records]
+
+        span = decode_snapshot(blob, span=(FRAME_SIZE - 2, FRAME_SIZE + 1))
+        self.assertEqual(list(span), dois[FRAME_SIZE - 2:FRAME_SIZE + 2])
+
+        wanted = [dois[0], dois[-1], '10.1/missing']
+        subset = decode_snapshot(blob, dois=wanted)
+        self.assertEqual(set(subset), {dois[0], dois[-1]})
+        self.assertEqual(subset[dois[-1]], self.expected[dois[-1]])
+
+    def test_empty_snapshot(self):
+        self.assertEqual(decode_snapshot(encode_snapshot([])), {})
+
+
+class SnapshotBlockTest(RedisTestCase):
+
+    def setUp(self):
+        super().setUp()
+        from lib.redis.paper_blocks import PaperBlocks
+
+        self.papers = _papers()
+        PaperBlocks.set_block('J', 2020, self.papers, snapshot=True)
+        PaperBlocks.set_block('H', 2020, self.papers, snapshot=False)
+
+    def test_set_block_writes_snapshot_readable_as_records(self):
+        from lib.redis.paper_blocks import PaperBlocks
+
+        self.assertEqual(self.binary.type('meta:J:2020'), b'string')
+        records = PaperBlocks.get_block_records('meta:J:2020')
+        self.assertEqual(records, PaperBlocks.get_block_records('meta:H:2020'))
+        self.assertEqual(records['10.1/007'].title, 'Title 7')
+        self.assertEqual(PaperBlocks.get_block('J', 2020), self.papers)
+        self.assertEqual(PaperBlocks.get_block_dois('J', 2020), sorted(self.papers))
+
+    def test_slice_keys_read_the_same_papers_from_both_formats(self):
+        from lib.redis.paper_blocks import PaperBlocks
+
+        for key in ('meta:J:2020', 'meta:H:2020'):
+            sliced = PaperBlocks.split_into_slices([key], FRAME_SIZE)
+            self.assertEqual(len(sliced), 3)
+            dois = []
+            for slice_key in sliced:
+                dois += list(PaperBlocks.get_block_records(slice_key))
+            self.assertEqual(dois, sorted(self.papers))
+
+    def test_single_paper_lookup(self):
+        from lib.redis import paper_blocks
+        from lib.redis.paper_blocks import PaperBlocks
+
+        doi = '10.1/020'
+        self.assertEqual(PaperBlocks.get_paper('J', 2020, doi), self.papers[doi])
+        # 首次读取不足以包含索引段时按头部长度重读
+        with mock.patch.object(paper_blocks, 'SNAPSHOT_PEEK', 16):
+            self.assertEqual(PaperBlocks._lookup_bib('meta:J:2020', doi), self.papers[doi])
+
+    def test_lookup_of_missing_paper_returns_none(self):
+        from lib.redis.paper_blocks import PaperBlocks
+
+        # HGET 为nil时脚本仍返回两个元素，不在解包时抛出异常
+        self.assertIsNone(PaperBlocks._lookup_bib('meta:H:2020', '10.1/missing'))
+        self.assertIsNone(PaperBlocks._lookup_bib('meta:none:2020', '10.1/000'))
+        self.assertIsNone(PaperBlocks._lookup_bib('meta:J:2020', '10.1/missing'))
+        self.assertEqual(PaperBlocks.get_paper_by_doi('10.1/005')[1], self.papers['10.1/005'])
+
+    def test_truncated_script_reply_is_a_miss(self):
+        from lib.redis import paper_blocks
+        from lib.redis.paper_blocks import PaperBlocks
+
+        # 真实Redis把Lua表中的nil之后的元素截断，回复只剩 ['hash']
+        with mock.patch.object(paper_blocks, 'get_script',
+                               return_value=lambda keys, args: [b'hash']):
+            self.assertIsNone(PaperBlocks._lookup_bib('meta:H:2020', '10.1/missing'))
+            self.assertEqual(PaperBlocks._parse_read_block('meta:H:2020', [b'snapshot'], True), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
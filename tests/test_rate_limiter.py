@@ -0,0 +1,69 @@
+"""
+Redis令牌桶限流单元测试（ACQUIRE_SCRIPT / RECONCILE_SCRIPT）
+"""
+
+import unittest
+
+from tests.fake_redis import RedisTestCase
+
+
+class RateLimiterTest(RedisTestCase):
+
+    def setUp(self):
+        super().setUp()
+        from lib.redis.rate_limiter import RateLimiter
+        self.limiter = RateLimiter
+
+    def _tokens(self, key):
+        return float(self.redis.hget(key, 't'))
+
+    def test_acquire_debits_global_and_key_bucket(self):
+        from lib.redis.rate_limiter import KEY_GLOBAL_BUCKET
+
+        index, wait = self.limiter.try_acquire([('k1', 6000, 60)], (60000, 600), 1000)
+
+        self.assertEqual((index, wait), (0, 0.0))
+        self.assertAlmostEqual(self._tokens(self.limiter._key_bucket('k1')), 5000, delta=5)
+        self.assertAlmostEqual(self._tokens(KEY_GLOBAL_BUCKET), 59000, delta=5)
+        self.assertGreater(self.redis.ttl(KEY_GLOBAL_BUCKET), 0)
+
+    def test_exhausted_key_falls_through_to_next_candidate(self):
+        candidates = [('k1', 60000, 1), ('k2', 60000, 60)]
+
+        self.assertEqual(self.limiter.try_acquire(candidates, (10 ** 6, 600), 10)[0], 0)
+        # k1 每分钟只允许1个请求，第二次请求落到 k2
+        self.assertEqual(self.limiter.try_acquire(candidates, (10 ** 6, 600), 10)[0], 1)
+
+    def test_all_exhausted_returns_wait(self):
+        self.assertEqual(self.limiter.try_acquire([('k1', 60000, 1)], (10 ** 6, 600), 10)[0], 0)
+
+        index, wait = self.limiter.try_acquire([('k1', 60000, 1)], (10 ** 6, 600), 10)
+        self.assertEqual(index, -1)
+        self.assertGreater(wait, 50)
+
+    def test_global_bucket_limits_all_keys(self):
+        candidates = [('k1', 60000, 60), ('k2', 60000, 60)]
+
+        self.assertEqual(self.limiter.try_acquire(candidates, (10 ** 6, 1), 10)[0], 0)
+        index, wait = self.limiter.try_acquire(candidates, (10 ** 6, 1), 10)
+        self.assertEqual(index, -1)
+        self.assertGreater(wait, 0)
+        # 全局桶不足时不触碰任何Key桶
+        self.assertFalse(self.redis.exists(self.limiter._key_bucket('k2')))
+
+    def test_reconcile_refunds_overestimate(self):
+        key = self.limiter._key_bucket('k1')
+        self.limiter.try_acquire([('k1', 6000, 60)], (60000, 600), 1000)
+
+        self.assertTrue(self.limiter.reconcile('k1', -400))
+        self.assertAlmostEqual(self._tokens(key), 5400, delta=5)
+        self.assertTrue(self.limiter.reconcile('k1', 900))
+        self.assertAlmostEqual(self._tokens(key), 4500, delta=5)
+
+    def test_reconcile_skips_expired_buckets(self):
+        self.assertTrue(self.limiter.reconcile('k1', 500))
+        self.assertFalse(self.redis.exists(self.limiter._key_bucket('k1')))
+
+
+if __name__ == '__main__':
+    unittest.main()
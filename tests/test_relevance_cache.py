@@ -0,0 +1,73 @@
+"""
+相关性结果缓存单元测试
+"""
+
+import unittest
+
+from tests.fake_redis import RedisTestCase
+
+
+class RelevanceCacheKeyTest(unittest.TestCase):
+
+    def setUp(self):
+        from lib.redis.relevance_cache import RelevanceCache
+        self.build_key = RelevanceCache.build_key
+
+    def test_normalizes_question_requirements_and_doi(self):
+        a = self.build_key('Deep  Learning\nfor X', 'Only RCTs', '10.1/ABC', 'm', 'prompt')
+        b = self.build_key(' deep learning for x ', 'only rcts', '10.1/abc', 'm', 'prompt')
+        self.assertEqual(a, b)
+        self.assertTrue(a.startswith('relcache:'))
+
+    def test_model_prompt_and_doi_change_key(self):
+        base = self.build_key('q', 'r', '10.1/a', 'm', 'prompt')
+        self.assertNotEqual(base, self.build_key('q', 'r', '10.1/b', 'm', 'prompt'))
+        self.assertNotEqual(base, self.build_key('q', 'r', '10.1/a', 'm2', 'prompt'))
+        self.assertNotEqual(base, self.build_key('q', 'r', '10.1/a', 'm', 'prompt v2'))
+
+
+class RelevanceCacheTest(RedisTestCase):
+
+    def test_round_trip_refreshes_ttl_and_counts(self):
+        from lib.redis.relevance_cache import RelevanceCache
+
+        key = RelevanceCache.build_key('q', 'r', '10.1/a', 'm', 'p')
+        self.assertIsNone(RelevanceCache.get(key))
+        self.assertTrue(RelevanceCache.set(key, 'Y', '相关', ttl=100))
+
+        self.redis.expire(key, 5)
+        self.assertEqual(RelevanceCache.get(key, ttl=100), {'relevant': 'Y', 'reason': '相关'})
+        self.assertGreater(self.redis.ttl(key), 5)
+
+        stats = RelevanceCache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['stores']), (1, 1, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+        RelevanceCache.reset_stats()
+        self.assertEqual(RelevanceCache.get_stats()['hits'], 0)
+
+
+class CacheHitBillingTest(RedisTestCase):
+
+    def test_cache_hit_is_billed_at_cache_hit_rate(self):
+        from lib.process.worker import BlockWorker
+        from lib.redis.paper_commit import COMMIT_OK
+        from lib.redis.system_config import SystemConfig
+        from lib.redis.task_queue import TaskQueue
+        from lib.redis.user_cache import UserCache
+
+        SystemConfig.set_cache_hit_rate(0.25)
+        TaskQueue.init_status(1, 'q', 1)
+        UserCache.set_balance(1, 10)
+        worker = BlockWorker(1, 'q')
+
+        status = worker._finish_paper(
+            '10.1/a', {'relevant': 'Y', 'reason': 'r', '_cached': True}, 'meta:J:2020', 4
+        )
+
+        self.assertEqual(status, COMMIT_OK)
+        self.assertAlmostEqual(UserCache.get_balance(1), 10 - 4 * 0.25)
+
+
+if __name__ == '__main__':
+    unittest.main()
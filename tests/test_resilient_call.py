@@ -0,0 +1,123 @@
+"""
+AI调用容错单元测试（错误分类、退避、对冲预算、失败文献的重新入队）
+"""
+
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from lib.config import config_loader as config
+from lib.process.resilient_call import (
+    ERR_AUTH, ERR_BAD_REQUEST, ERR_CIRCUIT_OPEN, ERR_NETWORK, ERR_NO_KEY, ERR_RATE_LIMIT,
+    ERR_SERVER, ERR_TIMEOUT, ERR_UNKNOWN, RETRY_MAX_DELAY, RETRYABLE_ERRORS,
+    CircuitOpenError, LatencyTracker, NoApiKeyError, backoff_delay, classify_error, retry_after
+)
+from tests.fake_redis import RedisTestCase
+
+
+class _StatusError(Exception):
+    def __init__(self, status, headers=None):
+        super().__init__(f"status {status}")
+        self.response = SimpleNamespace(status_code=status, headers=headers or {})
+
+
+class APITimeoutError(Exception):
+    pass
+
+
+class APIConnectionError(Exception):
+    pass
+
+
+class ClassifyErrorTest(unittest.TestCase):
+
+    def test_status_codes(self):
+        cases = {429: ERR_RATE_LIMIT, 408: ERR_TIMEOUT, 500: ERR_SERVER, 503: ERR_SERVER,
+                 401: ERR_AUTH, 403: ERR_AUTH, 400: ERR_BAD_REQUEST, 404: ERR_BAD_REQUEST}
+        for status, expected in cases.items():
+            self.assertEqual(classify_error(_StatusError(status)), expected, status)
+
+    def test_exception_types(self):
+        self.assertEqual(classify_error(APITimeoutError()), ERR_TIMEOUT)
+        self.assertEqual(classify_error(APIConnectionError()), ERR_NETWORK)
+        self.assertEqual(classify_error(ConnectionResetError()), ERR_NETWORK)
+        self.assertEqual(classify_error(NoApiKeyError()), ERR_NO_KEY)
+        self.assertEqual(classify_error(CircuitOpenError('open', 3)), ERR_CIRCUIT_OPEN)
+        self.assertEqual(classify_error(ValueError('parse')), ERR_UNKNOWN)
+
+        self.assertNotIn(ERR_BAD_REQUEST, RETRYABLE_ERRORS)
+        self.assertNotIn(ERR_UNKNOWN, RETRYABLE_ERRORS)
+
+    def test_retry_after(self):
+        self.assertEqual(retry_after(_StatusError(429, {'retry-after': '7'})), 7.0)
+        self.assertEqual(retry_after(_StatusError(429, {'retry-after': 'soon'})), 0.0)
+        self.assertEqual(retry_after(CircuitOpenError('open', 4.5)), 4.5)
+        self.assertEqual(retry_after(ValueError()), 0.0)
+
+
+class BackoffTest(unittest.TestCase):
+
+    def test_full_jitter_is_capped(self):
+        with mock.patch.object(config, 'ai_retry_base_delay', 1.0, create=True):
+            for attempt in range(10):
+                delay = backoff_delay(attempt)
+                self.assertGreaterEqual(delay, 0)
+                self.assertLessEqual(delay, min(RETRY_MAX_DELAY, 2 ** attempt))
+            self.assertGreaterEqual(backoff_delay(0, min_delay=5), 5)
+
+
+class LatencyTrackerTest(unittest.TestCase):
+
+    def test_hedge_delay_needs_samples_and_budget(self):
+        tracker = LatencyTracker()
+        with mock.patch.object(config, 'ai_hedge_enabled', True, create=True):
+            self.assertIsNone(tracker.hedge_delay())
+            # p95 每32个样本重新计算一次
+            for i in range(128):
+                tracker.record(float(i))
+            self.assertEqual(tracker.hedge_delay(), 121.0)
+
+            for _ in range(40):
+                tracker.hedge_delay()
+            # 预算为调用数的5%（至少1次）
+            self.assertTrue(tracker.try_hedge())
+            self.assertTrue(tracker.try_hedge())
+            self.assertFalse(tracker.try_hedge())
+
+        with mock.patch.object(config, 'ai_hedge_enabled', False, create=True):
+            self.assertIsNone(tracker.hedge_delay())
+
+
+class FailedPaperRequeueTest(RedisTestCase):
+    """重试用尽的文献推迟到重试Block，不扣费；重新入队次数用尽后免费写入失败结果"""
+
+    def setUp(self):
+        super().setUp()
+        from lib.redis.task_queue import TaskQueue
+        from lib.redis.user_cache import UserCache
+
+        TaskQueue.init_status(1, 'q', 1)
+        UserCache.set_balance(1, 10)
+
+    def test_retryable_failure_is_deferred_then_written_free(self):
+        from lib.process.worker import BlockWorker, COMMIT_DEFERRED
+        from lib.redis.paper_blocks import PaperBlocks
+        from lib.redis.paper_commit import COMMIT_OK
+        from lib.redis.user_cache import UserCache
+
+        worker = BlockWorker(1, 'q')
+        worker._max_requeue = 1
+        failed = {'relevant': 'N', 'reason': 'x', '_tokens': 0, '_failed': True, '_retryable': True}
+
+        status = worker._finish_paper('10.1/a', dict(failed), 'meta:J:2020', 3)
+        self.assertEqual(status, COMMIT_DEFERRED)
+        self.assertEqual(worker._deferred, ['10.1/a'])
+
+        retry_key = PaperBlocks.make_retry_key('meta:J:2020', ['10.1/a'], 1)
+        self.assertEqual(PaperBlocks.retry_attempt(retry_key), 1)
+        self.assertEqual(worker._finish_paper('10.1/a', dict(failed), retry_key, 3), COMMIT_OK)
+        self.assertEqual(UserCache.get_balance(1), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+"""
+调度事件单元测试（事件流发布/读取、确认、领取遗留的待确认事件、按优先级启动查询）
+"""
+
+import time
+import unittest
+from unittest import mock
+
+from tests.fake_redis import RedisTestCase
+
+
+class SchedulerEventsTest(RedisTestCase):
+
+    def setUp(self):
+        super().setUp()
+        from lib.redis.scheduler_events import SchedulerEvents
+
+        # 消费组从创建时的位置开始读取
+        self.assertEqual(SchedulerEvents.read(block_ms=10), [])
+
+    def _pending_count(self):
+        from lib.redis.scheduler_events import KEY_SCHED_EVENTS, SCHED_GROUP
+
+        return self.redis.xpending(KEY_SCHED_EVENTS, SCHED_GROUP)['pending']
+
+    def test_publish_then_read_and_ack(self):
+        from lib.redis.scheduler_events import SchedulerEvents
+
+        self.assertTrue(SchedulerEvents.publish_query(1, 'q1'))
+        self.assertTrue(SchedulerEvents.publish_query(2, 'q2', is_distillation=True))
+        self.assertFalse(SchedulerEvents.publish_query(0, 'q3'))
+
+        events = SchedulerEvents.read(block_ms=10)
+        self.assertEqual(events, [
+            {'uid': 1, 'qid': 'q1', 'is_distillation': False},
+            {'uid': 2, 'qid': 'q2', 'is_distillation': True},
+        ])
+        self.assertEqual(self._pending_count(), 0)
+        self.assertEqual(SchedulerEvents.read(block_ms=10), [])
+
+    def test_each_event_goes_to_one_consumer(self):
+        from lib.redis.scheduler_events import SchedulerEvents
+
+        SchedulerEvents.publish_query(1, 'q1')
+        first = SchedulerEvents.read(block_ms=10)
+        with mock.patch.object(SchedulerEvents, '_consumer', 'other-process'):
+            second = SchedulerEvents.read(block_ms=10)
+        self.assertEqual((len(first), second), (1, []))
+
+    def test_unacked_event_of_dead_consumer_is_reclaimed(self):
+        from lib.redis import scheduler_events
+        from lib.redis.scheduler_events import KEY_SCHED_EVENTS, SCHED_GROUP, SchedulerEvents
+
+        SchedulerEvents.publish_query(1, 'q1')
+        # 其他进程读取后在确认前退出
+        self.redis.xreadgroup(SCHED_GROUP, 'dead-process', {KEY_SCHED_EVENTS: '>'})
+        self.assertEqual(self._pending_count(), 1)
+
+        # 空闲时间未到时不领取
+        SchedulerEvents._last_reclaim = 0.0
+        self.assertEqual(SchedulerEvents.read(block_ms=10), [])
+
+        time.sleep(0.02)
+        SchedulerEvents._last_reclaim = 0.0
+        with mock.patch.object(scheduler_events, 'RECLAIM_IDLE_MS', 10):
+            events = SchedulerEvents.read(block_ms=10)
+        self.assertEqual(events, [{'uid': 1, 'qid': 'q1', 'is_distillation': False}])
+        self.assertEqual(self._pending_count(), 0)
+
+    def test_read_recreates_group_after_stream_is_deleted(self):
+        from lib.redis.scheduler_events import KEY_SCHED_EVENTS, SchedulerEvents
+
+        self.redis.delete(KEY_SCHED_EVENTS)
+        self.assertIsNone(SchedulerEvents.read(block_ms=10))
+        self.assertEqual(SchedulerEvents.read(block_ms=10), [])
+        SchedulerEvents.publish_query(1, 'q1')
+        self.assertEqual(len(SchedulerEvents.read(block_ms=10)), 1)
+
+
+class ProcessEventsTest(RedisTestCase):
+    """按 (优先级, 待处理Block数) 启动；满载时 batch 事件保留"""
+
+    def setUp(self):
+        super().setUp()
+        from lib.process import scheduler
+        from lib.redis.task_queue import TaskQueue
+
+        self.scheduler = scheduler
+        queries = {'batch-small': ('batch', 1), 'batch-large': ('batch', 5),
+                   'interactive': ('interactive', 9), 'admin': ('admin', 20)}
+        for qid, (priority, blocks) in queries.items():
+            TaskQueue.init_status(1, qid, blocks)
+            TaskQueue.set_priority(1, qid, priority)
+            TaskQueue.enqueue_blocks(1, qid, [f'meta:{qid}:{i}' for i in range(blocks)])
+
+        self.started = []
+        for target, kwargs in (
+                ('_start_query_workers',
+                 {'side_effect': lambda uid, qid, *args: self.started.append(qid)}),
+                ('get_permission', {'return_value': 2}),
+                ('_can_accept_new_work', {'return_value': True})):
+            patcher = mock.patch.object(scheduler, target, **kwargs)
+            setattr(self, target, patcher.start())
+            self.addCleanup(patcher.stop)
+        scheduler._pending_events.clear()
+        self.addCleanup(scheduler._pending_events.clear)
+
+    def _push(self, *qids):
+        self.scheduler._pending_events.extend(
+            {'uid': 1, 'qid': qid, 'is_distillation': False} for qid in qids)
+
+    def test_starts_by_priority_then_remaining_blocks(self):
+        self._push('batch-large', 'batch-small', 'interactive', 'admin', 'empty')
+        self.scheduler._process_events(True)
+
+        self.assertEqual(self.started, ['admin', 'interactive', 'batch-small', 'batch-large'])
+        self.assertEqual(len(self.scheduler._pending_events), 0)
+
+    def test_full_system_keeps_batch_events(self):
+        self._can_accept_new_work.return_value = False
+        self._push('batch-small', 'interactive')
+        self.scheduler._process_events(False)
+
+        self.assertEqual(self.started, ['interactive'])
+        self.assertEqual([e['qid'] for e in self.scheduler._pending_events], ['batch-small'])
+
+    def test_batch_waits_once_capacity_runs_out(self):
+        self._can_accept_new_work.return_value = False
+        self._push('batch-large', 'batch-small')
+        self.scheduler._process_events(True)
+
+        self.assertEqual(self.started, ['batch-small'])
+        self.assertEqual([e['qid'] for e in self.scheduler._pending_events], ['batch-large'])
+
+
+if __name__ == '__main__':
+    unittest.main()
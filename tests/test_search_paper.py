@@ -0,0 +1,98 @@
+"""
+AI调用重试单元测试（空响应重试与失败调用的Token上报）
+"""
+
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from lib.config import config_loader as config
+from lib.process import search_paper
+from lib.process.fair_share import FairShareGate
+from lib.process.resilient_call import (
+    ERR_BAD_RESPONSE, EmptyResponseError, RETRYABLE_ERRORS, classify_error
+)
+
+
+def _response(content):
+    message = SimpleNamespace(content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class EmptyResponseTest(unittest.TestCase):
+
+    def test_empty_content_is_retryable_bad_response(self):
+        for content in (None, '', '  \n'):
+            with self.assertRaises(EmptyResponseError):
+                search_paper._response_content(_response(content))
+        self.assertEqual(search_paper._response_content(_response('{"relevant": "Y"}')),
+                         '{"relevant": "Y"}')
+
+        error = classify_error(EmptyResponseError('empty'))
+        self.assertEqual(error, ERR_BAD_RESPONSE)
+        self.assertIn(error, RETRYABLE_ERRORS)
+
+    def test_api_call_keeps_tokens_of_empty_response(self):
+        response = _response(None)
+        response.usage = SimpleNamespace(total_tokens=120)
+        client = mock.Mock()
+        client.chat.completions.create.return_value = response
+        key_pool = mock.Mock()
+        endpoint = mock.Mock()
+        endpoint.try_acquire.return_value = True
+        estimator = mock.Mock()
+        estimator.estimate.return_value = 100
+
+        with mock.patch.object(search_paper, 'get_key_pool', return_value=key_pool), \
+                mock.patch.object(search_paper, 'get_endpoint_breaker', return_value=endpoint), \
+                mock.patch.object(search_paper, 'get_token_estimator', return_value=estimator), \
+                mock.patch.object(search_paper, 'get_llm_client', return_value=client):
+            result = search_paper._call_ai_api('{"system": "s", "user": "u"}')
+
+        self.assertEqual((result['_error'], result['_tokens']), (ERR_BAD_RESPONSE, 120))
+        # Key池按实际用量结算
+        self.assertEqual(key_pool.release.call_args[0][1], 120)
+
+
+class RetryTokenReportTest(unittest.TestCase):
+
+    def setUp(self):
+        for name, value in (('fair_share_concurrency', 4), ('adaptive_concurrency', False),
+                            ('ai_max_retries', 2)):
+            patcher = mock.patch.object(config, name, value, create=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        gate = FairShareGate()
+        for target, kwargs in (('get_fair_share_gate', {'return_value': gate}),
+                               ('backoff_delay', {'return_value': 0}),
+                               ('report_tokens', {})):
+            patcher = mock.patch.object(search_paper, target, **kwargs)
+            setattr(self, target, patcher.start())
+            self.addCleanup(patcher.stop)
+
+    def _failed_call(self, tokens):
+        return {'relevant': 'N', 'reason': 'empty', '_tokens': tokens,
+                '_error': ERR_BAD_RESPONSE, '_retry_after': 0}
+
+    def test_empty_response_is_retried_and_tokens_reported(self):
+        calls = [self._failed_call(50),
+                 {'relevant': 'Y', 'reason': 'ok', '_tokens': 80}]
+        with mock.patch.object(search_paper, '_call_hedged', side_effect=calls):
+            result = search_paper._call_with_retry('prompt', 1, 'q')
+
+        self.assertEqual((result['relevant'], result['_tokens']), ('Y', 80))
+        self.report_tokens.assert_called_once_with(50)
+
+    def test_exhausted_retries_fail_as_retryable(self):
+        calls = [self._failed_call(30) for _ in range(3)]
+        with mock.patch.object(search_paper, '_call_hedged', side_effect=calls):
+            result = search_paper._call_with_retry('prompt', 1, 'q')
+
+        self.assertTrue(result['_failed'])
+        self.assertTrue(result['_retryable'])
+        self.assertEqual(result['_tokens'], 0)
+        self.assertEqual(self.report_tokens.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
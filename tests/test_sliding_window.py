@@ -0,0 +1,89 @@
+"""
+环形数组滑动窗口单元测试
+"""
+
+import threading
+import unittest
+from unittest import mock
+
+from lib.process import sliding_window
+from lib.process.sliding_window import RPMSlidingWindow, SlidingWindow, TPMSlidingWindow
+
+
+class SlidingWindowTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch.object(sliding_window.time, 'time', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_values_expire_after_window(self):
+        window = SlidingWindow(60)
+        window.add(10)
+        self.now += 30
+        window.add(5, count=3)
+        self.assertEqual((window.get_total(), window.get_count()), (15, 4))
+
+        # 第一个数据点滑出窗口
+        self.now += 30
+        self.assertEqual((window.get_total(), window.get_count()), (5, 3))
+
+        self.now += 30
+        self.assertEqual((window.get_total(), window.get_count()), (0, 0))
+
+    def test_long_idle_gap_clears_all_slots(self):
+        window = SlidingWindow(60)
+        for _ in range(60):
+            window.add(1)
+            self.now += 1
+        self.assertEqual(window.get_total(), 59)
+
+        self.now += 3600
+        self.assertEqual(window.get_total(), 0)
+        window.add(2)
+        self.assertEqual(window.get_total(), 2)
+
+    def test_clock_going_back_counts_in_latest_slot(self):
+        window = SlidingWindow(60)
+        window.add(1)
+        self.now -= 10
+        window.add(1)
+        self.assertEqual(window.get_total(), 2)
+
+    def test_coarse_slots(self):
+        window = SlidingWindow(60, slots=6)
+        window.add(4)
+        self.now += 55
+        self.assertEqual(window.get_total(), 4)
+        self.now += 10
+        self.assertEqual(window.get_total(), 0)
+
+    def test_stripes_sum_across_threads(self):
+        window = SlidingWindow(60, stripes=4)
+
+        def worker():
+            for _ in range(1000):
+                window.add(1)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual((window.get_total(), window.get_count()), (8000, 8000))
+
+        window.clear()
+        self.assertEqual(window.get_total(), 0)
+
+    def test_tpm_and_rpm_windows(self):
+        tpm = TPMSlidingWindow(60)
+        rpm = RPMSlidingWindow(60)
+        tpm.add_tokens(1500)
+        rpm.add_request(3)
+        rpm.add_request(0)
+        self.assertEqual((tpm.get_tpm(), rpm.get_rpm(), rpm.get_count()), (1500, 3, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
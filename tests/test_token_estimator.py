@@ -0,0 +1,76 @@
+"""
+Token预估单元测试（文本估算、按实际用量的滑动平均校准、系数上下限、失败请求不参与校准）
+"""
+
+import unittest
+from unittest import mock
+
+from lib.config import config_loader as config
+from lib.process.token_estimator import (
+    CALIBRATION_ALPHA, CALIBRATION_MAX, CALIBRATION_MIN, MESSAGE_OVERHEAD,
+    TokenEstimator, approx_tokens,
+)
+
+
+class TokenEstimatorTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(config, 'estimated_completion_tokens', 60, create=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_approx_tokens(self):
+        self.assertEqual(approx_tokens(''), 0)
+        self.assertEqual(approx_tokens('abcdefgh'), 2)
+        self.assertEqual(approx_tokens('abcde'), 2)
+        self.assertEqual(approx_tokens('文献检索ab'), 5)
+
+    def test_estimate_sums_messages_and_completion(self):
+        estimator = TokenEstimator()
+        expected = (2 + MESSAGE_OVERHEAD) + (4 + MESSAGE_OVERHEAD) + 60
+        self.assertEqual(estimator.estimate('abcdefgh', '文献检索'), expected)
+
+        with mock.patch.object(config, 'estimated_completion_tokens', 0, create=True):
+            self.assertEqual(estimator.estimate(), 1)
+
+    def test_observe_moves_ratio_by_alpha(self):
+        estimator = TokenEstimator()
+        raw = estimator.estimate('x' * 400)
+
+        estimator.observe(raw, raw * 2)
+        ratio = 1.0 + CALIBRATION_ALPHA * (2.0 - 1.0)
+        self.assertEqual(estimator.get_stats(), {'ratio': round(ratio, 3), 'samples': 1})
+        self.assertEqual(estimator.estimate('x' * 400), int(raw * ratio))
+
+        # 预估值已乘过当前系数，校准时按原始估算计算真实比例
+        estimated = estimator.estimate('x' * 400)
+        estimator.observe(estimated, raw * 2)
+        self.assertAlmostEqual(estimator._ratio,
+                               ratio + CALIBRATION_ALPHA * (raw * 2 / (estimated / ratio) - ratio))
+        self.assertEqual(estimator.get_stats()['samples'], 2)
+
+    def test_ratio_is_clamped(self):
+        high = TokenEstimator()
+        high._ratio = CALIBRATION_MAX - 0.01
+        high.observe(100, 100 * 1000)
+        self.assertEqual(high._ratio, CALIBRATION_MAX)
+
+        low = TokenEstimator()
+        low._ratio = CALIBRATION_MIN + 0.01
+        low.observe(1000, 1)
+        self.assertEqual(low._ratio, CALIBRATION_MIN)
+
+        for _ in range(500):
+            high.observe(high.estimate('x' * 40), 1)
+        self.assertEqual(high._ratio, CALIBRATION_MIN)
+
+    def test_failed_requests_are_ignored(self):
+        estimator = TokenEstimator()
+        estimator.observe(100, 0)
+        estimator.observe(0, 100)
+        estimator.observe(100, -5)
+        self.assertEqual(estimator.get_stats(), {'ratio': 1.0, 'samples': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()